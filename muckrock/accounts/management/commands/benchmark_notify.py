@@ -0,0 +1,117 @@
+"""
+Benchmark notifying the owner and followers of a request, as done when a
+communication is received, against creating one notification at a time
+"""
+# Django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+# Standard Library
+import time
+
+# Third Party
+from actstream.models import Follow, followers
+
+# MuckRock
+from muckrock.accounts.models import Notification
+from muckrock.accounts.tasks import fan_out_notifications
+from muckrock.core.utils import new_action
+
+
+class Command(BaseCommand):
+    """Benchmark request notifications"""
+
+    help = (
+        "Compare query count and wall time of notifying a request's followers "
+        "in bulk against one notification at a time, for several numbers of "
+        "followers.  All data created is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--followers",
+            type=int,
+            nargs="+",
+            default=[10, 100, 1000, 5000],
+            help="Numbers of followers to benchmark",
+        )
+
+    def handle(self, *args, **kwargs):
+        if not settings.DEBUG:
+            raise CommandError("Benchmarking is only allowed with DEBUG on")
+
+        for num in kwargs["followers"]:
+            with transaction.atomic():
+                self.benchmark(num)
+                transaction.set_rollback(True)
+
+    def benchmark(self, num):
+        """Benchmark notifying a request with the given number of followers"""
+        # pylint: disable=import-outside-toplevel
+        # MuckRock
+        from muckrock.foia.factories import FOIARequestFactory
+
+        foia = FOIARequestFactory()
+        users = User.objects.bulk_create(
+            [User(username=f"benchmark-notify-{num}-{i}") for i in range(num)]
+        )
+        content_type = ContentType.objects.get_for_model(foia)
+        Follow.objects.bulk_create(
+            [
+                Follow(user=user, content_type=content_type, object_id=str(foia.pk))
+                for user in users
+            ]
+        )
+
+        action = new_action(foia.agency, "completed", target=foia)
+        legacy_queries, legacy_time = self.run(self.legacy_notify, foia, action)
+        # notify twice, so the identical notifications are marked read
+        action = new_action(foia.agency, "completed", target=foia)
+        self.legacy_notify(foia, action)
+        action = new_action(foia.agency, "completed", target=foia)
+        bulk_queries, bulk_time = self.run(foia.notify, action)
+
+        self.stdout.write(f"{num} followers:")
+        self.stdout.write(
+            f"  One at a time: {legacy_queries} queries, {legacy_time:.2f}s"
+        )
+        self.stdout.write(f"  Bulk: {bulk_queries} queries, {bulk_time:.2f}s")
+        if num > settings.NOTIFICATION_ASYNC_THRESHOLD:
+            background_queries, background_time = self.run(
+                fan_out_notifications,
+                content_type.pk,
+                foia.pk,
+                action.pk,
+                [user.pk for user in users],
+            )
+            self.stdout.write(
+                f"  Background fan out: {background_queries} queries, "
+                f"{background_time:.2f}s"
+            )
+
+    def run(self, func, *args):
+        """Run the function, returning the number of queries made and the wall
+        time"""
+        with CaptureQueriesContext(connection) as queries:
+            start = time.time()
+            func(*args)
+            elapsed = time.time() - start
+        return len(queries), elapsed
+
+    def legacy_notify(self, foia, action):
+        """Notify the owner and followers one notification at a time"""
+        identical_notifications = (
+            Notification.objects.for_object(foia)
+            .get_unread()
+            .filter(
+                action__actor_object_id=action.actor_object_id, action__verb=action.verb
+            )
+        )
+        for notification in identical_notifications:
+            notification.mark_read()
+        for user in [foia.composer.user] + followers(foia):
+            Notification.objects.create(user=user, action=action)
@@ -0,0 +1,100 @@
+"""
+Benchmark the grouped nightly statistics against the original implementation,
+which computed each statistic with its own query
+"""
+# Django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+# Standard Library
+import time
+
+# MuckRock
+from muckrock.accounts.management.commands._legacy_statistics import legacy_statistics
+from muckrock.accounts.statistics import compute_statistics
+
+
+class Command(BaseCommand):
+    """Benchmark the nightly statistics"""
+
+    help = (
+        "Compare query count and wall time of the grouped statistics against "
+        "the original one query per statistic implementation"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Create this many requests (with related data) before "
+            "benchmarking.  Only allowed with DEBUG on.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=settings.STATISTICS_WORKERS,
+            help="Number of groups to compute in parallel",
+        )
+
+    def handle(self, *args, **kwargs):
+        if kwargs["seed"]:
+            if not settings.DEBUG:
+                raise CommandError("Seeding is only allowed with DEBUG on")
+            self.seed(kwargs["seed"])
+
+        legacy, legacy_queries, legacy_time = self.run(legacy_statistics)
+        # the date is added when the statistics are stored
+        legacy.pop("date")
+        grouped, grouped_queries, grouped_time = self.run(compute_statistics, workers=1)
+        _, _, parallel_time = self.run(compute_statistics, workers=kwargs["workers"])
+
+        self.stdout.write(f"Original: {legacy_queries} queries, {legacy_time:.2f}s")
+        self.stdout.write(f"Grouped: {grouped_queries} queries, {grouped_time:.2f}s")
+        self.stdout.write(
+            f"Grouped with {kwargs['workers']} workers: {parallel_time:.2f}s"
+        )
+        mismatches = [key for key in legacy if legacy[key] != grouped.get(key)]
+        for key in mismatches:
+            self.stdout.write(
+                f"Mismatch for {key}: {legacy[key]} != {grouped.get(key)}"
+            )
+        if not mismatches:
+            self.stdout.write(f"All {len(legacy)} statistics match")
+
+    def run(self, func, **kwargs):
+        """Compute the statistics, returning the results, the number of queries
+        made from this thread and the wall time"""
+        with CaptureQueriesContext(connection) as queries:
+            start = time.time()
+            results = func(**kwargs)
+            elapsed = time.time() - start
+        return results, len(queries), elapsed
+
+    def seed(self, num):
+        """Seed the database with requests, communications and tasks"""
+        # pylint: disable=import-outside-toplevel
+        # MuckRock
+        from muckrock.communication.factories import FaxCommunicationFactory
+        from muckrock.core.factories import CrowdfundFactory
+        from muckrock.foia.factories import (
+            FOIACommunicationFactory,
+            FOIAFileFactory,
+            FOIARequestFactory,
+        )
+        from muckrock.task.factories import FlaggedTaskFactory, ResponseTaskFactory
+
+        statuses = ["done", "rejected", "submitted", "ack", "processed", "fix"]
+        for i in range(num):
+            foia = FOIARequestFactory(status=statuses[i % len(statuses)])
+            comm = FOIACommunicationFactory(foia=foia)
+            FaxCommunicationFactory(communication=comm)
+            FOIAFileFactory(comm=comm)
+            ResponseTaskFactory(communication=comm)
+            if i % 5 == 0:
+                FlaggedTaskFactory(foia=foia)
+                foia.crowdfund = CrowdfundFactory()
+                foia.save()
+        self.stdout.write(f"Seeded {num} requests")
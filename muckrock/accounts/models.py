@@ -308,6 +308,41 @@ class NotificationQuerySet(models.QuerySet):
         """All unread notifications"""
         return self.filter(read=False)
 
+    def mark_read(self):
+        """Mark all of the notifications read, with a single update"""
+        return self.update(read=True)
+
+    def fan_out(self, obj, action, user_ids):
+        """Notify many users about an action on an object, in bulk
+
+        Identical notifications about the object, from the same actor with the
+        same verb, are marked read, so that users are only notified of the
+        latest one.  This compares the times of the actions, so the result is
+        the same even if fan outs for successive actions run out of order.
+        Users being notified of the same action again are also only left with
+        the new notification.
+        """
+        identical = self.for_object(obj).filter(
+            action__actor_object_id=action.actor_object_id, action__verb=action.verb
+        )
+        identical.get_unread().filter(
+            models.Q(action__timestamp__lt=action.timestamp)
+            | models.Q(action=action, user_id__in=user_ids)
+        ).mark_read()
+        # users who have already been notified of a later identical action
+        newer = set(
+            identical.filter(action__timestamp__gt=action.timestamp).values_list(
+                "user_id", flat=True
+            )
+        )
+        return self.bulk_create(
+            [
+                self.model(user_id=user_id, action=action, read=user_id in newer)
+                for user_id in user_ids
+            ],
+            batch_size=settings.NOTIFICATION_BATCH_SIZE,
+        )
+
 
 class Notification(models.Model):
     """A notification connects an action to a user."""
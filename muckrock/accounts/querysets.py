@@ -8,6 +8,7 @@ from django.db import models, transaction
 
 # Standard Library
 import logging
+from collections import defaultdict
 
 # MuckRock
 from muckrock.organization.models import Membership, Organization
@@ -19,8 +20,12 @@ class ProfileQuerySet(models.QuerySet):
     """Object manager for profiles"""
 
     @transaction.atomic
-    def squarelet_update_or_create(self, uuid, data):
-        """Update or create records based on data from squarelet"""
+    def squarelet_update_or_create(self, uuid, data, refresh_cache=True):
+        """Update or create records based on data from squarelet
+
+        Set `refresh_cache` to False when updating many users at once, to
+        refresh their cached organizations together afterwards
+        """
 
         required_fields = {"preferred_username", "organizations"}
         missing = required_fields - (required_fields & set(data.keys()))
@@ -33,6 +38,10 @@ class ProfileQuerySet(models.QuerySet):
 
         self._update_organizations(user, profile, data)
 
+        # update cache after updating orgs
+        if refresh_cache:
+            self.refresh_organization_cache([user])
+
         return user, created
 
     def _squarelet_update_or_create_user(self, uuid, data):
@@ -126,14 +135,32 @@ class ProfileQuerySet(models.QuerySet):
 
         user.memberships.filter(organization__in=current_organizations).delete()
 
-        # update cache after updating orgs
-        cache.set(
-            "sb:{}:user_org".format(user.username),
-            profile.organization,
-            settings.DEFAULT_CACHE_TIMEOUT,
-        )
-        cache.set(
-            "sb:{}:user_orgs".format(user.username),
-            user.organizations.get_cache(),
-            settings.DEFAULT_CACHE_TIMEOUT,
+    def refresh_organization_cache(self, users):
+        """Refresh the cached active organization and organizations shown in
+        the navbar for many users, with a single query"""
+        users = {user.pk: user for user in users}
+        if not users:
+            return
+        organizations = defaultdict(list)
+        active = {}
+        memberships = (
+            Membership.objects.filter(user__in=users)
+            .select_related("organization__entitlement")
+            .order_by("-organization__individual", "organization__name")
         )
+        for membership in memberships:
+            organizations[membership.user_id].append(membership.organization)
+            if membership.active:
+                active[membership.user_id] = membership.organization
+        values = {}
+        stale = []
+        for pk, user in users.items():
+            if pk in active:
+                values["sb:{}:user_org".format(user.username)] = active[pk]
+            else:
+                # let the active organization be looked up again on demand
+                stale.append("sb:{}:user_org".format(user.username))
+            values["sb:{}:user_orgs".format(user.username)] = organizations[pk]
+        cache.set_many(values, settings.DEFAULT_CACHE_TIMEOUT)
+        if stale:
+            cache.delete_many(stale)
@@ -0,0 +1,567 @@
+"""
+Declarative specification of the nightly statistics
+
+Statistics are grouped by the table they are computed from, and each group is
+computed with a single conditional aggregate query, instead of running a
+separate count query for each statistic
+"""
+
+# Django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import Count, Exists, F, OuterRef, Q, Sum
+from django.db.models.fields import DurationField
+from django.db.models.functions import Cast, Now
+from django.utils import timezone
+
+# Standard Library
+import logging
+import time as time_
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time, timedelta
+
+# MuckRock
+from muckrock.agency.models import Agency
+from muckrock.communication.models import (
+    EmailCommunication,
+    EmailOpen,
+    FaxCommunication,
+    MailCommunication,
+    MailEvent,
+    PortalCommunication,
+)
+from muckrock.core.models import ExtractDay
+from muckrock.crowdfund.models import Crowdfund, CrowdfundPayment
+from muckrock.crowdsource.models import Crowdsource, CrowdsourceResponse
+from muckrock.foia.models import FOIACommunication, FOIAComposer, FOIAFile, FOIARequest
+from muckrock.foiamachine.models import FoiaMachineRequest
+from muckrock.jurisdiction.models import ExampleAppeal, Exemption, InvokedExemption
+from muckrock.news.models import Article
+from muckrock.project.models import Project
+from muckrock.task.models import (
+    CrowdfundTask,
+    FailedFaxTask,
+    FlaggedTask,
+    NewAgencyTask,
+    OrphanTask,
+    PortalTask,
+    RejectedEmailTask,
+    ResponseTask,
+    ReviewAgencyTask,
+    SnailMailTask,
+    Task,
+)
+
+logger = logging.getLogger(__name__)
+
+# statuses shared by FOIA requests and FOIA machine requests, keyed by the
+# suffix used for the statistic's name
+REQUEST_STATUSES = [
+    ("success", "done"),
+    ("denied", "rejected"),
+    ("submitted", "submitted"),
+    ("awaiting_ack", "ack"),
+    ("awaiting_response", "processed"),
+    ("awaiting_appeal", "appealing"),
+    ("fix_required", "fix"),
+    ("payment_required", "payment"),
+    ("no_docs", "no_docs"),
+    ("partial", "partial"),
+    ("abandoned", "abandoned"),
+    ("lawsuit", "lawsuit"),
+]
+
+ENTITLEMENTS = [
+    ("pro", "professional"),
+    ("basic", "free"),
+    ("beta", "beta"),
+    ("proxy", "proxy"),
+    ("admin", "admin"),
+]
+
+CROWDFUND_RANGES = [
+    ("0_25", 0, 0.25),
+    ("25_50", 0.25, 0.50),
+    ("50_75", 0.50, 0.75),
+    ("75_100", 0.75, 1.00),
+    ("100_125", 1.00, 1.25),
+    ("125_150", 1.25, 1.50),
+    ("150_175", 1.50, 1.75),
+    ("175_200", 1.75, 2.00),
+]
+
+
+def count(*args, distinct=False, **kwargs):
+    """Count the rows matching the given filter"""
+    if args or kwargs:
+        return Count("pk", filter=Q(*args, **kwargs), distinct=distinct)
+    return Count("pk", distinct=distinct)
+
+
+class StatisticGroup:
+    """A set of statistics computed from a single table in one query"""
+
+    def __init__(self, name, queryset, aggregates):
+        self.name = name
+        self.queryset = queryset
+        self.aggregates = aggregates
+
+    def run(self):
+        """Compute all of the statistics in this group in one query"""
+        return self.queryset.aggregate(**self.aggregates)
+
+
+def _task_group(name, model, extra=None):
+    """Totals for a type of task"""
+    undeferred = Q(date_deferred__lte=date.today()) | Q(date_deferred=None)
+    aggregates = {
+        f"total_{name}_tasks": count(),
+        f"total_unresolved_{name}_tasks": count(undeferred, resolved=False),
+        f"total_deferred_{name}_tasks": count(date_deferred__gt=date.today()),
+    }
+    if extra:
+        aggregates.update(extra)
+    return StatisticGroup(name, model.objects.all(), aggregates)
+
+
+def get_statistic_groups(today=None):
+    """Get the groups of statistics to compute for the day before `today`"""
+    # pylint: disable=too-many-locals
+    if today is None:
+        today = date.today()
+    midnight = time(tzinfo=timezone.get_current_timezone())
+    today_midnight = datetime.combine(today, midnight)
+    yesterday_midnight = today_midnight - timedelta(1)
+    yesterday = (yesterday_midnight, today_midnight)
+    now = timezone.now()
+
+    groups = []
+
+    groups.append(
+        StatisticGroup(
+            "requests",
+            FOIARequest.objects.all(),
+            {
+                "total_requests": count(),
+                "requests_processing_days": ExtractDay(
+                    Sum(
+                        today - F("date_processing"),
+                        filter=Q(status="submitted", date_processing__isnull=False),
+                    )
+                ),
+                "total_fees": Sum("price"),
+                **{
+                    f"total_requests_{suffix}": count(status=status)
+                    for suffix, status in REQUEST_STATUSES
+                },
+            },
+        )
+    )
+    entitlement_slugs = [slug for _, slug in ENTITLEMENTS] + ["organization"]
+    groups.append(
+        StatisticGroup(
+            "daily_requests",
+            FOIARequest.objects.get_submitted_range(*yesterday),
+            {
+                **{
+                    f"daily_requests_{suffix}": count(
+                        composer__organization__entitlement__slug=slug,
+                        composer__organization__individual=True,
+                    )
+                    for suffix, slug in ENTITLEMENTS
+                },
+                "daily_requests_org": count(
+                    composer__organization__entitlement__slug="organization"
+                ),
+                "daily_requests_other": count(
+                    ~Q(composer__organization__entitlement__slug__in=entitlement_slugs)
+                ),
+            },
+        )
+    )
+    groups.append(
+        StatisticGroup(
+            "composers",
+            FOIAComposer.objects.all(),
+            {
+                "total_composers": count(),
+                "total_composers_draft": count(status="started"),
+                "total_composers_submitted": count(status="submitted"),
+                "total_composers_filed": count(status="filed"),
+            },
+        )
+    )
+
+    # communications
+    sent_yesterday = Q(
+        communication__datetime__range=yesterday, communication__response=False
+    )
+    groups.append(
+        StatisticGroup(
+            "portal_communications",
+            PortalCommunication.objects.all(),
+            {"sent_communications_portal": count(sent_yesterday)},
+        )
+    )
+    weekly_ranges = [("weekly", 0, 7), ("weekly2", 7, 14)]
+    email_aggregates = {"sent_communications_email": count(sent_yesterday)}
+    fax_aggregates = {"sent_communications_fax": count(sent_yesterday)}
+    mail_aggregates = {"sent_communications_mail": count(sent_yesterday)}
+    for weekly, range_min, range_max in weekly_ranges:
+        sent_range = Q(
+            sent_datetime__gt=now - timedelta(days=range_max),
+            sent_datetime__lt=now - timedelta(days=range_min),
+        )
+        email_aggregates[f"email_communications_{weekly}_total"] = count(
+            sent_range, communication__response=False
+        )
+        email_aggregates[f"email_communications_{weekly}_confirmed"] = count(
+            sent_range,
+            Exists(EmailOpen.objects.filter(email=OuterRef("pk"))),
+            communication__response=False,
+        )
+        fax_aggregates[f"fax_communications_{weekly}_total"] = count(sent_range)
+        fax_aggregates[f"fax_communications_{weekly}_confirmed"] = count(
+            sent_range, confirmed_datetime__isnull=False
+        )
+        mail_aggregates[f"mail_communications_{weekly}_total"] = count(
+            sent_range, communication__response=False
+        )
+        mail_aggregates[f"mail_communications_{weekly}_confirmed"] = count(
+            sent_range,
+            Exists(
+                MailEvent.objects.filter(
+                    mail=OuterRef("pk"), event__endswith=".processed_for_delivery"
+                )
+            ),
+            communication__response=False,
+        )
+    groups.append(
+        StatisticGroup(
+            "email_communications", EmailCommunication.objects.all(), email_aggregates
+        )
+    )
+    groups.append(
+        StatisticGroup(
+            "fax_communications", FaxCommunication.objects.all(), fax_aggregates
+        )
+    )
+    groups.append(
+        StatisticGroup(
+            "mail_communications", MailCommunication.objects.all(), mail_aggregates
+        )
+    )
+    groups.append(
+        StatisticGroup(
+            "orphaned_communications",
+            FOIACommunication.objects.all(),
+            {"orphaned_communications": count(foia=None)},
+        )
+    )
+
+    groups.append(
+        StatisticGroup(
+            "machine_requests",
+            FoiaMachineRequest.objects.all(),
+            {
+                "machine_requests": count(),
+                "machine_requests_draft": count(status="started"),
+                **{
+                    f"machine_requests_{suffix}": count(status=status)
+                    for suffix, status in REQUEST_STATUSES
+                },
+            },
+        )
+    )
+    groups.append(
+        StatisticGroup("files", FOIAFile.objects.all(), {"total_pages": Sum("pages")})
+    )
+    groups.append(
+        StatisticGroup(
+            "users_filed",
+            User.objects.annotate(num_foia=Count("composers")).exclude(num_foia=0),
+            {"total_users_filed": count()},
+        )
+    )
+    groups.append(
+        StatisticGroup(
+            "agencies",
+            Agency.objects.all(),
+            {
+                "total_agencies": count(),
+                "unapproved_agencies": count(status="pending"),
+                "portal_agencies": count(portal__isnull=False),
+            },
+        )
+    )
+    groups.append(
+        StatisticGroup(
+            "articles",
+            Article.objects.all(),
+            {"daily_articles": count(pub_date__range=yesterday)},
+        )
+    )
+
+    # tasks
+    groups.append(
+        StatisticGroup(
+            "tasks",
+            Task.objects.all(),
+            {
+                "total_tasks": count(),
+                "total_unresolved_tasks": count(
+                    Q(date_deferred__lte=date.today()) | Q(date_deferred=None),
+                    resolved=False,
+                ),
+                "total_deferred_tasks": count(date_deferred__gt=date.today()),
+            },
+        )
+    )
+    groups.extend(
+        [
+            _task_group("orphan", OrphanTask),
+            _task_group(
+                "snailmail",
+                SnailMailTask,
+                {
+                    "unresolved_snailmail_appeals": count(
+                        Q(date_deferred__lte=date.today()) | Q(date_deferred=None),
+                        resolved=False,
+                        category="a",
+                    )
+                },
+            ),
+            _task_group("rejected", RejectedEmailTask),
+            _task_group(
+                "flagged",
+                FlaggedTask,
+                {
+                    "flag_processing_days": ExtractDay(
+                        Cast(
+                            Sum(
+                                Now() - F("date_created"),
+                                filter=(
+                                    Q(date_deferred__lte=date.today())
+                                    | Q(date_deferred=None)
+                                )
+                                & Q(resolved=False),
+                            ),
+                            DurationField(),
+                        )
+                    )
+                },
+            ),
+            _task_group("newagency", NewAgencyTask),
+            _task_group(
+                "response",
+                ResponseTask,
+                {
+                    "daily_robot_response_tasks": count(
+                        date_done__gte=yesterday_midnight,
+                        date_done__lt=today_midnight,
+                        resolved_by__username="mlrobot",
+                    )
+                },
+            ),
+            _task_group("faxfail", FailedFaxTask),
+            _task_group("crowdfundpayment", CrowdfundTask),
+            _task_group("reviewagency", ReviewAgencyTask),
+            _task_group("portal", PortalTask),
+        ]
+    )
+
+    # crowdfunds - filtering by entitlement joins across multi valued
+    # relationships, so the plain counts must be distinct
+    closed_aggregates = {
+        "closed_crowdfunds_0": count(closed=True, percent=0, distinct=True),
+        "closed_crowdfunds_200": count(closed=True, percent__gt=2.00, distinct=True),
+    }
+    for suffix, low, high in CROWDFUND_RANGES:
+        closed_aggregates[f"closed_crowdfunds_{suffix}"] = count(
+            closed=True, percent__gt=low, percent__lte=high, distinct=True
+        )
+    groups.append(
+        StatisticGroup(
+            "crowdfunds",
+            Crowdfund.objects.annotate(
+                percent=F("payment_received") / F("payment_required")
+            ),
+            {
+                "total_crowdfunds": count(distinct=True),
+                "open_crowdfunds": count(closed=False, distinct=True),
+                **{
+                    f"total_crowdfunds_{suffix}": count(_entitlement_q(slug))
+                    for suffix, slug in ENTITLEMENTS
+                },
+                **{
+                    f"open_crowdfunds_{suffix}": count(
+                        _entitlement_q(slug), closed=False
+                    )
+                    for suffix, slug in ENTITLEMENTS
+                },
+                **closed_aggregates,
+            },
+        )
+    )
+    groups.append(
+        StatisticGroup(
+            "crowdfund_payments",
+            CrowdfundPayment.objects.all(),
+            {
+                "total_crowdfund_payments": count(),
+                "total_crowdfund_payments_loggedin": count(user__isnull=False),
+                "total_crowdfund_payments_loggedout": count(user=None),
+            },
+        )
+    )
+
+    groups.append(
+        StatisticGroup(
+            "projects",
+            Project.objects.all(),
+            {
+                "public_projects": count(private=False, approved=True),
+                "private_projects": count(private=True, approved=True),
+                "unapproved_projects": count(approved=False),
+                "crowdfund_projects": count(
+                    Exists(
+                        Project.crowdfunds.through.objects.filter(
+                            project=OuterRef("pk")
+                        )
+                    )
+                ),
+            },
+        )
+    )
+    groups.append(
+        StatisticGroup(
+            "project_users",
+            User.objects.exclude(projects=None),
+            {
+                "project_users": count(distinct=True),
+                **{
+                    f"project_users_{suffix}": count(
+                        organizations__entitlement__slug=slug
+                    )
+                    for suffix, slug in ENTITLEMENTS
+                },
+            },
+        )
+    )
+
+    groups.append(
+        StatisticGroup(
+            "exemptions", Exemption.objects.all(), {"total_exemptions": count()}
+        )
+    )
+    groups.append(
+        StatisticGroup(
+            "invoked_exemptions",
+            InvokedExemption.objects.all(),
+            {"total_invoked_exemptions": count()},
+        )
+    )
+    groups.append(
+        StatisticGroup(
+            "example_appeals",
+            ExampleAppeal.objects.all(),
+            {"total_example_appeals": count()},
+        )
+    )
+    groups.append(
+        StatisticGroup(
+            "crowdsources",
+            Crowdsource.objects.all(),
+            {
+                "total_crowdsources": count(),
+                "total_draft_crowdsources": count(status="draft"),
+                "total_open_crowdsources": count(status="open"),
+                "total_close_crowdsources": count(status="close"),
+            },
+        )
+    )
+    groups.append(
+        StatisticGroup(
+            "crowdsource_responses",
+            CrowdsourceResponse.objects.all(),
+            {
+                "total_crowdsource_responses": count(distinct=True),
+                "num_crowdsource_responded_users": Count("user", distinct=True),
+                **{
+                    f"crowdsource_responses_{suffix}": count(
+                        user__organizations__entitlement__slug=slug
+                    )
+                    for suffix, slug in ENTITLEMENTS
+                },
+            },
+        )
+    )
+
+    return groups
+
+
+def _entitlement_q(entitlement):
+    """Crowdfunds by users with a certain entitlement type, mirroring
+    `CrowdfundQuerySet.filter_by_entitlement`"""
+    return Q(foia__composer__organization__entitlement__slug=entitlement) | Q(
+        projects__contributors__organizations__entitlement__slug=entitlement
+    )
+
+
+# statistics which are no longer tracked, or are now tracked on squarelet
+CONSTANT_STATISTICS = {
+    "total_requests_draft": 0,
+    "total_users": 0,
+    "total_users_excluding_agencies": 0,
+    "pro_users": 0,
+    "pro_user_names": "",
+    "stale_agencies": 0,
+    "total_generic_tasks": 0,
+    "total_unresolved_generic_tasks": 0,
+    "total_deferred_generic_tasks": 0,
+    "total_staleagency_tasks": 0,
+    "total_unresolved_staleagency_tasks": 0,
+    "total_deferred_staleagency_tasks": 0,
+    "total_active_org_members": 0,
+    "total_active_orgs": 0,
+}
+
+
+def _run_group(group, threaded):
+    """Run a single group, timing it"""
+    start = time_.time()
+    try:
+        results = group.run()
+    finally:
+        if threaded:
+            # each thread opens its own database connection
+            connection.close()
+    logger.info(
+        "[STATISTICS] %s: %d statistics in %.2fs",
+        group.name,
+        len(group.aggregates),
+        time_.time() - start,
+    )
+    return results
+
+
+def compute_statistics(today=None, workers=None):
+    """Compute all of the statistics, returning them as a dictionary
+
+    Groups are independent of each other, so they are run in parallel
+    """
+    if workers is None:
+        workers = settings.STATISTICS_WORKERS
+    groups = get_statistic_groups(today)
+    results = dict(CONSTANT_STATISTICS)
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for group_results in executor.map(
+                lambda g: _run_group(g, threaded=True), groups
+            ):
+                results.update(group_results)
+    else:
+        for group in groups:
+            results.update(_run_group(group, threaded=False))
+    return results
@@ -10,6 +10,9 @@ from nose.tools import eq_
 
 # MuckRock
 from muckrock.accounts import models, tasks
+from muckrock.accounts.management.commands._legacy_statistics import legacy_statistics
+from muckrock.accounts.statistics import compute_statistics
+from muckrock.foia.factories import FOIARequestFactory
 
 
 class TestStatisticsTask(TestCase):
@@ -23,3 +26,18 @@ class TestStatisticsTask(TestCase):
         eq_(
             new_stat_count, stat_count + 1, "A new Statistics object should be created."
         )
+
+    def test_grouped_stats(self):
+        """Grouped statistics should match computing each one with its own
+        query, as they were before being grouped"""
+        FOIARequestFactory(status="done")
+        FOIARequestFactory(status="rejected")
+        FOIARequestFactory(status="rejected")
+        grouped = compute_statistics(workers=1)
+        legacy = legacy_statistics()
+        # the date is added when the statistics are stored
+        legacy.pop("date")
+        eq_({key: grouped.get(key) for key in legacy}, legacy)
+        eq_(grouped["total_requests"], 3)
+        eq_(grouped["total_requests_success"], 1)
+        eq_(grouped["total_requests_denied"], 2)
@@ -21,6 +21,7 @@ from muckrock.core.factories import (
     QuestionFactory,
     UserFactory,
 )
+from muckrock.core.tasks import queue_export
 from muckrock.core.test_utils import (
     http_get_response,
     http_post_response,
@@ -210,6 +211,26 @@ class TestUnreadNotificationList(TestCase):
         )
 
 
+class TestExportList(TestCase):
+    """A user should be able to view the progress of their exports."""
+
+    def test_get(self):
+        """The view should list the user's exports, newest first."""
+        user = UserFactory()
+        other_user = UserFactory()
+        queue_export(user, "Old Export")
+        queue_export(user, "New Export")
+        queue_export(other_user, "Other Export")
+        response = http_get_response(
+            reverse("acct-exports"), views.ExportList.as_view(), user
+        )
+        eq_(response.status_code, 200)
+        names = [e["name"] for e in response.context_data["exports"]]
+        eq_(names[:2], ["New Export", "Old Export"])
+        ok_("Other Export" not in names)
+        eq_(response.context_data["exports"][0]["status"], "queued")
+
+
 class TestNotificationRead(TestCase):
     """Getting an object view should read its notifications for that user."""
 
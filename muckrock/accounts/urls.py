@@ -60,6 +60,7 @@ urlpatterns = [
         name="acct-notifications-unread",
     ),
     re_path(r"^settings/$", views.ProfileSettings.as_view(), name="acct-settings"),
+    re_path(r"^exports/$", views.ExportList.as_view(), name="acct-exports"),
     re_path(r"^proxies/$", views.ProxyList.as_view(), name="accounts-proxies"),
     re_path(r"^stripe_webhook_v2/$", views.stripe_webhook, name="acct-webhook-v2"),
     re_path(
@@ -45,6 +45,7 @@ from muckrock.accounts.mixins import BuyRequestsMixin
 from muckrock.accounts.models import Notification, RecurringDonation
 from muckrock.accounts.utils import mixpanel_event
 from muckrock.agency.models import Agency
+from muckrock.core.tasks import get_exports
 from muckrock.core.views import MRAutocompleteView, MRFilterListView
 from muckrock.crowdfund.models import RecurringCrowdfundPayment
 from muckrock.foia.models import FOIARequest
@@ -409,6 +410,20 @@ class UnreadNotificationList(NotificationList):
         return notifications.get_unread()
 
 
+@method_decorator(login_required, name="dispatch")
+class ExportList(TemplateView):
+    """Progress of the user's recent exports"""
+
+    template_name = "accounts/exports.html"
+
+    def get_context_data(self, **kwargs):
+        """Add the exports to the context"""
+        context = super().get_context_data(**kwargs)
+        context["exports"] = get_exports(self.request.user)
+        context["title"] = "Exports"
+        return context
+
+
 class ProxyList(MRFilterListView):
     """List of Proxies"""
 
@@ -12,12 +12,16 @@ class AgencyConfig(AppConfig):
     name = "muckrock.agency"
 
     def ready(self):
-        """Registers agencies with the activity streams plugin"""
-        # pylint: disable=invalid-name, import-outside-toplevel
+        """Registers agencies with the activity streams plugin, and connects
+        signals to rebuild the fuzzy matching indexes"""
+        # pylint: disable=invalid-name, import-outside-toplevel, unused-import
         # Third Party
         from actstream import registry as action
         from watson import search
 
+        # MuckRock
+        import muckrock.agency.signals
+
         Agency = self.get_model("Agency")
         action.register(Agency)
         search.register(Agency.objects.get_approved())
@@ -0,0 +1,198 @@
+"""
+In memory fuzzy matching of agency names
+
+The names and aliases of each jurisdiction's agencies are indexed by their
+trigrams the first time the jurisdiction is searched.  A search only scores
+the agencies sharing the most trigrams with the query, instead of every agency
+in the jurisdiction, falling back to scoring every agency if none of those
+match.  An index is rebuilt when its version key in the default cache
+changes, which happens whenever one of its agencies is saved, so all processes
+see the change.
+"""
+
+# Django
+from django.conf import settings
+from django.core.cache import cache
+
+# Standard Library
+import heapq
+import re
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+
+# Third Party
+from fuzzywuzzy import fuzz, utils
+
+VERSION_KEY = "agency:fuzzy:version:{}"
+
+# the number of agencies sharing the most trigrams with the query to score
+CANDIDATES = 200
+# the number of jurisdiction indexes to keep in memory per process
+MAX_INDEXES = 500
+
+
+def trigrams(text):
+    """The trigrams of the text, padded with spaces, so that trigrams spanning
+    word boundaries keep the order of the words"""
+    text = " %s " % " ".join(text.split())
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+def split_aliases(aliases):
+    """Aliases are free text, separated by new lines, commas or semicolons"""
+    return [a.strip() for a in re.split(r"[\n,;]", aliases) if a.strip()]
+
+
+class AgencyIndex:
+    """A trigram index of the agencies in a single jurisdiction"""
+
+    def __init__(self, agencies):
+        """`agencies` is an iterable of tuples of
+        (pk, name, aliases, status, user id)"""
+        self.agencies = []
+        self.names = []
+        self.sizes = []
+        self.pending = set()
+        self.postings = {}
+        for pk, name, aliases, status, user_id in agencies:
+            i = len(self.agencies)
+            self.agencies.append((pk, status, user_id))
+            if status == "pending":
+                self.pending.add(i)
+            # match the processing fuzzywuzzy does on choices
+            names = [
+                n
+                for n in (
+                    utils.full_process(a) for a in [name] + split_aliases(aliases)
+                )
+                if n
+            ]
+            self.names.append(names)
+            grams = [trigrams(n) for n in names]
+            self.sizes.append(min((len(g) for g in grams), default=0))
+            for gram in set().union(*grams):
+                self.postings.setdefault(gram, []).append(i)
+
+    @classmethod
+    def load(cls, jurisdiction_id):
+        """Build the index for the jurisdiction from the database"""
+        # pylint: disable=import-outside-toplevel
+        # MuckRock
+        from muckrock.agency.models import Agency
+
+        return cls(
+            Agency.objects.filter(
+                jurisdiction_id=jurisdiction_id, status__in=["approved", "pending"]
+            ).values_list("pk", "name", "aliases", "status", "user_id")
+        )
+
+    def visible(self, i, user_id, exclude):
+        """Is the agency approved, or pending and created by the user, and not
+        excluded"""
+        pk, status, agency_user_id = self.agencies[i]
+        if status == "pending" and (not user_id or agency_user_id != user_id):
+            return False
+        return str(pk) not in exclude
+
+    def __len__(self):
+        return len(self.agencies)
+
+    def search(self, query, user=None, exclude=(), limit=10, score_cutoff=83):
+        """Return the pks and scores of the best matching agencies which are
+        approved, or pending and created by the user"""
+        query = utils.full_process(query)
+        if not query:
+            return []
+        user_id = user.pk if user is not None and user.is_authenticated else None
+        exclude = {str(pk) for pk in exclude}
+
+        grams = trigrams(query)
+        counts = Counter()
+        for gram in grams:
+            counts.update(self.postings.get(gram, ()))
+        # partial matching finds the shorter string within the longer one, so
+        # rank candidates by the fraction of the shorter one's trigrams shared
+        num_grams = len(grams)
+        sizes = self.sizes
+        overlaps = {
+            i: c / (sizes[i] if sizes[i] < num_grams else num_grams)
+            for i, c in counts.items()
+        }
+        # take enough extra candidates to make up for any which are hidden
+        hidden = len(self.pending) + len(exclude)
+        candidates = [
+            i
+            for i in heapq.nlargest(
+                CANDIDATES + hidden, overlaps, key=overlaps.__getitem__
+            )
+            if self.visible(i, user_id, exclude)
+        ][:CANDIDATES]
+
+        results = self.score(query, candidates, score_cutoff)
+        if not results:
+            # the pruning may have missed a weaker match, so check them all
+            results = self.score(
+                query,
+                (
+                    i
+                    for i in range(len(self.agencies))
+                    if self.visible(i, user_id, exclude)
+                ),
+                score_cutoff,
+            )
+        # break ties in the order the agencies were loaded, as a full scan does
+        results.sort(key=lambda r: (-r[1], r[2]))
+        return [(pk, score) for pk, score, _ in results[:limit]]
+
+    def score(self, query, candidates, score_cutoff):
+        """Return the pks, scores and positions of the candidates matching the
+        query at least as well as the cutoff"""
+        results = []
+        for i in candidates:
+            score = max(fuzz.partial_ratio(query, name) for name in self.names[i])
+            if score >= score_cutoff:
+                results.append((self.agencies[i][0], score, i))
+        return results
+
+
+class AgencyIndexes:
+    """The agency indexes for the most recently searched jurisdictions"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._indexes = OrderedDict()
+
+    def get(self, jurisdiction_id):
+        """Get the index for the jurisdiction, building it if it has not been
+        built yet or has changed"""
+        version = cache.get(VERSION_KEY.format(jurisdiction_id))
+        with self._lock:
+            entry = self._indexes.get(jurisdiction_id)
+            if entry is not None:
+                self._indexes.move_to_end(jurisdiction_id)
+        if (
+            entry is None
+            or entry[0] != version
+            or time.time() - entry[1] > settings.AGENCY_INDEX_TIMEOUT
+        ):
+            # build outside of the lock, so searches of other jurisdictions are
+            # not held up.  Concurrent searches of the same jurisdiction may
+            # each build it, and the last one built is kept.
+            entry = (version, time.time(), AgencyIndex.load(jurisdiction_id))
+            with self._lock:
+                self._indexes[jurisdiction_id] = entry
+                self._indexes.move_to_end(jurisdiction_id)
+                while len(self._indexes) > MAX_INDEXES:
+                    self._indexes.popitem(last=False)
+        return entry[2]
+
+    def invalidate(self, jurisdiction_id):
+        """Force all processes to rebuild the index for the jurisdiction"""
+        with self._lock:
+            self._indexes.pop(jurisdiction_id, None)
+        cache.set(VERSION_KEY.format(jurisdiction_id), uuid.uuid4().hex, None)
+
+
+agency_indexes = AgencyIndexes()
@@ -7,22 +7,32 @@ from django.conf import settings
 from django.core.validators import URLValidator, ValidationError
 from django.db import transaction
 from django.db.models import Q
+from django.db.models.functions import Lower
 from django.utils.text import slugify
 
 # Standard Library
 import csv
+import logging
 import re
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import reduce
+from operator import or_
 
 # Third Party
-from fuzzywuzzy import fuzz, process
 from localflavor.us.us_states import STATE_CHOICES
 
 # MuckRock
+from muckrock.agency.fuzzy import AgencyIndex
 from muckrock.agency.models import Agency, AgencyAddress, AgencyEmail, AgencyPhone
 from muckrock.communication.models import Address, EmailAddress, PhoneNumber
+from muckrock.core import metrics
 from muckrock.jurisdiction.models import Jurisdiction
 from muckrock.portal.models import PORTAL_TYPES, Portal
 
+logger = logging.getLogger(__name__)
+
 STATES = [s[0] for s in STATE_CHOICES]  # pylint: disable=not-an-iterable
 PORTALS = [p[0] for p in PORTAL_TYPES]
 
@@ -63,40 +73,212 @@ class PyReader:
             yield datum
 
 
+class AgencyContacts:
+    """The contact information linked to a batch of agencies, kept up to date
+    as new links are added, so the links can be created in bulk"""
+
+    def __init__(self, agency_ids):
+        self.emails = defaultdict(set)
+        self.primary_emails = set()
+        self.phones = defaultdict(set)
+        self.primary_faxes = set()
+        self.addresses = defaultdict(set)
+        self.primary_addresses = set()
+        self.new_emails = []
+        self.new_phones = []
+        self.new_addresses = []
+
+        for (
+            agency_id,
+            email_id,
+            request_type,
+            email_type,
+            status,
+        ) in AgencyEmail.objects.filter(agency__in=agency_ids).values_list(
+            "agency_id", "email_id", "request_type", "email_type", "email__status"
+        ):
+            self.emails[agency_id].add(email_id)
+            if (request_type, email_type, status) == ("primary", "to", "good"):
+                self.primary_emails.add(agency_id)
+        for (
+            agency_id,
+            phone_id,
+            request_type,
+            type_,
+            status,
+        ) in AgencyPhone.objects.filter(agency__in=agency_ids).values_list(
+            "agency_id", "phone_id", "request_type", "phone__type", "phone__status"
+        ):
+            self.phones[agency_id].add(phone_id)
+            if (request_type, type_, status) == ("primary", "fax", "good"):
+                self.primary_faxes.add(agency_id)
+        for agency_id, address_id, request_type in AgencyAddress.objects.filter(
+            agency__in=agency_ids
+        ).values_list("agency_id", "address_id", "request_type"):
+            self.addresses[agency_id].add(address_id)
+            if request_type == "primary":
+                self.primary_addresses.add(agency_id)
+
+    def add_email(self, agency, email, request_type, email_type):
+        """Link an email address to the agency"""
+        self.emails[agency.pk].add(email.pk)
+        if (request_type, email_type, email.status) == ("primary", "to", "good"):
+            self.primary_emails.add(agency.pk)
+        self.new_emails.append(
+            AgencyEmail(
+                agency=agency,
+                email=email,
+                request_type=request_type,
+                email_type=email_type,
+            )
+        )
+
+    def add_phone(self, agency, phone, request_type="none"):
+        """Link a phone number to the agency"""
+        self.phones[agency.pk].add(phone.pk)
+        if (request_type, phone.type, phone.status) == ("primary", "fax", "good"):
+            self.primary_faxes.add(agency.pk)
+        self.new_phones.append(
+            AgencyPhone(agency=agency, phone=phone, request_type=request_type)
+        )
+
+    def add_address(self, agency, address, request_type):
+        """Link an address to the agency"""
+        self.addresses[agency.pk].add(address.pk)
+        if request_type == "primary":
+            self.primary_addresses.add(agency.pk)
+        self.new_addresses.append(
+            AgencyAddress(agency=agency, address=address, request_type=request_type)
+        )
+
+    def save(self):
+        """Create all of the new links"""
+        AgencyEmail.objects.bulk_create(self.new_emails)
+        AgencyPhone.objects.bulk_create(self.new_phones)
+        AgencyAddress.objects.bulk_create(self.new_addresses)
+
+
 class Importer:
-    """Match and import multiple agencies at a time"""
+    """Match and import multiple agencies at a time
+
+    Importing happens in two phases.  First all of the data is read, and all
+    of the jurisdictions and their agencies are loaded at once to match
+    against.  Then the contact information is imported in batches, with the
+    contacts and links for each batch fetched and created in bulk.  Both
+    phases are generators, so results are produced as they are ready.
+    """
 
     p_zip = re.compile(r"^\d{5}(?:-\d{4})?$")
+    address_parts = [
+        "address_suite",
+        "address_street",
+        "address_city",
+        "address_state",
+        "address_zip",
+    ]
 
     def __init__(self, reader):
         self.data = reader.read()
-
-    def _match_jurisdiction(self, datum):
-        """Match the jurisdiction name"""
-        jurisdiction_name = datum["jurisdiction"]
-        # if there is a comma in the name, it is a locality state pair
-        # seperate and try to find an exact match
-        if "," in jurisdiction_name:
-            locality, state = [j.strip() for j in jurisdiction_name.split(",", 1)]
-            jurisdiction = Jurisdiction.objects.filter(
-                Q(parent__name__iexact=state) | Q(parent__abbrev__iexact=state),
-                name__iexact=locality,
-                level="l",
-            ).first()
-        # otherwise assume it is a state or federal jurisdiction and just look
-        # for an exact match
-        else:
-            name = jurisdiction_name.strip()
-            jurisdiction = Jurisdiction.objects.filter(
-                Q(name__iexact=name) | Q(abbrev__iexact=name), level__in=("s", "f")
-            ).first()
-
-        datum["match_jurisdiction"] = jurisdiction
-        if jurisdiction is None:
-            datum["jurisdiction_status"] = "no jurisdiction"
-        else:
-            datum["jurisdiction_status"] = "found"
-        return jurisdiction
+        self.timings = defaultdict(float)
+        # agencies created during this import, by jurisdiction and name
+        self._created = {}
+
+    @contextmanager
+    def _phase(self, name):
+        """Time the work done in each phase, not including the time spent by
+        the consumer of the generators"""
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.timings[name] += time.time() - start
+
+    def _report(self):
+        """Log and record the time spent in each phase"""
+        logger.info(
+            "Agency import timings: %s",
+            ", ".join("%s %.2fs" % (k, v) for k, v in self.timings.items()),
+        )
+        for name, seconds in self.timings.items():
+            metrics.timing("agency_import.%s" % name, seconds)
+
+    def _match_jurisdictions(self, data):
+        """Match the jurisdiction names of all of the data with one query"""
+        names = set()
+        for datum in data:
+            jurisdiction_name = datum["jurisdiction"]
+            # if there is a comma in the name, it is a locality state pair
+            if "," in jurisdiction_name:
+                jurisdiction_name = jurisdiction_name.split(",", 1)[0]
+            names.add(jurisdiction_name.strip().lower())
+
+        jurisdictions = {}
+        for jurisdiction in (
+            Jurisdiction.objects.annotate(
+                lower_name=Lower("name"), lower_abbrev=Lower("abbrev")
+            )
+            .filter(Q(lower_name__in=names) | Q(lower_abbrev__in=names))
+            .select_related("parent")
+        ):
+            if jurisdiction.level == "l":
+                # annotations are not set on related objects
+                parent = jurisdiction.parent
+                for state in (parent.name.lower(), parent.abbrev.lower()):
+                    if state:
+                        jurisdictions.setdefault(
+                            (jurisdiction.lower_name, state), jurisdiction
+                        )
+            else:
+                for name in (jurisdiction.lower_name, jurisdiction.lower_abbrev):
+                    if name:
+                        jurisdictions.setdefault((name, None), jurisdiction)
+
+        for datum in data:
+            jurisdiction_name = datum["jurisdiction"]
+            # seperate locality state pairs and try to find an exact match,
+            # otherwise assume it is a state or federal jurisdiction and just
+            # look for an exact match
+            if "," in jurisdiction_name:
+                locality, state = [
+                    j.strip().lower() for j in jurisdiction_name.split(",", 1)
+                ]
+                jurisdiction = jurisdictions.get((locality, state))
+            else:
+                jurisdiction = jurisdictions.get(
+                    (jurisdiction_name.strip().lower(), None)
+                )
+            datum["match_jurisdiction"] = jurisdiction
+            if jurisdiction is None:
+                datum["jurisdiction_status"] = "no jurisdiction"
+            else:
+                datum["jurisdiction_status"] = "found"
+
+    def _load_agencies(self, data):
+        """Load the approved agencies of all matched jurisdictions with one
+        query, and index them by name for exact and fuzzy matching"""
+        jurisdictions = {
+            d["match_jurisdiction"].pk for d in data if d["match_jurisdiction"]
+        }
+        agencies = defaultdict(list)
+        for agency in (
+            Agency.objects.get_approved()
+            .filter(jurisdiction__in=jurisdictions)
+            .select_related("jurisdiction")
+            .order_by("pk")
+        ):
+            agencies[agency.jurisdiction_id].append(agency)
+
+        exact = {}
+        by_pk = {}
+        indexes = {}
+        for jurisdiction_id, agencies_ in agencies.items():
+            for agency in agencies_:
+                exact.setdefault((jurisdiction_id, agency.name.lower()), agency)
+                by_pk[agency.pk] = agency
+            indexes[jurisdiction_id] = AgencyIndex(
+                (a.pk, a.name, "", a.status, None) for a in agencies_
+            )
+        return exact, by_pk, indexes
 
     def _set_match_agency(self, datum, agency, status, score=None):
         """Set match agency and related attributes for easy access"""
@@ -108,30 +290,22 @@ class Importer:
         if score is not None:
             datum["match_agency_score"] = score
 
-    def _match_one(self, datum):
-        """Match a single agency"""
-        jurisdiction = self._match_jurisdiction(datum)
+    def _match_one(self, datum, exact, by_pk, indexes):
+        """Match a single agency against the loaded agencies"""
+        jurisdiction = datum["match_jurisdiction"]
         if jurisdiction is None:
             return datum
 
-        agencies = Agency.objects.get_approved().filter(jurisdiction=jurisdiction)
-
-        try:
-            agency = agencies.get(name__iexact=datum["agency"])
+        agency = exact.get((jurisdiction.pk, datum["agency"].lower()))
+        if agency is not None:
             self._set_match_agency(datum, agency, "exact match")
             return datum
-        except Agency.DoesNotExist:
-            pass
-
-        match = process.extractOne(
-            datum["agency"],
-            {a: a.name for a in agencies},
-            scorer=fuzz.partial_ratio,
-            score_cutoff=83,
-        )
-        if match:
-            _agency_name, score, agency = match
-            self._set_match_agency(datum, agency, "fuzzy match", score)
+
+        index = indexes.get(jurisdiction.pk)
+        matches = index.search(datum["agency"], limit=1) if index else []
+        if matches:
+            ((pk, score),) = matches
+            self._set_match_agency(datum, by_pk[pk], "fuzzy match", score)
         else:
             datum["agency_status"] = "no agency"
 
@@ -148,38 +322,126 @@ class Importer:
             error = True
         return error
 
+    def _match(self):
+        """Read all of the data and match each datum"""
+        with self._phase("read"):
+            data = list(self.data)
+        with self._phase("load"):
+            valid = [d for d in data if not self._validate(d)]
+            self._match_jurisdictions(valid)
+            loaded = self._load_agencies(valid)
+        for datum in data:
+            if "match_jurisdiction" in datum:
+                with self._phase("match"):
+                    self._match_one(datum, *loaded)
+            yield datum
+
     def match(self):
         """Match each datum"""
-        for datum in self.data:
-            error = self._validate(datum)
-            if error:
-                yield datum
-            else:
-                yield self._match_one(datum)
+        yield from self._match()
+        self._report()
 
     def _create_agency(self, datum, user):
         """Create an agency when importing a new agency"""
+        jurisdiction = datum["match_jurisdiction"]
+        key = (jurisdiction.pk, datum["agency"].lower())
+        # the same new agency may appear more than once in the import
+        if key in self._created:
+            agency = self._created[key]
+            self._set_match_agency(datum, agency, "exact match")
+            return agency
         agency = Agency.objects.create(
             name=datum["agency"],
             slug=(slugify(datum["agency"]) or "untitled"),
-            jurisdiction=datum["match_jurisdiction"],
+            jurisdiction=jurisdiction,
             status="approved",
             user=user,
         )
+        self._created[key] = agency
         self._set_match_agency(datum, agency, "created")
         return agency
 
-    def _import_email(self, agency, datum):
+    def _fetch_contacts(self, batch):
+        """Fetch or create all of the email addresses, phone numbers and
+        addresses for the batch at once"""
+        email_headers = []
+        numbers = []
+        addresses = []
+        for datum in batch:
+            if datum.get("email"):
+                email_headers.extend([datum["email"], datum.get("cc_emails", "")])
+            if datum.get("phone"):
+                numbers.append((datum["phone"], "phone"))
+            if datum.get("fax"):
+                numbers.append((datum["fax"], "fax"))
+            address = self._get_address(datum)
+            if address:
+                addresses.append(address)
+        return (
+            EmailAddress.objects.fetch_bulk(email_headers),
+            PhoneNumber.objects.fetch_bulk(numbers),
+            self._fetch_addresses(addresses),
+        )
+
+    def _get_address(self, datum):
+        """Get the address fields from the datum, or None if they are missing
+        or not valid"""
+        if not any(p in datum for p in self.address_parts):
+            return None
+        suite, street, city, state, zip_code = [
+            datum.get(p, "") for p in self.address_parts
+        ]
+        if not all(
+            [
+                len(suite) <= 255,
+                len(street) <= 255,
+                len(city) <= 255,
+                state in STATES,
+                self.p_zip.match(zip_code),
+            ]
+        ):
+            return None
+        return (suite, street, city, state, zip_code)
+
+    @staticmethod
+    def _fetch_addresses(addresses):
+        """Get or create all of the addresses at once"""
+        addresses = set(addresses)
+        if not addresses:
+            return {}
+        fields = ("suite", "street", "city", "state", "zip_code")
+        query = reduce(or_, (Q(**dict(zip(fields, a))) for a in addresses))
+        existing = {}
+        for address in Address.objects.filter(
+            query, agency_override="", attn_override="", address=""
+        ).order_by("pk"):
+            existing.setdefault(tuple(getattr(address, f) for f in fields), address)
+        missing = [a for a in addresses if a not in existing]
+        created = Address.objects.bulk_create(
+            [
+                Address(
+                    agency_override="",
+                    attn_override="",
+                    address="",
+                    **dict(zip(fields, a)),
+                )
+                for a in missing
+            ]
+        )
+        existing.update(zip(missing, created))
+        return existing
+
+    def _import_email(self, agency, datum, contacts, email_addresses):
         """Import an agency's email address"""
         email = datum.get("email")
-        cc_emails = datum.get("cc_emails", "")
         if email:
-            email_address = EmailAddress.objects.fetch(email)
-            cc_email_addresses = EmailAddress.objects.fetch_many(cc_emails)
-            if email_address is None:
+            primary = email_addresses[email]
+            cc_email_addresses = email_addresses[datum.get("cc_emails", "")]
+            if not primary:
                 # email failed validation
                 datum["email_status"] = "error"
                 return
+            email_address = primary[0]
             if datum["agency_status"] == "created":
                 # if the agency was just created, it does not have any existing emails
                 request_type = "primary"
@@ -188,12 +450,12 @@ class Importer:
                 status = "primary"
             else:
                 # otherwise check for existing email addresses
-                if any(e == email_address for e in agency.emails.all()):
+                if email_address.pk in contacts.emails[agency.pk]:
                     # email address is already present on the agency
                     datum["email_status"] = "already set"
                     return
                 # check if it already has a primary email address
-                if agency.get_emails("primary", "to"):  # optimize
+                if agency.pk in contacts.primary_emails:
                     request_type = "none"
                     email_type = "none"
                     cc_type = "none"
@@ -203,41 +465,31 @@ class Importer:
                     email_type = "to"
                     cc_type = "cc"
                     status = "primary"
-            AgencyEmail.objects.create(
-                agency=agency,
-                email=email_address,
-                request_type=request_type,
-                email_type=email_type,
-            )
+            contacts.add_email(agency, email_address, request_type, email_type)
             for cc_email_address in cc_email_addresses:
-                AgencyEmail.objects.get_or_create(
-                    agency=agency,
-                    email=cc_email_address,
-                    defaults={"request_type": request_type, "email_type": cc_type},
-                )
+                if cc_email_address.pk not in contacts.emails[agency.pk]:
+                    contacts.add_email(agency, cc_email_address, request_type, cc_type)
             datum["email_status"] = "set {}".format(status)
 
-    def _import_phone(self, agency, datum):
+    def _import_phone(self, agency, datum, contacts, phone_numbers):
         """Import an agency's phone number"""
         phone = datum.get("phone")
         if phone:
-            phone_number = PhoneNumber.objects.fetch(phone, type_="phone")
+            phone_number = phone_numbers[(phone, "phone")]
             if phone_number is None:
                 datum["phone_status"] = "error"
                 return
-            _, created = AgencyPhone.objects.update_or_create(
-                agency=agency, phone=phone_number
-            )
-            if created:
-                datum["phone_status"] = "set"
-            else:
+            if phone_number.pk in contacts.phones[agency.pk]:
                 datum["phone_status"] = "already set"
+            else:
+                contacts.add_phone(agency, phone_number)
+                datum["phone_status"] = "set"
 
-    def _import_fax(self, agency, datum):
+    def _import_fax(self, agency, datum, contacts, phone_numbers):
         """Import an agency's fax number"""
         fax = datum.get("fax")
         if fax:
-            fax_number = PhoneNumber.objects.fetch(fax, type_="fax")
+            fax_number = phone_numbers[(fax, "fax")]
             if fax_number is None:
                 datum["fax_status"] = "error"
                 return
@@ -245,87 +497,54 @@ class Importer:
                 request_type = "primary"
                 status = "primary"
             else:
-                if any(p == fax_number for p in agency.phones.filter(type="fax")):
+                if fax_number.pk in contacts.phones[agency.pk]:
                     # fax is already present on the agency
                     datum["fax_status"] = "already set"
                     return
-                if agency.get_faxes("primary"):  # optimize
+                if agency.pk in contacts.primary_faxes:
                     request_type = "none"
                     status = "other"
                 else:
                     request_type = "primary"
                     status = "primary"
-            AgencyPhone.objects.create(
-                agency=agency, phone=fax_number, request_type=request_type
-            )
+            contacts.add_phone(agency, fax_number, request_type)
             datum["fax_status"] = "set {}".format(status)
 
-    def _import_address(self, agency, datum):
+    def _import_address(self, agency, datum, contacts, addresses):
         """Import an agency's address"""
-        address_parts = [
-            "address_suite",
-            "address_street",
-            "address_city",
-            "address_state",
-            "address_zip",
-        ]
-        if any(p in datum for p in address_parts):
-            suite = datum.get("address_suite", "")
-            street = datum.get("address_street", "")
-            city = datum.get("address_city", "")
-            state = datum.get("address_state", "")
-            zip_code = datum.get("address_zip", "")
-            if not all(
-                [
-                    len(suite) <= 255,
-                    len(street) <= 255,
-                    len(city) <= 255,
-                    state in STATES,
-                    self.p_zip.match(zip_code),
-                ]
-            ):
+        if any(p in datum for p in self.address_parts):
+            address = addresses.get(self._get_address(datum))
+            if address is None:
                 datum["address_status"] = "error"
                 return
-            address, _ = Address.objects.get_or_create(
-                suite=datum.get("address_suite", ""),
-                street=datum.get("address_street", ""),
-                city=datum.get("address_city", ""),
-                state=datum.get("address_state", ""),
-                zip_code=datum.get("address_zip", ""),
-                agency_override="",
-                attn_override="",
-                address="",
-            )
             if datum["agency_status"] == "created":
                 request_type = "primary"
                 status = "primary"
             else:
-                if any(a == address for a in agency.addresses.all()):
+                if address.pk in contacts.addresses[agency.pk]:
                     # address is already present on the agency
                     datum["address_status"] = "already set"
                     return
-                if agency.get_addresses("primary"):  # optimize
+                if agency.pk in contacts.primary_addresses:
                     request_type = "none"
                     status = "other"
                 else:
                     request_type = "primary"
                     status = "primary"
-            AgencyAddress.objects.create(
-                agency=agency, address=address, request_type=request_type
-            )
+            contacts.add_address(agency, address, request_type)
             datum["address_status"] = "set {}".format(status)
 
     def _import_portal(self, agency, datum):
-        """Import an agency's portal"""
+        """Import an agency's portal, returning if the agency needs saving"""
         portal_url = datum.get("portal_url")
         portal_type = datum.get("portal_type")
         if portal_url and portal_type:
             if not valid_url(portal_url) or portal_type not in PORTALS:
                 datum["portal_status"] = "error"
-                return
+                return False
             if agency.portal:
                 datum["portal_status"] = "not set, existing"
-                return
+                return False
             portal, _ = Portal.objects.get_or_create(
                 url=portal_url,
                 defaults={
@@ -334,11 +553,13 @@ class Importer:
                 },
             )
             agency.portal = portal
-            agency.save()
             datum["portal_status"] = "set"
+            return True
+        return False
 
     def _import_other(self, agency, datum):
-        """Import an agency's other information"""
+        """Import an agency's other information, returning if the agency needs
+        saving"""
         aliases = datum.get("aliases")
         url = datum.get("foia_website")
         website = datum.get("website")
@@ -368,32 +589,45 @@ class Importer:
             datum["requires_proxy_status"] = "set {}".format(
                 str(agency.requires_proxy).lower()
             )
-        if save:
-            agency.save()
-
-    def _import_one(self, datum, user):
-        """Import a single agency's data"""
-        agency = datum.get("match_agency")
-        if agency is None and datum.get("match_jurisdiction") is not None:
-            agency = self._create_agency(datum, user)
-        elif agency is None and datum.get("match_jurisdiction") is None:
-            # no jurisdiction, cannot create new agency
-            return datum
-
-        self._import_email(agency, datum)
-        self._import_phone(agency, datum)
-        self._import_fax(agency, datum)
-        self._import_address(agency, datum)
-        self._import_portal(agency, datum)
-        self._import_other(agency, datum)
-
-        return datum
+        return save
+
+    def _import_batch(self, batch, user):
+        """Import the data for a batch of agencies"""
+        for datum in batch:
+            if datum.get("match_agency") is None and datum.get("match_jurisdiction"):
+                self._create_agency(datum, user)
+        # no jurisdiction, cannot create new agency
+        batch = [d for d in batch if d.get("match_agency") is not None]
+
+        email_addresses, phone_numbers, addresses = self._fetch_contacts(batch)
+        contacts = AgencyContacts({d["match_agency"].pk for d in batch})
+        for datum in batch:
+            agency = datum["match_agency"]
+            self._import_email(agency, datum, contacts, email_addresses)
+            self._import_phone(agency, datum, contacts, phone_numbers)
+            self._import_fax(agency, datum, contacts, phone_numbers)
+            self._import_address(agency, datum, contacts, addresses)
+            save = self._import_portal(agency, datum)
+            save = self._import_other(agency, datum) or save
+            if save:
+                agency.save()
+        contacts.save()
 
     def import_(self, user=None, dry=False):
         """Import all agency data"""
         with transaction.atomic():
             sid = transaction.savepoint()
-            for datum in self.match():
-                yield self._import_one(datum, user)
+            batch = []
+            for datum in self._match():
+                batch.append(datum)
+                if len(batch) >= settings.AGENCY_IMPORT_BATCH_SIZE:
+                    with self._phase("import"):
+                        self._import_batch(batch, user)
+                    yield from batch
+                    batch = []
+            with self._phase("import"):
+                self._import_batch(batch, user)
+            yield from batch
             if dry:
                 transaction.savepoint_rollback(sid)
+        self._report()
@@ -0,0 +1,173 @@
+"""
+Benchmark the indexed fuzzy agency matching against scoring every agency in
+the jurisdiction
+"""
+
+# Django
+from django.core.management.base import BaseCommand
+
+# Standard Library
+import random
+import statistics
+import time
+
+# Third Party
+from fuzzywuzzy import fuzz, process
+
+# MuckRock
+from muckrock.agency.fuzzy import AgencyIndex
+
+WORDS = [
+    "Department",
+    "Office",
+    "Bureau",
+    "Administration",
+    "Agency",
+    "Commission",
+    "Board",
+    "Service",
+    "Council",
+    "Authority",
+    "Justice",
+    "Defense",
+    "Energy",
+    "Labor",
+    "Health",
+    "Transportation",
+    "Education",
+    "Interior",
+    "Treasury",
+    "Agriculture",
+    "Veterans",
+    "Homeland",
+    "Security",
+    "Investigation",
+    "Prisons",
+    "Land",
+    "Management",
+    "Reclamation",
+    "Indian",
+    "Affairs",
+    "Fish",
+    "Wildlife",
+    "Park",
+    "Forest",
+    "Geological",
+    "Survey",
+    "Census",
+    "Patent",
+    "Trademark",
+    "Weather",
+    "Aviation",
+    "Highway",
+    "Railroad",
+    "Maritime",
+    "Nuclear",
+    "Regulatory",
+    "Trade",
+    "Communications",
+    "Elections",
+    "Housing",
+]
+
+
+class Command(BaseCommand):
+    """Benchmark the agency composer autocomplete fuzzy matching"""
+
+    help = (
+        "Compare the latency of the trigram index against fuzzy matching every "
+        "agency, on a synthetic jurisdiction"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--agencies",
+            type=int,
+            default=10000,
+            help="Number of agencies in the synthetic jurisdiction",
+        )
+        parser.add_argument(
+            "--queries", type=int, default=200, help="Number of queries to run"
+        )
+        parser.add_argument("--seed", type=int, default=0, help="Random seed")
+
+    def handle(self, *args, **kwargs):
+        rand = random.Random(kwargs["seed"])
+        agencies = [
+            (
+                i,
+                " ".join(rand.sample(WORDS, rand.randint(2, 5))),
+                "",
+                "approved",
+                None,
+            )
+            for i in range(kwargs["agencies"])
+        ]
+        queries = [self.query(rand, name) for _, name, *_ in agencies]
+        queries = rand.sample(queries, min(kwargs["queries"], len(queries)))
+
+        start = time.time()
+        index = AgencyIndex(agencies)
+        self.stdout.write(
+            f"Built index of {len(index)} agencies in {time.time() - start:.2f}s"
+        )
+
+        choices = {pk: name for pk, name, *_ in agencies}
+        full_times, full_results = self.run(
+            queries,
+            lambda q: [
+                (pk, score)
+                for _, score, pk in process.extractBests(
+                    q, choices, scorer=fuzz.partial_ratio, score_cutoff=83, limit=10
+                )
+            ],
+        )
+        index_times, index_results = self.run(queries, index.search)
+
+        self.report("Full scan", full_times)
+        self.report("Trigram index", index_times)
+        # agencies with tied scores may be returned in a different order, so
+        # compare the scores as well as the agencies
+        found = sum(
+            len({pk for pk, _ in full} & {pk for pk, _ in indexed})
+            for full, indexed in zip(full_results, index_results)
+        )
+        total = sum(len(full) for full in full_results)
+        same_scores = sum(
+            [s for _, s in full] == [s for _, s in indexed]
+            for full, indexed in zip(full_results, index_results)
+        )
+        self.stdout.write(
+            f"Recall: {found}/{total} agencies, "
+            f"same scores for {same_scores}/{len(queries)} queries"
+        )
+
+    @staticmethod
+    def query(rand, name):
+        """Make a query from part of a name, as typed in to the autocomplete,
+        sometimes with a typo"""
+        query = name[: rand.randint(4, len(name))]
+        if rand.random() < 0.3:
+            i = rand.randrange(len(query))
+            query = query[:i] + query[i + 1 :]
+        return query
+
+    @staticmethod
+    def run(queries, method):
+        """Time the method on each query"""
+        times = []
+        results = []
+        for query in queries:
+            start = time.perf_counter()
+            results.append(method(query))
+            times.append(time.perf_counter() - start)
+        return times, results
+
+    def report(self, name, times):
+        """Print the latency percentiles in milliseconds"""
+        times = sorted(t * 1000 for t in times)
+        self.stdout.write(
+            f"{name}: mean {statistics.mean(times):.2f}ms, "
+            f"p50 {times[len(times) // 2]:.2f}ms, "
+            f"p95 {times[int(len(times) * 0.95)]:.2f}ms"
+        )
@@ -22,7 +22,7 @@ from easy_thumbnails.fields import ThumbnailerImageField
 # MuckRock
 from muckrock.accounts.models import Profile
 from muckrock.core.utils import squarelet_post
-from muckrock.jurisdiction.models import Jurisdiction, RequestHelper
+from muckrock.jurisdiction.models import Jurisdiction, RequestHelper, Scorecard
 from muckrock.task.models import NewAgencyTask
 
 logger = logging.getLogger(__name__)
@@ -422,3 +422,14 @@ class Agency(models.Model, RequestHelper):
             ("merge_agency", "Can merge two agencies together"),
             ("mass_import", "Can mass import a CSV of agencies"),
         )
+
+
+class AgencyScorecard(Scorecard):
+    """Precomputed request statistics for an agency"""
+
+    agency = models.OneToOneField(
+        Agency, on_delete=models.CASCADE, related_name="scorecard"
+    )
+
+    def __str__(self):
+        return "Scorecard for %s" % self.agency
@@ -62,9 +62,11 @@ class AgencySerializer(serializers.ModelSerializer):
         queryset=Jurisdiction.objects.all(), style={"base_template": "input.html"}
     )
     absolute_url = serializers.SerializerMethodField()
-    average_response_time = serializers.ReadOnlyField(source="average_response_time_")
-    fee_rate = serializers.ReadOnlyField(source="fee_rate_")
-    success_rate = serializers.ReadOnlyField(source="success_rate_")
+    average_response_time = serializers.ReadOnlyField(
+        source="get_scorecard.average_response_time"
+    )
+    fee_rate = serializers.ReadOnlyField(source="get_scorecard.fee_rate")
+    success_rate = serializers.ReadOnlyField(source="get_scorecard.success_rate")
 
     # contact fields
     has_portal = serializers.SerializerMethodField()
@@ -78,18 +80,34 @@ class AgencySerializer(serializers.ModelSerializer):
     phones = AgencyPhoneSerializer(many=True, read_only=True, source="agencyphone_set")
 
     # request counts
-    number_requests = serializers.ReadOnlyField()
-    number_requests_completed = serializers.ReadOnlyField()
-    number_requests_rejected = serializers.ReadOnlyField()
-    number_requests_no_docs = serializers.ReadOnlyField()
-    number_requests_ack = serializers.ReadOnlyField()
-    number_requests_resp = serializers.ReadOnlyField()
-    number_requests_fix = serializers.ReadOnlyField()
-    number_requests_appeal = serializers.ReadOnlyField()
-    number_requests_pay = serializers.ReadOnlyField()
-    number_requests_partial = serializers.ReadOnlyField()
-    number_requests_lawsuit = serializers.ReadOnlyField()
-    number_requests_withdrawn = serializers.ReadOnlyField()
+    number_requests = serializers.ReadOnlyField(source="get_scorecard.num_requests")
+    number_requests_completed = serializers.ReadOnlyField(
+        source="get_scorecard.num_done"
+    )
+    number_requests_rejected = serializers.ReadOnlyField(
+        source="get_scorecard.num_rejected"
+    )
+    number_requests_no_docs = serializers.ReadOnlyField(
+        source="get_scorecard.num_no_docs"
+    )
+    number_requests_ack = serializers.ReadOnlyField(source="get_scorecard.num_ack")
+    number_requests_resp = serializers.ReadOnlyField(
+        source="get_scorecard.num_processed"
+    )
+    number_requests_fix = serializers.ReadOnlyField(source="get_scorecard.num_fix")
+    number_requests_appeal = serializers.ReadOnlyField(
+        source="get_scorecard.num_appealing"
+    )
+    number_requests_pay = serializers.ReadOnlyField(source="get_scorecard.num_payment")
+    number_requests_partial = serializers.ReadOnlyField(
+        source="get_scorecard.num_partial"
+    )
+    number_requests_lawsuit = serializers.ReadOnlyField(
+        source="get_scorecard.num_lawsuit"
+    )
+    number_requests_withdrawn = serializers.ReadOnlyField(
+        source="get_scorecard.num_abandoned"
+    )
 
     def __init__(self, *args, **kwargs):
         """After initializing the serializer,
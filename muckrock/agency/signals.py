@@ -0,0 +1,42 @@
+"""Signals for the agency application"""
+
+# Django
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+
+# MuckRock
+from muckrock.agency.fuzzy import agency_indexes
+from muckrock.agency.models import Agency
+
+# pylint: disable=unused-argument
+
+
+def agency_moving(sender, instance, **kwargs):
+    """Rebuild the old jurisdiction's index if the agency changes jurisdiction"""
+    if instance.pk is None:
+        return
+    old_jurisdiction_id = (
+        Agency.objects.filter(pk=instance.pk)
+        .values_list("jurisdiction_id", flat=True)
+        .first()
+    )
+    if old_jurisdiction_id not in (None, instance.jurisdiction_id):
+        transaction.on_commit(lambda: agency_indexes.invalidate(old_jurisdiction_id))
+
+
+def agency_changed(sender, instance, **kwargs):
+    """Rebuild the jurisdiction's index when an agency is saved, merged or
+    deleted"""
+    jurisdiction_id = instance.jurisdiction_id
+    transaction.on_commit(lambda: agency_indexes.invalidate(jurisdiction_id))
+
+
+pre_save.connect(
+    agency_moving, sender=Agency, dispatch_uid="muckrock.agency.signals.moving"
+)
+post_save.connect(
+    agency_changed, sender=Agency, dispatch_uid="muckrock.agency.signals.save"
+)
+post_delete.connect(
+    agency_changed, sender=Agency, dispatch_uid="muckrock.agency.signals.delete"
+)
@@ -3,6 +3,8 @@
 # Django
 from celery.schedules import crontab
 from celery.task import periodic_task, task
+from django.conf import settings
+from django.core.cache import caches
 
 # Standard Library
 import csv
@@ -15,6 +17,11 @@ from smart_open.smart_open_lib import smart_open
 
 # MuckRock
 from muckrock.agency.importer import CSVReader, Importer
+from muckrock.agency.models import Agency
+from muckrock.core.stats import (
+    refresh_agency_scorecards,
+    refresh_jurisdiction_scorecards,
+)
 from muckrock.core.tasks import AsyncFileDownloadTask
 from muckrock.foia.models import FOIARequest
 from muckrock.task.models import ReviewAgencyTask
@@ -23,6 +30,9 @@ client = Client(os.environ.get("SENTRY_DSN"))
 register_logger_signal(client)
 register_signal(client)
 
+SCORECARD_PENDING = "scorecards:pending:{}"
+SCORECARD_MISSING = "scorecards:missing:{}:{}"
+
 
 @periodic_task(
     run_every=crontab(day_of_week="sunday", hour=4, minute=0),
@@ -36,6 +46,61 @@ def stale():
         )
 
 
+@periodic_task(
+    run_every=crontab(hour=3, minute=30),
+    name="muckrock.agency.tasks.rebuild_scorecards",
+)
+def rebuild_scorecards():
+    """Recalculate all agency and jurisdiction scorecards nightly"""
+    refresh_agency_scorecards()
+    refresh_jurisdiction_scorecards()
+
+
+def schedule_scorecard_refresh(agency_pk):
+    """Refresh the agency's scorecards soon, unless a refresh is already
+    scheduled"""
+    delay = settings.SCORECARD_REFRESH_DELAY
+    if caches["lock"].add(SCORECARD_PENDING.format(agency_pk), True, delay + 3600):
+        refresh_scorecards.apply_async(args=[agency_pk], countdown=delay)
+
+
+@task(ignore_result=True, name="muckrock.agency.tasks.refresh_scorecards")
+def refresh_scorecards(agency_pk):
+    """Recalculate the scorecards for an agency and its jurisdictions"""
+    # clear the pending flag first, so changes made while we are calculating
+    # schedule another refresh
+    caches["lock"].delete(SCORECARD_PENDING.format(agency_pk))
+    agency = Agency.objects.filter(pk=agency_pk).select_related("jurisdiction").first()
+    if agency is None:
+        return
+    refresh_agency_scorecards([agency.pk])
+    jurisdiction_ids = [agency.jurisdiction_id]
+    # states include the requests of their localities
+    if agency.jurisdiction.level == "l":
+        jurisdiction_ids.append(agency.jurisdiction.parent_id)
+    refresh_jurisdiction_scorecards(jurisdiction_ids)
+
+
+def schedule_scorecard_build(obj):
+    """Calculate the scorecard for an agency or jurisdiction which does not have
+    one yet, unless it is already being calculated"""
+    model_name = obj._meta.model_name
+    if caches["lock"].add(SCORECARD_MISSING.format(model_name, obj.pk), True, 3600):
+        build_scorecard.delay(model_name, obj.pk)
+
+
+@task(ignore_result=True, name="muckrock.agency.tasks.build_scorecard")
+def build_scorecard(model_name, pk):
+    """Calculate the scorecard for an agency or jurisdiction"""
+    try:
+        if model_name == "agency":
+            refresh_agency_scorecards([pk])
+        else:
+            refresh_jurisdiction_scorecards([pk])
+    finally:
+        caches["lock"].delete(SCORECARD_MISSING.format(model_name, pk))
+
+
 class MassImport(AsyncFileDownloadTask):
     """Do a mass import of agency data"""
 
@@ -81,8 +146,8 @@ class MassImport(AsyncFileDownloadTask):
         "requires_proxy_status",
     ]
 
-    def __init__(self, user_pk, file_path, match, dry):
-        super().__init__(user_pk, file_path)
+    def __init__(self, user_pk, file_path, match, dry, export_id=None):
+        super().__init__(user_pk, file_path, export_id)
         self.file_path = file_path
         self.match = match
         self.dry = dry
@@ -102,11 +167,13 @@ class MassImport(AsyncFileDownloadTask):
                 fields = self.import_fields
 
             writer.writerow(fields)
-            for datum in data:
+            for i, datum in enumerate(data, start=1):
                 writer.writerow(datum.get(f, "") for f in fields)
+                if i % 100 == 0:
+                    self.set_progress(done=i)
 
 
 @task(ignore_result=True, time_limit=1800, name="muckrock.agency.tasks.mass_import")
-def mass_import(user_pk, file_path, match, dry):
+def mass_import(user_pk, file_path, match, dry, export_id=None):
     """Mass import a CSV of agencies"""
-    MassImport(user_pk, file_path, match, dry).run()
+    MassImport(user_pk, file_path, match, dry, export_id).run()
@@ -109,6 +109,25 @@ class TestAgencyImporter(TestCase):
         eq_("missing agency", data[10]["agency_status"])
         eq_("missing jurisdiction", data[10]["jurisdiction_status"])
 
+    def test_match_queries(self):
+        """Matching loads all jurisdictions and agencies up front, regardless
+        of the number of rows"""
+        reader = PyReader(
+            [
+                {"agency": "Central Intelligence Agency", "jurisdiction": "USA"},
+                {"agency": "Governors Office", "jurisdiction": "Massachusetts"},
+                {"agency": "The Police Department", "jurisdiction": "Boston, MA"},
+                {"agency": "Sheriff's Secret Police", "jurisdiction": "Boston, MA"},
+            ]
+            * 10
+        )
+        importer = Importer(reader)
+        with self.assertNumQueries(2):
+            data = list(importer.match())
+        eq_(len(data), 40)
+        eq_(data[-2]["match_agency"], self.police)
+        ok_("match" in importer.timings)
+
     def test_import_update(self):
         """An import test where we are updating the contact information for an
         existing agency
@@ -10,12 +10,19 @@ from django.urls import reverse
 
 # Standard Library
 import json
+import random
 
 # Third Party
+from fuzzywuzzy import fuzz, process
 from nose.tools import assert_in, assert_not_in, eq_, ok_, raises
 
 # MuckRock
 from muckrock.agency.forms import AgencyForm
+from muckrock.agency.fuzzy import AgencyIndex, agency_indexes
+from muckrock.agency.management.commands.benchmark_agency_autocomplete import (
+    WORDS,
+    Command as BenchmarkCommand,
+)
 from muckrock.agency.models import Agency
 from muckrock.agency.views import AgencyList, boilerplate, contact_info, detail
 from muckrock.communication.factories import EmailAddressFactory, PhoneNumberFactory
@@ -32,6 +39,8 @@ from muckrock.foia.factories import (
     FOIARequestFactory,
     FOIATemplateFactory,
 )
+from muckrock.jurisdiction.factories import LocalJurisdictionFactory
+from muckrock.jurisdiction.resolver import jurisdiction_resolver
 
 
 class TestAgencyUnit(TestCase):
@@ -211,6 +220,86 @@ class TestAgencyManager(TestCase):
         ok_(self.agency3 not in agencies, "Unapproved agencies shouldn't be siblings.")
 
 
+class TestAgencyFuzzy(TestCase):
+    """Tests for the fuzzy agency matching index and jurisdiction resolver"""
+
+    def setUp(self):
+        self.local = LocalJurisdictionFactory()
+        self.state = self.local.parent
+        self.federal = self.state.parent
+        self.user = UserFactory()
+        self.police = AgencyFactory(
+            name="Boston Police Department",
+            aliases="BPD",
+            jurisdiction=self.local,
+        )
+        self.pending = AgencyFactory(
+            name="Boston Police Commission",
+            jurisdiction=self.local,
+            status="pending",
+            user=self.user,
+        )
+        jurisdiction_resolver.invalidate()
+
+    def test_search(self):
+        """Searches should match names and aliases, only including pending
+        agencies for the user who created them"""
+        index = agency_indexes.get(self.local.pk)
+        pks = [pk for pk, _ in index.search("boston police")]
+        eq_(pks, [self.police.pk])
+        pks = {pk for pk, _ in index.search("boston police", self.user)}
+        eq_(pks, {self.police.pk, self.pending.pk})
+        eq_(index.search("boston police", exclude=[str(self.police.pk)]), [])
+        eq_([pk for pk, _ in index.search("bpd")], [self.police.pk])
+
+    def test_invalidate(self):
+        """Saving an agency should rebuild its jurisdiction's index"""
+        eq_(agency_indexes.get(self.local.pk).search("fire department"), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            fire = AgencyFactory(name="Boston Fire Department", jurisdiction=self.local)
+        pks = [pk for pk, _ in agency_indexes.get(self.local.pk).search("fire dep")]
+        eq_(pks, [fire.pk])
+
+    def test_recall(self):
+        """The index should find nearly the same agencies as scoring every
+        agency, on the synthetic jurisdiction used for benchmarking"""
+        rand = random.Random(0)
+        agencies = [
+            (i, " ".join(rand.sample(WORDS, rand.randint(2, 5))), "", "approved", None)
+            for i in range(2000)
+        ]
+        index = AgencyIndex(agencies)
+        choices = {pk: name for pk, name, *_ in agencies}
+        found = total = same_scores = 0
+        for _, name, *_ in rand.sample(agencies, 100):
+            query = BenchmarkCommand.query(rand, name)
+            full = [
+                (pk, score)
+                for _, score, pk in process.extractBests(
+                    query, choices, scorer=fuzz.partial_ratio, score_cutoff=83, limit=10
+                )
+            ]
+            indexed = index.search(query)
+            found += len({pk for pk, _ in full} & {pk for pk, _ in indexed})
+            total += len(full)
+            same_scores += [s for _, s in full] == [s for _, s in indexed]
+        ok_(found >= 0.95 * total, "Found %d of %d agencies" % (found, total))
+        ok_(same_scores >= 95, "Same scores for %d of 100 queries" % same_scores)
+
+    def test_split_jurisdiction(self):
+        """Jurisdictions should be resolved from names and abbreviations"""
+        eq_(
+            jurisdiction_resolver.split("Police, Boston, MA"),
+            ("Police", self.local.pk),
+        )
+        eq_(
+            jurisdiction_resolver.split("Governor, Massachusetts"),
+            ("Governor", self.state.pk),
+        )
+        eq_(jurisdiction_resolver.split("Police, boston"), ("Police", self.local.pk))
+        eq_(jurisdiction_resolver.split("FBI"), ("FBI", self.federal.pk))
+
+
 class TestAgencyViews(TestCase):
     """Tests for Agency views"""
 
@@ -6,7 +6,6 @@ Views for the Agency application
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.mixins import PermissionRequiredMixin
-from django.db.models import Q
 from django.db.models.aggregates import Count
 from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
@@ -24,17 +23,18 @@ from string import capwords
 from time import time
 
 # Third Party
-from fuzzywuzzy import fuzz, process
 from smart_open.smart_open_lib import smart_open
 
 # MuckRock
 from muckrock.agency.constants import FOIA_FILE_LIMIT
 from muckrock.agency.filters import AgencyFilterSet
 from muckrock.agency.forms import AgencyMassImportForm, AgencyMergeForm
+from muckrock.agency.fuzzy import agency_indexes
 from muckrock.agency.importer import CSVReader, Importer
 from muckrock.agency.models import Agency
 from muckrock.agency.tasks import mass_import
 from muckrock.core.stats import collect_stats, grade_agency
+from muckrock.core.tasks import queue_export
 from muckrock.core.views import (
     ModelFilterMixin,
     MRAutocompleteView,
@@ -45,6 +45,7 @@ from muckrock.foia.filters import FOIAFileFilterSet
 from muckrock.foia.models import FOIAFile, FOIATemplate
 from muckrock.jurisdiction.forms import FlagForm
 from muckrock.jurisdiction.models import Jurisdiction
+from muckrock.jurisdiction.resolver import jurisdiction_resolver
 from muckrock.task.models import FlaggedTask, ReviewAgencyTask
 
 
@@ -333,72 +334,24 @@ class AgencyComposerAutocomplete(AgencyAutocomplete):
             .order_by("-count")[:10]
         )
 
-        query, jurisdiction = self._split_jurisdiction(self.q)
-        fuzzy_choices = self._fuzzy_choices(query, jurisdiction, exclude)
+        query, jurisdiction_id = jurisdiction_resolver.split(self.q)
+        fuzzy_pks = [
+            pk
+            for pk, _ in agency_indexes.get(jurisdiction_id).search(
+                query, self.request.user, exclude
+            )
+        ]
 
         return (
-            self.queryset.filter(
-                pk__in=[a.pk for a in queryset] + [a[2].pk for a in fuzzy_choices]
-            )
+            self.queryset.filter(pk__in=[a.pk for a in queryset] + fuzzy_pks)
             .annotate(count=Count("foiarequest"))
             .order_by("-count")
         )
 
     def _split_jurisdiction(self, query):
         """Try to pull a jurisdiction out of an unmatched query"""
-        comma_split = query.split(",")
-        if len(comma_split) > 2:
-            # at least 2 commas, assume last 2 parts are locality, state
-            locality, state = [w.strip() for w in comma_split[-2:]]
-            name = ",".join(comma_split[:-2])
-            try:
-                jurisdiction = Jurisdiction.objects.get(
-                    Q(parent__name__iexact=state) | Q(parent__abbrev__iexact=state),
-                    name__iexact=locality,
-                    level="l",
-                )
-                return name, jurisdiction
-            except Jurisdiction.DoesNotExist:
-                pass
-        if len(comma_split) > 1:
-            # at least 1 commas, assume the last part is a jurisdiction
-            state = comma_split[-1].strip()
-            name = ",".join(comma_split[:-1])
-            try:
-                # first see if it matches a state
-                jurisdiction = Jurisdiction.objects.get(
-                    Q(name__iexact=state) | Q(abbrev__iexact=state), level="s"
-                )
-                return name, jurisdiction
-            except Jurisdiction.DoesNotExist:
-                # if not, try matching a locality
-                # order them by popularity
-                jurisdiction = (
-                    Jurisdiction.objects.filter(name__iexact=state, level="l")
-                    .annotate(count=Count("agencies__foiarequest"))
-                    .order_by("-count")
-                    .first()
-                )
-                if jurisdiction is not None:
-                    return name, jurisdiction
-
-        # if all else fails, assume they want a federal agency
-        return query, Jurisdiction.objects.get(level="f")
-
-    def _fuzzy_choices(self, query, jurisdiction, exclude):
-        """Do fuzzy matching for additional choices"""
-        choices = (
-            self.queryset.get_approved_and_pending(self.request.user)
-            .filter(jurisdiction=jurisdiction)
-            .exclude(pk__in=exclude)
-        )
-        return process.extractBests(
-            query,
-            {a: a.name for a in choices},
-            scorer=fuzz.partial_ratio,
-            score_cutoff=83,
-            limit=10,
-        )
+        name, jurisdiction_id = jurisdiction_resolver.split(query)
+        return name, Jurisdiction.objects.get(pk=jurisdiction_id)
 
     def has_add_permission(self, request):
         """Everyone may add a new agency during"""
@@ -463,15 +416,19 @@ class MassImportAgency(PermissionRequiredMixin, FormView):
             for chunk in self.request.FILES["csv"].chunks():
                 file_.write(chunk)
 
+        export_id = queue_export(self.request.user, "Agency mass import")
         mass_import.delay(
             self.request.user.pk,
             file_path,
             form.cleaned_data.get("match_or_import") == "match",
             form.cleaned_data.get("dry_run"),
+            export_id=export_id,
         )
         messages.success(
             self.request,
-            "Importing agencies, results will be emailed to you when completed",
+            "Importing agencies, results will be emailed to you when completed, "
+            'and you can follow its progress on your <a href="%s">exports page</a>.'
+            % reverse("acct-exports"),
         )
         return self.render_to_response(self.get_context_data())
 
@@ -1,10 +1,9 @@
 """Viewsets for Agency"""
 
 # Django
-from django.db.models.aggregates import Avg, Count, Sum
-from django.db.models.expressions import Case, F, Value, When
-from django.db.models.fields import FloatField, IntegerField
-from django.db.models.functions import Coalesce
+from django.db.models.aggregates import Sum
+from django.db.models.expressions import Case, When
+from django.db.models.fields import IntegerField
 from django.db.models.query import Prefetch
 
 # Third Party
@@ -15,7 +14,6 @@ from rest_framework import viewsets
 from muckrock.agency.models import Agency
 from muckrock.agency.serializers import AgencySerializer
 from muckrock.communication.models import Address, EmailAddress, PhoneNumber
-from muckrock.core.models import ExtractDay, NullIf
 
 
 def CountWhen(output_field=None, **kwargs):
@@ -31,7 +29,7 @@ class AgencyViewSet(viewsets.ModelViewSet):
 
     queryset = (
         Agency.objects.order_by("id")
-        .select_related("jurisdiction", "parent", "appeal_agency")
+        .select_related("jurisdiction", "parent", "appeal_agency", "scorecard")
         .prefetch_related(
             "agencyemail_set__email",
             "agencyphone_set__phone",
@@ -59,46 +57,6 @@ class AgencyViewSet(viewsets.ModelViewSet):
             ),
             "types",
         )
-        .annotate(
-            average_response_time_=Coalesce(
-                ExtractDay(
-                    Avg(
-                        F("foiarequest__datetime_done")
-                        - F("foiarequest__composer__datetime_submitted")
-                    )
-                ),
-                Value(0),
-            ),
-            fee_rate_=Coalesce(
-                100
-                * CountWhen(foiarequest__price__gt=0, output_field=FloatField())
-                / NullIf(Count("foiarequest"), Value(0), output_field=FloatField()),
-                Value(0),
-                output_field=FloatField(),
-            ),
-            success_rate_=Coalesce(
-                100
-                * CountWhen(
-                    foiarequest__status__in=["done", "partial"],
-                    output_field=FloatField(),
-                )
-                / NullIf(Count("foiarequest"), Value(0), output_field=FloatField()),
-                Value(0),
-                output_field=FloatField(),
-            ),
-            number_requests=Count("foiarequest"),
-            number_requests_completed=CountWhen(foiarequest__status="done"),
-            number_requests_rejected=CountWhen(foiarequest__status="rejected"),
-            number_requests_no_docs=CountWhen(foiarequest__status="no_docs"),
-            number_requests_ack=CountWhen(foiarequest__status="ack"),
-            number_requests_resp=CountWhen(foiarequest__status="processed"),
-            number_requests_fix=CountWhen(foiarequest__status="fix"),
-            number_requests_appeal=CountWhen(foiarequest__status="appealing"),
-            number_requests_pay=CountWhen(foiarequest__status="payment"),
-            number_requests_partial=CountWhen(foiarequest__status="partial"),
-            number_requests_lawsuit=CountWhen(foiarequest__status="lawsuit"),
-            number_requests_withdrawn=CountWhen(foiarequest__status="abandoned"),
-        )
     )
     serializer_class = AgencySerializer
     # don't allow ordering by computed fields
@@ -19,17 +19,20 @@ function showCommForm(id) {
     });
 }
 
-var actions = $('.communication-action').map(function() {
-    return '#' + $(this).attr('id');
-}).get();
+// Checked when the hash changes, instead of collecting the actions once, as
+// older communications may be loaded after the page
+function isCommAction(hash) {
+    var target = hash ? document.getElementById(hash.slice(1)) : null;
+    return target !== null && $(target).hasClass('communication-action');
+}
 
 // Bind to hashchange event
 $(window).on('hashchange', function () {
     // check if the hash is a target
     var hash = location.hash;
-    if (actions.indexOf(hash) !== -1) {
+    if (isCommAction(hash)) {
         showCommForm(hash);
     }
 });
 
-showCommForm(actions.indexOf(location.hash) !== -1 ? location.hash : '');
+showCommForm(isCommAction(location.hash) ? location.hash : '');
@@ -86,6 +86,66 @@ $('#toggle-communication-collapse').click(function(){
     }
 });
 
+function loadOlderCommunications(comm) {
+    var button = $('#load-older-communications');
+    if (button.length === 0 || button.prop('disabled')) {
+        return;
+    }
+    button.prop('disabled', true);
+    var params = {cursor: button.data('cursor')};
+    // pass along the access key for viewers without permission on the request
+    if (button.attr('data-key')) {
+        params.key = button.attr('data-key');
+    }
+    // load far enough back to include a linked communication
+    if (comm) {
+        params.comm = comm;
+    }
+    $.getJSON(button.data('url'), params, function(data){
+        var entries = $($.parseHTML(data.html));
+        entries.find('header').click(function(){
+            $(this).parent('.collapsable, .note').toggleClass('collapsed');
+        });
+        entries.find('.nocollapse').click(function(event){
+            event.stopPropagation();
+        });
+        $('#comms .communications-list').prepend(entries);
+        entries.find('.resend-communication select').trigger('change');
+        if (window.createUploaderComm) {
+            entries.find('.fine-uploader-comm').each(function(){
+                window.createUploaderComm(this);
+            });
+        }
+        if (data.cursor) {
+            button.data('cursor', data.cursor);
+            button.prop('disabled', false);
+        } else {
+            button.remove();
+        }
+        if (comm && $(location.hash).length > 0) {
+            // show the linked communication now that it is loaded
+            $(window).trigger('hashchange');
+        }
+    });
+}
+
+$('#load-older-communications').click(function(){
+    loadOlderCommunications();
+});
+
+// links to communications older than those shown when the page loads
+function loadLinkedCommunication() {
+    var match = /^#comm-(\d+)$/.exec(location.hash);
+    if (match && $(location.hash).length === 0) {
+        loadOlderCommunications(match[1]);
+    }
+}
+$(window).on('hashchange', loadLinkedCommunication);
+loadLinkedCommunication();
+
+/* Handlers for elements within the communications are delegated, so that
+   they also work for older communications loaded later */
+
 /* Request action composer */
 
 var composers = $('.composer');
@@ -151,7 +211,7 @@ export function displayFile(file) {
     window.scrollTo(0, 0);
 }
 
-$('.view-file').click(function() {
+$(document).on('click', '.view-file', function() {
     // We force a hashchange when the view-file link is clicked.
     $(window).trigger('hashchange');
     window.scrollTo(0, $('.active-document').offset().top);
@@ -166,7 +226,7 @@ $('.active-document').find('.cancel.button').click(function(){
     files.parent('li').removeClass('active');
 });
 
-$('.toggle-embed').click(function(){
+$(document).on('click', '.toggle-embed', function(){
     var file = $(this).closest('.file');
     var embed = $(file).find('.file-embed');
     $(embed).toggleClass('visible');
@@ -176,7 +236,7 @@ $('.toggle-embed').click(function(){
     });
 });
 
-$('.file-form').click(function(){
+$(document).on('click', '.file-form', function(){
     $(this).closest('form').submit();
 });
 
@@ -220,14 +280,14 @@ $('.text-area.modal-button').click(function(e){
     return false;
 });
 
-$('.modal-link.agency-flag').click(function(e){
+$(document).on('click', '.modal-link.agency-flag', function(e){
     e.preventDefault();
     $("#id_flag-category").val($(this).data("category"));
     modal($($(this).data('modal')));
     return false;
 });
 
-$('.modal-link').click(function(e){
+$(document).on('click', '.modal-link', function(e){
     e.preventDefault();
     modal($($(this).data('modal')));
     return false;
@@ -258,7 +318,7 @@ $("#agency-reply #id_status").trigger("change");
 
 /* Communication Resend */
 
-$(".resend-communication select.resend-via").change(function() {
+$(document).on('change', ".resend-communication select.resend-via", function() {
   if ($(this).val() == "portal" || $(this).val() == "snail") {
     $(this).siblings(".resend-email").next().hide();
     $(this).siblings(".resend-fax").next().hide();
@@ -540,7 +600,7 @@ $('document').ready(function(){
 
 });
 
-$(".raw-content-button").click(function(e) {
+$(document).on('click', ".raw-content-button", function(e) {
   $(".raw-content").hide();
   $(e.target.attributes.href.value).show();
   e.preventDefault();
@@ -65,7 +65,7 @@ $('document').ready(function(){
   });
 
   // Modal
-  $('.modal-trigger').click(function(){
+  $(document).on('click', '.modal-trigger', function(){
     modal(this.hash);
     return false;
   });
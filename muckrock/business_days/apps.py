@@ -0,0 +1,18 @@
+"""
+App config for business days
+"""
+
+# Django
+from django.apps import AppConfig
+
+
+class BusinessDaysConfig(AppConfig):
+    """Configures the business days application"""
+
+    name = "muckrock.business_days"
+
+    def ready(self):
+        """Connect signals to clear the compiled calendars"""
+        # pylint: disable=unused-import, import-outside-toplevel
+        # MuckRock
+        import muckrock.business_days.signals
@@ -5,8 +5,9 @@ Models for the Business Days application
 from django.db import models
 
 # Standard Library
+from bisect import bisect_left, bisect_right
 from calendar import monthrange
-from datetime import timedelta
+from datetime import date, timedelta
 
 # Third Party
 from dateutil.easter import easter
@@ -83,8 +84,7 @@ class Holiday(models.Model):
 
     def match(self, date_, observe_sat):
         """Is the given date an instance of this Holiday?"""
-        table = dict((k, getattr(self, "_match_%s" % k)) for k, _ in self.kinds)
-        return table[self.kind](date_, observe_sat)
+        return getattr(self, "_match_%s" % self.kind)(date_, observe_sat)
 
     def _match_date(self, date_, observe_sat):
         """match for date type holidays"""
@@ -132,16 +132,128 @@ class Holiday(models.Model):
         )
 
 
+# compiled calendars, keyed by the holiday definitions and observe_sat
+_compiled_calendars = {}
+
+# how many years on either side of the current year to precompute
+COMPILED_YEARS = 5
+
+
+def clear_compiled_calendars():
+    """Drop all compiled calendars for this process"""
+    _compiled_calendars.clear()
+
+
+class CompiledCalendar:
+    """A precomputed table of holidays and business days over a window of years
+
+    `cumulative[i]` is the number of business days strictly before
+    `start + i`, which turns counting business days into a subtraction
+    and finding the nth business day into a bisect
+    """
+
+    def __init__(self, holidays, observe_sat, first_year, last_year):
+        self.start = date(first_year, 1, 1).toordinal()
+        self.end = date(last_year, 12, 31).toordinal()
+
+        self.holidays = {}
+        cumulative = [0]
+        for ordinal in range(self.start, self.end + 1):
+            date_ = date.fromordinal(ordinal)
+            business_day = date_.weekday() not in (SAT, SUN)
+            if business_day:
+                for holiday in holidays:
+                    if holiday.match(date_, observe_sat):
+                        self.holidays[ordinal] = holiday
+                        business_day = False
+                        break
+            cumulative.append(cumulative[-1] + business_day)
+        self.holiday_ordinals = sorted(self.holidays)
+        self.cumulative = cumulative
+
+    def covers(self, *dates):
+        """Are all of the given dates within the precomputed window?"""
+        return all(self.start <= d.toordinal() <= self.end for d in dates)
+
+    def is_holiday(self, date_):
+        """Is given date a holiday?"""
+        ordinal = date_.toordinal()
+        index = bisect_left(self.holiday_ordinals, ordinal)
+        if (
+            index < len(self.holiday_ordinals)
+            and self.holiday_ordinals[index] == ordinal
+        ):
+            return self.holidays[ordinal]
+        return None
+
+    def is_business_day(self, date_):
+        """Is the given date a business day?"""
+        index = date_.toordinal() - self.start
+        return self.cumulative[index + 1] > self.cumulative[index]
+
+    def business_days_from(self, date_, num):
+        """Returns the date n business days from the given date,
+        or None if the result falls outside of the window"""
+        if num == 0:
+            return date_
+        index = date_.toordinal() - self.start
+        if num > 0:
+            # the first day after date_ with num business days in (date_, day]
+            target = self.cumulative[index + 1] + num
+            found = bisect_left(self.cumulative, target) - 1
+        else:
+            # the last day before date_ with -num business days in [day, date_)
+            target = self.cumulative[index] + num
+            found = bisect_right(self.cumulative, target) - 1
+        if target < 0 or found < 0 or found >= len(self.cumulative) - 1:
+            return None
+        return date.fromordinal(self.start + found)
+
+    def business_days_between(self, date_a, date_b):
+        """How many business days are between the given dates?"""
+        index_a = date_a.toordinal() - self.start
+        index_b = date_b.toordinal() - self.start
+        return self.cumulative[index_b + 1] - self.cumulative[index_a + 1]
+
+
 class HolidayCalendar:
     """A set of holidays"""
 
     def __init__(self, holidays, observe_sat):
         self.holidays = holidays
         self.observe_sat = observe_sat
+        self._compiled = None
+
+    @property
+    def compiled(self):
+        """The compiled calendar for this set of holidays, shared between all
+        calendars with the same holiday definitions in this process"""
+        if self._compiled is None:
+            holidays = sorted(self.holidays, key=lambda h: h.pk)
+            key = (
+                tuple(
+                    (h.pk, h.name, h.kind, h.month, h.day, h.weekday, h.num)
+                    for h in holidays
+                ),
+                self.observe_sat,
+            )
+            if key not in _compiled_calendars:
+                year = date.today().year
+                _compiled_calendars[key] = CompiledCalendar(
+                    holidays,
+                    self.observe_sat,
+                    year - COMPILED_YEARS,
+                    year + COMPILED_YEARS,
+                )
+            self._compiled = _compiled_calendars[key]
+        return self._compiled
 
     def is_holiday(self, date_):
         """Is given date a holiday?"""
 
+        if self.compiled.covers(date_):
+            return self.compiled.is_holiday(date_)
+
         for holiday in self.holidays:
             if holiday.match(date_, self.observe_sat):
                 return holiday
@@ -150,6 +262,9 @@ class HolidayCalendar:
     def is_business_day(self, date_):
         """Is the given date a business day?"""
 
+        if self.compiled.covers(date_):
+            return self.compiled.is_business_day(date_)
+
         weekday = date_.weekday()
         if weekday in (SAT, SUN):
             return False
@@ -159,7 +274,12 @@ class HolidayCalendar:
     def business_days_from(self, date_, num):
         """Returns the date n business days from the given date"""
 
-        # could be optimized
+        if self.compiled.covers(date_):
+            found = self.compiled.business_days_from(date_, num)
+            if found is not None:
+                return found
+
+        # fall back to walking the days outside of the compiled window
         delta = timedelta(1 if num >= 0 else -1)
         num = abs(num)
 
@@ -172,12 +292,15 @@ class HolidayCalendar:
     def business_days_between(self, date_a, date_b):
         """How many business days are between the given dates?"""
 
-        # could be optimized
         sign = 1
         if date_a > date_b:
             date_a, date_b = date_b, date_a
             sign = -1
 
+        if self.compiled.covers(date_a, date_b):
+            return self.compiled.business_days_between(date_a, date_b) * sign
+
+        # fall back to walking the days outside of the compiled window
         num = 0
         while date_a < date_b:
             date_a += timedelta(1)
@@ -0,0 +1,32 @@
+"""Signals for the business days application"""
+# Django
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+# MuckRock
+from muckrock.business_days.models import Holiday, clear_compiled_calendars
+from muckrock.jurisdiction.models import Jurisdiction
+
+# pylint: disable=unused-argument
+
+
+def holidays_changed(sender, **kwargs):
+    """Clear the compiled calendars when holidays are edited or a
+    jurisdiction's set of holidays changes"""
+    clear_compiled_calendars()
+
+
+post_save.connect(
+    holidays_changed,
+    sender=Holiday,
+    dispatch_uid="muckrock.business_days.signals.holiday_save",
+)
+post_delete.connect(
+    holidays_changed,
+    sender=Holiday,
+    dispatch_uid="muckrock.business_days.signals.holiday_delete",
+)
+m2m_changed.connect(
+    holidays_changed,
+    sender=Jurisdiction.holidays.through,
+    dispatch_uid="muckrock.business_days.signals.jurisdiction_holidays",
+)
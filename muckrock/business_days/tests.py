@@ -6,13 +6,18 @@ Tests using nose for the business_days application
 from django.test import TestCase
 
 # Standard Library
-from datetime import date
+from datetime import date, timedelta
 
 # Third Party
 import nose.tools
 
 # MuckRock
-from muckrock.business_days.models import Calendar, Holiday
+from muckrock.business_days.models import (
+    Calendar,
+    Holiday,
+    HolidayCalendar,
+    _compiled_calendars,
+)
 from muckrock.jurisdiction.factories import FederalJurisdictionFactory
 
 
@@ -113,3 +118,34 @@ class TestBusinessDayUnit(TestCase):
         nose.tools.eq_(
             self.gen_cal.business_days_between(date(2010, 11, 1), date(2010, 12, 1)), 30
         )
+
+    def test_compiled_matches_walking(self):
+        """The compiled calendar should agree with walking day by day"""
+        # pylint: disable=protected-access
+        walk_cal = HolidayCalendar(self.usa_cal.holidays, False)
+        walk_cal._compiled = Calendar()
+        walk_cal._compiled.covers = lambda *dates: False
+        start = date(date.today().year, 1, 1)
+        for offset in range(0, 365, 7):
+            date_ = start + timedelta(offset)
+            for num in (-45, -1, 0, 1, 20, 45):
+                nose.tools.eq_(
+                    self.usa_cal.business_days_from(date_, num),
+                    walk_cal.business_days_from(date_, num),
+                )
+            nose.tools.eq_(
+                self.usa_cal.business_days_between(date_, date_ + timedelta(60)),
+                walk_cal.business_days_between(date_, date_ + timedelta(60)),
+            )
+            nose.tools.eq_(
+                self.usa_cal.business_days_between(date_, date_ - timedelta(60)),
+                walk_cal.business_days_between(date_, date_ - timedelta(60)),
+            )
+
+    def test_compiled_cache_invalidation(self):
+        """Editing a holiday should clear the compiled calendars"""
+        self.usa_cal.is_business_day(date.today())
+        nose.tools.assert_true(_compiled_calendars)
+        self.independence_day.day = 5
+        self.independence_day.save()
+        nose.tools.assert_false(_compiled_calendars)
@@ -0,0 +1,117 @@
+"""
+Cached evaluation of which email addresses may post to a request
+
+The whitelisted domains and the agency email addresses are loaded once per
+process.  They are reloaded when a version key in the default cache changes,
+which happens whenever a whitelisted domain or agency email is edited, so
+all processes see the change.
+"""
+
+# Django
+from django.conf import settings
+from django.core.cache import cache
+
+# Standard Library
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+# Third Party
+from localflavor.us.us_states import STATE_CHOICES
+
+# MuckRock
+from muckrock.agency.models import AgencyEmail
+from muckrock.mailgun.models import WhitelistDomain
+
+VERSION_KEY = "communication:allow_list:version"
+
+ALLOWED_TLDS = tuple(
+    [
+        ".%s.us" % a.lower()
+        for (a, _) in list(STATE_CHOICES)
+        if a not in ("AS", "DC", "GU", "MP", "PR", "VI")
+    ]
+    + [".gov", ".mil"]
+)
+
+
+class AllowList:
+    """The set of whitelisted domains and agency email addresses"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._loaded = 0
+        self.domains = None
+        self.agency_emails = None
+        self.all_agency_emails = None
+
+    def _stale(self, version):
+        return (
+            self.domains is None
+            or version != self._version
+            or time.time() - self._loaded > settings.ALLOW_LIST_TIMEOUT
+        )
+
+    def load(self):
+        """Load the allow list if it has not been loaded or has changed"""
+        version = cache.get(VERSION_KEY)
+        if self._stale(version):
+            with self._lock:
+                if self._stale(version):
+                    agency_emails = defaultdict(set)
+                    for agency_id, email_id in AgencyEmail.objects.values_list(
+                        "agency_id", "email_id"
+                    ):
+                        agency_emails[agency_id].add(email_id)
+                    self.agency_emails = agency_emails
+                    self.all_agency_emails = set().union(*agency_emails.values())
+                    self.domains = {
+                        d.lower()
+                        for d in WhitelistDomain.objects.values_list(
+                            "domain", flat=True
+                        )
+                    }
+                    self._version = version
+                    self._loaded = time.time()
+
+    def invalidate(self):
+        """Force all processes to reload the allow list"""
+        self.domains = None
+        cache.set(VERSION_KEY, uuid.uuid4().hex, None)
+
+    def allowed(self, email_address, foia=None):
+        """Is this email address allowed to post to this FOIA request?"""
+        # pylint: disable=too-many-return-statements
+        self.load()
+
+        # from the same domain as the FOIA email
+        if foia and foia.email and email_address.domain == foia.email.domain:
+            return True
+
+        # the email is a known email for this FOIA's agency
+        if foia and email_address.pk in self.agency_emails.get(foia.agency_id, ()):
+            return True
+
+        # it is from any known government TLD
+        if email_address.email.endswith(ALLOWED_TLDS):
+            return True
+
+        # if not associated with any FOIA,
+        # checked if the email is known for any agency
+        if not foia and email_address.pk in self.all_agency_emails:
+            return True
+
+        # check the email domain against the whitelist
+        if email_address.domain.lower() in self.domains:
+            return True
+
+        # the email is a known email for this FOIA
+        if foia and foia.cc_emails.filter(pk=email_address.pk).exists():
+            return True
+
+        return False
+
+
+allow_list = AllowList()
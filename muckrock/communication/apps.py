@@ -10,3 +10,9 @@ class CommunicationConfig(AppConfig):
     """Communication app config"""
 
     name = "muckrock.communication"
+
+    def ready(self):
+        """Connect signals to reload the allow list"""
+        # pylint: disable=unused-import, import-outside-toplevel
+        # MuckRock
+        import muckrock.communication.signals
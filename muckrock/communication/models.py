@@ -20,12 +20,8 @@ from email.utils import getaddresses, parseaddr
 # Third Party
 import phonenumbers
 from localflavor.us.models import USStateField, USZipCodeField
-from localflavor.us.us_states import STATE_CHOICES
 from phonenumber_field.modelfields import PhoneNumberField
 
-# MuckRock
-from muckrock.mailgun.models import WhitelistDomain
-
 PHONE_TYPES = (("fax", "Fax"), ("phone", "Phone"))
 CHECK_STATUS = (
     ("pending", "Pending"),
@@ -48,10 +44,9 @@ class EmailAddressQuerySet(models.QuerySet):
             email = self._normalize_email(email)
         except ValidationError:
             return None
-        email_address, created = self.update_or_create(
-            email=email, defaults={"name": name}
-        )
-        if created and user:
+        email_addresses, created = self._resolve([(name, email)])
+        email_address = email_addresses[email]
+        if email in created and user:
             email_address.sources.create(
                 datetime=timezone.now(),
                 user=user,
@@ -61,21 +56,87 @@ class EmailAddressQuerySet(models.QuerySet):
 
     def fetch_many(self, *addresses, **kwargs):
         """Fetch multiple email address objects based on an email header"""
-        name_emails = getaddresses(addresses)
-        addresses = []
-        for name, email in name_emails:
+        name_emails = self._parse_many(addresses, kwargs.get("ignore_errors", True))
+        email_addresses, _ = self._resolve(name_emails)
+        return [email_addresses[email] for _, email in name_emails]
+
+    def fetch_headers(self, from_, to_, cc_):
+        """Fetch the email address objects for the from, to and cc headers of
+        a message, all at once"""
+        name, from_email = parseaddr(from_)
+        try:
+            from_email = self._normalize_email(from_email)
+            from_name_emails = [(name, from_email)]
+        except ValidationError:
+            from_email = None
+            from_name_emails = []
+        to_name_emails = self._parse_many([to_], ignore_errors=True)
+        cc_name_emails = self._parse_many([cc_], ignore_errors=True)
+        email_addresses, _ = self._resolve(
+            from_name_emails + to_name_emails + cc_name_emails
+        )
+        return (
+            email_addresses.get(from_email),
+            [email_addresses[email] for _, email in to_name_emails],
+            [email_addresses[email] for _, email in cc_name_emails],
+        )
+
+    def fetch_bulk(self, headers):
+        """Fetch the email address objects for many email headers at once,
+        returning a dictionary mapping each header to a list of its valid email
+        addresses"""
+        parsed = {h: self._parse_many([h], ignore_errors=True) for h in set(headers)}
+        email_addresses, _ = self._resolve(
+            [
+                name_email
+                for name_emails in parsed.values()
+                for name_email in name_emails
+            ]
+        )
+        return {
+            header: [email_addresses[email] for _, email in name_emails]
+            for header, name_emails in parsed.items()
+        }
+
+    def _parse_many(self, addresses, ignore_errors):
+        """Parse email headers into a list of names and normalized emails"""
+        name_emails = []
+        for name, email in getaddresses(addresses):
             try:
-                email = self._normalize_email(email)
+                name_emails.append((name, self._normalize_email(email)))
             except ValidationError:
-                if kwargs.get("ignore_errors", True):
-                    continue
-                else:
+                if not ignore_errors:
                     raise
-            email_address, _ = self.update_or_create(
-                email=email, defaults={"name": name}
+        return name_emails
+
+    def _resolve(self, name_emails):
+        """Get or create email addresses for a list of names and normalized
+        emails, updating their names, using a constant number of queries
+
+        Returns a dictionary mapping emails to email addresses, and the set of
+        emails which were created
+        """
+        # later names for the same email take precedence
+        names = dict((email, name) for name, email in name_emails)
+        if not names:
+            return {}, set()
+        email_addresses = self.in_bulk(names, field_name="email")
+        renamed = []
+        for email, email_address in email_addresses.items():
+            if email_address.name != names[email]:
+                email_address.name = names[email]
+                renamed.append(email_address)
+        if renamed:
+            self.bulk_update(renamed, ["name"])
+        missing = [email for email in names if email not in email_addresses]
+        if missing:
+            # another process may create the same addresses concurrently
+            self.bulk_create(
+                [self.model(email=email, name=names[email]) for email in missing],
+                ignore_conflicts=True,
             )
-            addresses.append(email_address)
-        return addresses
+            email_addresses.update(self.in_bulk(missing, field_name="email"))
+        return email_addresses, set(missing)
 
     @staticmethod
     def _normalize_email(email):
@@ -120,43 +181,11 @@ class EmailAddress(models.Model):
 
     def allowed(self, foia=None):
         """Is this email address allowed to post to this FOIA request?"""
-        # pylint: disable=too-many-return-statements, import-outside-toplevel
+        # pylint: disable=import-outside-toplevel
         # MuckRock
-        from muckrock.agency.models import AgencyEmail
-
-        allowed_tlds = [
-            ".%s.us" % a.lower()
-            for (a, _) in list(STATE_CHOICES)
-            if a not in ("AS", "DC", "GU", "MP", "PR", "VI")
-        ]
-        allowed_tlds.extend([".gov", ".mil"])
-
-        # from the same domain as the FOIA email
-        if foia and foia.email and self.domain == foia.email.domain:
-            return True
-
-        # the email is a known email for this FOIA's agency
-        if foia and self.agencies.filter(pk=foia.agency_id).exists():
-            return True
-
-        # the email is a known email for this FOIA
-        if foia and foia.cc_emails.filter(email=self).exists():
-            return True
-
-        # it is from any known government TLD
-        if any(self.email.endswith(tld) for tld in allowed_tlds):
-            return True
-
-        # if not associated with any FOIA,
-        # checked if the email is known for any agency
-        if not foia and AgencyEmail.objects.filter(email=self).exists():
-            return True
+        from muckrock.communication.allowlist import allow_list
 
-        # check the email domain against the whitelist
-        if WhitelistDomain.objects.filter(domain__iexact=self.domain).exists():
-            return True
-
-        return False
+        return allow_list.allowed(self, foia)
 
     class Meta:
         verbose_name_plural = "email addresses"
@@ -176,6 +205,48 @@ class PhoneNumberQuerySet(models.QuerySet):
         except phonenumbers.NumberParseException:
             return None
 
+    def fetch_bulk(self, numbers):
+        """Fetch or create many numbers at once, from a list of number and type
+        pairs, returning a dictionary mapping each pair to its phone number, or
+        None if it is not valid.  As with `fetch`, existing numbers are updated
+        to the given type, with later pairs taking precedence."""
+        parsed = {}
+        for number, type_ in numbers:
+            try:
+                phone = phonenumbers.parse(number, "US")
+            except phonenumbers.NumberParseException:
+                parsed[(number, type_)] = None
+                continue
+            if phonenumbers.is_valid_number(phone):
+                parsed[(number, type_)] = phonenumbers.format_number(
+                    phone, phonenumbers.PhoneNumberFormat.E164
+                )
+            else:
+                parsed[(number, type_)] = None
+        types = {e164: type_ for (_, type_), e164 in parsed.items() if e164}
+        if not types:
+            return parsed
+
+        phones = {p.number.as_e164: p for p in self.filter(number__in=types)}
+        changed = []
+        for e164, phone in phones.items():
+            if phone.type != types[e164]:
+                phone.type = types[e164]
+                changed.append(phone)
+        if changed:
+            self.bulk_update(changed, ["type"])
+        missing = [e164 for e164 in types if e164 not in phones]
+        if missing:
+            # another process may create the same numbers concurrently
+            self.bulk_create(
+                [self.model(number=e164, type=types[e164]) for e164 in missing],
+                ignore_conflicts=True,
+            )
+            phones.update(
+                {p.number.as_e164: p for p in self.filter(number__in=missing)}
+            )
+        return {pair: phones.get(e164) for pair, e164 in parsed.items()}
+
 
 class PhoneNumber(models.Model):
     """A phone number"""
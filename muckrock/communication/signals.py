@@ -0,0 +1,33 @@
+"""Signals for the communication application"""
+# Django
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+# MuckRock
+from muckrock.agency.models import Agency, AgencyEmail
+from muckrock.communication.allowlist import allow_list
+from muckrock.mailgun.models import WhitelistDomain
+
+# pylint: disable=unused-argument
+
+
+def allow_list_changed(sender, **kwargs):
+    """Reload the allow list when whitelisted domains or agency emails change"""
+    allow_list.invalidate()
+
+
+for model in (AgencyEmail, WhitelistDomain):
+    post_save.connect(
+        allow_list_changed,
+        sender=model,
+        dispatch_uid="muckrock.communication.signals.%s_save" % model.__name__,
+    )
+    post_delete.connect(
+        allow_list_changed,
+        sender=model,
+        dispatch_uid="muckrock.communication.signals.%s_delete" % model.__name__,
+    )
+m2m_changed.connect(
+    allow_list_changed,
+    sender=Agency.emails.through,
+    dispatch_uid="muckrock.communication.signals.agency_emails",
+)
@@ -30,6 +30,22 @@ class TestEmailAddress(TestCase):
         with assert_raises(ValidationError):
             EmailAddress.objects.fetch_many("a@a.comn, foobar", ignore_errors=False)
 
+    def test_fetch_headers(self):
+        """All of the addresses in the headers should be fetched at once"""
+        EmailAddress.objects.create(email="b@b.com", name="Old")
+        with self.assertNumQueries(4):
+            from_email, to_emails, cc_emails = EmailAddress.objects.fetch_headers(
+                "a@a.com",
+                '"New" <b@b.com>, c@c.com, foobar',
+                "c@c.com, A@A.COM",
+            )
+        eq_(from_email.email, "a@a.com")
+        eq_([e.email for e in to_emails], ["b@b.com", "c@c.com"])
+        eq_([e.email for e in cc_emails], ["c@c.com", "A@a.com"])
+        eq_(to_emails[0].name, "New")
+        eq_(to_emails[1], cc_emails[0])
+        ok_(EmailAddress.objects.fetch_headers("foobar", "", "")[0] is None)
+
     def test_allowed(self):
         """Test allowed email function"""
         foia = FOIARequestFactory(
@@ -68,6 +84,10 @@ class TestEmailAddress(TestCase):
         # non foia test - any agency email
         ok_(EmailAddress.objects.fetch("main@agency.com").allowed())
 
+        # the allow list is reloaded when it changes
+        WhitelistDomain.objects.create(domain="BlackHat.edu")
+        ok_(EmailAddress.objects.fetch("foo@blackhat.edu").allowed(foia))
+
     def test_domain(self):
         """Test the domain method"""
         eq_(EmailAddress.objects.fetch("a@a.com").domain, "a.com")
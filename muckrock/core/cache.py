@@ -0,0 +1,122 @@
+"""
+Caching with soft expiration and single flight recomputation
+
+Values are stored along with the time they are due to be refreshed, and are
+kept in the cache for a while after that.  Once a value is due, one process
+takes a lock in the lock cache and recomputes it, while everyone else keeps
+getting the stale value, so a popular value expiring does not cause every
+concurrent request to recompute it at once.
+"""
+# Django
+from django.conf import settings
+from django.core.cache import caches
+
+# Standard Library
+import logging
+import time
+
+# Third Party
+from redis.exceptions import RedisError
+
+# MuckRock
+from muckrock.core import metrics
+
+logger = logging.getLogger(__name__)
+
+LOCK = "soft_cache:lock:{}"
+# values are stored under their own prefix, so that plain values cached under
+# the same key, such as by the cache template tag, are never read as entries
+KEY = "soft_cache:value:{}"
+
+
+def _lock(key):
+    """Try to take the lock to recompute the value for the key"""
+    try:
+        return caches["lock"].add(
+            LOCK.format(key), True, settings.SOFT_CACHE_LOCK_TIMEOUT
+        )
+    except RedisError as exc:
+        # better to recompute than to fail to render
+        logger.warning("Error locking soft cache key %s: %s", key, exc)
+        return True
+
+
+def _unlock(key):
+    """Release the lock to recompute the value for the key"""
+    try:
+        caches["lock"].delete(LOCK.format(key))
+    except RedisError as exc:
+        logger.warning("Error unlocking soft cache key %s: %s", key, exc)
+
+
+def _get(cache, key):
+    """Get the (refresh at, value) entry for the key, or None if it is missing
+    or is not an entry"""
+    entry = cache.get(KEY.format(key))
+    if isinstance(entry, tuple) and len(entry) == 2:
+        return entry
+    return None
+
+
+def _wait(cache, key):
+    """Wait for another process to compute a missing value, returning None if
+    it takes too long"""
+    deadline = time.time() + settings.SOFT_CACHE_LOCK_WAIT
+    while time.time() < deadline:
+        time.sleep(0.05)
+        entry = _get(cache, key)
+        if entry is not None:
+            return entry[1]
+    return None
+
+
+def set_value(cache, key, value, timeout):
+    """Store a value to be refreshed after the timeout"""
+    cache.set(
+        KEY.format(key),
+        (time.time() + timeout, value),
+        timeout + settings.SOFT_CACHE_STALE_TIMEOUT,
+    )
+
+
+def expire(cache, key):
+    """Mark a value as due to be refreshed, while still serving it until the
+    refreshed value is ready"""
+    entry = _get(cache, key)
+    if entry is not None:
+        cache.set(KEY.format(key), (0, entry[1]), settings.SOFT_CACHE_STALE_TIMEOUT)
+
+
+def get_or_set(cache, key, timeout, compute, name):
+    """Get the value for the key, computing it if it is missing or due to be
+    refreshed.  Hits, stale values served, misses and recompute timings are
+    recorded under the given name."""
+    entry = _get(cache, key)
+    if entry is not None:
+        refresh_at, value = entry
+        if time.time() < refresh_at:
+            metrics.incr(f"soft_cache.{name}.hit")
+            return value
+        if not _lock(key):
+            # another process is already refreshing it
+            metrics.incr(f"soft_cache.{name}.stale")
+            return value
+        metrics.incr(f"soft_cache.{name}.refresh")
+    else:
+        metrics.incr(f"soft_cache.{name}.miss")
+        if not _lock(key):
+            # there is nothing stale to serve, so wait for the other process
+            value = _wait(cache, key)
+            if value is not None:
+                return value
+            metrics.incr(f"soft_cache.{name}.wait_timeout")
+            value = compute()
+            set_value(cache, key, value, timeout)
+            return value
+    try:
+        with metrics.timer(f"soft_cache.{name}.recompute"):
+            value = compute()
+        set_value(cache, key, value, timeout)
+    finally:
+        _unlock(key)
+    return value
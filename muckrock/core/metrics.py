@@ -0,0 +1,105 @@
+"""
+Lightweight operational metrics
+
+Metrics are kept in redis, using the lock cache, so that they are shared
+between web and worker processes.  They are best effort - a failure to record
+a metric is logged and otherwise ignored.
+"""
+
+# Django
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+
+# Standard Library
+import logging
+import time
+from contextlib import contextmanager
+
+# Third Party
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "metrics:"
+
+
+def _cache():
+    return caches["lock"]
+
+
+def incr(name, value=1):
+    """Increment a counter"""
+    cache = _cache()
+    key = PREFIX + name
+    try:
+        try:
+            cache.incr(key, value)
+        except ValueError:
+            # the key does not exist yet
+            cache.set(key, value, settings.METRICS_TIMEOUT)
+    except RedisError as exc:
+        logger.warning("Error recording metric %s: %s", name, exc)
+
+
+def gauge(name, value):
+    """Set a value which replaces the previous one"""
+    try:
+        _cache().set(PREFIX + name, value, settings.METRICS_TIMEOUT)
+    except RedisError as exc:
+        logger.warning("Error recording metric %s: %s", name, exc)
+
+
+def timing(name, seconds):
+    """Record a duration, keeping the count, total and maximum"""
+    cache = _cache()
+    incr(f"{name}.count")
+    incr(f"{name}.total_ms", int(seconds * 1000))
+    try:
+        key = f"{PREFIX}{name}.max_ms"
+        if int(seconds * 1000) > (cache.get(key) or 0):
+            cache.set(key, int(seconds * 1000), settings.METRICS_TIMEOUT)
+    except RedisError as exc:
+        logger.warning("Error recording metric %s: %s", name, exc)
+
+
+@contextmanager
+def timer(name):
+    """Time the enclosed block"""
+    start = time.time()
+    try:
+        yield
+    finally:
+        timing(name, time.time() - start)
+
+
+class QueryCounter:
+    """Counts the database queries made"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def count_queries():
+    """Count the database queries made in the enclosed block, without the
+    overhead of recording them as the debug cursor does"""
+    counter = QueryCounter()
+    with connection.execute_wrapper(counter):
+        yield counter
+
+
+def get_metrics(prefix=""):
+    """Get all recorded metrics starting with the given prefix"""
+    cache = _cache()
+    try:
+        keys = cache.keys(f"{PREFIX}{prefix}*")
+        values = cache.get_many(keys)
+    except RedisError as exc:
+        logger.warning("Error reading metrics: %s", exc)
+        return {}
+    return {key[len(PREFIX) :]: value for key, value in sorted(values.items())}
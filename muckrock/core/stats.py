@@ -1,24 +1,170 @@
 """
-Utilities for calculating stats for agencies and jurisdictions
+Utilities for calculating stats for agencies and jurisdictions, and site wide
 """
 
 # Django
-from django.db.models import Count
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count, F, Q, Sum
+
+# Standard Library
+from collections import defaultdict
+from datetime import date
+
+# MuckRock
+from muckrock.agency.models import Agency, AgencyScorecard
+from muckrock.foia.models import FOIAFile, FOIARequest
+from muckrock.jurisdiction.models import (
+    SCORECARD_STATUSES,
+    Jurisdiction,
+    JurisdictionScorecard,
+    Scorecard,
+)
+
+SITE_STATS = "site_stats"
+
+
+def compute_site_stats():
+    """Compute the site wide counters shown on the homepage, which are too
+    expensive to compute while rendering it"""
+    stats = {
+        "request_count": FOIARequest.objects.count(),
+        "completed_count": FOIARequest.objects.get_done().count(),
+        "page_count": FOIAFile.objects.aggregate(pages=Sum("pages"))["pages"],
+        "agency_count": Agency.objects.get_approved().count(),
+    }
+    caches["lock"].set(SITE_STATS, stats, settings.SITE_STATS_TIMEOUT)
+    return stats
+
+
+def get_site_stats():
+    """Get the precomputed site wide counters, computing them if they are
+    missing"""
+    stats = caches["lock"].get(SITE_STATS)
+    if stats is None:
+        stats = compute_site_stats()
+    return stats
 
 
 def collect_stats(obj, context):
     """Helper for collecting stats"""
     statuses = ("rejected", "ack", "processed", "fix", "no_docs", "done", "appealing")
-    requests = obj.get_requests()
-    status_counts = (
-        requests.filter(status__in=statuses)
-        .order_by("status")
-        .values_list("status")
-        .annotate(Count("status"))
+    scorecard = obj.get_scorecard()
+    context.update({"num_%s" % s: getattr(scorecard, "num_%s" % s) for s in statuses})
+    context["num_overdue"] = scorecard.num_overdue
+    context["num_submitted"] = scorecard.num_requests
+
+
+def _scorecard_aggregates():
+    """The aggregates used to calculate a scorecard's totals"""
+    aggregates = {"num_requests": Count("pk")}
+    aggregates.update(
+        {"num_%s" % s: Count("pk", filter=Q(status=s)) for s in SCORECARD_STATUSES}
+    )
+    aggregates.update(
+        {
+            "num_overdue": Count(
+                "pk",
+                filter=Q(status__in=["ack", "processed"], date_due__lt=date.today()),
+            ),
+            "num_succeeded": Count(
+                "pk",
+                filter=Q(status__in=["partial", "done"], datetime_done__isnull=False),
+            ),
+            "num_fees": Count("pk", filter=Q(price__gt=0)),
+            "total_fees": Sum("price", filter=Q(price__gt=0)),
+            "num_responded": Count(
+                "pk",
+                filter=Q(
+                    datetime_done__isnull=False,
+                    composer__datetime_submitted__isnull=False,
+                ),
+            ),
+            "total_response_time": Sum(
+                F("datetime_done") - F("composer__datetime_submitted")
+            ),
+        }
+    )
+    return aggregates
+
+
+def _grouped_totals(field, filters):
+    """Calculate the scorecard totals for all requests, grouped by `field`,
+    with one query for the requests and one for the pages"""
+    totals = defaultdict(dict)
+    requests = (
+        FOIARequest.objects.filter(**filters)
+        .order_by()
+        .values(field)
+        .annotate(**_scorecard_aggregates())
+    )
+    for row in requests:
+        key = row.pop(field)
+        totals[key].update({k: v for k, v in row.items() if v is not None})
+    pages = (
+        FOIAFile.objects.filter(**{"comm__foia__%s" % k: v for k, v in filters.items()})
+        .order_by()
+        .values("comm__foia__%s" % field)
+        .annotate(total_pages=Sum("pages"))
     )
-    context.update({"num_%s" % s: c for s, c in status_counts})
-    context["num_overdue"] = requests.get_overdue().count()
-    context["num_submitted"] = requests.count()
+    for row in pages:
+        if row["total_pages"]:
+            totals[row["comm__foia__%s" % field]]["total_pages"] = row["total_pages"]
+    return totals
+
+
+def _add_totals(first, second):
+    """Add two sets of scorecard totals together"""
+    totals = dict(first)
+    for field, value in second.items():
+        totals[field] = totals[field] + value if field in totals else value
+    return totals
+
+
+def _save_scorecards(model, field, ids, totals):
+    """Create or update the scorecards for the given ids"""
+    scorecards = [model(**{"%s_id" % field: id_}, **totals.get(id_, {})) for id_ in ids]
+    model.objects.bulk_create(
+        scorecards,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=[field],
+        update_fields=Scorecard.total_fields + ["datetime_updated"],
+    )
+    return scorecards
+
+
+def refresh_agency_scorecards(ids=None):
+    """Recalculate the scorecards for the given agencies, or all agencies"""
+    filters = {}
+    if ids is None:
+        ids = list(Agency.objects.values_list("pk", flat=True))
+    else:
+        filters["agency__in"] = ids
+    totals = _grouped_totals("agency", filters)
+    return _save_scorecards(AgencyScorecard, "agency", ids, totals)
+
+
+def refresh_jurisdiction_scorecards(ids=None):
+    """Recalculate the scorecards for the given jurisdictions, or all
+    jurisdictions.  States include the requests from their localities."""
+    if ids is None:
+        ids = list(Jurisdiction.objects.values_list("pk", flat=True))
+        direct_filters = {}
+        local_filters = {}
+    else:
+        direct_filters = {"agency__jurisdiction__in": ids}
+        local_filters = {"agency__jurisdiction__parent__in": ids}
+    direct = _grouped_totals("agency__jurisdiction", direct_filters)
+    local = _grouped_totals(
+        "agency__jurisdiction__parent",
+        dict(local_filters, agency__jurisdiction__parent__level="s"),
+    )
+    totals = {
+        id_: _add_totals(direct.get(id_, {}), local.get(id_, {}))
+        for id_ in set(direct) | set(local)
+    }
+    return _save_scorecards(JurisdictionScorecard, "jurisdiction", ids, totals)
 
 
 def assign_grade(grade, text, percentile=None):
@@ -44,7 +190,7 @@ def grade_absolute_response_time(agency):
         return assign_grade(
             "neutral", "The agency's jurisdiction has no mandated response time."
         )
-    if agency.jurisdiction.days >= agency.average_response_time():
+    if agency.jurisdiction.days >= agency.get_scorecard().average_response_time:
         return assign_grade(
             "pass", "On average, they respond within the legally allowed time."
         )
@@ -56,8 +202,10 @@ def grade_absolute_response_time(agency):
 
 def grade_relative_response_time(agency):
     """Do they respond faster than other agencies in the jurisdiction?"""
-    agency_average_response_time = agency.average_response_time()
-    jurisdiction_average_response_time = agency.jurisdiction.average_response_time()
+    agency_average_response_time = agency.get_scorecard().average_response_time
+    jurisdiction_average_response_time = (
+        agency.jurisdiction.get_scorecard().average_response_time
+    )
     if (
         agency.jurisdiction.agencies.count() < 2
         or agency_average_response_time == 0
@@ -88,8 +236,8 @@ def grade_relative_response_time(agency):
 
 def grade_success_rate(agency):
     """Do they fulfill requests more than other agencies in the jurisdiction?"""
-    agency_success_rate = agency.success_rate()
-    jurisdiction_success_rate = agency.jurisdiction.success_rate()
+    agency_success_rate = agency.get_scorecard().success_rate
+    jurisdiction_success_rate = agency.jurisdiction.get_scorecard().success_rate
     if (
         agency.jurisdiction.agencies.count() < 2
         or jurisdiction_success_rate == 0
@@ -116,8 +264,8 @@ def grade_success_rate(agency):
 
 def grade_fee_rate(agency):
     """Do they charge feeds more often than other agencies in the jurisdiction?"""
-    agency_fee_rate = agency.fee_rate()
-    jurisdiction_fee_rate = agency.jurisdiction.fee_rate()
+    agency_fee_rate = agency.get_scorecard().fee_rate
+    jurisdiction_fee_rate = agency.jurisdiction.get_scorecard().fee_rate
     if (
         agency.jurisdiction.agencies.count() < 2
         or agency_fee_rate == 0
@@ -144,8 +292,8 @@ def grade_fee_rate(agency):
 
 def grade_fee_average(agency):
     """Do they charge feeds higher than other agencies in the jurisdiction?"""
-    agency_fee_average = agency.average_fee()
-    jurisdiction_fee_average = agency.jurisdiction.average_fee()
+    agency_fee_average = agency.get_scorecard().average_fee
+    jurisdiction_fee_average = agency.jurisdiction.get_scorecard().average_fee
     if (
         agency.jurisdiction.agencies.count() < 2
         or agency_fee_average == 0
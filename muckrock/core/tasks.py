@@ -2,12 +2,17 @@
 Shared functionality for tasks
 """
 # Django
+from celery.schedules import crontab
+from celery.task import periodic_task
 from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.utils import timezone
 
 # Standard Library
 import logging
 import sys
+import uuid
 from datetime import date
 from hashlib import md5
 from time import time
@@ -18,10 +23,58 @@ from botocore.exceptions import ClientError
 from smart_open.smart_open_lib import smart_open
 
 # MuckRock
+from muckrock.core.stats import compute_site_stats
 from muckrock.message.email import TemplateEmail
 
 logger = logging.getLogger(__name__)
 
+EXPORT_PROGRESS = "export:{}"
+USER_EXPORTS = "exports:{}"
+MAX_USER_EXPORTS = 10
+
+
+def _progress_timeout():
+    """Keep progress for as long as the download links are valid"""
+    return int(settings.AWS_MEDIA_EXPIRATION_SECONDS)
+
+
+def queue_export(user, name):
+    """Record a new export for the user, returning its id to pass to the export
+    task, so it is shown as queued until the task starts"""
+    cache = caches["lock"]
+    export_id = uuid.uuid4().hex
+    cache.set(
+        EXPORT_PROGRESS.format(export_id),
+        {
+            "name": name,
+            "status": "queued",
+            "done": 0,
+            "total": None,
+            "url": None,
+            "datetime": timezone.now(),
+        },
+        _progress_timeout(),
+    )
+    export_ids = cache.get(USER_EXPORTS.format(user.pk)) or []
+    cache.set(
+        USER_EXPORTS.format(user.pk),
+        [export_id] + export_ids[: MAX_USER_EXPORTS - 1],
+        _progress_timeout(),
+    )
+    return export_id
+
+
+def get_exports(user):
+    """Get the progress of the user's recent exports, newest first"""
+    cache = caches["lock"]
+    export_ids = cache.get(USER_EXPORTS.format(user.pk)) or []
+    progress = cache.get_many([EXPORT_PROGRESS.format(i) for i in export_ids])
+    return [
+        progress[EXPORT_PROGRESS.format(i)]
+        for i in export_ids
+        if EXPORT_PROGRESS.format(i) in progress
+    ]
+
 
 class AsyncFileDownloadTask:
     """Base behavior for asynchrnously generating large files for downloading
@@ -33,12 +86,17 @@ class AsyncFileDownloadTask:
     self.html_template - html template for notification email
     self.subject - subject line for notification email
     self.mode - "w" for text (default), "wb" for binary
+
+    If an export id from `queue_export` is given, the progress of the export is
+    recorded for the user to see.  Subclasses should call `set_progress` with
+    the number of items done and the total as they generate the file.
     """
 
     mode = "w"
 
-    def __init__(self, user_pk, hash_key):
+    def __init__(self, user_pk, hash_key, export_id=None):
         self.user = User.objects.get(pk=user_pk)
+        self.export_id = export_id
         self.bucket = settings.AWS_MEDIA_BUCKET_NAME
         today = date.today()
         self.file_key = "{dir_name}/{y:4d}/{m:02d}/{d:02d}/{md5}/{file_name}".format(
@@ -75,11 +133,21 @@ class AsyncFileDownloadTask:
             "expiration_in_days": user_media_expiration_days,
         }
 
-    def send_notification(self):
+    def set_progress(self, **kwargs):
+        """Update the recorded progress of the export"""
+        if self.export_id is None:
+            return
+        cache = caches["lock"]
+        key = EXPORT_PROGRESS.format(self.export_id)
+        progress = cache.get(key) or {}
+        progress.update(kwargs)
+        cache.set(key, progress, _progress_timeout())
+
+    def send_notification(self, context):
         """Send the user the link to their file"""
         notification = TemplateEmail(
             user=self.user,
-            extra_context=self.get_context(),
+            extra_context=context,
             text_template=self.text_template,
             html_template=self.html_template,
             subject=self.subject,
@@ -88,16 +156,34 @@ class AsyncFileDownloadTask:
 
     def run(self):
         """Task entry point"""
-        with smart_open(
-            self.key, self.mode, s3_min_part_size=settings.AWS_S3_MIN_PART_SIZE
-        ) as out_file:
-            self.generate_file(out_file)
+        self.set_progress(status="running")
+        try:
+            with smart_open(
+                self.key, self.mode, s3_min_part_size=settings.AWS_S3_MIN_PART_SIZE
+            ) as out_file:
+                self.generate_file(out_file)
 
-        s3 = boto3.resource("s3")
-        obj = s3.ObjectAcl(self.bucket, self.file_key)
-        obj.put(ACL=settings.AWS_DEFAULT_ACL)
-        self.send_notification()
+            s3 = boto3.resource("s3")
+            obj = s3.ObjectAcl(self.bucket, self.file_key)
+            obj.put(ACL=settings.AWS_DEFAULT_ACL)
+        except Exception:
+            self.set_progress(status="failed")
+            raise
+        context = self.get_context()
+        self.send_notification(context)
+        self.set_progress(
+            status="done", url=context["presigned_url"] if context else None
+        )
 
     def generate_file(self, out_file):
         """Abstract method"""
         raise NotImplementedError("Subclass must override generate_file")
+
+
+@periodic_task(
+    run_every=crontab(minute="*/10"), name="muckrock.core.tasks.precompute_site_stats"
+)
+def precompute_site_stats():
+    """Precompute the site wide counters, so they are never computed while
+    rendering a page"""
+    compute_site_stats()
@@ -24,6 +24,7 @@ import smartypants as _smartypants
 from sorl.thumbnail.templatetags.thumbnail import thumbnail
 
 # MuckRock
+from muckrock.core import cache as soft_cache
 from muckrock.core.forms import NewsletterSignupForm, TagManagerForm
 from muckrock.foia.models import FOIARequest
 from muckrock.project.forms import ProjectManagerForm
@@ -427,6 +428,27 @@ class CacheNode(Node):
             return self.nodelist.render(context)
 
 
+class SoftCacheNode(CacheNode):
+    """Cache Node which refreshes expired fragments in a single process, while
+    serving the stale fragment to everyone else"""
+
+    def render(self, context):
+        """Render the cached fragment"""
+        expire_time, fragment_cache = self._resolve_vars(context)
+        if expire_time == 0:
+            return self.nodelist.render(context)
+        if expire_time is None:
+            expire_time = settings.DEFAULT_CACHE_TIMEOUT
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        return soft_cache.get_or_set(
+            fragment_cache,
+            make_template_fragment_key(self.fragment_name, vary_on),
+            expire_time,
+            lambda: self.nodelist.render(context),
+            self.fragment_name,
+        )
+
+
 def parse_cache(parser, token):
     """Do the parsing for custom cache tags"""
     nodelist = parser.parse(("endcache",))
@@ -460,6 +482,13 @@ def do_compress_cache(parser, token):
     return CacheNode(*parse_cache(parser, token), compress=True)
 
 
+@register.tag("soft_cache")
+def do_soft_cache(parser, token):
+    """Cache tag with a soft expiration, which only lets one process at a time
+    recompute the fragment"""
+    return SoftCacheNode(*parse_cache(parser, token))
+
+
 @register.tag
 def sorl_thumbnail(parser, token):
     """Wrapper for sorl thumbnail tag to resolve name clash with easy thumbnails"""
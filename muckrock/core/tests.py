@@ -5,8 +5,10 @@ Tests for site level functionality and helper functions for application tests
 # Django
 from django.conf import settings
 from django.contrib.sites.models import Site
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
 from django.core.exceptions import ValidationError
-from django.test import RequestFactory, TestCase
+from django.test import RequestFactory, TestCase, override_settings
 from django.urls import reverse
 
 # Standard Library
@@ -21,6 +23,7 @@ from nose.tools import eq_, ok_
 
 # MuckRock
 from muckrock.accounts.models import Notification
+from muckrock.core import cache as soft_cache
 from muckrock.core.factories import (
     AgencyFactory,
     AnswerFactory,
@@ -351,6 +354,60 @@ class TestTemplatetagsFunctional(TestCase):
         nose.tools.eq_(tags.company_title("company"), "company")
 
 
+class TestSoftCache(TestCase):
+    """Test the soft expiring cache"""
+
+    def setUp(self):
+        self.cache = LocMemCache("soft-cache-test", {})
+        self.cache.clear()
+        caches["lock"].delete(soft_cache.LOCK.format("key"))
+        self.compute = Mock(return_value="fresh")
+
+    def tearDown(self):
+        caches["lock"].delete(soft_cache.LOCK.format("key"))
+
+    def test_miss_and_hit(self):
+        """A missing value should be computed once and then cached"""
+        eq_(soft_cache.get_or_set(self.cache, "key", 60, self.compute, "test"), "fresh")
+        eq_(soft_cache.get_or_set(self.cache, "key", 60, self.compute, "test"), "fresh")
+        eq_(self.compute.call_count, 1)
+
+    def test_stale_while_refreshing(self):
+        """A stale value should be served while another process refreshes it"""
+        soft_cache.set_value(self.cache, "key", "stale", 60)
+        soft_cache.expire(self.cache, "key")
+        caches["lock"].add(soft_cache.LOCK.format("key"), True, 60)
+        eq_(soft_cache.get_or_set(self.cache, "key", 60, self.compute, "test"), "stale")
+        self.compute.assert_not_called()
+
+    def test_refresh(self):
+        """A stale value should be refreshed by one process"""
+        soft_cache.set_value(self.cache, "key", "stale", 60)
+        soft_cache.expire(self.cache, "key")
+        eq_(soft_cache.get_or_set(self.cache, "key", 60, self.compute, "test"), "fresh")
+        eq_(soft_cache.get_or_set(self.cache, "key", 60, self.compute, "test"), "fresh")
+        eq_(self.compute.call_count, 1)
+
+    def test_plain_values(self):
+        """Values cached without soft expiration under the same key, or invalid
+        entries, should be treated as missing"""
+        self.cache.set("key", "<html>")
+        eq_(soft_cache.get_or_set(self.cache, "key", 60, self.compute, "test"), "fresh")
+        self.cache.set(soft_cache.KEY.format("key"), "<html>")
+        soft_cache.expire(self.cache, "key")
+        eq_(soft_cache.get_or_set(self.cache, "key", 60, self.compute, "test"), "fresh")
+        eq_(self.compute.call_count, 2)
+
+    @override_settings(SOFT_CACHE_LOCK_WAIT=0)
+    def test_wait_timeout(self):
+        """A value computed after waiting too long for another process should
+        still be cached"""
+        caches["lock"].add(soft_cache.LOCK.format("key"), True, 60)
+        eq_(soft_cache.get_or_set(self.cache, "key", 60, self.compute, "test"), "fresh")
+        eq_(soft_cache.get_or_set(self.cache, "key", 60, self.compute, "test"), "fresh")
+        eq_(self.compute.call_count, 1)
+
+
 class TestGradeAgency(TestCase):
     """Evaluates agency key metrics against the law and sibling agencies."""
 
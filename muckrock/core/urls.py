@@ -97,6 +97,7 @@ router.register(r"project", muckrock.project.viewsets.ProjectViewSet, "api-proje
 urlpatterns = [
     re_path(r"^$", views.homepage, name="index"),
     re_path(r"^reset_cache/$", views.reset_homepage_cache, name="reset-cache"),
+    re_path(r"^metrics/$", views.metrics, name="metrics"),
     re_path(r"^accounts/", include("muckrock.accounts.urls")),
     re_path(r"^foi/", include("muckrock.foia.urls")),
     re_path(r"^news/", include("muckrock.news.urls")),
@@ -17,12 +17,15 @@ import string
 import sys
 import time
 import uuid
+from functools import lru_cache
+from operator import attrgetter
 
 # Third Party
 import actstream
 import boto3
 import requests
 import stripe
+from documentcloud import DocumentCloud
 
 logger = logging.getLogger(__name__)
 
@@ -83,7 +86,6 @@ def notify(users, action):
     # MuckRock
     from muckrock.accounts.models import Notification
 
-    notifications = []
     if isinstance(users, Group):
         # If users is a group, get the queryset of users
         users = users.user_set.all()
@@ -92,11 +94,11 @@ def notify(users, action):
         users = [users]
     if action is None:
         # If no action is provided, don't generate any notifications
-        return notifications
-    for user in users:
-        notification = Notification.objects.create(user=user, action=action)
-        notifications.append(notification)
-    return notifications
+        return []
+    return Notification.objects.bulk_create(
+        [Notification(user=user, action=action) for user in users],
+        batch_size=settings.NOTIFICATION_BATCH_SIZE,
+    )
 
 
 def generate_key(size=12, chars=string.ascii_uppercase + string.digits):
@@ -172,6 +174,18 @@ class TempDisconnectSignal:
         )
 
 
+def keyset_chunks(queryset, chunk_size, get_pk=attrgetter("pk")):
+    """Yield the results of a queryset a chunk at a time, paginating on the
+    primary key so each chunk is an indexed range scan, no matter how far into
+    the results it is.  `get_pk` gets the primary key from a result, for
+    querysets of values."""
+    queryset = queryset.order_by("pk")
+    chunk = list(queryset[:chunk_size])
+    while chunk:
+        yield chunk
+        chunk = list(queryset.filter(pk__gt=get_pk(chunk[-1]))[:chunk_size])
+
+
 def read_in_chunks(file_, size=128):
     """Read a file in chunks"""
     # from https://www.smallsurething.com/how-to-read-a-file-properly-in-python/
@@ -229,11 +243,12 @@ def squarelet_post(path, data):
     return _squarelet(requests.post, path, data=data)
 
 
-def squarelet_get(path, params=None):
-    """Make a get request to squarlet"""
+def squarelet_get(path, params=None, session=requests):
+    """Make a get request to squarlet, optionally through a session to reuse
+    its connections"""
     if params is None:
         params = {}
-    return _squarelet(requests.get, path, params=params)
+    return _squarelet(session.get, path, params=params)
 
 
 def _zoho(method, path, **kwargs):
@@ -255,6 +270,18 @@ def zoho_get(path, params=None):
     return _zoho(requests.get, path, params=params)
 
 
+@lru_cache(maxsize=None)
+def get_documentcloud_client():
+    """Get a DocumentCloud client, shared for the life of the process
+    so that we only authenticate once"""
+    return DocumentCloud(
+        username=settings.DOCUMENTCLOUD_BETA_USERNAME,
+        password=settings.DOCUMENTCLOUD_BETA_PASSWORD,
+        base_uri=f"{settings.DOCCLOUD_API_URL}/api/",
+        auth_uri=f"{settings.SQUARELET_URL}/api/",
+    )
+
+
 def get_s3_storage_bucket():
     """Return the S3 storage bucket"""
     s3 = boto3.resource("s3")
@@ -9,11 +9,13 @@ from django.contrib.auth.decorators import user_passes_test
 from django.core.cache import cache
 from django.core.cache.utils import make_template_fragment_key
 from django.core.exceptions import ImproperlyConfigured
-from django.db.models import F, Q, Sum
+from django.db.models import F, Q
+from django.http import HttpRequest, JsonResponse, QueryDict
 from django.shortcuts import get_object_or_404, redirect, render
 from django.template.loader import render_to_string
 from django.urls import reverse
 from django.utils.decorators import method_decorator
+from django.utils.functional import SimpleLazyObject
 from django.utils.html import escape
 from django.views.generic import FormView, ListView, TemplateView, View
 
@@ -38,10 +40,13 @@ from muckrock.accounts.utils import (
     mixpanel_event,
     stripe_get_customer,
 )
-from muckrock.agency.models import Agency
+from muckrock.core import cache as soft_cache
 from muckrock.core.forms import NewsletterSignupForm, SearchForm, StripeForm
+from muckrock.core.metrics import get_metrics
+from muckrock.core.stats import get_site_stats
+from muckrock.core.tasks import precompute_site_stats
 from muckrock.core.utils import stripe_retry_on_error
-from muckrock.foia.models import FOIAFile, FOIARequest
+from muckrock.foia.models import FOIARequest
 from muckrock.jurisdiction.models import Jurisdiction
 from muckrock.news.models import Article
 from muckrock.project.models import Project
@@ -103,6 +108,23 @@ class ModelFilterMixin:
             self.request.GET, queryset=self.get_queryset(), request=self.request
         )
 
+    @classmethod
+    def rebuild_queryset(cls, user, params, kwargs=None):
+        """Rebuild the filtered queryset outside of a request, from the user,
+        query parameters and url arguments the list was viewed with.  This lets
+        a task work on the same results the user saw, without passing every
+        result through the task queue."""
+        request = HttpRequest()
+        request.user = user
+        request.GET = QueryDict(params)
+        view = cls()
+        view.setup(request, **(kwargs or {}))
+        filter_ = view.get_filter()
+        queryset = filter_.qs
+        if any(filter_.data.values()):
+            queryset = queryset.distinct()
+        return queryset
+
     def get_context_data(self, **kwargs):
         """
         Adds the filter to the context and overrides the
@@ -367,16 +389,9 @@ class Homepage:
         )
 
     def stats(self):
-        """Get some stats to show on the front page"""
-        # pylint: disable=unnecessary-lambda
-        return {
-            "request_count": lambda: FOIARequest.objects.count(),
-            "completed_count": lambda: FOIARequest.objects.get_done().count(),
-            "page_count": lambda: FOIAFile.objects.aggregate(pages=Sum("pages"))[
-                "pages"
-            ],
-            "agency_count": lambda: Agency.objects.get_approved().count(),
-        }
+        """Get some stats to show on the front page, which are precomputed on
+        a schedule"""
+        return SimpleLazyObject(get_site_stats)
 
 
 def homepage(request):
@@ -391,13 +406,22 @@ def homepage(request):
 def reset_homepage_cache(request):
     """Reset the homepage cache"""
 
-    template_keys = ("homepage_top", "homepage_bottom", "dropdown_recent_articles")
-    for key in template_keys:
-        cache.delete(make_template_fragment_key(key))
+    # the homepage fragments are refreshed by the next request while the
+    # current ones are still served, instead of every request recomputing them
+    precompute_site_stats.delay()
+    for key in ("homepage_top", "homepage_bottom"):
+        soft_cache.expire(cache, make_template_fragment_key(key))
+    cache.delete(make_template_fragment_key("dropdown_recent_articles"))
 
     return redirect("index")
 
 
+@user_passes_test(lambda u: u.is_staff)
+def metrics(request):
+    """Show the recorded operational metrics"""
+    return JsonResponse(get_metrics(request.GET.get("prefix", "")))
+
+
 class StripeFormMixin:
     """Prefills the StripeForm values."""
 
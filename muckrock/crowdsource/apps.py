@@ -11,3 +11,9 @@ class CrowdsourceConfig(AppConfig):
     """Crowdsource config"""
 
     name = "muckrock.crowdsource"
+
+    def ready(self):
+        """Connect signals to keep the data completion counts up to date"""
+        # pylint: disable=import-outside-toplevel, unused-import
+        # MuckRock
+        import muckrock.crowdsource.signals
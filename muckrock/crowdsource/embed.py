@@ -0,0 +1,115 @@
+"""
+Cached oEmbed rendering for crowdsource data
+
+Fetching the embed code for a URL may take several requests to third party
+sites, so it is done in the background and the result is cached.  Failures
+are cached for a shorter time, so a broken URL is not fetched on every page
+view.  Until the embed code is cached, a plain iframe is shown instead.
+"""
+
+# Django
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+
+# Standard Library
+import hashlib
+import logging
+from functools import lru_cache
+
+# Third Party
+from pkg_resources import resource_filename
+from pyembed.core import PyEmbed
+from pyembed.core.discovery import AutoDiscoverer, ChainingDiscoverer, FileDiscoverer
+from pyembed.core.error import PyEmbedError
+
+logger = logging.getLogger(__name__)
+
+EMBED_KEY = "crowdsource:embed:{}"
+PENDING_KEY = "crowdsource:embed:pending:{}"
+
+
+@lru_cache(maxsize=None)
+def get_pyembed():
+    """Get the oEmbed consumer, shared for the life of the process so the
+    provider registry is only read once"""
+    return PyEmbed(
+        # we don't use the default discoverer because it contains a bug
+        # that makes it always match spotify
+        discoverer=ChainingDiscoverer(
+            [
+                FileDiscoverer(resource_filename(__name__, "oembed_providers.json")),
+                AutoDiscoverer(),
+            ]
+        )
+    )
+
+
+def _key(template, url):
+    """Cache keys are hashed, as URLs may be too long or contain characters
+    which are not valid in a key"""
+    return template.format(hashlib.md5(url.encode("utf8")).hexdigest())
+
+
+def fallback(url):
+    """A simple iframe, for URLs without oEmbed support"""
+    return format_html('<iframe src="{}" width="100%" height="400px"></iframe>', url)
+
+
+def fetch(url):
+    """Fetch the embed code for the URL and cache it, returning the HTML to
+    embed"""
+    try:
+        html = get_pyembed().embed(url, max_height=400)
+    except PyEmbedError as exc:
+        logger.info("Error fetching embed for %s: %s", url, exc)
+        cache.set(_key(EMBED_KEY, url), "", settings.CROWDSOURCE_EMBED_FAILURE_TTL)
+        return fallback(url)
+    cache.set(_key(EMBED_KEY, url), html, settings.CROWDSOURCE_EMBED_TTL)
+    return mark_safe(html)
+
+
+def prewarm(urls):
+    """Fetch the embed code for any of the URLs which are not cached"""
+    keys = {_key(EMBED_KEY, url): url for url in urls if url}
+    cached = cache.get_many(keys)
+    for key, url in keys.items():
+        if key not in cached:
+            fetch(url)
+
+
+def schedule_prewarm(urls):
+    """Fetch the embed code for the URLs in the background, skipping URLs
+    which are already scheduled"""
+    # pylint: disable=import-outside-toplevel
+    # MuckRock
+    from muckrock.crowdsource.tasks import prewarm_embeds
+
+    lock = caches["lock"]
+    urls = [
+        url
+        for url in urls
+        if url
+        and lock.add(_key(PENDING_KEY, url), True, settings.CROWDSOURCE_EMBED_PENDING)
+    ]
+    for i in range(0, len(urls), settings.CROWDSOURCE_EMBED_CHUNK_SIZE):
+        prewarm_embeds.delay(urls[i : i + settings.CROWDSOURCE_EMBED_CHUNK_SIZE])
+
+
+def get_embed(url, wait=False):
+    """Get the HTML to embed for the URL, without waiting on third party sites
+    unless `wait` is set"""
+    if not url:
+        return ""
+    html = cache.get(_key(EMBED_KEY, url))
+    if html is None:
+        if wait:
+            return fetch(url)
+        schedule_prewarm([url])
+        return fallback(url)
+    elif html == "":
+        # fetching the embed code failed recently
+        return fallback(url)
+    else:
+        return mark_safe(html)
@@ -0,0 +1,172 @@
+"""
+Set based export of crowdsource responses
+
+Responses are read a chunk at a time, ordered by primary key.  The tags and
+field values for each chunk are fetched with one query each and pivoted into
+columns in memory, so the number of queries depends on the number of chunks
+instead of the number of responses.
+"""
+
+# Django
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+
+# Standard Library
+import csv
+import json
+from collections import defaultdict
+from operator import itemgetter
+
+# MuckRock
+from muckrock.core.utils import keyset_chunks
+from muckrock.crowdsource import fields
+from muckrock.crowdsource.models import CrowdsourceResponse, CrowdsourceValue
+from muckrock.tags.models import TaggedItemBase
+
+
+class ResponseExporter:
+    """Export all of the responses for a crowdsource"""
+
+    def __init__(
+        self, crowdsource, include_emails=False, chunk_size=None, progress=None
+    ):
+        self.crowdsource = crowdsource
+        # called with the number of responses exported after each chunk
+        self.progress = progress
+        self.include_emails = include_emails
+        self.chunk_size = chunk_size or settings.CROWDSOURCE_EXPORT_CHUNK_SIZE
+        # resolve the columns once for the whole export
+        self.metadata_keys = crowdsource.get_metadata_keys()
+        self.has_data = crowdsource.data.exists()
+        self.field_ids = list(
+            crowdsource.fields.exclude(type__in=fields.STATIC_FIELDS).values_list(
+                "pk", flat=True
+            )
+        )
+        self.header = crowdsource.get_header_values(self.metadata_keys, include_emails)
+
+    def _chunks(self):
+        """Yield the responses a chunk at a time"""
+        responses = CrowdsourceResponse.objects.filter(
+            crowdsource=self.crowdsource
+        ).values_list(
+            "pk",
+            "user__username",
+            "user__email",
+            "public",
+            "datetime",
+            "skip",
+            "flag",
+            "gallery",
+            "number",
+            "data__url",
+            "data__metadata",
+        )
+        return keyset_chunks(responses, self.chunk_size, itemgetter(0))
+
+    def _tags(self, response_ids):
+        """Get the comma separated tags for each response"""
+        tags = defaultdict(list)
+        for object_id, name in (
+            TaggedItemBase.objects.filter(
+                content_type=ContentType.objects.get_for_model(CrowdsourceResponse),
+                object_id__in=response_ids,
+            )
+            .order_by("object_id", "tag__name")
+            .values_list("object_id", "tag__name")
+        ):
+            tags[object_id].append(name)
+        return {pk: ", ".join(names) for pk, names in tags.items()}
+
+    def _values(self, response_ids):
+        """Get the comma separated values of each field for each response"""
+        values = defaultdict(lambda: defaultdict(list))
+        for response_id, field_id, value in (
+            CrowdsourceValue.objects.filter(response__in=response_ids)
+            .exclude(field__type__in=fields.STATIC_FIELDS)
+            # blank values of multivalued fields only hold original values
+            .exclude(value="", field__type__in=fields.MULTI_FIELDS)
+            .order_by("response_id", "pk")
+            .values_list("response_id", "field_id", "value")
+        ):
+            values[response_id][field_id].append(value)
+        return values
+
+    def rows(self):
+        """Yield a list of values for each response, matching the header"""
+        done = 0
+        for chunk in self._chunks():
+            response_ids = [r[0] for r in chunk]
+            tags = self._tags(response_ids)
+            values = self._values(response_ids)
+            for (
+                pk,
+                username,
+                email,
+                public,
+                datetime,
+                skip,
+                flag,
+                gallery,
+                number,
+                url,
+                metadata,
+            ) in chunk:
+                row = [
+                    username or "Anonymous",
+                    public,
+                    datetime.strftime("%Y-%m-%d %H:%M:%S"),
+                    skip,
+                    flag,
+                    gallery,
+                    tags.get(pk, ""),
+                ]
+                if self.include_emails:
+                    row.insert(1, email or "")
+                if self.crowdsource.multiple_per_page:
+                    row.append(number)
+                if self.has_data:
+                    # keep the columns aligned for responses without a datum
+                    metadata = metadata or {}
+                    row.append(url or "")
+                    row.extend(metadata.get(k, "") for k in self.metadata_keys)
+                field_values = values.get(pk, {})
+                row.extend(
+                    ", ".join(field_values.get(field_id, []))
+                    for field_id in self.field_ids
+                )
+                yield row
+            done += len(chunk)
+            if self.progress is not None:
+                self.progress(done)
+
+    def write_csv(self, out_file):
+        """Write the responses as CSV"""
+        writer = csv.writer(out_file)
+        writer.writerow(self.header)
+        writer.writerows(self.rows())
+
+    def json_keys(self):
+        """The header, with repeated column names numbered so that no column is
+        lost from the JSON objects"""
+        keys = []
+        seen = set(self.header)
+        counts = defaultdict(int)
+        for name in self.header:
+            counts[name] += 1
+            if counts[name] > 1:
+                key = "{} ({})".format(name, counts[name])
+                while key in seen:
+                    counts[name] += 1
+                    key = "{} ({})".format(name, counts[name])
+                seen.add(key)
+                name = key
+            keys.append(name)
+        return keys
+
+    def write_jsonl(self, out_file):
+        """Write the responses as JSON lines, one object per response"""
+        keys = self.json_keys()
+        for row in self.rows():
+            out_file.write(json.dumps(dict(zip(keys, row))))
+            out_file.write("\n")
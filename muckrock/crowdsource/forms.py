@@ -18,13 +18,14 @@ from dal import forward
 from muckrock.communication.models import EmailAddress
 from muckrock.core import autocomplete
 from muckrock.crowdsource.constants import DOCUMENT_URL_RE, PROJECT_URL_RE
+from muckrock.crowdsource.embed import schedule_prewarm
 from muckrock.crowdsource.fields import FIELD_DICT
 from muckrock.crowdsource.models import (
     Crowdsource,
     CrowdsourceData,
     CrowdsourceResponse,
 )
-from muckrock.crowdsource.tasks import datum_per_page, import_doccloud_proj
+from muckrock.crowdsource.tasks import start_documentcloud_import
 from muckrock.project.models import Project
 
 
@@ -119,6 +120,7 @@ class CrowdsourceDataCsvForm(forms.Form):
         data_csv = self.cleaned_data["data_csv"]
         doccloud_each_page = self.cleaned_data["doccloud_each_page"]
         if data_csv:
+            urls = []
             reader = csv.reader(codecs.iterdecode(data_csv, "utf-8"))
             headers = [h.lower() for h in next(reader)]
             for line in reader:
@@ -127,15 +129,15 @@ class CrowdsourceDataCsvForm(forms.Form):
                 doc_match = DOCUMENT_URL_RE.match(url)
                 proj_match = PROJECT_URL_RE.match(url)
                 if doccloud_each_page and doc_match:
-                    datum_per_page.delay(
-                        crowdsource.pk, doc_match.group("doc_id"), data
+                    start_documentcloud_import(
+                        crowdsource, data, True, document_id=doc_match.group("doc_id")
                     )
                 elif proj_match:
-                    import_doccloud_proj.delay(
-                        crowdsource.pk,
-                        proj_match.group("proj_id"),
+                    start_documentcloud_import(
+                        crowdsource,
                         data,
                         doccloud_each_page,
+                        project_id=proj_match.group("proj_id"),
                     )
                 elif url:
                     # skip invalid URLs
@@ -145,8 +147,10 @@ class CrowdsourceDataCsvForm(forms.Form):
                         pass
                     else:
                         crowdsource.data.create(url=url, metadata=data)
+                        urls.append(url)
                 else:
                     crowdsource.data.create(metadata=data)
+            schedule_prewarm(urls)
 
 
 class CrowdsourceForm(forms.ModelForm, CrowdsourceDataCsvForm):
@@ -270,18 +274,21 @@ class CrowdsourceDataFormset(CrowdsourceDataFormsetBase):
             doc_match = DOCUMENT_URL_RE.match(instance.url)
             proj_match = PROJECT_URL_RE.match(instance.url)
             if doccloud_each_page and doc_match:
-                datum_per_page.delay(self.instance.pk, doc_match.group("doc_id"), {})
+                start_documentcloud_import(
+                    self.instance, {}, True, document_id=doc_match.group("doc_id")
+                )
             elif proj_match:
-                import_doccloud_proj.delay(
-                    self.instance.pk,
-                    proj_match.group("proj_id"),
+                start_documentcloud_import(
+                    self.instance,
                     {},
                     doccloud_each_page,
+                    project_id=proj_match.group("proj_id"),
                 )
             else:
                 return_instances.append(instance)
                 if commit:
                     instance.save()
+        schedule_prewarm([i.url for i in return_instances])
         return return_instances
 
 
@@ -0,0 +1,138 @@
+"""
+Benchmark the set based crowdsource export against exporting each response
+individually
+"""
+
+# Django
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+# Standard Library
+import io
+import random
+import time
+
+# MuckRock
+from muckrock.crowdsource.export import ResponseExporter
+from muckrock.crowdsource.models import (
+    Crowdsource,
+    CrowdsourceData,
+    CrowdsourceField,
+    CrowdsourceResponse,
+    CrowdsourceValue,
+)
+
+
+class Rollback(Exception):
+    """Raised to roll back the generated crowdsource"""
+
+
+class Command(BaseCommand):
+    """Benchmark the crowdsource export"""
+
+    help = (
+        "Compare the time and number of queries of the set based export against "
+        "exporting each response individually, on a generated crowdsource which "
+        "is rolled back afterwards"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--responses", type=int, default=20000, help="Number of responses"
+        )
+        parser.add_argument("--fields", type=int, default=30, help="Number of fields")
+        parser.add_argument(
+            "--sample",
+            type=int,
+            default=500,
+            help="Number of responses to export individually, as exporting all "
+            "of them this way is too slow",
+        )
+        parser.add_argument("--seed", type=int, default=0, help="Random seed")
+
+    def handle(self, *args, **kwargs):
+        try:
+            with transaction.atomic():
+                self.benchmark(**kwargs)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def generate(self, rand, responses, fields):
+        """Generate a crowdsource with data, fields, responses and values"""
+        user = User.objects.create(username="benchmark-crowdsource-export")
+        crowdsource = Crowdsource.objects.create(
+            title="Benchmark", slug="benchmark", user=user
+        )
+        data = CrowdsourceData.objects.bulk_create(
+            CrowdsourceData(
+                crowdsource=crowdsource,
+                url=f"https://www.example.com/{i}/",
+                metadata={"page": i, "source": "benchmark"},
+            )
+            for i in range(max(responses // 5, 1))
+        )
+        fields = CrowdsourceField.objects.bulk_create(
+            CrowdsourceField(
+                crowdsource=crowdsource,
+                label=f"Field {i}",
+                type="checkbox-group" if i % 5 == 0 else "text",
+                order=i,
+            )
+            for i in range(fields)
+        )
+        responses = CrowdsourceResponse.objects.bulk_create(
+            CrowdsourceResponse(
+                crowdsource=crowdsource, user=user, data=rand.choice(data)
+            )
+            for _ in range(responses)
+        )
+        values = []
+        for response in responses:
+            for field in fields:
+                for _ in range(rand.randint(1, 2)):
+                    value = str(rand.randint(0, 1000))
+                    values.append(
+                        CrowdsourceValue(
+                            response=response,
+                            field=field,
+                            value=value,
+                            original_value=value,
+                        )
+                    )
+        CrowdsourceValue.objects.bulk_create(values, batch_size=10000)
+        return crowdsource
+
+    def benchmark(self, **kwargs):
+        """Generate the crowdsource and time both exports"""
+        rand = random.Random(kwargs["seed"])
+        start = time.time()
+        crowdsource = self.generate(rand, kwargs["responses"], kwargs["fields"])
+        self.stdout.write(f"Generated crowdsource in {time.time() - start:.2f}s")
+
+        metadata_keys = crowdsource.get_metadata_keys()
+        responses = crowdsource.responses.all()[: kwargs["sample"]]
+        with CaptureQueriesContext(connection) as queries:
+            start = time.time()
+            for response in responses:
+                response.get_values(metadata_keys)
+            elapsed = time.time() - start
+        self.report("Per response", len(responses), elapsed, len(queries))
+
+        with CaptureQueriesContext(connection) as queries:
+            start = time.time()
+            out_file = io.StringIO()
+            ResponseExporter(crowdsource).write_csv(out_file)
+            elapsed = time.time() - start
+        self.report("Set based", kwargs["responses"], elapsed, len(queries))
+        self.stdout.write(f"Exported {len(out_file.getvalue()) / 1e6:.1f}MB of CSV")
+
+    def report(self, name, responses, elapsed, queries):
+        """Print the throughput and number of queries"""
+        self.stdout.write(
+            f"{name}: {responses} responses in {elapsed:.2f}s "
+            f"({responses / elapsed:.0f} responses/s), {queries} queries "
+            f"({queries / responses:.2f} per response)"
+        )
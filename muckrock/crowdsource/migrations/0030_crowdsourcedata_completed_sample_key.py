@@ -0,0 +1,49 @@
+# Generated by Django 4.2 on 2026-10-18 12:00
+
+from django.db import migrations, models
+import random
+
+
+def count_completed(apps, schema_editor):
+    """Count the responses for each existing datum"""
+    CrowdsourceData = apps.get_model("crowdsource", "CrowdsourceData")
+    CrowdsourceResponse = apps.get_model("crowdsource", "CrowdsourceResponse")
+    completed = (
+        CrowdsourceResponse.objects.filter(data=models.OuterRef("pk"), number=1)
+        .order_by()
+        .values("data")
+        .annotate(count=models.Count("pk"))
+        .values("count")
+    )
+    CrowdsourceData.objects.update(
+        completed=models.functions.Coalesce(models.Subquery(completed), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crowdsource', '0029_alter_crowdsourcedata_metadata'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='crowdsourcedata',
+            name='completed',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='crowdsourcedata',
+            name='sample_key',
+            field=models.FloatField(default=random.random),
+        ),
+        migrations.RunSQL(
+            "UPDATE crowdsource_crowdsourcedata SET sample_key = random()",
+            migrations.RunSQL.noop,
+        ),
+        migrations.RunPython(count_completed, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='crowdsourcedata',
+            index=models.Index(fields=['crowdsource', 'sample_key'], name='crowdsource_crowdso_a7f498_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2 on 2026-10-18 12:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crowdsource', '0030_crowdsourcedata_completed_sample_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CrowdsourceImport',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('document_id', models.CharField(blank=True, max_length=255)),
+                ('project_id', models.CharField(blank=True, max_length=255)),
+                ('metadata', models.JSONField(blank=True, default=dict)),
+                ('each_page', models.BooleanField(default=False)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=7)),
+                ('total_documents', models.PositiveIntegerField(blank=True, null=True)),
+                ('documents_imported', models.PositiveIntegerField(default=0)),
+                ('data_created', models.PositiveIntegerField(default=0)),
+                ('datetime_created', models.DateTimeField(default=django.utils.timezone.now)),
+                ('datetime_updated', models.DateTimeField(auto_now=True)),
+                ('crowdsource', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='imports', to='crowdsource.crowdsource')),
+            ],
+            options={
+                'verbose_name': 'assignment data import',
+                'ordering': ('-datetime_created',),
+            },
+        ),
+    ]
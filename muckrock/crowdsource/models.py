@@ -4,6 +4,7 @@
 # Django
 from django.conf import settings
 from django.contrib.postgres.aggregates import StringAgg
+from django.core.cache import caches
 from django.core.mail.message import EmailMessage
 from django.core.validators import MinValueValidator
 from django.db import models, transaction
@@ -13,24 +14,19 @@ from django.db.models.functions import Concat
 from django.db.models.functions.datetime import TruncDay
 from django.urls import reverse
 from django.utils import timezone
-from django.utils.html import format_html
-from django.utils.safestring import mark_safe
 
 # Standard Library
 import json
 from html import unescape
-from random import choice
+from random import random
 
 # Third Party
 from bleach.sanitizer import Cleaner
-from pkg_resources import resource_filename
-from pyembed.core import PyEmbed
-from pyembed.core.consumer import PyEmbedConsumerError
-from pyembed.core.discovery import AutoDiscoverer, ChainingDiscoverer, FileDiscoverer
 from taggit.managers import TaggableManager
 
 # MuckRock
 from muckrock.crowdsource import fields
+from muckrock.crowdsource.embed import get_embed
 from muckrock.crowdsource.querysets import (
     CrowdsourceDataQuerySet,
     CrowdsourceQuerySet,
@@ -116,12 +112,35 @@ class Crowdsource(models.Model):
         return reverse("crowdsource-detail", kwargs={"slug": self.slug, "idx": self.pk})
 
     def get_data_to_show(self, user, ip_address):
-        """Get the crowdsource data to show"""
-        options = self.data.get_choices(self.data_limit, user, ip_address)
-        if options:
-            return choice(options)
-        else:
+        """Get the crowdsource data to show
+
+        Reads a few eligible data starting from a random point in the sample
+        key index, instead of every eligible datum, and passes over data which
+        was recently handed to another volunteer when there are others to show
+        """
+        options = self.data.get_choices(self.data_limit, user, ip_address).order_by(
+            "sample_key"
+        )
+        size = settings.CROWDSOURCE_SAMPLE_SIZE
+        start = random()
+        candidates = list(options.filter(sample_key__gte=start)[:size])
+        if len(candidates) < size:
+            # wrap around to the beginning of the index
+            candidates.extend(
+                options.filter(sample_key__lt=start)[: size - len(candidates)]
+            )
+        if not candidates:
             return None
+        cache = caches["lock"]
+        for datum in candidates:
+            if cache.add(
+                "crowdsource:claim:{}".format(datum.pk),
+                True,
+                settings.CROWDSOURCE_CLAIM_TIMEOUT,
+            ):
+                return datum
+        # every candidate is being worked on, so share one
+        return candidates[0]
 
     @transaction.atomic
     def create_form(self, form_json):
@@ -280,41 +299,63 @@ class CrowdsourceData(models.Model):
     )
     url = models.URLField(max_length=255, verbose_name="Data URL", blank=True)
     metadata = models.JSONField(default=dict, blank=True)
+    # the number of responses to this datum, not counting additional responses
+    # from the same user for multiple per page crowdsources
+    completed = models.PositiveIntegerField(default=0)
+    # a random key to sample data from without reading all of them
+    sample_key = models.FloatField(default=random)
 
     objects = CrowdsourceDataQuerySet.as_manager()
 
     def __str__(self):
         return "Crowdsource Data: {}".format(self.url)
 
-    def embed(self):
+    def embed(self, wait=False):
         """Get the html to embed into the crowdsource"""
-        if self.url:
-            try:
-                # first try to get embed code from oEmbed
-                return mark_safe(
-                    PyEmbed(
-                        # we don't use the default discoverer because it contains a bug
-                        # that makes it always match spotify
-                        discoverer=ChainingDiscoverer(
-                            [
-                                FileDiscoverer(
-                                    resource_filename(__name__, "oembed_providers.json")
-                                ),
-                                AutoDiscoverer(),
-                            ]
-                        )
-                    ).embed(self.url, max_height=400)
-                )
-            except PyEmbedConsumerError:
-                # fall back to a simple iframe
-                return format_html(
-                    '<iframe src="{}" width="100%" height="400px"></iframe>', self.url
-                )
-        else:
-            return ""
+        return get_embed(self.url, wait)
 
     class Meta:
         verbose_name = "assignment data"
+        indexes = [models.Index(fields=["crowdsource", "sample_key"])]
+
+
+class CrowdsourceImport(models.Model):
+    """An import of a DocumentCloud document or project as crowdsource data"""
+
+    crowdsource = models.ForeignKey(
+        Crowdsource, related_name="imports", on_delete=models.CASCADE
+    )
+    document_id = models.CharField(max_length=255, blank=True)
+    project_id = models.CharField(max_length=255, blank=True)
+    metadata = models.JSONField(default=dict, blank=True)
+    each_page = models.BooleanField(default=False)
+    status = models.CharField(
+        max_length=7,
+        default="pending",
+        choices=(
+            ("pending", "Pending"),
+            ("running", "Running"),
+            ("done", "Done"),
+            ("failed", "Failed"),
+        ),
+    )
+    total_documents = models.PositiveIntegerField(blank=True, null=True)
+    # documents are imported in order, so an interrupted import continues from
+    # the first document which has not been imported
+    documents_imported = models.PositiveIntegerField(default=0)
+    data_created = models.PositiveIntegerField(default=0)
+    datetime_created = models.DateTimeField(default=timezone.now)
+    datetime_updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        if self.project_id:
+            return "DocumentCloud Project: {}".format(self.project_id)
+        else:
+            return "DocumentCloud Document: {}".format(self.document_id)
+
+    class Meta:
+        verbose_name = "assignment data import"
+        ordering = ("-datetime_created",)
 
 
 class CrowdsourceField(models.Model):
@@ -2,7 +2,7 @@
 
 # Django
 from django.db import models
-from django.db.models import Case, Count, Q, Sum, Value, When
+from django.db.models import Count, Q
 
 
 class CrowdsourceQuerySet(models.QuerySet):
@@ -27,15 +27,7 @@ class CrowdsourceDataQuerySet(models.QuerySet):
 
     def get_choices(self, data_limit, user, ip_address):
         """Get choices for data to show"""
-        choices = self.annotate(
-            count=Sum(
-                Case(
-                    When(responses__number=1, then=Value(1)),
-                    default=0,
-                    output_field=models.IntegerField(),
-                )
-            )
-        ).filter(count__lt=data_limit)
+        choices = self.filter(completed__lt=data_limit)
         if user is not None:
             choices = choices.exclude(responses__user=user)
         elif ip_address is not None:
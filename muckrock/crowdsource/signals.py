@@ -0,0 +1,39 @@
+"""Signals for the crowdsource application"""
+
+# Django
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_save
+
+# MuckRock
+from muckrock.crowdsource.models import CrowdsourceData, CrowdsourceResponse
+
+# pylint: disable=unused-argument
+
+
+def response_created(sender, instance, created, **kwargs):
+    """Count the response towards its datum's completion"""
+    if created and instance.data_id is not None and instance.number == 1:
+        CrowdsourceData.objects.filter(pk=instance.data_id).update(
+            completed=F("completed") + 1
+        )
+
+
+def response_deleted(sender, instance, **kwargs):
+    """Stop counting the response towards its datum's completion"""
+    if instance.data_id is not None and instance.number == 1:
+        CrowdsourceData.objects.filter(pk=instance.data_id).update(
+            completed=Greatest(F("completed") - 1, 0)
+        )
+
+
+post_save.connect(
+    response_created,
+    sender=CrowdsourceResponse,
+    dispatch_uid="muckrock.crowdsource.signals.response_created",
+)
+post_delete.connect(
+    response_deleted,
+    sender=CrowdsourceResponse,
+    dispatch_uid="muckrock.crowdsource.signals.response_deleted",
+)
@@ -3,70 +3,170 @@ Celery tasks for the crowdsource application
 """
 
 # Django
-from celery.task import task
+from celery.schedules import crontab
+from celery.task import periodic_task, task
 from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
 
 # Standard Library
-import csv
 import logging
+from datetime import timedelta
 
 # Third Party
-from documentcloud import DocumentCloud
 from documentcloud.exceptions import DocumentCloudError
 
 # MuckRock
 from muckrock.core.tasks import AsyncFileDownloadTask
-from muckrock.crowdsource.models import Crowdsource
+from muckrock.core.utils import get_documentcloud_client
+from muckrock.crowdsource.embed import prewarm, schedule_prewarm
+from muckrock.crowdsource.export import ResponseExporter
+from muckrock.crowdsource.models import Crowdsource, CrowdsourceData, CrowdsourceImport
 
 logger = logging.getLogger(__name__)
 
 
+IMPORT_RUNNING = "crowdsource:import:{}"
+
+
+def start_documentcloud_import(
+    crowdsource, metadata, each_page, document_id="", project_id=""
+):
+    """Record a DocumentCloud import for the crowdsource and start it once the
+    record is committed"""
+    import_ = CrowdsourceImport.objects.create(
+        crowdsource=crowdsource,
+        document_id=document_id,
+        project_id=project_id,
+        metadata=metadata,
+        each_page=each_page,
+    )
+    transaction.on_commit(lambda: import_documentcloud.delay(import_.pk))
+    return import_
+
+
+def _document_urls(document, each_page):
+    """The URLs of the data to create for a document"""
+    if each_page:
+        return [
+            f"{document.canonical_url}/pages/{i}" for i in range(1, document.pages + 1)
+        ]
+    else:
+        return [document.canonical_url]
+
+
 @task(
-    name="muckrock.crowdsource.tasks.datum_per_page",
+    name="muckrock.crowdsource.tasks.import_documentcloud",
     autoretry_for=(DocumentCloudError,),
     retry_backoff=60,
-    retry_kwargs={"max_retries": 3},
+    max_retries=3,
+    time_limit=settings.CROWDSOURCE_IMPORT_TIME_LIMIT,
 )
+def import_documentcloud(import_pk):
+    """Create crowdsource data for the documents of a DocumentCloud import,
+    a chunk at a time, continuing after the last document imported"""
+    cache = caches["lock"]
+    if not cache.add(
+        IMPORT_RUNNING.format(import_pk), True, settings.CROWDSOURCE_IMPORT_TIME_LIMIT
+    ):
+        # another worker is already running this import
+        return
+    try:
+        import_ = CrowdsourceImport.objects.get(pk=import_pk)
+        if import_.status == "done":
+            return
+        import_.status = "running"
+        import_.save(update_fields=["status", "datetime_updated"])
+
+        client = get_documentcloud_client()
+        if import_.project_id:
+            documents = list(client.projects.get(import_.project_id).documents)
+        else:
+            documents = [client.documents.get(import_.document_id)]
+        import_.total_documents = len(documents)
+        import_.save(update_fields=["total_documents", "datetime_updated"])
+
+        urls = []
+        for i, document in enumerate(
+            documents[import_.documents_imported :], import_.documents_imported + 1
+        ):
+            urls.extend(_document_urls(document, import_.each_page))
+            if len(urls) >= settings.CROWDSOURCE_IMPORT_CHUNK_SIZE:
+                _create_data(import_, urls, i)
+                urls = []
+        _create_data(import_, urls, len(documents))
+        import_.status = "done"
+        import_.save(update_fields=["status", "datetime_updated"])
+    except DocumentCloudError:
+        # the import stays running while it is being retried, so it is not
+        # offered to be resumed in parallel with the retry
+        if import_documentcloud.request.retries >= import_documentcloud.max_retries:
+            CrowdsourceImport.objects.filter(pk=import_pk).update(status="failed")
+        raise
+    finally:
+        cache.delete(IMPORT_RUNNING.format(import_pk))
+
+
+def _create_data(import_, urls, documents_imported):
+    """Create the data for whole documents and record the progress together,
+    so an interrupted import does not create any data twice"""
+    with transaction.atomic():
+        CrowdsourceData.objects.bulk_create(
+            [
+                CrowdsourceData(
+                    crowdsource_id=import_.crowdsource_id,
+                    url=url,
+                    metadata=import_.metadata,
+                )
+                for url in urls
+            ],
+            batch_size=settings.CROWDSOURCE_IMPORT_CHUNK_SIZE,
+        )
+        transaction.on_commit(lambda: schedule_prewarm(urls))
+        import_.documents_imported = documents_imported
+        import_.data_created += len(urls)
+        import_.save(
+            update_fields=["documents_imported", "data_created", "datetime_updated"]
+        )
+
+
+@periodic_task(
+    run_every=crontab(minute=15),
+    name="muckrock.crowdsource.tasks.resume_documentcloud_imports",
+)
+def resume_documentcloud_imports():
+    """Restart imports which were interrupted, such as by a worker restart or
+    the time limit"""
+    stalled = CrowdsourceImport.objects.filter(
+        status__in=["pending", "running"],
+        datetime_updated__lt=timezone.now()
+        - timedelta(seconds=settings.CROWDSOURCE_IMPORT_TIME_LIMIT),
+    )
+    for import_pk in stalled.values_list("pk", flat=True):
+        import_documentcloud.delay(import_pk)
+
+
+@task(ignore_result=True, name="muckrock.crowdsource.tasks.prewarm_embeds")
+def prewarm_embeds(urls):
+    """Fetch and cache the embed code for crowdsource data"""
+    prewarm(urls)
+
+
+@task(name="muckrock.crowdsource.tasks.datum_per_page")
 def datum_per_page(crowdsource_pk, doc_id, metadata):
     """Create a crowdsource data item for each page of the document"""
-
     crowdsource = Crowdsource.objects.get(pk=crowdsource_pk)
-    dc_client = DocumentCloud(
-        username=settings.DOCUMENTCLOUD_BETA_USERNAME,
-        password=settings.DOCUMENTCLOUD_BETA_PASSWORD,
-        base_uri=f"{settings.DOCCLOUD_API_URL}/api/",
-        auth_uri=f"{settings.SQUARELET_URL}/api/",
-    )
-    document = dc_client.documents.get(doc_id)
-    for i in range(1, document.pages + 1):
-        crowdsource.data.create(
-            url=f"{document.canonical_url}/pages/{i}", metadata=metadata
-        )
+    start_documentcloud_import(crowdsource, metadata, True, document_id=doc_id)
 
 
-@task(
-    name="muckrock.crowdsource.tasks.import_doccloud_proj",
-    autoretry_for=(DocumentCloudError,),
-    retry_backoff=60,
-    retry_kwargs={"max_retries": 3},
-)
+@task(name="muckrock.crowdsource.tasks.import_doccloud_proj")
 def import_doccloud_proj(crowdsource_pk, proj_id, metadata, doccloud_each_page):
     """Import documents from a document cloud project"""
     crowdsource = Crowdsource.objects.get(pk=crowdsource_pk)
-
-    dc_client = DocumentCloud(
-        username=settings.DOCUMENTCLOUD_BETA_USERNAME,
-        password=settings.DOCUMENTCLOUD_BETA_PASSWORD,
-        base_uri=f"{settings.DOCCLOUD_API_URL}/api/",
-        auth_uri=f"{settings.SQUARELET_URL}/api/",
+    start_documentcloud_import(
+        crowdsource, metadata, doccloud_each_page, project_id=proj_id
     )
-    project = dc_client.projects.get(proj_id)
-
-    for document in project.documents:
-        if doccloud_each_page:
-            datum_per_page.delay(crowdsource.pk, document.id, metadata)
-        else:
-            crowdsource.data.create(url=document.canonical_url, metadata=metadata)
 
 
 class ExportCsv(AsyncFileDownloadTask):
@@ -78,24 +178,41 @@ class ExportCsv(AsyncFileDownloadTask):
     html_template = "message/notification/csv_export.html"
     subject = "Your CSV Export"
 
-    def __init__(self, user_pk, crowdsource_pk):
-        super().__init__(user_pk, crowdsource_pk)
+    def __init__(self, user_pk, crowdsource_pk, export_id=None):
+        super().__init__(user_pk, crowdsource_pk, export_id)
         self.crowdsource = Crowdsource.objects.get(pk=crowdsource_pk)
 
+    def get_exporter(self):
+        """Get the exporter for the crowdsource, recording progress as each
+        chunk of responses is exported"""
+        self.set_progress(total=self.crowdsource.responses.count())
+        return ResponseExporter(
+            self.crowdsource,
+            self.user.is_staff,
+            progress=lambda done: self.set_progress(done=done),
+        )
+
     def generate_file(self, out_file):
         """Export all responses as a CSV file"""
-        metadata_keys = self.crowdsource.get_metadata_keys()
-        include_emails = self.user.is_staff
+        self.get_exporter().write_csv(out_file)
 
-        writer = csv.writer(out_file)
-        writer.writerow(
-            self.crowdsource.get_header_values(metadata_keys, include_emails)
-        )
-        for csr in self.crowdsource.responses.all().iterator():
-            writer.writerow(csr.get_values(metadata_keys, include_emails))
+
+class ExportJsonLines(ExportCsv):
+    """Export the results of the crowdsource for the user as JSON lines, which
+    is easier to load than CSV for large crowdsources"""
+
+    file_name = "results.jsonl"
+    subject = "Your JSON Lines Export"
+
+    def generate_file(self, out_file):
+        """Export all responses as a JSON lines file"""
+        self.get_exporter().write_jsonl(out_file)
+
+
+EXPORTS = {"csv": ExportCsv, "jsonl": ExportJsonLines}
 
 
 @task(time_limit=1800, name="muckrock.crowdsource.tasks.export_csv")
-def export_csv(crowdsource_pk, user_pk):
+def export_csv(crowdsource_pk, user_pk, format_="csv", export_id=None):
     """Export the results of the crowdsource for the user"""
-    ExportCsv(user_pk, crowdsource_pk).run()
+    EXPORTS[format_](user_pk, crowdsource_pk, export_id).run()
@@ -2,19 +2,25 @@
 """Tests for crowdsource models"""
 
 # Django
+from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
-from django.test import TestCase
+from django.core.cache import caches
+from django.test import TestCase, override_settings
 from django.utils import timezone
 
 # Standard Library
 import json
 from datetime import datetime
+from io import StringIO
 
 # Third Party
+from mock import Mock, patch
 from nose.tools import assert_in, assert_is_none, assert_not_in, eq_, ok_
+from pyembed.core.error import PyEmbedError
 
 # MuckRock
 from muckrock.core.factories import ProjectFactory, UserFactory
+from muckrock.crowdsource.export import ResponseExporter
 from muckrock.crowdsource.factories import (
     CrowdsourceCheckboxGroupFieldFactory,
     CrowdsourceDataFactory,
@@ -31,6 +37,12 @@ from muckrock.crowdsource.models import Crowdsource
 class TestCrowdsource(TestCase):
     """Test the Crowdsource model"""
 
+    @override_settings(
+        CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+            "lock": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        }
+    )
     def test_get_data_to_show(self):
         """Get data to show should pick the correct data"""
         crowdsource = CrowdsourceFactory()
@@ -39,6 +51,23 @@ class TestCrowdsource(TestCase):
         data = CrowdsourceDataFactory(crowdsource=crowdsource)
         eq_(data, crowdsource.get_data_to_show(crowdsource.user, ip_address))
 
+    @override_settings(
+        CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+            "lock": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        }
+    )
+    def test_get_data_to_show_concurrent(self):
+        """Concurrent volunteers should be shown different data while there is
+        data left which has not been handed out"""
+        caches["lock"].clear()
+        crowdsource = CrowdsourceFactory()
+        data = CrowdsourceDataFactory.create_batch(2, crowdsource=crowdsource)
+        users = UserFactory.create_batch(3)
+        shown = [crowdsource.get_data_to_show(user, None) for user in users]
+        eq_(set(shown[:2]), set(data))
+        assert_in(shown[2], data)
+
     def test_create_form(self):
         """Create form should create fields from the JSON"""
         crowdsource = CrowdsourceFactory()
@@ -222,6 +251,25 @@ class TestCrowdsource(TestCase):
 class TestCrowdsourceData(TestCase):
     """Test the Crowdsource Data model"""
 
+    @override_settings(
+        CACHES=dict(
+            settings.CACHES,
+            default={"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        )
+    )
+    def test_embed(self):
+        """Embed codes and failures to fetch them should be cached"""
+        pyembed = Mock()
+        pyembed.embed.side_effect = ["<embed>", PyEmbedError]
+        with patch("muckrock.crowdsource.embed.get_pyembed", return_value=pyembed):
+            data = CrowdsourceDataFactory(url="https://www.example.com/embed/")
+            eq_(data.embed(wait=True), "<embed>")
+            eq_(data.embed(), "<embed>")
+            data = CrowdsourceDataFactory(url="https://www.example.com/error/")
+            assert_in("<iframe", data.embed(wait=True))
+            assert_in("<iframe", data.embed())
+        eq_(pyembed.embed.call_count, 2)
+
     def test_get_choices(self):
         """Test the get choices queryset method"""
         crowdsource = CrowdsourceFactory()
@@ -259,6 +307,9 @@ class TestCrowdsourceData(TestCase):
             set(crowdsource.data.get_choices(limit, None, ip_address)),
             set([data[0], data[2]]),
         )
+        # deleting a response frees up its datum
+        data[1].responses.first().delete()
+        eq_(set(crowdsource.data.get_choices(limit, user, None)), set(data[1:]))
 
 
 class TestCrowdsourceResponse(TestCase):
@@ -331,3 +382,60 @@ class TestCrowdsourceResponse(TestCase):
                 "",
             ],
         )
+
+
+class TestResponseExporter(TestCase):
+    """Test the set based crowdsource export"""
+
+    def test_rows(self):
+        """The exported rows should match the per response values, using a
+        fixed number of queries"""
+        crowdsource = CrowdsourceFactory()
+        data = CrowdsourceDataFactory(crowdsource=crowdsource, metadata={"a": "b"})
+        text_field = CrowdsourceTextFieldFactory(crowdsource=crowdsource, order=0)
+        CrowdsourceHeaderFieldFactory(crowdsource=crowdsource, order=1)
+        check_field = CrowdsourceCheckboxGroupFieldFactory(
+            crowdsource=crowdsource, order=2
+        )
+        responses = CrowdsourceResponseFactory.create_batch(
+            5, crowdsource=crowdsource, data=data
+        )
+        responses[0].tags.add("foo", "bar")
+        for response in responses:
+            CrowdsourceValueFactory(response=response, field=text_field, value="Text")
+            CrowdsourceValueFactory(response=response, field=check_field, value="")
+            CrowdsourceValueFactory(response=response, field=check_field, value="Foo")
+            CrowdsourceValueFactory(response=response, field=check_field, value="Bar")
+
+        exporter = ResponseExporter(crowdsource, chunk_size=2)
+        # three chunks with a tags and values query each, and a final empty chunk
+        with self.assertNumQueries(10):
+            rows = list(exporter.rows())
+        eq_(
+            rows,
+            [r.get_values(exporter.metadata_keys) for r in responses],
+        )
+        eq_(len(exporter.header), len(rows[0]))
+        eq_(rows[0][6], "bar, foo")
+
+    def test_jsonl_duplicate_columns(self):
+        """Columns sharing a name should all be kept in the JSON lines"""
+        crowdsource = CrowdsourceFactory()
+        data = CrowdsourceDataFactory(crowdsource=crowdsource, metadata={"user": "b"})
+        live = CrowdsourceTextFieldFactory(
+            crowdsource=crowdsource, label="Name (deleted)", order=0
+        )
+        deleted = CrowdsourceTextFieldFactory(
+            crowdsource=crowdsource, label="Name", order=1, deleted=True
+        )
+        response = CrowdsourceResponseFactory(crowdsource=crowdsource, data=data)
+        CrowdsourceValueFactory(response=response, field=live, value="live")
+        CrowdsourceValueFactory(response=response, field=deleted, value="deleted")
+
+        out_file = StringIO()
+        ResponseExporter(crowdsource).write_jsonl(out_file)
+        line = json.loads(out_file.getvalue())
+        eq_(line["user"], response.user.username)
+        eq_(line["user (2)"], "b")
+        eq_(line["Name (deleted)"], "live")
+        eq_(line["Name (deleted) (2)"], "deleted")
@@ -0,0 +1,101 @@
+"""
+Tests for the crowdsource tasks
+"""
+
+# Django
+from django.test import TestCase, override_settings
+
+# Third Party
+from documentcloud.exceptions import DocumentCloudError
+from mock import Mock, patch
+from nose.tools import assert_raises, eq_
+
+# MuckRock
+from muckrock.crowdsource.factories import CrowdsourceFactory
+from muckrock.crowdsource.models import CrowdsourceImport
+from muckrock.crowdsource.tasks import import_documentcloud
+
+
+class TestImportDocumentCloud(TestCase):
+    """Test importing DocumentCloud projects as crowdsource data"""
+
+    def setUp(self):
+        self.crowdsource = CrowdsourceFactory()
+        documents = [
+            Mock(canonical_url=f"https://www.documentcloud.org/documents/{i}", pages=3)
+            for i in range(5)
+        ]
+        client = Mock()
+        client.projects.get.return_value = Mock(documents=documents)
+        patcher = patch(
+            "muckrock.crowdsource.tasks.get_documentcloud_client", return_value=client
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @override_settings(CROWDSOURCE_IMPORT_CHUNK_SIZE=4)
+    def test_import_pages(self):
+        """Each page of each document should be imported"""
+        import_ = CrowdsourceImport.objects.create(
+            crowdsource=self.crowdsource,
+            project_id="1",
+            metadata={"foo": "bar"},
+            each_page=True,
+        )
+        import_documentcloud(import_.pk)
+        import_.refresh_from_db()
+        eq_(import_.status, "done")
+        eq_(import_.total_documents, 5)
+        eq_(import_.documents_imported, 5)
+        eq_(import_.data_created, 15)
+        eq_(self.crowdsource.data.count(), 15)
+        eq_(
+            self.crowdsource.data.filter(
+                url="https://www.documentcloud.org/documents/4/pages/3",
+                metadata={"foo": "bar"},
+            ).count(),
+            1,
+        )
+
+    def test_resume(self):
+        """An interrupted import should continue after the last document
+        imported"""
+        import_ = CrowdsourceImport.objects.create(
+            crowdsource=self.crowdsource,
+            project_id="1",
+            status="running",
+            documents_imported=3,
+            data_created=3,
+        )
+        import_documentcloud(import_.pk)
+        import_.refresh_from_db()
+        eq_(import_.status, "done")
+        eq_(import_.data_created, 5)
+        eq_(
+            set(self.crowdsource.data.values_list("url", flat=True)),
+            {
+                "https://www.documentcloud.org/documents/3",
+                "https://www.documentcloud.org/documents/4",
+            },
+        )
+
+    def test_failed(self):
+        """An import should only be marked as failed once it is out of
+        retries"""
+        import_ = CrowdsourceImport.objects.create(
+            crowdsource=self.crowdsource, project_id="1"
+        )
+        error = DocumentCloudError("Error")
+        with patch("muckrock.crowdsource.tasks.get_documentcloud_client") as client:
+            client.return_value.projects.get.side_effect = error
+            with assert_raises(DocumentCloudError):
+                import_documentcloud(import_.pk)
+            import_.refresh_from_db()
+            eq_(import_.status, "running")
+
+            with assert_raises(DocumentCloudError):
+                import_documentcloud.apply(
+                    args=[import_.pk], retries=import_documentcloud.max_retries
+                )
+            import_.refresh_from_db()
+            eq_(import_.status, "failed")
@@ -34,6 +34,7 @@ from ipware import get_client_ip
 # MuckRock
 from muckrock.accounts.mixins import MiniregMixin
 from muckrock.accounts.utils import mixpanel_event
+from muckrock.core.tasks import queue_export
 from muckrock.core.views import (
     MRAutocompleteView,
     MRFilterListView,
@@ -54,7 +55,7 @@ from muckrock.crowdsource.models import (
     CrowdsourceResponse,
     CrowdsourceValue,
 )
-from muckrock.crowdsource.tasks import export_csv
+from muckrock.crowdsource.tasks import EXPORTS, export_csv, import_documentcloud
 from muckrock.message.email import TemplateEmail
 
 
@@ -117,12 +118,17 @@ class CrowdsourceDetailView(DetailView):
         has_perm = self.request.user.has_perm(
             "crowdsource.change_crowdsource", crowdsource
         )
-        if self.request.GET.get("csv") and has_perm:
-            export_csv.delay(crowdsource.pk, self.request.user.pk)
+        format_ = self.request.GET.get("format", "csv")
+        if self.request.GET.get("csv") and has_perm and format_ in EXPORTS:
+            export_id = queue_export(self.request.user, f"{crowdsource.title} results")
+            export_csv.delay(
+                crowdsource.pk, self.request.user.pk, format_, export_id=export_id
+            )
             messages.info(
                 self.request,
-                "Your CSV is being processed.  It will be emailed to you when "
-                "it is ready.",
+                "Your export is being processed.  It will be emailed to you when "
+                "it is ready, and you can follow its progress on your "
+                '<a href="%s">exports page</a>.' % reverse("acct-exports"),
             )
         return super().get(request, *args, **kwargs)
 
@@ -148,6 +154,13 @@ class CrowdsourceDetailView(DetailView):
                 messages.success(request, "The data is being added to the assignment")
             else:
                 messages.error(request, form.errors)
+        elif request.POST.get("action") == "Resume Import":
+            import_ = crowdsource.imports.filter(
+                pk=request.POST.get("import"), status="failed"
+            ).first()
+            if import_ is not None:
+                import_documentcloud.delay(import_.pk)
+                messages.success(request, "The import has been resumed")
         return redirect(crowdsource)
 
     def get_context_data(self, **kwargs):
@@ -158,6 +171,7 @@ class CrowdsourceDetailView(DetailView):
         )
         context["message_form"] = CrowdsourceMessageResponseForm()
         context["data_form"] = CrowdsourceDataCsvForm()
+        context["imports"] = self.object.imports.all()[:10]
         context["edit_access"] = self.request.user.has_perm(
             "crowdsource.change_crowdsource", self.object
         )
@@ -601,9 +615,13 @@ class CrowdsourceUpdateView(UpdateView):
             messages.error(request, "You may not edit this crowdsource")
             return redirect(crowdsource)
         if crowdsource.status != "draft":
-            export_csv.delay(crowdsource.pk, self.request.user.pk)
+            export_id = queue_export(request.user, f"{crowdsource.title} results")
+            export_csv.delay(crowdsource.pk, self.request.user.pk, export_id=export_id)
             messages.info(
-                self.request, "A CSV of the results so far will be emailed to you"
+                self.request,
+                "A CSV of the results so far will be emailed to you, and you can "
+                'follow its progress on your <a href="%s">exports page</a>.'
+                % reverse("acct-exports"),
             )
         return super().dispatch(request, *args, **kwargs)
 
@@ -662,7 +680,7 @@ def oembed(request):
     """AJAX view to get oembed data"""
     if "url" in request.GET:
         data = CrowdsourceData(url=request.GET["url"])
-        return HttpResponse(data.embed())
+        return HttpResponse(data.embed(wait=True))
     else:
         return HttpResponseBadRequest()
 
@@ -0,0 +1,369 @@
+"""
+Auto import scanned mail from S3
+
+Scans are uploaded to the autoimport bucket named after the date they were
+received and the requests they belong to, for example `1-31-23 MR123 MR456.pdf`.
+A folder may be used to upload multiple files for the same requests.
+"""
+
+# Django
+from celery.exceptions import SoftTimeLimitExceeded
+from django.conf import settings
+from django.core.cache import caches
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+# Standard Library
+import logging
+import os.path
+import re
+import sys
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time
+
+# Third Party
+import boto3
+
+# MuckRock
+from muckrock.communication.models import MailCommunication
+from muckrock.foia.models import FOIACommunication, FOIAFile, FOIARequest
+from muckrock.task.models import ResponseTask
+
+logger = logging.getLogger(__name__)
+
+p_name = re.compile(
+    r"(?P<month>\d\d?)-(?P<day>\d\d?)-(?P<year>\d\d) " r"(?P<docs>(?:mr\d+(?: |$))+)",
+    re.I,
+)
+
+# keys which have been imported, but not yet deleted from the autoimport bucket
+CHECKPOINT_KEY = "autoimport:imported:{}"
+CHECKPOINT_TIMEOUT = 7 * 24 * 60 * 60
+
+
+def parse_name(name):
+    """Parse a file name"""
+    # strip off trailing / and file extension
+    name = os.path.normpath(name)
+    name = os.path.splitext(name)[0]
+
+    m_name = p_name.match(name)
+    if not m_name:
+        raise ValueError("ERROR: %s does not match the file name format" % name)
+    foia_pks = [int(pk[2:]) for pk in m_name.group("docs").split()]
+    file_datetime = datetime.combine(
+        datetime(
+            int(m_name.group("year")) + 2000,
+            int(m_name.group("month")),
+            int(m_name.group("day")),
+        ),
+        time(tzinfo=timezone.get_current_timezone()),
+    )
+
+    return foia_pks, file_datetime
+
+
+class ImportUnit:
+    """A single uploaded file, or a folder of files, to be imported to one or
+    more requests"""
+
+    def __init__(self, key):
+        self.key = key
+        # list of (key, size) for each file to import
+        self.files = []
+        self.errors = []
+        self.foia_pks = []
+        self.file_datetime = None
+        # maps foia pk to a list of (file name, copied path) pairs, or an
+        # exception if copying the files failed
+        self.copies = {}
+
+    @property
+    def name(self):
+        """The name of the file or folder, without the autoimport path"""
+        return self.key.replace(settings.AWS_AUTOIMPORT_PATH, "", 1)
+
+
+class AutoImporter:
+    """Import all of the scans in the autoimport bucket
+
+    All keys are listed once up front, and all referenced requests are fetched
+    in a single query.  S3 copies and size checks are run in a bounded thread
+    pool, and the database records for each file or folder are created in bulk
+    in a single transaction.  Imported keys are checkpointed before they are
+    deleted, so an interrupted import can be resumed without importing any
+    key twice.
+    """
+
+    def __init__(self, log):
+        self.log = log
+        self.s3_client = boto3.client("s3")
+        self.bucket = settings.AWS_AUTOIMPORT_BUCKET_NAME
+        self.storage_bucket = settings.AWS_MEDIA_BUCKET_NAME
+        self.checkpoint = caches["lock"]
+        self.agency_users = {}
+
+    def run(self):
+        """Import all of the scans"""
+        units = self.list_units()
+        units = [u for u in units if self.parse(u)]
+        foias = FOIARequest.objects.select_related(
+            "agency__jurisdiction__parent", "agency__profile__user", "composer__user"
+        ).in_bulk({pk for unit in units for pk in unit.foia_pks})
+        with ThreadPoolExecutor(max_workers=settings.AUTOIMPORT_THREADS) as executor:
+            batch_size = settings.AUTOIMPORT_THREADS
+            for i in range(0, len(units), batch_size):
+                batch = units[i : i + batch_size]
+                # start all of the copies for this batch of units, then
+                # create the database records for each one as they finish
+                futures = [
+                    (unit, pk, executor.submit(self.copy_files, unit))
+                    for unit in batch
+                    for pk in unit.foia_pks
+                    if pk in foias
+                ]
+                for unit, pk, future in futures:
+                    try:
+                        unit.copies[pk] = future.result()
+                    except SoftTimeLimitExceeded:
+                        raise
+                    except Exception as exc:  # pylint: disable=broad-except
+                        unit.copies[pk] = exc
+                for unit in batch:
+                    self.import_unit(unit, foias)
+
+    def list_units(self):
+        """List all keys in the autoimport path, grouping files within folders"""
+        units = {}
+        paginator = self.s3_client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(
+            Bucket=self.bucket, Prefix=settings.AWS_AUTOIMPORT_PATH
+        ):
+            for obj in page.get("Contents", []):
+                key = obj["Key"]
+                if key == settings.AWS_AUTOIMPORT_PATH:
+                    continue
+                name = key[len(settings.AWS_AUTOIMPORT_PATH) :]
+                if "/" in name.rstrip("/"):
+                    # a file within a folder
+                    top, rest = name.split("/", 1)
+                    unit_key = settings.AWS_AUTOIMPORT_PATH + top + "/"
+                    unit = units.setdefault(unit_key, ImportUnit(unit_key))
+                    if "/" in rest:
+                        unit.errors.append(
+                            "ERROR: nested directories not allowed: %s in %s"
+                            % (key, unit_key)
+                        )
+                    else:
+                        unit.files.append((key, obj["Size"]))
+                elif name.endswith("/"):
+                    # the folder itself
+                    units.setdefault(key, ImportUnit(key))
+                else:
+                    unit = units.setdefault(key, ImportUnit(key))
+                    unit.files.append((key, obj["Size"]))
+        return list(units.values())
+
+    def parse(self, unit):
+        """Parse the unit's name, returning whether it is valid"""
+        if self.checkpoint.get(CHECKPOINT_KEY.format(unit.key)):
+            # this was imported by a previous run which was interrupted
+            # before it could be deleted
+            self.log.append("SKIPPED: %s was already imported" % unit.name)
+            self.delete(unit)
+            return False
+        try:
+            unit.foia_pks, unit.file_datetime = parse_name(unit.name)
+        except ValueError as exc:
+            self.copy_to_review(unit)
+            self.delete(unit)
+            self.log.append(str(exc))
+            return False
+        return True
+
+    def copy_files(self, unit):
+        """Copy all of the unit's files to the storage bucket, checking their
+        sizes, returning a list of (file name, path) for the copied files
+
+        This is called once for each request the unit belongs to, and each
+        call makes its own copies under distinct keys
+        """
+        copies = []
+        for key, size in unit.files:
+            file_name = os.path.split(key)[1]
+            # copies run concurrently, so nothing has been written yet for
+            # get_available_name to avoid - make each copy's name unique
+            root, ext = os.path.splitext(file_name)
+            unique_name = "{}_{}{}".format(root, uuid.uuid4().hex[:8], ext)
+            # first parameter is instance, but we do not have one yet
+            # luckily, it is only used if the upload_to for the field is
+            # a callable, which it is not, so it is safe to pass in None
+            full_file_name = FOIAFile.ffile.field.generate_filename(None, unique_name)
+            full_file_name = default_storage.get_available_name(full_file_name)
+            self.s3_client.copy_object(
+                Bucket=self.storage_bucket,
+                Key=full_file_name,
+                CopySource={"Bucket": self.bucket, "Key": key},
+                ACL=settings.AWS_DEFAULT_ACL,
+            )
+            new_size = self.s3_client.head_object(
+                Bucket=self.storage_bucket, Key=full_file_name
+            )["ContentLength"]
+            if new_size != size:
+                raise ValueError(
+                    "%s was %s bytes and after uploaded was %s bytes - retry"
+                    % (file_name, size, new_size)
+                )
+            copies.append((file_name, full_file_name))
+        return copies
+
+    def get_agency_user(self, agency):
+        """Get the agency user, once per agency"""
+        if agency.pk not in self.agency_users:
+            self.agency_users[agency.pk] = agency.get_user()
+        return self.agency_users[agency.pk]
+
+    def import_unit(self, unit, foias):
+        """Create the communications and files for a single unit"""
+        # pylint: disable=too-many-locals
+        self.log.extend(unit.errors)
+        comms = []
+        for foia_pk in unit.foia_pks:
+            foia = foias.get(foia_pk)
+            copies = unit.copies.get(foia_pk)
+            if foia is None:
+                self.copy_to_review(unit)
+                self.log.append(
+                    "ERROR: %s references FOIA Request %s, but it does not exist"
+                    % (unit.name, foia_pk)
+                )
+            elif isinstance(copies, Exception):
+                self.copy_to_review(unit)
+                self.log.append(
+                    "ERROR: %s has caused an unknown error. %s" % (unit.name, copies)
+                )
+                logger.error(
+                    "Autoimport error: %s",
+                    copies,
+                    exc_info=(type(copies), copies, copies.__traceback__),
+                )
+            else:
+                from_user = self.get_agency_user(foia.agency) if foia.agency else None
+                comm = FOIACommunication(
+                    foia=foia,
+                    from_user=from_user,
+                    to_user=foia.user,
+                    response=True,
+                    datetime=unit.file_datetime,
+                    communication="",
+                    hidden=True,
+                )
+                comms.append((comm, copies))
+
+        try:
+            self.create_records(unit, comms)
+        except SoftTimeLimitExceeded:
+            raise
+        except Exception as exc:  # pylint: disable=broad-except
+            self.copy_to_review(unit)
+            self.log.append(
+                "ERROR: %s has caused an unknown error. %s" % (unit.name, exc)
+            )
+            logger.error("Autoimport error: %s", exc, exc_info=sys.exc_info())
+            self.delete_copies(comms)
+        else:
+            for comm, copies in comms:
+                for file_name, _ in copies:
+                    self.log.append(
+                        "SUCCESS: %s uploaded to FOIA Request %s with a status of %s"
+                        % (file_name, comm.foia.pk, comm.foia.status)
+                    )
+
+        # checkpoint before deleting, so that if we are interrupted we will not
+        # import this key again
+        self.checkpoint.set(CHECKPOINT_KEY.format(unit.key), True, CHECKPOINT_TIMEOUT)
+        self.delete(unit)
+        self.checkpoint.delete(CHECKPOINT_KEY.format(unit.key))
+
+    @transaction.atomic
+    def create_records(self, unit, comms):
+        """Bulk create the communications, tasks and files"""
+        # pylint: disable=import-outside-toplevel
+        # MuckRock
+        from muckrock.foia.tasks import upload_document_cloud
+
+        if not comms:
+            return
+        # FOIACommunication.save only cleans up the text, which is empty for
+        # scans, and updates the request's date updated, which is done for all
+        # of the requests at once below
+        FOIACommunication.objects.bulk_create([comm for comm, _ in comms])
+        # bulk_create does not support multi-table inheritance, which
+        # ResponseTask uses
+        for comm, _ in comms:
+            ResponseTask.objects.create(communication=comm, scan=True)
+        MailCommunication.objects.bulk_create(
+            [
+                MailCommunication(communication=comm, sent_datetime=unit.file_datetime)
+                for comm, _ in comms
+            ]
+        )
+        files = []
+        for comm, copies in comms:
+            source = comm.get_source()
+            for file_name, path in copies:
+                foia_file = FOIAFile(
+                    comm=comm,
+                    title=os.path.splitext(file_name)[0][:255],
+                    datetime=unit.file_datetime,
+                    source=source,
+                )
+                foia_file.ffile.name = path
+                files.append(foia_file)
+        FOIAFile.objects.bulk_create(files)
+        for foia_file in files:
+            transaction.on_commit(
+                lambda pk=foia_file.pk: upload_document_cloud.delay(pk)
+            )
+
+        # update the requests' date updated if these are the latest communications
+        FOIARequest.objects.filter(
+            Q(datetime_updated__lt=unit.file_datetime) | Q(datetime_updated=None),
+            pk__in=[comm.foia_id for comm, _ in comms],
+        ).update(datetime_updated=unit.file_datetime)
+
+    def copy_to_review(self, unit):
+        """Copy the unit to the review folder"""
+        for key, _size in unit.files:
+            self.s3_client.copy_object(
+                Bucket=self.bucket,
+                Key="review/%s" % key.replace(settings.AWS_AUTOIMPORT_PATH, "", 1),
+                CopySource={"Bucket": self.bucket, "Key": key},
+            )
+
+    def delete(self, unit):
+        """Delete the unit's keys from the autoimport bucket"""
+        keys = [key for key, _size in unit.files]
+        if unit.key not in keys:
+            keys.append(unit.key)
+        self.delete_keys(self.bucket, keys)
+
+    def delete_copies(self, comms):
+        """Delete the files copied to the storage bucket for communications
+        which could not be created"""
+        self.delete_keys(
+            self.storage_bucket,
+            [path for _comm, copies in comms for _file_name, path in copies],
+        )
+
+    def delete_keys(self, bucket, keys):
+        """Delete the keys from the bucket"""
+        # delete_objects accepts at most 1000 keys at a time
+        for i in range(0, len(keys), 1000):
+            self.s3_client.delete_objects(
+                Bucket=bucket,
+                Delete={"Objects": [{"Key": key} for key in keys[i : i + 1000]]},
+            )
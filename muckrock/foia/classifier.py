@@ -0,0 +1,73 @@
+"""
+Machine learning classifier for predicting the status of a response
+"""
+
+# Standard Library
+import logging
+import os.path
+import threading
+import time
+
+# Third Party
+import dill as pickle
+import numpy as np
+from scipy.sparse import hstack
+
+# MuckRock
+from muckrock.core import metrics
+
+logger = logging.getLogger(__name__)
+
+CLASSIFIER_PATH = "muckrock/foia/classifier.pkl"
+
+
+class StatusClassifier:
+    """Wraps the pickled vectorizer, selector and classifier
+
+    The model is loaded lazily the first time it is needed and kept for the
+    life of the process.  It is reloaded if the pickle file is modified.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._model = None
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def get_model(self):
+        """Get the (vectorizer, selector, classifier) tuple, loading it if needed"""
+        mtime = os.path.getmtime(self.path)
+        if self._model is None or mtime != self._mtime:
+            with self._lock:
+                if self._model is None or mtime != self._mtime:
+                    start = time.time()
+                    with open(self.path, "rb") as pkl_fp:
+                        self._model = pickle.load(pkl_fp)
+                    self._mtime = mtime
+                    elapsed = time.time() - start
+                    logger.info("Loaded status classifier in %.2fs", elapsed)
+                    metrics.timing("classifier.load", elapsed)
+        return self._model
+
+    def predict(self, texts, pages):
+        """Predict the statuses for a batch of texts with their page counts
+
+        Returns a list of (status, probability) tuples
+        """
+        vectorizer, selector, classifier = self.get_model()
+        with metrics.timer("classifier.predict"):
+            input_vect = vectorizer.transform(texts)
+            pages_vect = np.array([pages], dtype=float).transpose()
+            input_vect = hstack([input_vect, pages_vect])
+            input_vect = selector.transform(input_vect)
+            probs = classifier.predict_proba(input_vect)
+        metrics.incr("classifier.predictions", len(texts))
+        metrics.gauge("classifier.last_batch_size", len(texts))
+        indices = probs.argmax(axis=1)
+        return [
+            (classifier.classes_[index], row[index])
+            for index, row in zip(indices, probs)
+        ]
+
+
+status_classifier = StatusClassifier(CLASSIFIER_PATH)
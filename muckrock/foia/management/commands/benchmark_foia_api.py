@@ -0,0 +1,152 @@
+"""
+Benchmark the request API, paging through the list with full, compact and
+sparse representations against streaming the bulk endpoint
+"""
+# Django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+# Standard Library
+import time
+
+# Third Party
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+# MuckRock
+from muckrock.foia.viewsets import FOIARequestViewSet
+
+
+class Command(BaseCommand):
+    """Benchmark the request API"""
+
+    help = (
+        "Compare query count, response size and throughput of paging through "
+        "the request list against the bulk endpoint.  Requests may be seeded "
+        "first, in which case all data created is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Create this many requests (with communications) before "
+            "benchmarking.  Only allowed with DEBUG on.",
+        )
+        parser.add_argument(
+            "--communications",
+            type=int,
+            default=5,
+            help="Number of communications for each seeded request",
+        )
+        parser.add_argument(
+            "--page-size",
+            type=int,
+            default=50,
+            help="Page size to use for the list",
+        )
+        parser.add_argument(
+            "--user",
+            help="Username to make the requests as, as the bulk endpoint "
+            "requires a logged in user.  Defaults to the first staff user.",
+        )
+
+    def handle(self, *args, **kwargs):
+        if kwargs["seed"] and not settings.DEBUG:
+            raise CommandError("Seeding is only allowed with DEBUG on")
+
+        if kwargs["user"]:
+            self.user = User.objects.filter(username=kwargs["user"]).first()
+        else:
+            self.user = User.objects.filter(is_staff=True).order_by("pk").first()
+        if self.user is None:
+            raise CommandError("No user to make the requests as")
+
+        with transaction.atomic():
+            if kwargs["seed"]:
+                self.seed(kwargs["seed"], kwargs["communications"])
+            self.benchmark(kwargs["page_size"])
+            transaction.set_rollback(True)
+
+    def benchmark(self, page_size):
+        """Benchmark each way of fetching every request, all as the same user
+        so that the same requests are visible"""
+        params = {
+            "Full list": {"expand": "communications,notes"},
+            "Compact list": {},
+            "Sparse list": {"fields": "id,title,status"},
+        }
+        for name, extra in params.items():
+            self.report(name, *self.run(self.list, page_size, extra))
+        self.report("Compact bulk", *self.run(self.bulk, {}))
+        self.report("Sparse bulk", *self.run(self.bulk, {"fields": "id,title,status"}))
+
+    def run(self, func, *args):
+        """Run the function, returning the number of rows and bytes it fetched,
+        the number of queries made and the wall time"""
+        with CaptureQueriesContext(connection) as queries:
+            start = time.time()
+            rows, size = func(*args)
+            elapsed = time.time() - start
+        return rows, size, len(queries), elapsed
+
+    def report(self, name, rows, size, queries, elapsed):
+        """Print the results for one way of fetching the requests"""
+        self.stdout.write(
+            f"{name}: {rows} requests, {size / 1024:.0f}KB, {queries} queries, "
+            f"{elapsed:.2f}s, {rows / elapsed if elapsed else 0:.0f} requests/s"
+        )
+
+    def get(self, view, path, params):
+        """Make an authenticated request to the view, checking it succeeded"""
+        request = APIRequestFactory().get(path, params, SERVER_NAME="localhost")
+        force_authenticate(request, user=self.user)
+        response = view(request)
+        if response.status_code != 200:
+            raise CommandError(f"{path} returned {response.status_code}")
+        return response
+
+    def list(self, page_size, params):
+        """Page through the list view"""
+        view = FOIARequestViewSet.as_view({"get": "list"})
+        rows = size = 0
+        page = 1
+        while True:
+            response = self.get(
+                view,
+                "/api_v1/foia/",
+                {"page": page, "page_size": page_size, **params},
+            ).render()
+            rows += len(response.data["results"])
+            size += len(response.content)
+            if not response.data["next"]:
+                return rows, size
+            page += 1
+
+    def bulk(self, params):
+        """Stream the bulk view"""
+        view = FOIARequestViewSet.as_view({"get": "bulk"})
+        rows = size = 0
+        for line in self.get(view, "/api_v1/foia/bulk/", params).streaming_content:
+            rows += 1
+            size += len(line)
+        return rows, size
+
+    def seed(self, num, communications):
+        """Seed the database with requests and communications"""
+        # pylint: disable=import-outside-toplevel
+        # MuckRock
+        from muckrock.foia.factories import (
+            FOIACommunicationFactory,
+            FOIAFileFactory,
+            FOIARequestFactory,
+        )
+
+        for _ in range(num):
+            foia = FOIARequestFactory()
+            for _ in range(communications):
+                FOIAFileFactory(comm=FOIACommunicationFactory(foia=foia))
+        self.stdout.write(f"Seeded {num} requests")
@@ -8,6 +8,7 @@ Models for the FOIA application
 # Django
 from django.conf import settings
 from django.contrib.auth.models import AnonymousUser, User
+from django.contrib.contenttypes.models import ContentType
 from django.core.mail import EmailMultiAlternatives, get_connection
 from django.db import connection, models, transaction
 from django.db.models import Sum
@@ -26,7 +27,7 @@ from datetime import date, timedelta
 from hashlib import md5
 
 # Third Party
-from actstream.models import followers
+from actstream.models import Follow
 from anymail.exceptions import AnymailError
 from constance import config
 from reversion import revisions as reversion
@@ -209,6 +210,21 @@ class FOIARequest(models.Model):
             },
         )
 
+    # the fields the agency and jurisdiction scorecards are calculated from
+    scorecard_fields = ("status", "price", "agency_id", "date_due", "datetime_done")
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # remember the values the scorecards were calculated from, so saving can
+        # tell if they need to be refreshed without loading the request again
+        instance.scorecard_values = {
+            f: instance.__dict__[f]
+            for f in cls.scorecard_fields
+            if f in instance.__dict__
+        }
+        return instance
+
     def save(self, *args, **kwargs):
         """Normalize fields before saving and set the embargo expiration if necessary"""
         self.slug = slugify(self.slug)
@@ -266,6 +282,11 @@ class FOIARequest(models.Model):
         """Short cut for checking a FOIA permission"""
         return user.has_perm("foia.%s_foiarequest" % perm, self)
 
+    def clear_perm_cache(self):
+        """Clear the cached relationships of users to this request, which are
+        used to check permissions, after they change"""
+        self.__dict__.pop("_perm_contexts", None)
+
     ## Creator
 
     def created_by(self, user):
@@ -282,11 +303,13 @@ class FOIARequest(models.Model):
         """Grants the user permission to edit this request."""
         if not self.has_viewer(user) and not self.created_by(user):
             self.edit_collaborators.add(user)
+            self.clear_perm_cache()
             logger.info("%s granted edit access to %s", user, self)
 
     def remove_editor(self, user):
         """Revokes the user's permission to edit this request."""
         self.edit_collaborators.remove(user)
+        self.clear_perm_cache()
         logger.info("%s revoked edit access from %s", user, self)
 
     def demote_editor(self, user):
@@ -304,11 +327,13 @@ class FOIARequest(models.Model):
         """Grants the user permission to view this request."""
         if not self.has_editor(user) and not self.created_by(user):
             self.read_collaborators.add(user)
+            self.clear_perm_cache()
             logger.info("%s granted view access to %s", user, self)
 
     def remove_viewer(self, user):
         """Revokes the user's permission to view this request."""
         self.read_collaborators.remove(user)
+        self.clear_perm_cache()
         logger.info("%s revoked view access from %s", user, self)
 
     def promote_viewer(self, user):
@@ -437,18 +462,27 @@ class FOIARequest(models.Model):
         Mark any existing notifications with the same message as read,
         to avoid notifying users with duplicated information.
         """
-        identical_notifications = (
-            Notification.objects.for_object(self)
-            .get_unread()
-            .filter(
-                action__actor_object_id=action.actor_object_id, action__verb=action.verb
-            )
-        )
-        for notification in identical_notifications:
-            notification.mark_read()
-        utils.notify(self.composer.user, action)
+        # pylint: disable=import-outside-toplevel
+        # MuckRock
+        from muckrock.accounts.tasks import fan_out_notifications
+
+        user_ids = [self.composer.user_id]
+        follower_ids = []
         if self.is_public() and not owner_only:
-            utils.notify(followers(self), action)
+            follower_ids = list(
+                Follow.objects.followers_qs(self).values_list("user_id", flat=True)
+            )
+        if len(follower_ids) > settings.NOTIFICATION_ASYNC_THRESHOLD:
+            # notify the owner right away, and the followers in the background
+            Notification.objects.fan_out(self, action, user_ids)
+            content_type = ContentType.objects.get_for_model(self)
+            transaction.on_commit(
+                lambda: fan_out_notifications.delay(
+                    content_type.pk, self.pk, action.pk, follower_ids
+                )
+            )
+        else:
+            Notification.objects.fan_out(self, action, user_ids + follower_ids)
 
     def submit(self, appeal=False, **kwargs):
         """
@@ -1116,7 +1150,10 @@ class FOIARequest(models.Model):
 
         is_owner = self.created_by(user)
         can_follow = user.is_authenticated and not is_owner and not is_agency_user
-        is_following = user.is_authenticated and user in followers(self)
+        is_following = (
+            user.is_authenticated
+            and Follow.objects.followers_qs(self).filter(user=user).exists()
+        )
         is_admin = user.is_staff
         kwargs = {
             "jurisdiction": self.jurisdiction.slug,
@@ -1272,6 +1309,8 @@ class FOIARequest(models.Model):
             category=self.get_category(**kwargs),
         )
         self.communications.update()
+        if comm.thanks:
+            self.clear_perm_cache()
         for pdf in pdfs:
             pdf.clone(comm)
         self.process_attachments(user)
@@ -5,9 +5,11 @@
 # Django
 from django.conf import settings
 from django.contrib.auth import load_backend
+from django.db.models import Exists, OuterRef
 
 # Standard Library
 import inspect
+from collections import namedtuple
 from datetime import date
 from functools import wraps
 
@@ -15,7 +17,63 @@ from functools import wraps
 from rules import add_perm, is_authenticated, is_staff, predicate
 
 # MuckRock
-from muckrock.foia.models.request import END_STATUS
+from muckrock.foia.models.communication import FOIACommunication
+from muckrock.foia.models.request import END_STATUS, FOIARequest
+
+# A user's relationships to a request which require a query to check.  The
+# owner, proxy, agency and status of the request are read from the request
+# itself, as they are already loaded along with it.
+PermissionContext = namedtuple(
+    "PermissionContext", ["editor", "viewer", "thanks", "organizations"]
+)
+
+
+def preload_permissions(user, foias):
+    """Load the user's relationships to many requests at once, so that
+    permissions for all of them may be checked in a constant number of
+    queries.  They are cached on each request until its collaborators change.
+    """
+    foias = [f for f in foias if user.pk not in f.__dict__.get("_perm_contexts", {})]
+    if not foias:
+        return
+    relations = (
+        FOIARequest.objects.filter(pk__in=[f.pk for f in foias])
+        .annotate(
+            editor=Exists(
+                FOIARequest.edit_collaborators.through.objects.filter(
+                    foiarequest=OuterRef("pk"), user_id=user.pk
+                )
+            ),
+            viewer=Exists(
+                FOIARequest.read_collaborators.through.objects.filter(
+                    foiarequest=OuterRef("pk"), user_id=user.pk
+                )
+            ),
+            thanks=Exists(
+                FOIACommunication.objects.filter(foia=OuterRef("pk"), thanks=True)
+            ),
+        )
+        .values_list("pk", "editor", "viewer", "thanks")
+    )
+    relations = {
+        pk: (editor, viewer, thanks) for pk, editor, viewer, thanks in relations
+    }
+    if user.is_authenticated:
+        organizations = frozenset(user.organizations.values_list("pk", flat=True))
+    else:
+        organizations = frozenset()
+    for foia in foias:
+        editor, viewer, thanks = relations.get(foia.pk, (False, False, False))
+        foia.__dict__.setdefault("_perm_contexts", {})[user.pk] = PermissionContext(
+            editor, viewer, thanks, organizations
+        )
+
+
+def get_permission_context(user, foia):
+    """Get the user's relationships to the request, loading them if they have
+    not been loaded yet"""
+    preload_permissions(user, [foia])
+    return foia.__dict__["_perm_contexts"][user.pk]
 
 
 def skip_if_not_obj(func):
@@ -80,20 +138,24 @@ def no_foia(user, foia):
 @predicate
 @skip_if_not_obj
 def is_editor(user, foia):
-    return user.is_authenticated and foia.edit_collaborators.filter(pk=user.pk).exists()
+    return user.is_authenticated and get_permission_context(user, foia).editor
 
 
 @predicate
 @skip_if_not_obj
 def is_read_collaborator(user, foia):
-    return user.is_authenticated and foia.read_collaborators.filter(pk=user.pk).exists()
+    return user.is_authenticated and get_permission_context(user, foia).viewer
 
 
 @predicate
 @skip_if_not_obj
 @user_authenticated
 def is_org_shared(user, foia):
-    return foia.user.profile.org_share and foia.composer.organization.has_member(user)
+    return (
+        foia.user.profile.org_share
+        and foia.composer.organization_id
+        in get_permission_context(user, foia).organizations
+    )
 
 
 is_viewer = is_read_collaborator | is_org_shared
@@ -111,7 +173,7 @@ is_private = is_embargoed
 @predicate
 @skip_if_not_obj
 def has_thanks(user, foia):
-    return foia.communications.filter(thanks=True).exists()
+    return get_permission_context(user, foia).thanks
 
 
 is_thankable = ~has_thanks & has_status(*END_STATUS)
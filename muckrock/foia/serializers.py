@@ -142,7 +142,14 @@ class FOIANoteSerializer(serializers.ModelSerializer):
 
 
 class FOIARequestSerializer(TaggitSerializer, serializers.ModelSerializer):
-    """Serializer for FOIA Request model"""
+    """Serializer for FOIA Request model
+
+    A set of field names may be given as `fields` in the context to only
+    serialize those fields
+    """
+
+    # connected models which are left out of lists unless asked for
+    expandable_fields = ("notes", "communications")
 
     username = serializers.StringRelatedField(source="composer.user")
     user = serializers.PrimaryKeyRelatedField(
@@ -171,21 +178,26 @@ class FOIARequestSerializer(TaggitSerializer, serializers.ModelSerializer):
         else:
             foia = None
 
+        fields = self.context.get("fields")
+        if fields is not None:
+            for field in set(self.fields) - set(fields):
+                self.fields.pop(field)
+
         request = self.context.get("request", None)
         if request is None:
-            self.fields.pop("mail_id")
+            self.fields.pop("mail_id", None)
             self.fields.pop("email", None)
-            self.fields.pop("notes")
+            self.fields.pop("notes", None)
             return
         if not request.user.is_staff:
-            self.fields.pop("mail_id")
+            self.fields.pop("mail_id", None)
             self.fields.pop("email", None)
             if not foia:
-                self.fields.pop("notes")
+                self.fields.pop("notes", None)
             else:
                 has_change = foia.has_perm(request.user, "change")
                 if not has_change:
-                    self.fields.pop("notes")
+                    self.fields.pop("notes", None)
                 if request.method == "PATCH":
                     self._set_patch_fields(request.user, foia)
 
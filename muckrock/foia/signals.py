@@ -10,6 +10,7 @@ from documentcloud import DocumentCloud
 from documentcloud.exceptions import DoesNotExistError
 
 # MuckRock
+from muckrock.agency.tasks import schedule_scorecard_refresh
 from muckrock.core.utils import clear_cloudfront_cache, get_s3_storage_bucket
 from muckrock.foia.models import FOIAFile, FOIARequest, OutboundRequestAttachment
 from muckrock.foia.tasks import upload_document_cloud
@@ -27,6 +28,33 @@ def foia_update_embargo(sender, **kwargs):
             transaction.on_commit(lambda doc=doc: upload_document_cloud.delay(doc.pk))
 
 
+def foia_update_scorecards(sender, instance, update_fields=None, **kwargs):
+    """When a request's statistics may have changed, refresh its agency's
+    scorecards"""
+    # pylint: disable=unused-argument
+    fields = instance.scorecard_fields
+    if update_fields is not None and not set(update_fields) & (
+        set(fields) | {"agency"}
+    ):
+        return
+    # the values the request was loaded with, if it was loaded from the database
+    old = getattr(instance, "scorecard_values", None)
+    if (
+        old is not None
+        and all(f in old for f in fields)
+        and all(old[f] == getattr(instance, f) for f in fields)
+    ):
+        return
+    instance.scorecard_values = {f: getattr(instance, f) for f in fields}
+    agency_pks = {instance.agency_id}
+    if old:
+        agency_pks.add(old.get("agency_id"))
+    for agency_pk in agency_pks - {None}:
+        transaction.on_commit(
+            lambda agency_pk=agency_pk: schedule_scorecard_refresh(agency_pk)
+        )
+
+
 def foia_file_delete_s3(sender, **kwargs):
     """Delete file from S3 after the model is deleted"""
     # pylint: disable=unused-argument
@@ -77,6 +105,12 @@ pre_save.connect(
     dispatch_uid="muckrock.foia.signals.embargo",
 )
 
+pre_save.connect(
+    foia_update_scorecards,
+    sender=FOIARequest,
+    dispatch_uid="muckrock.foia.signals.scorecards",
+)
+
 post_delete.connect(
     foia_file_delete_s3,
     sender=FOIAFile,
@@ -9,7 +9,7 @@ from celery.task import periodic_task, task
 from django.conf import settings
 from django.contrib.auth.models import User
 from django.contrib.postgres.aggregates.general import StringAgg
-from django.core.files.storage import default_storage
+from django.core.cache import caches
 from django.core.mail.message import EmailMessage
 from django.db import transaction
 from django.db.models import DurationField, F
@@ -18,6 +18,7 @@ from django.db.models.query import Prefetch
 from django.template.loader import render_to_string
 from django.urls import reverse
 from django.utils import timezone
+from django.utils.module_loading import import_string
 
 # Standard Library
 import csv
@@ -26,14 +27,12 @@ import os
 import os.path
 import re
 import sys
-from datetime import date, datetime, time
+import uuid
+from datetime import date, timedelta
 from random import randint
 
 # Third Party
-import boto3
-import dill as pickle
 import lob
-import numpy as np
 import requests
 from anymail.exceptions import AnymailError
 from constance import config
@@ -43,7 +42,6 @@ from phaxio import PhaxioApi
 from phaxio.exceptions import PhaxioError
 from raven import Client
 from raven.contrib.celery import register_logger_signal, register_signal
-from scipy.sparse import hstack
 from zipstream import ZIP_DEFLATED, ZipFile
 
 # MuckRock
@@ -55,10 +53,12 @@ from muckrock.communication.models import (
     MailCommunication,
     PortalCommunication,
 )
+from muckrock.core import metrics
 from muckrock.core.models import ExtractDay
 from muckrock.core.tasks import AsyncFileDownloadTask
-from muckrock.core.utils import read_in_chunks
-from muckrock.foia.exceptions import SizeError
+from muckrock.core.utils import get_documentcloud_client, keyset_chunks, read_in_chunks
+from muckrock.foia.autoimport import AutoImporter
+from muckrock.foia.classifier import status_classifier
 from muckrock.foia.models import (
     FOIACommunication,
     FOIAComposer,
@@ -271,86 +271,125 @@ def composer_delayed_submit(composer_pk, approve, contact_info, **kwargs):
         composer.multirequesttask_set.create()
 
 
-@task(ignore_result=True, max_retries=3, name="muckrock.foia.tasks.classify_status")
-def classify_status(task_pk, **kwargs):
-    """Use a machine learning classifier to predict the communications status"""
-
-    # pylint: disable=too-many-locals
-
-    def get_text_ocr(doc_id):
-        """Get the text OCR from document cloud"""
-
-        dc_client = DocumentCloud(
-            username=settings.DOCUMENTCLOUD_BETA_USERNAME,
-            password=settings.DOCUMENTCLOUD_BETA_PASSWORD,
-            base_uri=f"{settings.DOCCLOUD_API_URL}/api/",
-            auth_uri=f"{settings.SQUARELET_URL}/api/",
-        )
+def _get_text_ocr(doc_id):
+    """Get the text OCR from document cloud"""
+    try:
+        document = get_documentcloud_client().documents.get(doc_id)
+    except DocumentCloudError as exc:
+        logger.warning("Doc Cloud error for %s: %s", doc_id, exc.error)
+        return ""
 
-        try:
-            document = dc_client.documents.get(doc_id)
-        except DocumentCloudError as exc:
-            logger.warning("Doc Cloud error for %s: %s", doc_id, exc.error)
-            return ""
-
-        return document.full_text
-
-    def get_classifier():
-        """Load the pickled classifier"""
-        with open("muckrock/foia/classifier.pkl", "rb") as pkl_fp:
-            return pickle.load(pkl_fp)
-
-    def predict_status(vectorizer, selector, classifier, text, pages):
-        """Run the prediction"""
-        input_vect = vectorizer.transform([text])
-        pages_vect = np.array([pages], dtype=np.float).transpose()
-        input_vect = hstack([input_vect, pages_vect])
-        input_vect = selector.transform(input_vect)
-        probs = classifier.predict_proba(input_vect)[0]
-        max_prob = max(probs)
-        status = classifier.classes_[list(probs).index(max_prob)]
-        return status, max_prob
-
-    def resolve_if_possible(resp_task):
-        """Resolve this response task if possible based off of ML setttings"""
-        if config.ENABLE_ML and resp_task.status_probability >= config.CONFIDENCE_MIN:
-            try:
-                ml_robot = User.objects.get(username="mlrobot")
-                resp_task.set_status(resp_task.predicted_status)
-                resp_task.resolve(ml_robot, {"status": resp_task.predicted_status})
-            except User.DoesNotExist:
-                logger.error("mlrobot account does not exist")
+    return document.full_text
 
-    try:
-        resp_task = ResponseTask.objects.get(pk=task_pk)
-    except ResponseTask.DoesNotExist as exc:
-        classify_status.retry(countdown=60 * 30, args=[task_pk], kwargs=kwargs, exc=exc)
 
+def _get_response_text(resp_task):
+    """Get the full text and total pages of a response task's communication,
+    or None if document cloud has not finished processing its files yet"""
     file_text = []
     total_pages = 0
     for file_ in resp_task.communication.files.all():
         total_pages += file_.pages
         if file_.is_doccloud() and file_.doc_id:
-            file_text.append(get_text_ocr(file_.doc_id))
+            file_text.append(_get_text_ocr(file_.doc_id))
         elif file_.is_doccloud() and not file_.doc_id:
-            # wait longer for document cloud
-            classify_status.retry(countdown=60 * 30, args=[task_pk], kwargs=kwargs)
+            return None
 
     full_text = resp_task.communication.communication + (" ".join(file_text))
-    vectorizer, selector, classifier = get_classifier()
+    return full_text, total_pages
 
-    status, prob = predict_status(
-        vectorizer, selector, classifier, full_text, total_pages
-    )
 
+def _set_predicted_status(resp_task, status, prob):
+    """Save the prediction, and resolve the response task if possible based
+    off of ML setttings"""
     resp_task.predicted_status = status
     resp_task.status_probability = int(100 * prob)
 
-    resolve_if_possible(resp_task)
+    if config.ENABLE_ML and resp_task.status_probability >= config.CONFIDENCE_MIN:
+        try:
+            ml_robot = User.objects.get(username="mlrobot")
+            resp_task.set_status(resp_task.predicted_status)
+            resp_task.resolve(ml_robot, {"status": resp_task.predicted_status})
+        except User.DoesNotExist:
+            logger.error("mlrobot account does not exist")
 
     resp_task.save()
 
 
+@task(ignore_result=True, max_retries=3, name="muckrock.foia.tasks.classify_status")
+def classify_status(task_pk, **kwargs):
+    """Use a machine learning classifier to predict the communications status"""
+
+    start = timezone.now()
+    try:
+        resp_task = ResponseTask.objects.get(pk=task_pk)
+    except ResponseTask.DoesNotExist as exc:
+        classify_status.retry(countdown=60 * 30, args=[task_pk], kwargs=kwargs, exc=exc)
+
+    if resp_task.predicted_status is not None:
+        # already classified in a batch
+        return
+
+    text = _get_response_text(resp_task)
+    if text is None:
+        # wait longer for document cloud
+        classify_status.retry(countdown=60 * 30, args=[task_pk], kwargs=kwargs)
+    full_text, total_pages = text
+
+    ((status, prob),) = status_classifier.predict([full_text], [total_pages])
+    _set_predicted_status(resp_task, status, prob)
+    metrics.timing("classifier.task", (timezone.now() - start).total_seconds())
+
+
+@periodic_task(
+    run_every=crontab(minute="*/10"),
+    time_limit=10 * 60,
+    soft_time_limit=570,
+    name="muckrock.foia.tasks.classify_pending_statuses",
+)
+def classify_pending_statuses():
+    """Classify the unclassified response tasks for received email and portal
+    responses in a single batch, oldest first.  Tasks whose files document
+    cloud has not finished processing are skipped until a later run, and tasks
+    which have waited longer than CLASSIFY_MAX_AGE are left for staff."""
+    start = timezone.now()
+    resp_tasks = (
+        ResponseTask.objects.filter(
+            resolved=False,
+            predicted_status=None,
+            scan=False,
+            created_from_orphan=False,
+            date_created__lt=start - timedelta(minutes=30),
+            date_created__gte=start - timedelta(seconds=settings.CLASSIFY_MAX_AGE),
+        )
+        .select_related("communication")
+        .prefetch_related("communication__files")
+        .order_by("date_created")
+    )
+    ready_tasks = []
+    texts = []
+    pages = []
+    for resp_task in resp_tasks.iterator(chunk_size=settings.CLASSIFY_BATCH_SIZE):
+        text = _get_response_text(resp_task)
+        if text is not None:
+            ready_tasks.append(resp_task)
+            texts.append(text[0])
+            pages.append(text[1])
+            if len(ready_tasks) >= settings.CLASSIFY_BATCH_SIZE:
+                break
+
+    if not ready_tasks:
+        return
+
+    predictions = status_classifier.predict(texts, pages)
+    for resp_task, (status, prob) in zip(ready_tasks, predictions):
+        _set_predicted_status(resp_task, status, prob)
+
+    elapsed = (timezone.now() - start).total_seconds()
+    logger.info("Classified %d response tasks in %.2fs", len(ready_tasks), elapsed)
+    metrics.timing("classifier.batch", elapsed)
+    metrics.timing("classifier.task", elapsed / len(ready_tasks))
+
+
 @task(
     ignore_result=True,
     max_retries=5,
@@ -430,38 +469,162 @@ def send_fax(comm_id, subject, body, error_count, **kwargs):
             )
 
 
+FOLLOWUP_CLAIM = "followup:claim:{}:{}"
+FOLLOWUP_RUN = "followup:run:{}:{}"
+
+
 @periodic_task(
     run_every=crontab(hour=1, minute=0),
     time_limit=10 * 60,
     soft_time_limit=570,
     name="muckrock.foia.tasks.followup_requests",
 )
-def followup_requests():
-    """Follow up on any requests that need following up on"""
-    log = []
+def followup_requests(run_id=None):
+    """Follow up on any requests that need following up on
+
+    This pages through the requests needing a follow up by primary key and
+    queues chunks of them to be sent by `followup_chunk`.  It is safe to run
+    again for the same run id to resume an interrupted run - each request is
+    claimed before its follow up is sent, so none will be sent twice.
+    """
     # weekday returns 5 for sat and 6 for sun
     is_weekday = date.today().weekday() < 5
-    if config.ENABLE_FOLLOWUP and (config.ENABLE_WEEKEND_FOLLOWUP or is_weekday):
-        num_requests = FOIARequest.objects.get_followup().count()
-        try:
-            for foia in FOIARequest.objects.get_followup():
+    if not (config.ENABLE_FOLLOWUP and (config.ENABLE_WEEKEND_FOLLOWUP or is_weekday)):
+        return
+    if run_id is None:
+        run_id = date.today().isoformat()
+
+    cache = caches["lock"]
+    # the total is set once all chunks are queued, clear it in case we are
+    # resuming a previous run
+    cache.delete(FOLLOWUP_RUN.format(run_id, "total"))
+    last_pk = 0
+    num_requests = 0
+    num_chunks = 0
+    while True:
+        pks = list(
+            FOIARequest.objects.get_followup()
+            .filter(pk__gt=last_pk)
+            .order_by("pk")
+            .values_list("pk", flat=True)[: settings.FOLLOWUP_CHUNK_SIZE]
+        )
+        if not pks:
+            break
+        last_pk = pks[-1]
+        num_requests += len(pks)
+        num_chunks += 1
+        # count the chunk before queueing it, so the total is never behind
+        _followup_run_incr(run_id, "chunks_queued")
+        followup_chunk.delay(run_id, pks)
+    cache.set(
+        FOLLOWUP_RUN.format(run_id, "total"),
+        num_requests,
+        settings.FOLLOWUP_CLAIM_TIMEOUT,
+    )
+    logger.info(
+        "Follow ups %s: queued %d requests in %d chunks",
+        run_id,
+        num_requests,
+        num_chunks,
+    )
+    # all of the chunks may have finished before we finished queueing them
+    _followup_report(run_id)
+
+
+@task(
+    ignore_result=True,
+    time_limit=10 * 60,
+    soft_time_limit=570,
+    rate_limit=settings.FOLLOWUP_RATE_LIMIT,
+    name="muckrock.foia.tasks.followup_chunk",
+)
+def followup_chunk(run_id, pks):
+    """Send follow ups for a chunk of requests"""
+    cache = caches["lock"]
+    counts = {"completed": 0, "skipped": 0, "failed": 0}
+    # re-check which requests still need a follow up, in case they were
+    # updated after being queued
+    foias = FOIARequest.objects.get_followup().in_bulk(pks)
+    counts["skipped"] += len(pks) - len(foias)
+    remaining = [pk for pk in pks if pk in foias]
+    try:
+        while remaining:
+            foia = foias[remaining[0]]
+            claim = FOLLOWUP_CLAIM.format(run_id, foia.pk)
+            # add is atomic, so only one worker may claim each request
+            if not cache.add(claim, True, settings.FOLLOWUP_CLAIM_TIMEOUT):
+                counts["skipped"] += 1
+            else:
                 try:
                     foia.followup()
-                    log.append("%s - %d - %s" % (foia.status, foia.pk, foia.title))
+                    counts["completed"] += 1
+                    logger.info(
+                        "Follow up: %s - %d - %s", foia.status, foia.pk, foia.title
+                    )
+                except SoftTimeLimitExceeded:
+                    cache.delete(claim)
+                    raise
                 except AnymailError as exc:
+                    # release the claim so a resumed run may try again
+                    cache.delete(claim)
+                    counts["failed"] += 1
                     logger.error(
                         "Mailgun error during followups: %s",
                         exc,
                         exc_info=sys.exc_info(),
                     )
-        except SoftTimeLimitExceeded:
-            logger.warning(
-                "Follow ups did not complete in time. Completed %d out of %d",
-                num_requests - FOIARequest.objects.get_followup().count(),
-                num_requests,
-            )
-
-        logger.info("Follow Ups:\n%s", "\n".join(log))
+            remaining.pop(0)
+    except SoftTimeLimitExceeded:
+        logger.warning(
+            "Follow up chunk did not complete in time, re-queueing %d requests",
+            len(remaining),
+        )
+        _followup_run_incr(run_id, "chunks_queued")
+        followup_chunk.delay(run_id, remaining)
+    finally:
+        for name, value in counts.items():
+            if value:
+                _followup_run_incr(run_id, name, value)
+                metrics.incr(f"followups.{name}", value)
+        _followup_run_incr(run_id, "chunks_done")
+        _followup_report(run_id)
+
+
+def _followup_run_incr(run_id, name, value=1):
+    """Increment a counter for a follow up run, returning the new value"""
+    cache = caches["lock"]
+    key = FOLLOWUP_RUN.format(run_id, name)
+    # add does nothing if the key already exists
+    cache.add(key, 0, settings.FOLLOWUP_CLAIM_TIMEOUT)
+    return cache.incr(key, value)
+
+
+def _followup_report(run_id):
+    """Log the results of a follow up run once all of its chunks are done"""
+    cache = caches["lock"]
+    names = ["total", "chunks_queued", "chunks_done", "completed", "skipped", "failed"]
+    values = cache.get_many([FOLLOWUP_RUN.format(run_id, name) for name in names])
+    counts = {name: values.get(FOLLOWUP_RUN.format(run_id, name), 0) for name in names}
+    if (
+        FOLLOWUP_RUN.format(run_id, "total") not in values
+        or counts["chunks_done"] < counts["chunks_queued"]
+    ):
+        # the coordinator is still queueing chunks, or some are still running
+        return
+    # only report once per set of queued chunks
+    report_key = FOLLOWUP_RUN.format(run_id, "reported:%d" % counts["chunks_queued"])
+    if not cache.add(report_key, True, settings.FOLLOWUP_CLAIM_TIMEOUT):
+        return
+    logger.info(
+        "Follow ups %s complete: %d completed, %d skipped and %d failed "
+        "out of %d requests",
+        run_id,
+        counts["completed"],
+        counts["skipped"],
+        counts["failed"],
+        counts["total"],
+    )
+    metrics.gauge("followups.last_run", counts)
 
 
 @periodic_task(
@@ -506,205 +669,30 @@ def embargo_expire():
         ).send(fail_silently=False)
 
 
-# Increase the time limit for autoimport to 10 hours, and a soft time limit to
-# 5 minutes before that
+# The import is resumable, so rather than allowing it to run for hours, re-queue
+# it when it reaches the soft time limit
 @periodic_task(
     run_every=crontab(hour=2, minute=0),
     name="muckrock.foia.tasks.autoimport",
-    time_limit=36000,
-    soft_time_limit=35700,
+    time_limit=3600,
+    soft_time_limit=3300,
 )
-def autoimport():
+def autoimport(resume=0):
     """Auto import documents from S3"""
-    # pylint: disable=broad-except
-    # pylint: disable=too-many-statements
-    p_name = re.compile(
-        r"(?P<month>\d\d?)-(?P<day>\d\d?)-(?P<year>\d\d) "
-        r"(?P<docs>(?:mr\d+(?: |$))+)",
-        re.I,
-    )
-
-    def s3_copy(bucket, key_or_pre, dest_name):
-        """Copy an s3 key or prefix"""
-        if key_or_pre.endswith("/"):
-            for obj in bucket.objects.filter(Prefix=key_or_pre):
-                if obj.key == key_or_pre:
-                    bucket.Object(dest_name).copy_from(
-                        CopySource={"Bucket": bucket.name, "Key": obj.key}
-                    )
-                    continue
-                s3_copy(
-                    bucket,
-                    obj.key,
-                    "%s/%s" % (dest_name, os.path.basename(os.path.normpath(obj.key))),
-                )
-        else:
-            bucket.Object(dest_name).copy_from(
-                CopySource={"Bucket": bucket.name, "Key": key_or_pre}
-            )
-
-    def s3_delete(bucket, key_or_pre):
-        """Delete an s3 key or prefix"""
-        if key_or_pre.endswith("/"):
-            for obj in bucket.objects.filter(Prefix=key_or_pre):
-                if obj.key == key_or_pre:
-                    obj.delete()
-                    continue
-                s3_delete(bucket, obj.key)
-        else:
-            bucket.Object(key_or_pre).delete()
-
-    def parse_name(name):
-        """Parse a file name"""
-        # strip off trailing / and file extension
-        name = os.path.normpath(name)
-        name = os.path.splitext(name)[0]
-
-        m_name = p_name.match(name)
-        if not m_name:
-            raise ValueError("ERROR: %s does not match the file name format" % name)
-        foia_pks = [pk[2:] for pk in m_name.group("docs").split()]
-        file_datetime = datetime.combine(
-            datetime(
-                int(m_name.group("year")) + 2000,
-                int(m_name.group("month")),
-                int(m_name.group("day")),
-            ),
-            time(tzinfo=timezone.get_current_timezone()),
-        )
-
-        return foia_pks, file_datetime
-
-    @transaction.atomic
-    def import_key(key, bucket, storage_bucket, comm, log):
-        """Import a key"""
-        foia = comm.foia
-        file_name = os.path.split(key)[1]
-
-        # first parameter is instance, but we do not have one yet
-        # luckily, it is only used if the upload_to for the field is
-        # a callable, which it is not, so it is safe to pass in None
-        full_file_name = FOIAFile.ffile.field.generate_filename(None, file_name)
-        full_file_name = default_storage.get_available_name(full_file_name)
-
-        new_obj = storage_bucket.Object(full_file_name)
-        new_obj.copy_from(
-            CopySource={"Bucket": bucket.name, "Key": key}, ACL=settings.AWS_DEFAULT_ACL
-        )
-
-        foia_file = comm.attach_file(path=full_file_name, name=file_name, now=False)
-
-        oldfile = bucket.Object(key)
-        if oldfile.content_length != foia_file.ffile.size:
-            raise SizeError(key.size, foia_file.ffile.size, foia_file)
-
-        log.append(
-            "SUCCESS: %s uploaded to FOIA Request %s with a status of %s"
-            % (file_name, foia.pk, foia.status)
-        )
-
-    def import_prefix(prefix, bucket, storage_bucket, comm, log):
-        """Import a prefix (folder) full of documents"""
-        for obj in bucket.objects.filter(Prefix=prefix):
-            if obj.key == prefix:
-                continue
-            if obj.key.endswith("/"):
-                log.append(
-                    "ERROR: nested directories not allowed: %s in %s"
-                    % (obj.key, prefix)
-                )
-                continue
-            try:
-                import_key(obj.key, bucket, storage_bucket, comm, log)
-            except SizeError as exc:
-                s3_copy(
-                    bucket,
-                    obj.key,
-                    "review/%s" % obj.key.replace(settings.AWS_AUTOIMPORT_PATH, ""),
-                )
-                exc.args[2].delete()  # delete the foia file
-                comm.delete()
-                log.append(
-                    "ERROR: %s was %s bytes and after uploaded was %s bytes - retry"
-                    % (
-                        obj.key.replace(settings.AWS_AUTOIMPORT_PATH, ""),
-                        exc.args[0],
-                        exc.args[1],
-                    )
-                )
-
-    def process(log):
-        """Process the files"""
+    log = []
+    try:
         log.append("Start Time: %s" % timezone.now())
-        s3 = boto3.resource("s3")
-        bucket = s3.Bucket(settings.AWS_AUTOIMPORT_BUCKET_NAME)
-        storage_bucket = s3.Bucket(settings.AWS_MEDIA_BUCKET_NAME)
-        for obj in bucket.objects.filter(Prefix=settings.AWS_AUTOIMPORT_PATH):
-            if obj.key == settings.AWS_AUTOIMPORT_PATH:
-                continue
-            # strip off 'scans/'
-            file_name = obj.key.replace(settings.AWS_AUTOIMPORT_PATH, "")
-
-            try:
-                foia_pks, file_datetime = parse_name(file_name)
-            except ValueError as exc:
-                s3_copy(bucket, obj.key, "review/%s" % file_name)
-                s3_delete(bucket, obj.key)
-                log.append(str(exc))
-                continue
-
-            for foia_pk in foia_pks:
-                try:
-                    foia = FOIARequest.objects.get(pk=foia_pk)
-                    from_user = foia.agency.get_user() if foia.agency else None
-
-                    comm = FOIACommunication.objects.create(
-                        foia=foia,
-                        from_user=from_user,
-                        to_user=foia.user,
-                        response=True,
-                        datetime=file_datetime,
-                        communication="",
-                        hidden=True,
-                    )
-                    comm.responsetask_set.create(scan=True)
-                    MailCommunication.objects.create(
-                        communication=comm, sent_datetime=file_datetime
-                    )
-
-                    if obj.key.endswith("/"):
-                        import_prefix(obj.key, bucket, storage_bucket, comm, log)
-                    else:
-                        import_key(obj.key, bucket, storage_bucket, comm, log)
-
-                except FOIARequest.DoesNotExist:
-                    s3_copy(bucket, obj.key, "review/%s" % file_name)
-                    log.append(
-                        "ERROR: %s references FOIA Request %s, but it does not exist"
-                        % (file_name, foia_pk)
-                    )
-                except SoftTimeLimitExceeded:
-                    # if we reach the soft time limit,
-                    # re-raise so we can catch and clean up
-                    raise
-                except Exception as exc:
-                    s3_copy(bucket, obj.key, "review/%s" % file_name)
-                    log.append(
-                        "ERROR: %s has caused an unknown error. %s" % (file_name, exc)
-                    )
-                    logger.error("Autoimport error: %s", exc, exc_info=sys.exc_info())
-            # delete key after processing all requests for it
-            s3_delete(bucket, obj.key)
+        AutoImporter(log).run()
         log.append("End Time: %s" % timezone.now())
-
-    try:
-        log = []
-        process(log)
     except SoftTimeLimitExceeded:
-        log.append(
-            "ERROR: Time limit exceeded, please check folder for "
-            "undeleted uploads.  How big of a file did you put in there?"
-        )
+        if resume < settings.AUTOIMPORT_MAX_RESUMES:
+            log.append("Time limit exceeded, resuming the import")
+            autoimport.delay(resume=resume + 1)
+        else:
+            log.append(
+                "ERROR: Time limit exceeded, please check folder for "
+                "undeleted uploads.  How big of a file did you put in there?"
+            )
         log.append("End Time: %s" % timezone.now())
     finally:
         EmailMessage(
@@ -795,11 +783,21 @@ class ExportCsv(AsyncFileDownloadTask):
         ),
     )
 
-    def __init__(self, user_pk, foia_pks):
-        super().__init__(user_pk, "".join(str(pk) for pk in foia_pks[:100]))
+    chunk_size = 2000
+
+    def __init__(self, user_pk, foias, export_id=None):
+        # the file key only needs to be unique, so exports queued without an
+        # export id use a random one
+        super().__init__(
+            user_pk, export_id if export_id is not None else uuid.uuid4().hex, export_id
+        )
+        # the requests to export, which may be an arbitrarily filtered queryset
+        self.pks = foias.values_list("pk", flat=True)
+        # the fields needed to export each chunk of requests
         self.foias = (
-            FOIARequest.objects.filter(pk__in=foia_pks)
-            .select_related("composer__user", "agency__jurisdiction__parent")
+            FOIARequest.objects.select_related(
+                "composer__user", "agency__jurisdiction__parent"
+            )
             .prefetch_related("tracking_ids")
             .only(
                 "agency__id",
@@ -858,14 +856,33 @@ class ExportCsv(AsyncFileDownloadTask):
         """Export selected foia requests as a CSV file"""
         writer = csv.writer(out_file)
         writer.writerow(f[1] for f in self.fields)
-        for foia in self.foias.iterator(chunk_size=2000):
-            writer.writerow(f[0](foia) for f in self.fields)
+        self.set_progress(total=self.pks.count())
+        done = 0
+        for pks in keyset_chunks(self.pks, self.chunk_size, get_pk=lambda pk: pk):
+            for foia in self.foias.filter(pk__in=pks).order_by("pk"):
+                writer.writerow(f[0](foia) for f in self.fields)
+            done += len(pks)
+            self.set_progress(done=done)
+
+
+@task(
+    ignore_result=True,
+    time_limit=1800,
+    name="muckrock.foia.tasks.export_requests_csv",
+)
+def export_requests_csv(view, params, view_kwargs, user_pk, export_id=None):
+    """Export a csv of the FOIA requests shown by a list view, rebuilding the
+    list from the query parameters it was viewed with"""
+    user = User.objects.get(pk=user_pk)
+    foias = import_string(view).rebuild_queryset(user, params, view_kwargs)
+    ExportCsv(user_pk, foias, export_id).run()
 
 
 @task(ignore_result=True, time_limit=1800, name="muckrock.foia.tasks.export_csv")
 def export_csv(foia_pks, user_pk):
-    """Export a csv of the selected FOIA requests"""
-    ExportCsv(user_pk, foia_pks).run()
+    """Export a csv of the selected FOIA requests, kept for tasks queued before
+    exports were rebuilt from the list view"""
+    ExportCsv(user_pk, FOIARequest.objects.filter(pk__in=foia_pks)).run()
 
 
 class ZipRequest(AsyncFileDownloadTask):
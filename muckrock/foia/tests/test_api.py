@@ -4,7 +4,7 @@ Test the FOIA API viewset
 
 # Django
 from django.conf import settings
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 
 # Standard Library
@@ -24,7 +24,11 @@ from muckrock.core.factories import (
     UserFactory,
 )
 from muckrock.core.test_utils import mock_squarelet
-from muckrock.foia.factories import FOIATemplateFactory
+from muckrock.foia.factories import (
+    FOIACommunicationFactory,
+    FOIARequestFactory,
+    FOIATemplateFactory,
+)
 from muckrock.foia.models import FOIAComposer
 
 
@@ -262,3 +266,60 @@ class TestFOIAViewsetCreate(TestCase):
             code=402,
             status="Out of requests.  FOI Request has been saved.",
         )
+
+
+class TestFOIAViewsetList(TestCase):
+    """Unit Tests for FOIA API Viewset list representations"""
+
+    def setUp(self):
+        self.foias = FOIARequestFactory.create_batch(2)
+        for foia in self.foias:
+            FOIACommunicationFactory(foia=foia)
+
+    def test_compact(self):
+        """Lists leave out communications by default"""
+        response = self.client.get(reverse("api-foia-list"))
+        eq_(response.status_code, 200)
+        results = response.json()["results"]
+        eq_(len(results), 2)
+        ok_("communications" not in results[0])
+        ok_("title" in results[0])
+
+    def test_expand(self):
+        """Communications are included when expanded"""
+        response = self.client.get(
+            reverse("api-foia-list"), {"expand": "communications"}
+        )
+        eq_(response.status_code, 200)
+        eq_(len(response.json()["results"][0]["communications"]), 1)
+
+    def test_fields(self):
+        """Only the given fields are returned"""
+        response = self.client.get(reverse("api-foia-list"), {"fields": "id,title"})
+        eq_(response.status_code, 200)
+        eq_(set(response.json()["results"][0]), {"id", "title"})
+
+    def test_detail(self):
+        """The detail view includes communications"""
+        response = self.client.get(
+            reverse("api-foia-detail", kwargs={"pk": self.foias[0].pk})
+        )
+        eq_(response.status_code, 200)
+        eq_(len(response.json()["communications"]), 1)
+
+    @override_settings(
+        CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+            "lock": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        }
+    )
+    def test_bulk(self):
+        """Bulk streams each request as a line of JSON to logged in users"""
+        response = self.client.get(reverse("api-foia-bulk"), {"fields": "id"})
+        eq_(response.status_code, 401)
+        self.client.force_login(UserFactory())
+        response = self.client.get(reverse("api-foia-bulk"), {"fields": "id"})
+        eq_(response.status_code, 200)
+        eq_(response["Content-Type"], "application/x-ndjson")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        eq_([json.loads(line) for line in lines], [{"id": f.pk} for f in self.foias])
@@ -4,14 +4,19 @@ Tests using nose for the classifing of new communications
 
 # Django
 from django.test import TestCase
+from django.utils import timezone
+
+# Standard Library
+from datetime import timedelta
 
 # Third Party
 import nose.tools
 
 # MuckRock
 from muckrock.foia.factories import FOIACommunicationFactory
-from muckrock.foia.tasks import classify_status
+from muckrock.foia.tasks import classify_pending_statuses, classify_status
 from muckrock.task.factories import ResponseTaskFactory
+from muckrock.task.models import ResponseTask
 
 
 class TestFOIAClassify(TestCase):
@@ -27,3 +32,30 @@ class TestFOIAClassify(TestCase):
         task.refresh_from_db()
         nose.tools.ok_(task.predicted_status)
         nose.tools.ok_(task.status_probability)
+
+    def test_batch_classifier(self):
+        """The batch classifier should classify all pending response tasks"""
+        tasks = [
+            ResponseTaskFactory(
+                communication=FOIACommunicationFactory(communication=text)
+            )
+            for text in ["Here are your responsive documents", "Please pay $10"]
+        ]
+        new_task = ResponseTaskFactory()
+        scan_task = ResponseTaskFactory(scan=True)
+        orphan_task = ResponseTaskFactory(created_from_orphan=True)
+        old_task = ResponseTaskFactory()
+        ResponseTask.objects.filter(
+            pk__in=[t.pk for t in tasks + [scan_task, orphan_task]]
+        ).update(date_created=timezone.now() - timedelta(hours=1))
+        ResponseTask.objects.filter(pk=old_task.pk).update(
+            date_created=timezone.now() - timedelta(days=2)
+        )
+        classify_pending_statuses.apply(throw=True)
+        for task in tasks:
+            task.refresh_from_db()
+            nose.tools.ok_(task.predicted_status)
+            nose.tools.ok_(task.status_probability)
+        for task in [new_task, scan_task, orphan_task, old_task]:
+            task.refresh_from_db()
+            nose.tools.eq_(task.predicted_status, None)
@@ -4,16 +4,20 @@ Files should be added to communications
 
 # Django
 from django.http import Http404
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 
+# Standard Library
+from unittest import mock
+
 # Third Party
 from nose.tools import eq_, ok_, raises
 
 # MuckRock
 from muckrock.core.factories import UserFactory
 from muckrock.core.test_utils import http_get_response
-from muckrock.foia.factories import FOIAFileFactory
+from muckrock.foia.autoimport import AutoImporter
+from muckrock.foia.factories import FOIAFileFactory, FOIARequestFactory
 from muckrock.foia.views import FOIAFileListView
 
 
@@ -49,3 +53,122 @@ class TestRequestFilesView(TestCase):
         user = UserFactory()
         ok_(not self.foia.has_perm(user, "view"))
         http_get_response(self.url, self.view, user, **self.kwargs)
+
+
+@override_settings(
+    CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        "lock": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    },
+    AWS_AUTOIMPORT_PATH="scans/",
+    AUTOIMPORT_THREADS=2,
+)
+class TestAutoImport(TestCase):
+    """Scans should be imported from S3 in bulk"""
+
+    @mock.patch("muckrock.foia.autoimport.boto3")
+    def test_autoimport(self, mock_boto3):
+        """Files and folders should be imported, and bad names sent to review"""
+        foia = FOIARequestFactory()
+        s3_client = mock_boto3.client.return_value
+        s3_client.get_paginator.return_value.paginate.return_value = [
+            {
+                "Contents": [
+                    {"Key": "scans/", "Size": 0},
+                    {"Key": "scans/1-31-23 MR%d.pdf" % foia.pk, "Size": 10},
+                    {"Key": "scans/2-1-23 MR%d/" % foia.pk, "Size": 0},
+                    {"Key": "scans/2-1-23 MR%d/a.pdf" % foia.pk, "Size": 10},
+                    {"Key": "scans/2-1-23 MR%d/b.pdf" % foia.pk, "Size": 10},
+                    {"Key": "scans/bad name.pdf", "Size": 10},
+                ]
+            }
+        ]
+        s3_client.head_object.return_value = {"ContentLength": 10}
+        log = []
+        AutoImporter(log).run()
+
+        comms = foia.communications.order_by("datetime")
+        eq_(comms.count(), 2)
+        eq_(comms[0].files.count(), 1)
+        eq_(comms[1].files.count(), 2)
+        ok_(all(comm.responsetask_set.filter(scan=True).exists() for comm in comms))
+        ok_(all(comm.mails.exists() for comm in comms))
+        eq_(len([line for line in log if line.startswith("SUCCESS")]), 3)
+        ok_(any("bad name" in line for line in log))
+        review_keys = [
+            call[1]["Key"]
+            for call in s3_client.copy_object.call_args_list
+            if call[1]["Key"].startswith("review/")
+        ]
+        eq_(review_keys, ["review/bad name.pdf"])
+        deleted = [
+            obj["Key"]
+            for call in s3_client.delete_objects.call_args_list
+            for obj in call[1]["Delete"]["Objects"]
+        ]
+        eq_(len(deleted), 5)
+
+    @mock.patch("muckrock.foia.autoimport.boto3")
+    def test_autoimport_error(self, mock_boto3):
+        """If the records cannot be created, the scan is sent to review and its
+        copies are removed from the storage bucket"""
+        foia = FOIARequestFactory()
+        s3_client = mock_boto3.client.return_value
+        s3_client.get_paginator.return_value.paginate.return_value = [
+            {"Contents": [{"Key": "scans/1-31-23 MR%d.pdf" % foia.pk, "Size": 10}]}
+        ]
+        s3_client.head_object.return_value = {"ContentLength": 10}
+        log = []
+        with mock.patch.object(
+            AutoImporter, "create_records", side_effect=ValueError("Bad")
+        ):
+            AutoImporter(log).run()
+
+        eq_(foia.communications.count(), 0)
+        ok_(any(line.startswith("ERROR") for line in log))
+        copied = [
+            call[1]["Key"]
+            for call in s3_client.copy_object.call_args_list
+            if not call[1]["Key"].startswith("review/")
+        ]
+        deleted = [
+            obj["Key"]
+            for call in s3_client.delete_objects.call_args_list
+            for obj in call[1]["Delete"]["Objects"]
+        ]
+        eq_(len(copied), 1)
+        ok_(copied[0] in deleted)
+        ok_("scans/1-31-23 MR%d.pdf" % foia.pk in deleted)
+
+    @mock.patch("muckrock.foia.autoimport.boto3")
+    def test_autoimport_multiple(self, mock_boto3):
+        """A scan for multiple requests, and scans with the same file name,
+        should each be copied to their own key"""
+        foias = FOIARequestFactory.create_batch(2)
+        s3_client = mock_boto3.client.return_value
+        s3_client.get_paginator.return_value.paginate.return_value = [
+            {
+                "Contents": [
+                    {
+                        "Key": "scans/1-31-23 MR%d MR%d.pdf"
+                        % (foias[0].pk, foias[1].pk),
+                        "Size": 10,
+                    },
+                    {"Key": "scans/2-1-23 MR%d/a.pdf" % foias[0].pk, "Size": 10},
+                    {"Key": "scans/2-2-23 MR%d/a.pdf" % foias[0].pk, "Size": 10},
+                ]
+            }
+        ]
+        s3_client.head_object.return_value = {"ContentLength": 10}
+        AutoImporter([]).run()
+
+        copied = [call[1]["Key"] for call in s3_client.copy_object.call_args_list]
+        eq_(len(copied), 4)
+        eq_(len(set(copied)), 4)
+        paths = [
+            file_.ffile.name
+            for foia in foias
+            for comm in foia.communications.all()
+            for file_ in comm.files.all()
+        ]
+        eq_(sorted(paths), sorted(copied))
@@ -5,7 +5,7 @@ Tests using nose for the FOIA application
 # Django
 from django.contrib.auth.models import AnonymousUser
 from django.core import mail
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from django.utils import timezone
 
@@ -18,10 +18,13 @@ import nose.tools
 import pytz
 import requests_mock
 from actstream.actions import follow
+from anymail.exceptions import AnymailError
 from freezegun import freeze_time
+from mock import patch
 from nose.tools import eq_, ok_
 
 # MuckRock
+from muckrock.accounts.models import Notification
 from muckrock.core.factories import AgencyFactory, AppealAgencyFactory, UserFactory
 from muckrock.core.test_utils import RunCommitHooksMixin, mock_squarelet
 from muckrock.core.utils import new_action
@@ -33,6 +36,7 @@ from muckrock.foia.factories import (
     FOIATemplateFactory,
 )
 from muckrock.foia.models import FOIACommunication, FOIARequest, RawEmail
+from muckrock.foia.tasks import followup_chunk
 from muckrock.task.models import PaymentInfoTask, SnailMailTask
 
 
@@ -181,6 +185,65 @@ class TestFOIARequestUnit(RunCommitHooksMixin, TestCase):
         foia = FOIARequestFactory(date_estimate=date.today() + timedelta(num_days))
         nose.tools.eq_(foia._followup_days(), num_days)
 
+    def test_scorecard_refresh(self):
+        """Saving a request should only refresh its agency's scorecards if the
+        statistics may have changed"""
+        foia = FOIARequest.objects.get(pk=FOIARequestFactory(status="ack").pk)
+        with patch("muckrock.foia.signals.schedule_scorecard_refresh") as mock_refresh:
+            # clear the refresh from creating the request
+            self.run_commit_hooks()
+            mock_refresh.reset_mock()
+            foia.title = "New title"
+            foia.save()
+            self.run_commit_hooks()
+            mock_refresh.assert_not_called()
+            foia.status = "done"
+            foia.save()
+            self.run_commit_hooks()
+            mock_refresh.assert_called_once_with(foia.agency_id)
+
+    @override_settings(
+        CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+            "lock": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        }
+    )
+    def test_followup_chunk_claims(self):
+        """A request should only be followed up on once per run"""
+        foia = FOIARequestFactory(status="processed", date_followup=date.today())
+        other_foia = FOIARequestFactory(status="done")
+        num_comms = foia.communications.count()
+        followup_chunk("run", [foia.pk, other_foia.pk])
+        nose.tools.eq_(foia.communications.count(), num_comms + 1)
+        # even if the request still needs a follow up, it has been claimed
+        FOIARequest.objects.filter(pk=foia.pk).update(date_followup=date.today())
+        followup_chunk("run", [foia.pk])
+        nose.tools.eq_(foia.communications.count(), num_comms + 1)
+        # a new run may follow up again
+        followup_chunk("next run", [foia.pk])
+        nose.tools.eq_(foia.communications.count(), num_comms + 2)
+
+    @override_settings(
+        CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+            "lock": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        }
+    )
+    def test_followup_chunk_errors(self):
+        """Delivery errors are counted as failures and the request may be
+        retried, while unexpected errors are raised"""
+        foia = FOIARequestFactory(status="processed", date_followup=date.today())
+        with patch.object(FOIARequest, "followup", side_effect=AnymailError("Bad")):
+            followup_chunk("run", [foia.pk])
+        num_comms = foia.communications.count()
+        followup_chunk("run", [foia.pk])
+        nose.tools.eq_(foia.communications.count(), num_comms + 1)
+
+        FOIARequest.objects.filter(pk=foia.pk).update(date_followup=date.today())
+        with patch.object(FOIARequest, "followup", side_effect=TypeError("Bug")):
+            with nose.tools.assert_raises(TypeError):
+                followup_chunk("next run", [foia.pk])
+
     def test_manager_get_done(self):
         """Test the FOIA Manager's get_done method"""
 
@@ -611,7 +674,7 @@ class TestRequestSharing(TestCase):
         nose.tools.assert_true(self.foia.has_perm(self.creator, "view"))
 
 
-class TestFOIANotification(TestCase):
+class TestFOIANotification(RunCommitHooksMixin, TestCase):
     """The request should always notify its owner,
     but only notify followers if its not embargoed."""
 
@@ -725,3 +788,27 @@ class TestFOIANotification(TestCase):
             unread_count + 2,
             "The user should have two unread notifications.",
         )
+
+    @override_settings(NOTIFICATION_ASYNC_THRESHOLD=0)
+    def test_followers_notified_in_background(self):
+        """Followers of popular requests should be notified in the background"""
+        self.request.notify(self.action)
+        eq_(self.owner.notifications.count(), 1)
+        eq_(self.follower.notifications.count(), 0)
+        self.run_commit_hooks()
+        eq_(self.follower.notifications.count(), 1)
+
+    def test_fan_out_order(self):
+        """Fanning out an older action after a newer one should leave the
+        newer notification unread"""
+        newer_action = new_action(self.request.agency, "completed", target=self.request)
+        Notification.objects.fan_out(self.request, newer_action, [self.follower.pk])
+        Notification.objects.fan_out(self.request, self.action, [self.follower.pk])
+        eq_(
+            list(
+                self.follower.notifications.get_unread().values_list(
+                    "action", flat=True
+                )
+            ),
+            [newer_action.pk],
+        )
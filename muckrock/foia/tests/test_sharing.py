@@ -6,11 +6,13 @@ Tests sharing a FOIA request with other users
 from django.test import TestCase
 
 # Third Party
-from nose.tools import assert_false, assert_true, ok_
+from nose.tools import assert_false, assert_true, eq_, ok_
 
 # MuckRock
 from muckrock.core.factories import UserFactory
 from muckrock.foia.factories import FOIARequestFactory
+from muckrock.foia.models import FOIARequest
+from muckrock.foia.rules import preload_permissions
 from muckrock.organization.factories import MembershipFactory, OrganizationFactory
 
 
@@ -129,3 +131,30 @@ class TestRequestSharing(TestCase):
         assert_true(self.foia.has_perm(user, "view"))
         # non-org member still cannot view it
         assert_false(self.foia.has_perm(self.editor, "view"))
+
+    def test_permission_queries(self):
+        """A user's relationships to a request should only be loaded once"""
+        self.foia.add_viewer(self.editor)
+        ok_(self.foia.has_perm(self.editor, "view"))
+        with self.assertNumQueries(0):
+            ok_(self.foia.has_perm(self.editor, "view"))
+            assert_false(self.foia.has_perm(self.editor, "change"))
+            assert_false(self.foia.has_perm(self.editor, "thank"))
+
+    def test_preload_permissions(self):
+        """Permissions for many requests should be checked in a constant
+        number of queries"""
+        foias = FOIARequestFactory.create_batch(3, embargo=True)
+        foias[0].add_editor(self.editor)
+        foias = list(
+            FOIARequest.objects.filter(pk__in=[f.pk for f in foias])
+            .select_related("composer__user__profile", "agency")
+            .order_by("pk")
+        )
+        with self.assertNumQueries(2):
+            preload_permissions(self.editor, foias)
+        with self.assertNumQueries(0):
+            eq_(
+                [f.has_perm(self.editor, "change") for f in foias],
+                [True, False, False],
+            )
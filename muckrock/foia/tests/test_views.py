@@ -8,14 +8,16 @@ Tests for the FOIA views
 from django.contrib.auth.models import AnonymousUser, User
 from django.http.request import QueryDict
 from django.http.response import Http404
-from django.test import RequestFactory, TestCase
+from django.test import RequestFactory, TestCase, override_settings
 from django.urls import resolve, reverse
 from django.utils import timezone
 
 # Standard Library
 import datetime
+import json
 from datetime import date, timedelta
 from operator import attrgetter
+from urllib.parse import quote
 
 # Third Party
 import nose.tools
@@ -26,6 +28,7 @@ from nose.tools import (
     assert_in,
     assert_is_none,
     assert_not_in,
+    assert_raises,
     assert_true,
     eq_,
     ok_,
@@ -41,7 +44,12 @@ from muckrock.core.factories import (
     ProjectFactory,
     UserFactory,
 )
-from muckrock.core.test_utils import http_post_response, mock_middleware, mock_squarelet
+from muckrock.core.test_utils import (
+    http_get_response,
+    http_post_response,
+    mock_middleware,
+    mock_squarelet,
+)
 from muckrock.core.tests import get_404, get_allowed
 from muckrock.crowdfund.models import Crowdfund
 from muckrock.foia.factories import (
@@ -58,6 +66,7 @@ from muckrock.foia.views import (
     FollowingRequestList,
     MyRequestList,
     RequestList,
+    Thread,
     UpdateComposer,
     autosave,
     crowdfund_request,
@@ -351,6 +360,75 @@ class TestRequestDetailView(TestCase):
         response_task.refresh_from_db()
         ok_(response_task.resolved)
 
+    @override_settings(FOIA_THREAD_PAGE_SIZE=2)
+    def test_thread(self):
+        """Only the latest communications should be shown, with older
+        communications loaded on demand"""
+        now = timezone.now()
+        comms = [
+            FOIACommunicationFactory(foia=self.foia, datetime=now - timedelta(i))
+            for i in range(3)
+        ]
+        response = http_get_response(self.url, self.view, self.foia.user, **self.kwargs)
+        eq_(response.status_code, 200)
+        eq_(response.context_data["thread_count"], 3)
+        eq_(
+            [c for _, c in response.context_data["communications"]],
+            [comms[1], comms[0]],
+        )
+        cursor = response.context_data["thread_cursor"]
+        response = http_get_response(
+            "{}thread/?cursor={}".format(self.url, quote(cursor)),
+            Thread.as_view(),
+            self.foia.user,
+            **self.kwargs,
+        )
+        eq_(response.status_code, 200)
+        data = json.loads(response.content)
+        assert_is_none(data["cursor"])
+        assert_in(comms[2].anchor(), data["html"])
+
+    @override_settings(FOIA_THREAD_PAGE_SIZE=2)
+    def test_thread_linked(self):
+        """Older communications should be loaded back to a linked
+        communication"""
+        now = timezone.now()
+        comms = [
+            FOIACommunicationFactory(foia=self.foia, datetime=now - timedelta(i))
+            for i in range(6)
+        ]
+        response = http_get_response(self.url, self.view, self.foia.user, **self.kwargs)
+        cursor = response.context_data["thread_cursor"]
+        response = http_get_response(
+            "{}thread/?cursor={}&comm={}".format(self.url, quote(cursor), comms[4].pk),
+            Thread.as_view(),
+            self.foia.user,
+            **self.kwargs,
+        )
+        eq_(response.status_code, 200)
+        data = json.loads(response.content)
+        for comm in comms[2:5]:
+            assert_in(comm.anchor(), data["html"])
+        assert_not_in(comms[5].anchor(), data["html"])
+        ok_(data["cursor"])
+
+    def test_thread_access_key(self):
+        """Older communications of an embargoed request should load for
+        someone with the access key"""
+        self.foia.embargo = True
+        self.foia.save()
+        key = self.foia.generate_access_key()
+        comm = FOIACommunicationFactory(foia=self.foia)
+        cursor = "{},{}".format((comm.datetime + timedelta(1)).isoformat(), comm.pk + 1)
+        url = "{}thread/?cursor={}".format(self.url, quote(cursor))
+        with assert_raises(Http404):
+            http_get_response(url, Thread.as_view(), **self.kwargs)
+        response = http_get_response(
+            "{}&key={}".format(url, key), Thread.as_view(), **self.kwargs
+        )
+        eq_(response.status_code, 200)
+        assert_in(comm.anchor(), json.loads(response.content)["html"])
+
 
 class TestFollowingRequestList(TestCase):
     """Test to make sure following request list shows correct requests"""
@@ -375,6 +453,24 @@ class TestFollowingRequestList(TestCase):
         for foia in (foias[0], foias[4], foias[6]):
             nose.tools.assert_in(foia, response.context_data["object_list"])
 
+    def test_rebuild_queryset(self):
+        """The list should be rebuilt from its query parameters outside of a
+        request, as done for exports"""
+        user = UserFactory()
+        done = FOIARequestFactory.create_batch(3, status="done")
+        FOIARequestFactory(status="processed")
+        FOIARequestFactory(status="done", embargo=True)
+        for foia in done[:2]:
+            follow(user, foia)
+        eq_(
+            set(RequestList.rebuild_queryset(user, "status=done")),
+            set(done),
+        )
+        eq_(
+            set(FollowingRequestList.rebuild_queryset(user, "status=done")),
+            set(done[:2]),
+        )
+
 
 class TestBulkActions(TestCase):
     """Test the bulk actions on the list views"""
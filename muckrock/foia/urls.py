@@ -79,6 +79,7 @@ urlpatterns = [
     re_path(
         r"^%s/files/$" % foia_url, views.FOIAFileListView.as_view(), name="foia-files"
     ),
+    re_path(r"^%s/thread/$" % foia_url, views.Thread.as_view(), name="foia-thread"),
     re_path(r"^%s/follow/$" % foia_url, views.follow, name="foia-follow"),
     re_path(r"^%s/embargo/$" % foia_url, views.embargo, name="foia-embargo"),
     re_path(
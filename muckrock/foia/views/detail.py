@@ -7,11 +7,13 @@ from celery import current_app
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.models import User
-from django.db.models import Prefetch
-from django.http import Http404
+from django.db.models import Prefetch, Q
+from django.http import Http404, HttpResponseBadRequest, JsonResponse
 from django.shortcuts import get_object_or_404, redirect
+from django.template.loader import render_to_string
 from django.urls import reverse
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.views.generic import DetailView
 
 # Standard Library
@@ -47,7 +49,6 @@ from muckrock.foia.forms.comms import AgencyPasscodeForm
 from muckrock.foia.models import (
     END_STATUS,
     STATUS,
-    FOIACommunication,
     FOIAComposer,
     FOIAMultiRequest,
     FOIARequest,
@@ -55,7 +56,6 @@ from muckrock.foia.models import (
 from muckrock.foia.tasks import composer_delayed_submit, zip_request
 from muckrock.foia.views import detail_actions
 from muckrock.portal.forms import PortalForm
-from muckrock.tags.models import Tag
 from muckrock.task.models import Task
 
 logger = logging.getLogger(__name__)
@@ -70,6 +70,8 @@ AGENCY_STATUS = [
     ("partial", "Partially Completed"),
 ]
 
+STATUS_CHOICES = [(k, v) for (k, v) in STATUS if k != "submitted"]
+
 
 class Detail(DetailView):
     """Details of a single FOIA request as well
@@ -83,7 +85,8 @@ class Detail(DetailView):
         self.agency_reply_form = FOIAAgencyReplyForm()
         self.agency_passcode_form = None
         self.admin_fix_form = None
-        self.resend_forms = None
+        # resend forms with errors, by communication
+        self.resend_forms = {}
         self.fee_form = None
         self.valid_passcode = False
         super().__init__(*args, **kwargs)
@@ -100,9 +103,6 @@ class Detail(DetailView):
                 "other_emails": self.foia.cc_emails.all(),
             },
         )
-        self.resend_forms = {
-            c.pk: ResendForm(prefix=str(c.pk)) for c in self.foia.communications.all()
-        }
         self.fee_form = RequestFeeForm(
             user=self.request.user, initial={"amount": self.foia.get_stripe_amount()}
         )
@@ -142,22 +142,6 @@ class Detail(DetailView):
             ).prefetch_related(
                 "tracking_ids",
                 "cc_emails",
-                Prefetch(
-                    "communications",
-                    FOIACommunication.objects.select_related(
-                        "from_user__profile__agency"
-                    ).preload_list(),
-                ),
-                Prefetch(
-                    "communications__faxes",
-                    FaxCommunication.objects.order_by("-sent_datetime"),
-                    to_attr="reverse_faxes",
-                ),
-                Prefetch(
-                    "communications__emails",
-                    EmailCommunication.objects.exclude(rawemail=None),
-                    to_attr="raw_emails",
-                ),
             ),
             agency__jurisdiction__slug=self.kwargs["jurisdiction"],
             agency__jurisdiction__pk=self.kwargs["jidx"],
@@ -245,11 +229,10 @@ class Detail(DetailView):
             )
         context["note_form"] = FOIANoteForm()
         context["portal_form"] = PortalForm(foia=self.foia)
-        context["resend_forms"] = self.resend_forms
         context["tracking_id_form"] = TrackingNumberForm()
 
         # this data used in a form
-        context["status_choices"] = [(k, v) for (k, v) in STATUS if k != "submitted"]
+        context["status_choices"] = STATUS_CHOICES
         context["user_actions"] = self.foia.user_actions(
             self.request.user, context["is_agency_user"]
         )
@@ -270,16 +253,12 @@ class Detail(DetailView):
 
     def _get_obj_context_data(self, context):
         """Get context data about related objects"""
-        context["all_tags"] = Tag.objects.all()
         context["cc_emails"] = json.dumps([str(e) for e in self.foia.cc_emails.all()])
         context["files"] = self.foia.get_files().select_related("comm__foia")[:50]
         context["download_files"] = self.foia.communications.filter(
             download=True
         ).exists()
 
-        communications = [
-            (c.datetime, "communication", c) for c in self.foia.communications.all()
-        ]
         notes = [
             (n.datetime, "note", n)
             for n in self.foia.notes.select_related("author").all()
@@ -290,10 +269,112 @@ class Detail(DetailView):
             .select_related("user__profile")
             .prefetch_related("communication__mails__events")
         ]
+        context["notes"] = [(t, v) for _, t, v in merge(notes, checks)]
+        context["thread_count"] = self.foia.communications.count() + len(
+            context["notes"]
+        )
+        self._get_thread_context_data(context, notes=notes, checks=checks)
+
+    def _get_thread_context_data(
+        self, context, cursor=None, notes=None, checks=None, until=None
+    ):
+        """Get context data for a window of the communication thread
+
+        Only the latest communications before the cursor, or the latest
+        communications overall if there is no cursor, are loaded, along with
+        the notes and checks made between them.  If the primary key of a
+        communication is given as until, the window is extended back to
+        include it, so that links to older communications can be followed.
+        Pass in the notes and checks as (datetime, type, object) tuples if
+        they have already been loaded.
+        """
+        size = settings.FOIA_THREAD_PAGE_SIZE
+        communications = (
+            self.foia.communications.select_related("from_user__profile__agency")
+            .prefetch_related(
+                Prefetch(
+                    "faxes",
+                    FaxCommunication.objects.order_by("-sent_datetime"),
+                    to_attr="reverse_faxes",
+                ),
+                Prefetch(
+                    "emails",
+                    EmailCommunication.objects.exclude(rawemail=None),
+                    to_attr="raw_emails",
+                ),
+            )
+            .preload_list()
+            .order_by("-datetime", "-pk")
+        )
+        if cursor is not None:
+            datetime_, pk = cursor
+            communications = communications.filter(
+                Q(datetime__lt=datetime_) | Q(datetime=datetime_, pk__lt=pk)
+            )
+        if until is not None:
+            target = (
+                self.foia.communications.filter(pk=until)
+                .values_list("datetime", "pk")
+                .first()
+            )
+            if target is not None:
+                size = max(
+                    size,
+                    communications.filter(
+                        Q(datetime__gt=target[0])
+                        | Q(datetime=target[0], pk__gte=target[1])
+                    ).count(),
+                )
+        # fetch one extra to see if there are any older communications
+        window = list(communications[: size + 1])
+        more = len(window) > size
+        window = window[:size][::-1]
+
+        # the window starts at the oldest communication loaded, unless there
+        # are no older communications, and ends at the cursor
+        start = window[0].datetime if more else None
+        end = cursor[0] if cursor is not None else None
+
+        def in_window(datetime_):
+            return (start is None or datetime_ >= start) and (
+                end is None or datetime_ < end
+            )
+
+        if notes is None:
+            notes = []
+            if context["user_can_edit"]:
+                notes = [
+                    (n.datetime, "note", n)
+                    for n in self.foia.notes.select_related("author").filter(
+                        datetime__lt=end
+                    )
+                ]
+        if checks is None:
+            checks = [
+                (c.created_datetime, "check", c)
+                for c in Check.objects.filter(
+                    communication__foia=self.foia, created_datetime__lt=end
+                )
+                .select_related("user__profile")
+                .prefetch_related("communication__mails__events")
+            ]
+        communications = [(c.datetime, "communication", c) for c in window]
         context["communications"] = [
-            (t, v) for _, t, v in merge(communications, notes, checks)
+            (t, v)
+            for d, t, v in merge(communications, notes, checks)
+            if t == "communication" or in_window(d)
         ]
-        context["notes"] = [(t, v) for _, t, v in merge(notes, checks)]
+        if more:
+            context["thread_cursor"] = "{},{}".format(
+                window[0].datetime.isoformat(), window[0].pk
+            )
+        else:
+            context["thread_cursor"] = None
+        if self.request.user.is_staff:
+            context["resend_forms"] = {
+                c.pk: self.resend_forms.get(c.pk) or ResendForm(prefix=str(c.pk))
+                for c in window
+            }
 
     def _get_date_context_data(self, context):
         """Get context data about dates"""
@@ -402,6 +483,47 @@ class Detail(DetailView):
         return redirect(self.foia.get_absolute_url() + "#")
 
 
+class Thread(Detail):
+    """Older entries of a request's communication thread, loaded on demand
+    from the detail page"""
+
+    http_method_names = ["get"]
+
+    def dispatch(self, request, *args, **kwargs):
+        """Skip setting up the forms used by the detail page"""
+        # pylint: disable=bad-super-call
+        self.foia = self.get_object()
+        return super(Detail, self).dispatch(request, *args, **kwargs)
+
+    def get(self, request, *args, **kwargs):
+        """Render the thread entries before the cursor, going back as far as
+        the requested communication"""
+        datetime_, _, pk = request.GET.get("cursor", "").rpartition(",")
+        try:
+            cursor = (parse_datetime(datetime_), int(pk))
+        except ValueError:
+            cursor = (None, None)
+        if cursor[0] is None:
+            return HttpResponseBadRequest()
+        try:
+            until = int(request.GET["comm"])
+        except (KeyError, ValueError):
+            until = None
+
+        context = {"foia": self.foia, "status_choices": STATUS_CHOICES}
+        self._get_agency_context_data(context)
+        self._get_permission_context_data(context)
+        self._get_thread_context_data(context, cursor, until=until)
+        return JsonResponse(
+            {
+                "html": render_to_string(
+                    "foia/detail/thread.html", context, request=request
+                ),
+                "cursor": context["thread_cursor"],
+            }
+        )
+
+
 class MultiDetail(DetailView):
     """Detail view for multi requests"""
 
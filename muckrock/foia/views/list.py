@@ -23,9 +23,10 @@ from furl import furl
 # MuckRock
 from muckrock.agency.models import Agency
 from muckrock.core.forms import TagManagerForm
+from muckrock.core.tasks import queue_export
 from muckrock.core.views import MRListView, MRSearchFilterListView, class_view_decorator
 from muckrock.crowdsource.forms import CrowdsourceChoiceForm
-from muckrock.crowdsource.tasks import datum_per_page
+from muckrock.crowdsource.tasks import start_documentcloud_import
 from muckrock.foia.filters import (
     AgencyFOIARequestFilterSet,
     FOIARequestFilterSet,
@@ -45,8 +46,12 @@ from muckrock.foia.models import (
     FOIARequest,
     FOIASavedSearch,
 )
-from muckrock.foia.rules import can_embargo, can_embargo_permananently
-from muckrock.foia.tasks import export_csv
+from muckrock.foia.rules import (
+    can_embargo,
+    can_embargo_permananently,
+    preload_permissions,
+)
+from muckrock.foia.tasks import export_requests_csv
 from muckrock.news.models import Article
 from muckrock.project.forms import ProjectManagerForm
 from muckrock.project.models import Project
@@ -192,14 +197,23 @@ class RequestList(MRSearchFilterListView):
         wants_csv = self.request.GET.get("content_type") == "csv"
         has_perm = self.request.user.has_perm("foia.export_csv")
         if wants_csv and has_perm:
-            export_csv.delay(
-                list(context["paginator"].object_list.values_list("pk", flat=True)),
+            # send the list's filters instead of its results, so the task
+            # message stays small no matter how many requests are exported
+            params = self.request.GET.copy()
+            params.pop("content_type")
+            export_id = queue_export(self.request.user, f"{self.title} CSV")
+            export_requests_csv.delay(
+                f"{type(self).__module__}.{type(self).__qualname__}",
+                params.urlencode(),
+                self.kwargs,
                 self.request.user.pk,
+                export_id,
             )
             messages.info(
                 self.request,
                 "Your CSV is being processed.  It will be emailed to you when "
-                "it is ready.",
+                "it is ready, and you can follow its progress on your "
+                '<a href="%s">exports page</a>.' % reverse("acct-exports"),
             )
 
         return super().render_to_response(context, **kwargs)
@@ -242,6 +256,14 @@ class RequestList(MRSearchFilterListView):
             actions["change-owner"] = self._change_owner
         return actions
 
+    def _filter_perm(self, foias, user, perm):
+        """Filter the requests to those the user has the given permission for,
+        checking the permissions for all of them in a constant number of
+        queries"""
+        foias = list(foias.select_related("composer__user__profile", "agency"))
+        preload_permissions(user, foias)
+        return [f for f in foias if f.has_perm(user, perm)]
+
     def _delete(self, request):
         """Delete a saved search"""
         try:
@@ -293,7 +315,7 @@ class RequestList(MRSearchFilterListView):
     def _crowdsource_base(self, foias, user, post, split):
         """Helper function for both crowdsource actions"""
         foias = foias.prefetch_related("communications__files")
-        foias = [f for f in foias if f.has_perm(user, "view")]
+        foias = self._filter_perm(foias, user, "view")
         form = CrowdsourceChoiceForm(post, user=user)
         if form.is_valid():
             crowdsource = form.cleaned_data["crowdsource"]
@@ -303,7 +325,9 @@ class RequestList(MRSearchFilterListView):
                 for comm in foia.communications.all():
                     for file_ in comm.files.all():
                         if file_.doc_id and split:
-                            datum_per_page.delay(crowdsource.pk, file_.doc_id, {})
+                            start_documentcloud_import(
+                                crowdsource, {}, True, document_id=file_.doc_id
+                            )
                         elif file_.doc_id and not split:
                             crowdsource.data.create(
                                 url="https://beta.documentcloud.org/documents/"
@@ -397,7 +421,7 @@ class MyRequestList(RequestList):
     def _extend_embargo(self, foias, user, _post):
         """Extend the embargo on the selected requests"""
         end_date = date.today() + timedelta(30)
-        foias = [f.pk for f in foias if f.has_perm(user, "embargo")]
+        foias = [f.pk for f in self._filter_perm(foias, user, "embargo")]
         FOIARequest.objects.filter(pk__in=foias).update(embargo=True)
         # only set date if in end state
         FOIARequest.objects.filter(pk__in=foias, status__in=END_STATUS).update(
@@ -407,13 +431,13 @@ class MyRequestList(RequestList):
 
     def _remove_embargo(self, foias, user, _post):
         """Remove the embargo on the selected requests"""
-        foias = [f.pk for f in foias if f.has_perm(user, "embargo")]
+        foias = [f.pk for f in self._filter_perm(foias, user, "embargo")]
         FOIARequest.objects.filter(pk__in=foias).update(embargo=False)
         return "Embargoes removed"
 
     def _perm_embargo(self, foias, user, _post):
         """Permanently embargo the selected requests"""
-        foias = [f.pk for f in foias if f.has_perm(user, "embargo_perm")]
+        foias = [f.pk for f in self._filter_perm(foias, user, "embargo_perm")]
         FOIARequest.objects.filter(pk__in=foias).update(embargo=True)
         # only set permanent
         FOIARequest.objects.filter(pk__in=foias, status__in=END_STATUS).update(
@@ -423,7 +447,7 @@ class MyRequestList(RequestList):
 
     def _project(self, foias, user, post):
         """Add the requests to the selected projects"""
-        foias = [f for f in foias if f.has_perm(user, "change")]
+        foias = self._filter_perm(foias, user, "change")
         form = ProjectManagerForm(post, user=user)
         if form.is_valid():
             projects = form.cleaned_data["projects"]
@@ -435,7 +459,7 @@ class MyRequestList(RequestList):
 
     def _tags(self, foias, user, post):
         """Add tags to the selected requests"""
-        foias = [f for f in foias if f.has_perm(user, "change")]
+        foias = self._filter_perm(foias, user, "change")
         tags = [
             Tag.objects.get_or_create(name=normalize(t)) for t in post.getlist("tags")
         ]
@@ -446,7 +470,7 @@ class MyRequestList(RequestList):
 
     def _share(self, foias, user, post):
         """Share the requests with the selected users"""
-        foias = [f for f in foias if f.has_perm(user, "change")]
+        foias = self._filter_perm(foias, user, "change")
         form = FOIAAccessForm(post)
         if form.is_valid():
             access = form.cleaned_data["access"]
@@ -473,7 +497,7 @@ class MyRequestList(RequestList):
 
     def _autofollowup(self, foias, user, disable):
         """Set autofollowups"""
-        foias = [f.pk for f in foias if f.has_perm(user, "change")]
+        foias = [f.pk for f in self._filter_perm(foias, user, "change")]
         FOIARequest.objects.filter(pk__in=foias).update(disable_autofollowups=disable)
         action = "disabled" if disable else "enabled"
         return "Autofollowups {}".format(action)
@@ -7,10 +7,12 @@ from django import forms
 from django.conf import settings
 from django.core.files.base import ContentFile
 from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
 from django.template.defaultfilters import slugify
 from django.utils import timezone
 
 # Standard Library
+import json
 import logging
 
 # Third Party
@@ -20,11 +22,18 @@ import requests
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import decorators, status as http_status, viewsets
 from rest_framework.filters import SearchFilter
-from rest_framework.permissions import DjangoModelPermissions, IsAuthenticated
+from rest_framework.permissions import (
+    SAFE_METHODS,
+    DjangoModelPermissions,
+    IsAuthenticated,
+)
 from rest_framework.response import Response
+from rest_framework.throttling import ScopedRateThrottle
+from rest_framework.utils.encoders import JSONEncoder
 
 # MuckRock
 from muckrock.agency.models import Agency
+from muckrock.core.utils import keyset_chunks
 from muckrock.foia.exceptions import InsufficientRequestsError
 from muckrock.foia.models import FOIACommunication, FOIAComposer, FOIARequest
 from muckrock.foia.serializers import (
@@ -49,6 +58,11 @@ class FOIARequestViewSet(viewsets.ModelViewSet):
     * jurisdiction, by id
     * agency, by id
     * tags, by name
+
+    Lists leave out communications and notes unless they are given in
+    `expand`, and `fields` limits the fields returned.  `bulk` streams every
+    matching request as newline delimited JSON, for logged in users, with a
+    limited number of exports per user.
     """
 
     serializer_class = FOIARequestSerializer
@@ -102,28 +116,88 @@ class FOIARequestViewSet(viewsets.ModelViewSet):
 
     filterset_class = Filter
 
+    def get_fields(self):
+        """The fields to serialize, as given by the `fields` parameter, or all
+        of them.  Lists leave out the connected models unless they are named in
+        the `expand` parameter.  Returns None to serialize every field."""
+        if self.request.method not in SAFE_METHODS:
+            return None
+        fields = self.request.query_params.get("fields")
+        if fields:
+            fields = {f.strip() for f in fields.split(",")}
+        elif self.detail:
+            return None
+        else:
+            fields = set(FOIARequestSerializer.Meta.fields) - set(
+                FOIARequestSerializer.expandable_fields
+            )
+        expand = self.request.query_params.get("expand")
+        if expand:
+            fields |= {f.strip() for f in expand.split(",")} & set(
+                FOIARequestSerializer.expandable_fields
+            )
+        return fields
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["fields"] = self.get_fields()
+        return context
+
     def get_queryset(self):
-        return (
-            FOIARequest.objects.get_viewable(self.request.user)
-            .select_related("composer__user", "agency__jurisdiction")
-            .prefetch_related(
+        fields = self.get_fields()
+        if fields is None:
+            fields = FOIARequestSerializer.Meta.fields
+        queryset = FOIARequest.objects.get_viewable(self.request.user).select_related(
+            "composer__user", "agency__jurisdiction"
+        )
+        # only load the related objects needed for the requested fields
+        if "communications" in fields:
+            queryset = queryset.prefetch_related(
                 "communications__files",
                 "communications__emails",
                 "communications__faxes",
                 "communications__mails",
                 "communications__web_comms",
                 "communications__portals",
-                "notes",
-                "tags",
-                "edit_collaborators",
-                "read_collaborators",
-                "tracking_ids",
                 Prefetch(
                     "communications__responsetask_set",
                     queryset=ResponseTask.objects.select_related("resolved_by"),
                 ),
             )
-        )
+        if "notes" in fields:
+            queryset = queryset.prefetch_related("notes")
+        if "tags" in fields:
+            queryset = queryset.prefetch_related("tags")
+        if "tracking_id" in fields:
+            queryset = queryset.prefetch_related("tracking_ids")
+        if self.detail:
+            queryset = queryset.prefetch_related(
+                "edit_collaborators", "read_collaborators"
+            )
+        return queryset
+
+    @decorators.action(
+        detail=False,
+        permission_classes=(IsAuthenticated,),
+        throttle_classes=(ScopedRateThrottle,),
+        throttle_scope="foia_bulk",
+    )
+    def bulk(self, request):
+        """Stream all of the filtered requests as newline delimited JSON, in
+        order of ID.  Takes the same `fields` and `expand` parameters as the
+        list.  Only available to logged in users, and limited to
+        `API_BULK_THROTTLE_RATE` exports per user."""
+        queryset = self.filter_queryset(self.get_queryset())
+        context = self.get_serializer_context()
+        serializer_class = self.get_serializer_class()
+
+        def lines():
+            for chunk in keyset_chunks(queryset, settings.API_BULK_CHUNK_SIZE):
+                serializer = serializer_class(chunk, many=True, context=context)
+                for data in serializer.data:
+                    yield json.dumps(data, cls=JSONEncoder) + "\n"
+
+        return StreamingHttpResponse(lines(), content_type="application/x-ndjson")
 
     def _validate_create(self, user, data):
         """Do all of the data validation for request creation"""
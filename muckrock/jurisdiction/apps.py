@@ -12,10 +12,14 @@ class JurisdictionConfig(AppConfig):
     name = "muckrock.jurisdiction"
 
     def ready(self):
-        """Registers exemptions with watson"""
-        # pylint: disable=invalid-name, import-outside-toplevel
+        """Registers exemptions with watson, and connects signals to reload
+        the jurisdiction names"""
+        # pylint: disable=invalid-name, import-outside-toplevel, unused-import
         # Third Party
         from watson import search
 
+        # MuckRock
+        import muckrock.jurisdiction.signals
+
         Exemption = self.get_model("Exemption")
         search.register(Exemption)
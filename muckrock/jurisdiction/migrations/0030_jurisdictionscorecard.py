@@ -0,0 +1,46 @@
+# Generated by Django 4.2 on 2026-10-18 12:00
+
+import datetime
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jurisdiction', '0029_auto_20230117_1623'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JurisdictionScorecard',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('num_requests', models.PositiveIntegerField(default=0)),
+                ('num_submitted', models.PositiveIntegerField(default=0)),
+                ('num_ack', models.PositiveIntegerField(default=0)),
+                ('num_processed', models.PositiveIntegerField(default=0)),
+                ('num_appealing', models.PositiveIntegerField(default=0)),
+                ('num_fix', models.PositiveIntegerField(default=0)),
+                ('num_payment', models.PositiveIntegerField(default=0)),
+                ('num_lawsuit', models.PositiveIntegerField(default=0)),
+                ('num_rejected', models.PositiveIntegerField(default=0)),
+                ('num_no_docs', models.PositiveIntegerField(default=0)),
+                ('num_done', models.PositiveIntegerField(default=0)),
+                ('num_partial', models.PositiveIntegerField(default=0)),
+                ('num_abandoned', models.PositiveIntegerField(default=0)),
+                ('num_overdue', models.PositiveIntegerField(default=0)),
+                ('num_succeeded', models.PositiveIntegerField(default=0, help_text='Completed or partially completed with a date done')),
+                ('num_fees', models.PositiveIntegerField(default=0)),
+                ('total_fees', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('num_responded', models.PositiveIntegerField(default=0, help_text='Requests with a submitted and done date')),
+                ('total_response_time', models.DurationField(default=datetime.timedelta)),
+                ('total_pages', models.PositiveIntegerField(default=0)),
+                ('datetime_updated', models.DateTimeField(auto_now=True)),
+                ('jurisdiction', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='scorecard', to='jurisdiction.jurisdiction')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
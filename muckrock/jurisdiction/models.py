@@ -3,6 +3,7 @@ Models for the Jurisdiction application
 """
 # Django
 from django.contrib.auth.models import User
+from django.core.exceptions import ObjectDoesNotExist
 from django.db import models
 from django.db.models import Avg, Count, F, Q, Sum
 from django.db.models.expressions import Value
@@ -10,6 +11,9 @@ from django.db.models.functions import Coalesce
 from django.template.defaultfilters import slugify
 from django.urls import reverse
 
+# Standard Library
+from datetime import timedelta
+
 # Third Party
 from easy_thumbnails.fields import ThumbnailerImageField
 from simple_history.models import HistoricalRecords
@@ -18,7 +22,7 @@ from taggit.managers import TaggableManager
 # MuckRock
 from muckrock.business_days.models import Calendar, Holiday, HolidayCalendar
 from muckrock.core.models import ExtractDay
-from muckrock.foia.models import END_STATUS, FOIARequest
+from muckrock.foia.models import END_STATUS, STATUS, FOIARequest
 from muckrock.tags.models import TaggedItemBase
 
 
@@ -68,6 +72,108 @@ class RequestHelper:
         pages = requests.aggregate(pages=Sum("communications__files__pages"))["pages"]
         return pages if pages else 0
 
+    def get_scorecard(self):
+        """Get the precomputed statistics.  If they have not been calculated yet,
+        they are calculated in the background and an empty scorecard is
+        returned in the meantime."""
+        # pylint: disable=import-outside-toplevel
+        # MuckRock
+        from muckrock.agency.tasks import schedule_scorecard_build
+
+        try:
+            return self.scorecard
+        except ObjectDoesNotExist:
+            schedule_scorecard_build(self)
+            scorecard_class = self._meta.get_field("scorecard").related_model
+            return scorecard_class(**{self._meta.model_name: self})
+
+
+# the statuses with their own count on the scorecards
+SCORECARD_STATUSES = [s for s, _ in STATUS]
+
+
+class Scorecard(models.Model):
+    """Precomputed request statistics
+
+    Only totals are stored, so that scorecards may be added together, and the
+    averages and rates are computed from them.  These are refreshed when a
+    request changes status, and fully rebuilt nightly.  Requests become overdue
+    without being saved, so the overdue count is only updated by the nightly
+    rebuild and may be up to a day behind.
+    """
+
+    num_requests = models.PositiveIntegerField(default=0)
+    num_submitted = models.PositiveIntegerField(default=0)
+    num_ack = models.PositiveIntegerField(default=0)
+    num_processed = models.PositiveIntegerField(default=0)
+    num_appealing = models.PositiveIntegerField(default=0)
+    num_fix = models.PositiveIntegerField(default=0)
+    num_payment = models.PositiveIntegerField(default=0)
+    num_lawsuit = models.PositiveIntegerField(default=0)
+    num_rejected = models.PositiveIntegerField(default=0)
+    num_no_docs = models.PositiveIntegerField(default=0)
+    num_done = models.PositiveIntegerField(default=0)
+    num_partial = models.PositiveIntegerField(default=0)
+    num_abandoned = models.PositiveIntegerField(default=0)
+    num_overdue = models.PositiveIntegerField(default=0)
+    num_succeeded = models.PositiveIntegerField(
+        default=0, help_text="Completed or partially completed with a date done"
+    )
+    num_fees = models.PositiveIntegerField(default=0)
+    total_fees = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    num_responded = models.PositiveIntegerField(
+        default=0, help_text="Requests with a submitted and done date"
+    )
+    total_response_time = models.DurationField(default=timedelta)
+    total_pages = models.PositiveIntegerField(default=0)
+    datetime_updated = models.DateTimeField(auto_now=True)
+
+    # the fields which hold totals that may be summed
+    total_fields = (
+        ["num_requests"]
+        + ["num_%s" % s for s in SCORECARD_STATUSES]
+        + [
+            "num_overdue",
+            "num_succeeded",
+            "num_fees",
+            "total_fees",
+            "num_responded",
+            "total_response_time",
+            "total_pages",
+        ]
+    )
+
+    @property
+    def average_response_time(self):
+        """The average number of days from submission to completion"""
+        if not self.num_responded:
+            return 0
+        return (self.total_response_time / self.num_responded).days
+
+    @property
+    def average_fee(self):
+        """The average fee for requests which have one"""
+        if not self.num_fees:
+            return 0
+        return self.total_fees / self.num_fees
+
+    @property
+    def fee_rate(self):
+        """The percentage of requests which have a fee"""
+        if not self.num_requests:
+            return 0
+        return self.num_fees / self.num_requests * 100
+
+    @property
+    def success_rate(self):
+        """The percentage of requests which are successful"""
+        if not self.num_requests:
+            return 0
+        return self.num_succeeded / self.num_requests * 100
+
+    class Meta:
+        abstract = True
+
 
 class Jurisdiction(models.Model, RequestHelper):
     """A jursidiction that you may file FOIA requests in"""
@@ -237,6 +343,18 @@ class Jurisdiction(models.Model, RequestHelper):
         unique_together = ("slug", "parent")
 
 
+class JurisdictionScorecard(Scorecard):
+    """Precomputed request statistics for a jurisdiction, including its
+    localities for states"""
+
+    jurisdiction = models.OneToOneField(
+        Jurisdiction, on_delete=models.CASCADE, related_name="scorecard"
+    )
+
+    def __str__(self):
+        return "Scorecard for %s" % self.jurisdiction
+
+
 class Law(models.Model):
     """A law that allows for requests for public records from a jurisdiction."""
 
@@ -0,0 +1,116 @@
+"""
+Cached resolution of jurisdiction names and abbreviations
+
+The names of all states and localities are loaded once per process.  They
+are reloaded when a version key in the default cache changes, which happens
+whenever a jurisdiction is saved, so all processes see the change.
+"""
+
+# Django
+from django.conf import settings
+from django.core.cache import cache
+
+# Standard Library
+import threading
+import time
+import uuid
+
+VERSION_KEY = "jurisdiction:resolver:version"
+
+
+class JurisdictionResolver:
+    """Look up jurisdictions by name without querying the database"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._loaded = 0
+        self.federal = None
+        self.states = None
+        self.localities = None
+        self.popular_localities = None
+
+    def _stale(self, version):
+        return (
+            self.states is None
+            or version != self._version
+            or time.time() - self._loaded > settings.JURISDICTION_RESOLVER_TIMEOUT
+        )
+
+    def load(self):
+        """Load the jurisdictions if they have not been loaded or have changed"""
+        # pylint: disable=import-outside-toplevel
+        # MuckRock
+        from muckrock.jurisdiction.models import Jurisdiction
+
+        version = cache.get(VERSION_KEY)
+        if not self._stale(version):
+            return
+        with self._lock:
+            if not self._stale(version):
+                return
+            federal = None
+            states = {}
+            localities = {}
+            # the most requested locality for each name
+            popular_localities = {}
+            jurisdictions = Jurisdiction.objects.order_by("pk").values_list(
+                "pk", "name", "abbrev", "level", "parent_id", "scorecard__num_requests"
+            )
+            for pk, name, abbrev, level, parent_id, count in jurisdictions:
+                name = name.lower()
+                if level == "f":
+                    federal = pk
+                elif level == "s":
+                    states[name] = pk
+                    if abbrev:
+                        states[abbrev.lower()] = pk
+                elif level == "l":
+                    localities[(name, parent_id)] = pk
+                    count = count or 0
+                    if name not in popular_localities or (
+                        count > popular_localities[name][0]
+                    ):
+                        popular_localities[name] = (count, pk)
+            self.federal = federal
+            self.states = states
+            self.localities = localities
+            self.popular_localities = {
+                name: pk for name, (_, pk) in popular_localities.items()
+            }
+            self._version = version
+            self._loaded = time.time()
+
+    def invalidate(self):
+        """Force all processes to reload the jurisdictions"""
+        self.states = None
+        cache.set(VERSION_KEY, uuid.uuid4().hex, None)
+
+    def split(self, query):
+        """Try to pull a jurisdiction out of an agency name, in the form
+        "Agency, Locality, State" or "Agency, State" or "Agency, Locality".
+        Returns the remaining name and the jurisdiction's pk, which defaults to
+        the federal jurisdiction."""
+        self.load()
+        comma_split = query.split(",")
+        if len(comma_split) > 2:
+            # at least 2 commas, assume last 2 parts are locality, state
+            locality, state = [w.strip().lower() for w in comma_split[-2:]]
+            state_pk = self.states.get(state)
+            if (locality, state_pk) in self.localities:
+                return ",".join(comma_split[:-2]), self.localities[(locality, state_pk)]
+        if len(comma_split) > 1:
+            # at least 1 commas, assume the last part is a jurisdiction
+            # first see if it matches a state, if not, try matching a locality
+            state = comma_split[-1].strip().lower()
+            jurisdiction_pk = self.states.get(state) or self.popular_localities.get(
+                state
+            )
+            if jurisdiction_pk is not None:
+                return ",".join(comma_split[:-1]), jurisdiction_pk
+
+        # if all else fails, assume they want a federal agency
+        return query, self.federal
+
+
+jurisdiction_resolver = JurisdictionResolver()
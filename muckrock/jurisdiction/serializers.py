@@ -19,9 +19,11 @@ class JurisdictionSerializer(serializers.ModelSerializer):
         queryset=Jurisdiction.objects.order_by(), style={"base_template": "input.html"}
     )
     absolute_url = serializers.SerializerMethodField()
-    average_response_time = serializers.ReadOnlyField()
-    fee_rate = serializers.ReadOnlyField()
-    success_rate = serializers.ReadOnlyField()
+    average_response_time = serializers.ReadOnlyField(
+        source="get_scorecard.average_response_time"
+    )
+    fee_rate = serializers.ReadOnlyField(source="get_scorecard.fee_rate")
+    success_rate = serializers.ReadOnlyField(source="get_scorecard.success_rate")
 
     class Meta:
         model = Jurisdiction
@@ -0,0 +1,27 @@
+"""Signals for the jurisdiction application"""
+
+# Django
+from django.db.models.signals import post_delete, post_save
+
+# MuckRock
+from muckrock.jurisdiction.models import Jurisdiction
+from muckrock.jurisdiction.resolver import jurisdiction_resolver
+
+# pylint: disable=unused-argument
+
+
+def jurisdiction_changed(sender, **kwargs):
+    """Reload the jurisdiction names when a jurisdiction changes"""
+    jurisdiction_resolver.invalidate()
+
+
+post_save.connect(
+    jurisdiction_changed,
+    sender=Jurisdiction,
+    dispatch_uid="muckrock.jurisdiction.signals.save",
+)
+post_delete.connect(
+    jurisdiction_changed,
+    sender=Jurisdiction,
+    dispatch_uid="muckrock.jurisdiction.signals.delete",
+)
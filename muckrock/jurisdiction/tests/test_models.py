@@ -3,7 +3,7 @@ Tests for Jurisdiction application
 """
 
 # Django
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from django.utils import timezone
 
@@ -11,16 +11,19 @@ from django.utils import timezone
 from datetime import timedelta
 
 # Third Party
-from nose.tools import eq_
+from mock import patch
+from nose.tools import eq_, ok_
 
 # MuckRock
 from muckrock.core.factories import UserFactory
+from muckrock.core.stats import refresh_jurisdiction_scorecards
 from muckrock.foia.factories import (
     FOIACommunicationFactory,
     FOIAFileFactory,
     FOIARequestFactory,
 )
 from muckrock.jurisdiction import factories
+from muckrock.jurisdiction.models import JurisdictionScorecard
 
 
 class TestJurisdictionUnit(TestCase):
@@ -153,6 +156,60 @@ class TestJurisdictionUnit(TestCase):
         eq_(self.local.total_pages(), page_count)
         eq_(self.state.total_pages(), 2 * page_count)
 
+    def test_scorecard(self):
+        """
+        Scorecards should match the live statistics, with states including
+        their local jurisdictions, and be refreshed on request
+        """
+        now = timezone.now()
+        FOIARequestFactory(
+            agency__jurisdiction=self.state,
+            status="done",
+            price=2.00,
+            datetime_done=now,
+            composer__datetime_submitted=now - timedelta(12),
+        )
+        local_foia = FOIARequestFactory(
+            agency__jurisdiction=self.local,
+            status="ack",
+            composer__datetime_submitted=now - timedelta(6),
+        )
+        local_comm = FOIACommunicationFactory(foia=local_foia)
+        local_comm.files.add(FOIAFileFactory(pages=10))
+        refresh_jurisdiction_scorecards([self.state.pk, self.local.pk])
+        for jurisdiction in (self.state, self.local):
+            scorecard = jurisdiction.get_scorecard()
+            eq_(scorecard.num_requests, jurisdiction.get_requests().count())
+            eq_(scorecard.average_response_time, jurisdiction.average_response_time())
+            eq_(scorecard.success_rate, jurisdiction.success_rate())
+            eq_(scorecard.fee_rate, jurisdiction.fee_rate())
+            eq_(scorecard.average_fee, jurisdiction.average_fee())
+            eq_(scorecard.total_pages, jurisdiction.total_pages())
+        eq_(self.state.get_scorecard().num_done, 1)
+        eq_(self.state.get_scorecard().num_ack, 1)
+
+        refresh_jurisdiction_scorecards([self.local.pk])
+        eq_(JurisdictionScorecard.objects.get(jurisdiction=self.local).num_ack, 1)
+
+    @override_settings(
+        CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+            "lock": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        }
+    )
+    @patch("muckrock.agency.tasks.build_scorecard.delay")
+    def test_scorecard_missing(self, mock_build):
+        """A missing scorecard should be built in the background, with an empty
+        scorecard shown until then"""
+        FOIARequestFactory(agency__jurisdiction=self.local, status="done")
+        scorecard = self.local.get_scorecard()
+        ok_(scorecard.pk is None)
+        eq_(scorecard.num_requests, 0)
+        eq_(scorecard.success_rate, 0)
+        # the build is only queued once
+        self.local.get_scorecard()
+        mock_build.assert_called_once_with("jurisdiction", self.local.pk)
+
     def test_get_proxy(self):
         """Test getting the proxy user for a state"""
         eq_(self.state.get_proxy(), None)
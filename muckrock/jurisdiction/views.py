@@ -98,7 +98,7 @@ class JurisdictionExploreView(TemplateView):
         states = {
             state.abbrev: state
             for state in Jurisdiction.objects.filter(level__in=["s", "f"])
-            .select_related("law", "parent")
+            .select_related("law", "parent", "scorecard")
             .annotate(exemption_count=Count("exemptions"))
         }
         state_map = []
@@ -29,7 +29,9 @@ from muckrock.task.serializers import FlaggedTaskSerializer
 class JurisdictionViewSet(ModelViewSet):
     """API views for Jurisdiction"""
 
-    queryset = Jurisdiction.objects.order_by("id").select_related("parent__parent")
+    queryset = Jurisdiction.objects.order_by("id").select_related(
+        "parent__parent", "scorecard"
+    )
     serializer_class = JurisdictionSerializer
     # don't allow ordering by computed fields
     ordering_fields = [
@@ -6,6 +6,17 @@ Admin registration for Tasks
 from django.contrib import admin
 
 # MuckRock
-from muckrock.mailgun.models import WhitelistDomain
+from muckrock.mailgun.models import InboundMessage, WhitelistDomain
+
+
+class InboundMessageAdmin(admin.ModelAdmin):
+    """Inbound message admin"""
+
+    list_display = ("message_id", "ordering_key", "status", "datetime_received")
+    list_filter = ("status",)
+    search_fields = ("message_id", "ordering_key")
+    readonly_fields = ("datetime_received", "datetime_processed")
+
 
 admin.site.register(WhitelistDomain)
+admin.site.register(InboundMessage, InboundMessageAdmin)
@@ -0,0 +1,34 @@
+# Generated by Django 4.2 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mailgun', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InboundMessage',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('message_id', models.CharField(blank=True, max_length=255)),
+                ('ordering_key', models.CharField(db_index=True, help_text='Messages with the same ordering key are processed in the order they were received', max_length=255)),
+                ('post', models.JSONField(help_text='The POST data, as a dictionary of lists')),
+                ('files', models.JSONField(default=list, help_text='The attachments, spooled to storage')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('done', 'Done'), ('error', 'Error')], default='pending', max_length=7)),
+                ('error', models.TextField(blank=True)),
+                ('datetime_received', models.DateTimeField(auto_now_add=True)),
+                ('datetime_processed', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ('datetime_received', 'pk'),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='inboundmessage',
+            constraint=models.UniqueConstraint(condition=models.Q(('message_id', ''), _negated=True), fields=('message_id',), name='unique_inbound_message_id'),
+        ),
+    ]
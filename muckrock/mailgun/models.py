@@ -13,3 +13,40 @@ class WhitelistDomain(models.Model):
 
     def __str__(self):
         return self.domain
+
+
+class InboundMessage(models.Model):
+    """An incoming email from mailgun, stored to be processed asynchronously"""
+
+    message_id = models.CharField(max_length=255, blank=True)
+    ordering_key = models.CharField(
+        max_length=255,
+        db_index=True,
+        help_text="Messages with the same ordering key are processed in the order "
+        "they were received",
+    )
+    post = models.JSONField(help_text="The POST data, as a dictionary of lists")
+    files = models.JSONField(
+        default=list, help_text="The attachments, spooled to storage"
+    )
+    status = models.CharField(
+        max_length=7,
+        choices=(("pending", "Pending"), ("done", "Done"), ("error", "Error")),
+        default="pending",
+    )
+    error = models.TextField(blank=True)
+    datetime_received = models.DateTimeField(auto_now_add=True)
+    datetime_processed = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return "%s (%s)" % (self.message_id or self.pk, self.status)
+
+    class Meta:
+        ordering = ("datetime_received", "pk")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["message_id"],
+                condition=~models.Q(message_id=""),
+                name="unique_inbound_message_id",
+            )
+        ]
@@ -3,15 +3,161 @@ Celery tasks for mail handling
 """
 
 # Django
-from celery.task import task
+from celery.schedules import crontab
+from celery.task import periodic_task, task
+from django.conf import settings
+from django.core.cache import caches
+from django.core.files.base import File
+from django.core.files.storage import default_storage
+from django.db.models import Min
+from django.http.request import QueryDict
+from django.utils import timezone
+from django.utils.datastructures import MultiValueDict
+
+# Standard Library
+import logging
+import sys
+from datetime import timedelta
 
 # MuckRock
+from muckrock.core import metrics
 from muckrock.foia.models import FOIACommunication
 from muckrock.mailgun import utils
+from muckrock.mailgun.models import InboundMessage
+
+logger = logging.getLogger(__name__)
 
+INBOUND_LOCK = "mailgun:inbound:lock:{}"
+INBOUND_SLOT = "mailgun:inbound:slot:{}"
 
-@task(ignore_result=True, name="muckrock.mailgun.tasks.download_links")
+
+@task(
+    ignore_result=True,
+    time_limit=30 * 60,
+    soft_time_limit=29 * 60,
+    name="muckrock.mailgun.tasks.download_links",
+)
 def download_links(comm_pk):
     """Download links from the communication"""
     communication = FOIACommunication.objects.get(pk=comm_pk)
     utils.download_links(communication)
+
+
+@task(
+    ignore_result=True,
+    time_limit=10 * 60,
+    soft_time_limit=570,
+    max_retries=None,
+    name="muckrock.mailgun.tasks.process_inbound",
+)
+def process_inbound(ordering_key):
+    """Process the pending inbound messages with the given ordering key, in the
+    order they were received"""
+    cache = caches["lock"]
+    timeout = process_inbound.time_limit
+
+    # bound the number of messages processed at once across all workers
+    slot = next(
+        (
+            INBOUND_SLOT.format(i)
+            for i in range(settings.MAILGUN_INGEST_CONCURRENCY)
+            if cache.add(INBOUND_SLOT.format(i), True, timeout)
+        ),
+        None,
+    )
+    if slot is None:
+        process_inbound.retry(args=[ordering_key], countdown=30)
+
+    lock = INBOUND_LOCK.format(ordering_key)
+    try:
+        # if another worker is processing messages with this key, it will
+        # process ours after its own, preserving their order
+        if not cache.add(lock, True, timeout):
+            return
+        try:
+            while True:
+                message = InboundMessage.objects.filter(
+                    ordering_key=ordering_key, status="pending"
+                ).first()
+                if message is None:
+                    break
+                _process_message(message)
+        finally:
+            cache.delete(lock)
+    finally:
+        cache.delete(slot)
+
+    # a message may have been ingested after we finished, but before we
+    # released the lock
+    if InboundMessage.objects.filter(
+        ordering_key=ordering_key, status="pending"
+    ).exists():
+        process_inbound.delay(ordering_key)
+
+
+def _process_message(message):
+    """Route a single inbound message"""
+    # pylint: disable=import-outside-toplevel
+    # MuckRock
+    from muckrock.mailgun.views import route_message
+
+    post = QueryDict(mutable=True)
+    for key, values in message.post.items():
+        post.setlist(key, values)
+    files = MultiValueDict()
+    for spool in message.files:
+        file_ = File(default_storage.open(spool["path"]), name=spool["name"])
+        file_.content_type = spool["content_type"]
+        files.appendlist(spool["field"], file_)
+
+    try:
+        route_message(post, files)
+    except Exception as exc:  # pylint: disable=broad-except
+        logger.error(
+            "Error processing inbound message %s: %s",
+            message.pk,
+            exc,
+            exc_info=sys.exc_info(),
+        )
+        message.status = "error"
+        message.error = str(exc)
+        metrics.incr("mailgun.ingest.errors")
+    else:
+        message.status = "done"
+        for spool in message.files:
+            default_storage.delete(spool["path"])
+        metrics.incr("mailgun.ingest.processed")
+    finally:
+        for _, files_ in files.lists():
+            for file_ in files_:
+                file_.close()
+    message.datetime_processed = timezone.now()
+    message.save()
+    metrics.timing(
+        "mailgun.ingest.lag",
+        (message.datetime_processed - message.datetime_received).total_seconds(),
+    )
+
+
+@periodic_task(
+    run_every=crontab(minute="*/5"), name="muckrock.mailgun.tasks.sweep_inbound"
+)
+def sweep_inbound():
+    """Re-queue inbound messages which have been pending for too long, and
+    record the queue depth"""
+    pending = InboundMessage.objects.filter(status="pending")
+    stale = timezone.now() - timedelta(minutes=5)
+    for key in (
+        pending.filter(datetime_received__lt=stale)
+        .order_by()
+        .values_list("ordering_key", flat=True)
+        .distinct()
+    ):
+        process_inbound.delay(key)
+
+    oldest = pending.aggregate(oldest=Min("datetime_received"))["oldest"]
+    metrics.gauge("mailgun.ingest.pending", pending.count())
+    metrics.gauge(
+        "mailgun.ingest.oldest_pending_s",
+        (timezone.now() - oldest).total_seconds() if oldest else 0,
+    )
@@ -6,7 +6,7 @@ Tests for mailgun
 from django.conf import settings
 from django.core import mail
 from django.template.loader import render_to_string
-from django.test import RequestFactory, TestCase
+from django.test import RequestFactory, TestCase, override_settings
 from django.urls import reverse
 
 # Standard Library
@@ -28,6 +28,8 @@ from muckrock.communication.models import EmailAddress, EmailError, EmailOpen
 from muckrock.core.test_utils import RunCommitHooksMixin
 from muckrock.foia.factories import FOIACommunicationFactory, FOIARequestFactory
 from muckrock.foia.models import FOIACommunication
+from muckrock.mailgun.models import InboundMessage
+from muckrock.mailgun.utils import download_links
 from muckrock.mailgun.views import bounces, delivered, opened, route_mailgun
 from muckrock.task.models import OrphanTask
 
@@ -196,6 +198,36 @@ class TestMailgunViewHandleRequest(RunCommitHooksMixin, TestMailgunViews):
             if os.path.exists(file_path):
                 os.remove(file_path)
 
+    @override_settings(
+        MAILGUN_ASYNC_INGEST=True,
+        CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+            "lock": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        },
+    )
+    def test_async_ingest(self):
+        """Test storing a message to be processed by a worker"""
+        foia = FOIARequestFactory()
+        to_ = foia.get_request_email()
+        attachment = StringIO("Good file")
+        attachment.name = "data.pdf"
+        self.mailgun_route(to_=to_, text="Async", attachments=[attachment])
+        # mailgun may deliver the same message more than once
+        self.mailgun_route(to_=to_, text="Async")
+        nose.tools.eq_(foia.communications.count(), 0)
+        message = InboundMessage.objects.get()
+        nose.tools.eq_(message.status, "pending")
+        nose.tools.eq_(message.ordering_key, to_.split("@")[0])
+        nose.tools.eq_(len(message.files), 1)
+
+        self.run_commit_hooks()
+        message.refresh_from_db()
+        nose.tools.eq_(message.status, "done")
+        comm = foia.communications.get()
+        nose.tools.ok_(comm.communication.startswith("Async"))
+        nose.tools.eq_(comm.files.count(), 1)
+        comm.files.first().delete()
+
     def test_bad_strip(self):
         """Test an improperly stripped message"""
 
@@ -382,3 +414,46 @@ class TestMailgunViewWebHooks(TestMailgunViews):
             comm.emails.first().confirmed_datetime,
             datetime(2017, 1, 2, 17, tzinfo=pytz.utc),
         )
+
+
+class TestDownloadLinks(TestCase):
+    """Tests for downloading files from links in incoming mail"""
+
+    @override_settings(
+        DOWNLOAD_LINK_MAX_SIZE=20,
+        CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+            "lock": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        },
+    )
+    @requests_mock.Mocker()
+    def test_download_links(self, mock_requests):
+        """Links should be downloaded, skipping errors and large files"""
+        comm = FOIACommunicationFactory(
+            communication="https://www.dropbox.com/s/abc/docs.zip?dl=0\n"
+            "https://drive.google.com/file/d/abc123/view?usp=sharing\n"
+            "https://www.dropbox.com/s/def/missing.zip?dl=0\n"
+            "https://www.dropbox.com/s/ghi/large.zip?dl=0\n"
+        )
+        mock_requests.get(
+            "https://www.dropbox.com/s/abc/docs.zip?dl=1",
+            content=b"Dropbox file",
+            headers={"content-disposition": 'attachment; filename="docs.zip"'},
+        )
+        mock_requests.get(
+            "https://drive.google.com/uc?export=download&id=abc123",
+            content=b"Drive file",
+            headers={"content-disposition": 'attachment; filename="drive.pdf"'},
+        )
+        mock_requests.get(
+            "https://www.dropbox.com/s/def/missing.zip?dl=1", status_code=404
+        )
+        mock_requests.get(
+            "https://www.dropbox.com/s/ghi/large.zip?dl=1", content=b"x" * 100
+        )
+        num_files = comm.files.count()
+        download_links(comm)
+        files = comm.files.order_by("pk")[num_files:]
+        nose.tools.eq_(sorted(f.title for f in files), ["docs", "drive"])
+        for file_ in files:
+            file_.delete()
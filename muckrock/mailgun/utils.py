@@ -2,18 +2,51 @@
 Utilities for handling incoming mail
 """
 
+# Django
+from django.conf import settings
+from django.core.files.base import File
+
 # Standard Library
 import cgi
 import logging
+import os.path
 import re
+import resource
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import TemporaryFile
+from urllib.parse import unquote, urlparse
 
 # Third Party
 import requests
+from requests.adapters import HTTPAdapter
+
+# MuckRock
+from muckrock.core import metrics
 
 logger = logging.getLogger(__name__)
 
+CHUNK_SIZE = 1024 * 1024
+
+
+class Downloader:
+    """Download configuration for file sharing links
+
+    Subclasses set a name and a regex to find links, and may override
+    `preprocess` to turn the link into a direct download link
+    """
+
+    name = None
+    p_link = None
+
+    @staticmethod
+    def preprocess(link):
+        """Turn the link into a direct download link"""
+        return link
+
 
-class DropboxDownloader:
+class DropboxDownloader(Downloader):
     """Download configuration for dropbox links"""
 
     name = "DropBox"
@@ -25,25 +58,169 @@ class DropboxDownloader:
         return link.replace("dl=0", "dl=1")
 
 
+class GoogleDriveDownloader(Downloader):
+    """Download configuration for google drive file links"""
+
+    name = "GoogleDrive"
+    p_link = re.compile(
+        r"https://drive.google.com/file/d/[a-zA-Z0-9_-]+[a-zA-Z0-9$_.+!*\'(),;/?:@=&-]*"
+    )
+    p_id = re.compile(r"/file/d/([a-zA-Z0-9_-]+)")
+
+    @classmethod
+    def preprocess(cls, link):
+        """Replace the viewer page with a direct download of the file"""
+        file_id = cls.p_id.search(link).group(1)
+        return "https://drive.google.com/uc?export=download&id={}".format(file_id)
+
+
+class SharePointDownloader(Downloader):
+    """Download configuration for sharepoint and onedrive for business links"""
+
+    name = "SharePoint"
+    p_link = re.compile(
+        r"https://[a-zA-Z0-9-]+\.sharepoint\.com/:[a-z]:/"
+        r"[a-zA-Z0-9$_.+!*\'(),;/?:@=&-]+"
+    )
+
+    @staticmethod
+    def preprocess(link):
+        """Ask for a direct download of the file"""
+        separator = "&" if "?" in link else "?"
+        return "{}{}download=1".format(link, separator)
+
+
+DOWNLOADERS = [DropboxDownloader, GoogleDriveDownloader, SharePointDownloader]
+
+
+class DownloadTooLarge(Exception):
+    """The file being downloaded is larger than the maximum size allowed"""
+
+
+class LinkDownloader:
+    """Stream files from links to temporary files on disk
+
+    A session is kept per host so connections are pooled, and downloads may
+    run concurrently from multiple threads
+    """
+
+    def __init__(self, comm_pk):
+        self.comm_pk = comm_pk
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def get_session(self, link):
+        """Get the session for the link's host"""
+        host = urlparse(link).netloc
+        with self._lock:
+            if host not in self._sessions:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_maxsize=settings.DOWNLOAD_LINK_THREADS)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._sessions[host] = session
+            return self._sessions[host]
+
+    def close(self):
+        """Close all of the sessions"""
+        for session in self._sessions.values():
+            session.close()
+
+    def download(self, downloader, link):
+        """Download a single link, returning the file name and a temporary file
+        holding its contents, or None if it could not be downloaded"""
+        logger.info("[DL:%s] Trying to download %s", self.comm_pk, link)
+        max_size = settings.DOWNLOAD_LINK_MAX_SIZE
+        start = time.time()
+        size = 0
+        tmp_file = TemporaryFile()
+        try:
+            with self.get_session(link).get(
+                link, stream=True, timeout=settings.DOWNLOAD_LINK_TIMEOUT
+            ) as response:
+                response.raise_for_status()
+                if int(response.headers.get("content-length") or 0) > max_size:
+                    raise DownloadTooLarge(response.headers["content-length"])
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > max_size:
+                        raise DownloadTooLarge(size)
+                    tmp_file.write(chunk)
+                name = self.get_name(response, link)
+        except requests.exceptions.RequestException as exc:
+            logger.info("[DL:%s] Error %s", self.comm_pk, exc)
+            metrics.incr("download_links.errors")
+            tmp_file.close()
+            return None
+        except DownloadTooLarge as exc:
+            logger.info(
+                "[DL:%s] %s is larger than the maximum size: %s",
+                self.comm_pk,
+                link,
+                exc,
+            )
+            metrics.incr("download_links.too_large")
+            tmp_file.close()
+            return None
+
+        elapsed = time.time() - start
+        tmp_file.seek(0)
+        self.record(downloader, size, elapsed)
+        return name, tmp_file
+
+    @staticmethod
+    def get_name(response, link):
+        """Get the file name from the content disposition, or from the link"""
+        _, params = cgi.parse_header(response.headers.get("content-disposition", ""))
+        name = params.get("filename")
+        if not name:
+            name = os.path.basename(unquote(urlparse(link).path))
+        return name or "Untitled"
+
+    def record(self, downloader, size, elapsed):
+        """Record metrics for a completed download"""
+        # ru_maxrss is the peak memory for the whole process, in kilobytes
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        bytes_per_s = size / elapsed if elapsed else size
+        logger.info(
+            "[DL:%s] Downloaded %d bytes in %.2fs (%.0f bytes/s, peak RSS %dKB)",
+            self.comm_pk,
+            size,
+            elapsed,
+            bytes_per_s,
+            peak_rss,
+        )
+        metrics.incr("download_links.bytes", size)
+        metrics.timing(f"download_links.{downloader.name}", elapsed)
+        metrics.gauge(f"download_links.{downloader.name}.bytes_per_s", bytes_per_s)
+        metrics.gauge("download_links.peak_rss_kb", peak_rss)
+
+
 def download_links(communication):
     """Download links from the communication"""
-    downloaders = [DropboxDownloader]
     logger.info("Trying to download links for communication %s", communication.pk)
 
-    for downloader in downloaders:
+    links = []
+    for downloader in DOWNLOADERS:
         logger.info("[DL:%s] Looking for %s links", communication.pk, downloader.name)
         for link in downloader.p_link.findall(communication.communication):
-            link = downloader.preprocess(link)
-            logger.info("[DL:%s] Trying to download %s", communication.pk, link)
-            try:
-                response = requests.get(link)
-                response.raise_for_status()
-            except requests.exceptions.RequestException as exc:
-                logger.info("[DL:%s] Error %s", communication.pk, exc)
-            _, params = cgi.parse_header(
-                response.headers.get("content-disposition", "")
+            links.append((downloader, downloader.preprocess(link)))
+    if not links:
+        return
+
+    link_downloader = LinkDownloader(communication.pk)
+    try:
+        with ThreadPoolExecutor(max_workers=settings.DOWNLOAD_LINK_THREADS) as executor:
+            results = list(
+                executor.map(lambda args: link_downloader.download(*args), links)
             )
-            name = params.get("filename", "Untitled")
+    finally:
+        link_downloader.close()
+
+    for result in results:
+        if result is None:
+            continue
+        name, tmp_file = result
+        with tmp_file:
             logger.info("[DL:%s] Saving file %s", communication.pk, name)
-            content = response.content
-            communication.attach_file(content=content, name=name)
+            communication.attach_file(file_=File(tmp_file, name=name), name=name)
@@ -5,8 +5,9 @@ Views for mailgun
 # Django
 from django.conf import settings
 from django.core.cache import cache
+from django.core.files.storage import default_storage
 from django.core.mail import EmailMessage
-from django.db import transaction
+from django.db import IntegrityError, transaction
 from django.http import HttpResponse, HttpResponseForbidden
 from django.template.loader import render_to_string
 from django.urls import reverse
@@ -21,6 +22,7 @@ import logging
 import re
 import sys
 import time
+import uuid
 from datetime import datetime
 from email.utils import getaddresses
 from functools import wraps
@@ -36,9 +38,10 @@ from muckrock.communication.models import (
     FaxError,
     PhoneNumber,
 )
+from muckrock.core import metrics
 from muckrock.foia.models import FOIACommunication, FOIARequest, RawEmail
-from muckrock.foia.tasks import classify_status
-from muckrock.mailgun.tasks import download_links
+from muckrock.mailgun.models import InboundMessage
+from muckrock.mailgun.tasks import download_links, process_inbound
 from muckrock.task.models import (
     FileDownloadLink,
     FlaggedTask,
@@ -165,6 +168,15 @@ def route_mailgun(request):
     """Handle routing of incoming mail with proper header parsing"""
 
     post = request.POST
+    message_id = (
+        post.get("Message-ID") or post.get("Message-Id") or post.get("message-id")
+    )
+    if settings.MAILGUN_ASYNC_INGEST:
+        # store the message and its attachments to be processed by a worker,
+        # so that we can respond to mailgun immediately
+        _ingest(post, request.FILES, message_id)
+        return HttpResponse("OK")
+
     # The way spam hero is currently set up, all emails are sent to the same
     # address, so we must parse to headers to find the recipient.  This can
     # cause duplicate messages if one email is sent to or CC'd to multiple
@@ -173,28 +185,89 @@ def route_mailgun(request):
     # If it exists in the cache, we will stop processing this email.  The
     # ID will be cached for 5 minutes - duplicates should normally be processed
     # within seconds of each other.
-    message_id = (
-        post.get("Message-ID") or post.get("Message-Id") or post.get("message-id")
-    )
     if message_id:
         # cache.add will return False if the key is already present
         if not cache.add(message_id, 1, 300):
             return HttpResponse("OK")
 
-    p_request_email = re.compile(r"(\d+-\d{3,10})@%s" % settings.MAILGUN_SERVER_NAME)
+    route_message(post, request.FILES)
+    return HttpResponse("OK")
+
+
+def _get_recipients(post):
+    """Get the recipients of the message"""
     tos = post.get("To", "") or post.get("to", "")
     ccs = post.get("Cc", "") or post.get("cc", "")
-    name_emails = getaddresses([tos.lower(), ccs.lower()])
+    return getaddresses([tos.lower(), ccs.lower()])
+
+
+def _match_request_email(email):
+    """Match an email address to a request's mail ID"""
+    p_request_email = re.compile(r"(\d+-\d{3,10})@%s" % settings.MAILGUN_SERVER_NAME)
+    return p_request_email.match(email)
+
+
+def route_message(post, files):
+    """Route an incoming message to the requests it was sent to"""
+    name_emails = _get_recipients(post)
+    message_id = (
+        post.get("Message-ID") or post.get("Message-Id") or post.get("message-id")
+    )
     logger.info(
         "Incoming email: %s - %s - %s", name_emails, post.get("Subject", ""), message_id
     )
     for _, email in name_emails:
-        m_request_email = p_request_email.match(email)
+        m_request_email = _match_request_email(email)
         if m_request_email:
-            _handle_request(request, m_request_email.group(1))
+            _handle_request(post, files, m_request_email.group(1))
         elif email.endswith("@%s" % settings.MAILGUN_SERVER_NAME):
-            _catch_all(request, email)
-    return HttpResponse("OK")
+            _catch_all(post, files, email)
+
+
+def _ingest(post, files, message_id):
+    """Persist an incoming message and spool its attachments to storage, and
+    queue it to be processed"""
+    message_id = message_id or ""
+    # mailgun will retry if we are slow to respond, and messages sent to
+    # multiple addresses may be delivered more than once
+    if message_id and InboundMessage.objects.filter(message_id=message_id).exists():
+        return
+    spool_dir = "mailgun_inbound/{}/{}".format(
+        timezone.now().strftime("%Y/%m/%d"), uuid.uuid4().hex
+    )
+    spooled = []
+    for field, files_ in files.lists():
+        for file_ in files_:
+            spooled.append(
+                {
+                    "field": field,
+                    "name": file_.name,
+                    "content_type": file_.content_type,
+                    "path": default_storage.save(
+                        "{}/{}".format(spool_dir, file_.name), file_
+                    ),
+                }
+            )
+    # process messages for the same request in order, other messages may be
+    # processed independently
+    matches = [_match_request_email(email) for _, email in _get_recipients(post)]
+    mail_ids = [m.group(1) for m in matches if m]
+    ordering_key = mail_ids[0] if mail_ids else "message:{}".format(uuid.uuid4().hex)
+    try:
+        with transaction.atomic():
+            InboundMessage.objects.create(
+                message_id=message_id,
+                ordering_key=ordering_key,
+                post=dict(post.lists()),
+                files=spooled,
+            )
+    except IntegrityError:
+        # a duplicate was ingested concurrently
+        for spool in spooled:
+            default_storage.delete(spool["path"])
+        return
+    metrics.incr("mailgun.ingest.received")
+    transaction.on_commit(lambda: process_inbound.delay(ordering_key))
 
 
 def _parse_email_headers(post):
@@ -202,20 +275,16 @@ def _parse_email_headers(post):
     from_ = post.get("From", "")
     to_ = post.get("To") or post.get("to", "")
     cc_ = post.get("Cc") or post.get("cc", "")
-    from_email = EmailAddress.objects.fetch(from_)
-    to_emails = EmailAddress.objects.fetch_many(to_)
-    cc_emails = EmailAddress.objects.fetch_many(cc_)
-    return from_email, to_emails, cc_emails
+    return EmailAddress.objects.fetch_headers(from_, to_, cc_)
 
 
-def _handle_request(request, mail_id):
+def _handle_request(post, files, mail_id):
     """Handle incoming mailgun FOI request messages"""
     # this function needs to be refactored
     # pylint: disable=broad-except
     # pylint: disable=too-many-locals
     # pylint: disable=too-many-branches
     # pylint: disable=too-many-statements
-    post = request.POST
     from_email, to_emails, cc_emails = _parse_email_headers(post)
     subject = post.get("Subject") or post.get("subject", "")
     message_id = (
@@ -227,7 +296,7 @@ def _handle_request(request, mail_id):
 
         # extra logging for next request portals for now
         if foia.portal and foia.portal.type == "nextrequest":
-            _log_mail(request)
+            _log_mail(post)
 
         if foia.deleted:
             if from_email is not None:
@@ -257,7 +326,7 @@ def _handle_request(request, mail_id):
                 subject,
                 message_id,
                 post,
-                request.FILES,
+                files,
                 foia,
             )
             OrphanTask.objects.create(
@@ -292,18 +361,14 @@ def _handle_request(request, mail_id):
             email_comm.to_emails.set(to_emails)
             email_comm.cc_emails.set(cc_emails)
             transaction.on_commit(lambda: RawEmail.objects.make(message_id))
-            comm.process_attachments(request.FILES)
-            transaction.on_commit(lambda: download_links(comm.pk))
+            comm.process_attachments(files)
+            transaction.on_commit(lambda: download_links.delay(comm.pk))
 
             if foia.portal:
                 transaction.on_commit(lambda: foia.portal.receive_msg(comm))
             else:
-                task = comm.responsetask_set.create()
-                transaction.on_commit(
-                    lambda: classify_status.apply_async(
-                        args=(task.pk,), countdown=30 * 60
-                    )
-                )
+                # the status is predicted by classify_pending_statuses
+                comm.responsetask_set.create()
                 comm.create_agency_notifications()
 
         # attempt to autodetect a known portal
@@ -356,7 +421,7 @@ def _handle_request(request, mail_id):
             subject,
             message_id,
             post,
-            request.FILES,
+            files,
             foia,
         )
         OrphanTask.objects.create(reason="ia", communication=comm, address=mail_id)
@@ -367,16 +432,15 @@ def _handle_request(request, mail_id):
         logger.error(
             "Uncaught Mailgun Exception - %s: %s", mail_id, exc, exc_info=sys.exc_info()
         )
-        _forward(post, request.FILES, "Uncaught Mailgun Exception", info=True)
+        _forward(post, files, "Uncaught Mailgun Exception", info=True)
         return HttpResponse("ERROR")
 
     return HttpResponse("OK")
 
 
-def _catch_all(request, address):
+def _catch_all(post, files, address):
     """Handle emails sent to other addresses"""
 
-    post = request.POST
     from_email, to_emails, cc_emails = _parse_email_headers(post)
     subject = post.get("Subject") or post.get("subject", "")
     message_id = (
@@ -396,7 +460,7 @@ def _catch_all(request, address):
             subject,
             message_id,
             post,
-            request.FILES,
+            files,
             foia,
         )
         OrphanTask.objects.create(reason="ia", communication=comm, address=address)
@@ -648,10 +712,10 @@ def _forward(post, files, title="", extra_content="", info=False):
     email.send(fail_silently=False)
 
 
-def _log_mail(request):
+def _log_mail(post):
     """Log a request"""
     body = []
-    for key, value in request.POST.items():
+    for key, value in post.items():
         body.append("\n{}:".format(key))
         body.append(str(value))
     email = EmailMessage(
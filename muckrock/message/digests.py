@@ -4,7 +4,8 @@ Digest objects for the messages app
 
 # Django
 from django.contrib.auth.models import User
-from django.db.models import DurationField, F, Q
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import DurationField, F, Q, prefetch_related_objects
 from django.db.models.functions import Cast, Now
 from django.utils import timezone
 
@@ -12,9 +13,9 @@ from django.utils import timezone
 import logging
 from collections import OrderedDict
 from datetime import date, timedelta
+from functools import lru_cache
 
 # Third Party
-from actstream.models import Action
 from dateutil.relativedelta import relativedelta
 
 # MuckRock
@@ -101,6 +102,138 @@ class Digest(TemplateEmail):
         return self.user
 
 
+# request notifications are classified by a key and a verb phrase to match,
+# e.g. ('no_documents', 'no responsive documents')
+FOIA_CLASSIFIERS = [
+    ("completed", "completed"),
+    ("rejected", "rejected"),
+    ("no_documents", "no responsive documents"),
+    ("require_payment", "payment"),
+    ("require_fix", "require_fix"),
+    ("interim_response", "processing"),
+    ("acknowledged", "acknowledged"),
+    ("received", "sent a communication"),
+]
+# notes are only included for the user's own requests
+OWN_FOIA_CLASSIFIERS = FOIA_CLASSIFIERS + [("note", "added a note")]
+
+
+@lru_cache(maxsize=None)
+def classify_verb(verb, own):
+    """Returns the keys of all classifiers whose phrase is contained in the
+    verb, ignoring case.  There are few distinct verbs, so this is cached."""
+    classifiers = OWN_FOIA_CLASSIFIERS if own else FOIA_CLASSIFIERS
+    verb = verb.lower()
+    return tuple(key for key, phrase in classifiers if phrase in verb)
+
+
+def empty_activity():
+    """Returns the activity for a user with no notifications"""
+    return {
+        "count": 0,
+        "requests": {
+            "count": 0,
+            "mine": dict({key: [] for key, _ in OWN_FOIA_CLASSIFIERS}, count=0),
+            "following": dict({key: [] for key, _ in FOIA_CLASSIFIERS}, count=0),
+        },
+        "questions": {"count": 0, "mine": [], "following": []},
+    }
+
+
+def _object_ids(action, content_type):
+    """The ids of the actor, target and action object of the action which are
+    of the given content type"""
+    return [
+        object_id
+        for content_type_id, object_id in (
+            (action.actor_content_type_id, action.actor_object_id),
+            (action.target_content_type_id, action.target_object_id),
+            (action.action_object_content_type_id, action.action_object_object_id),
+        )
+        if content_type_id == content_type.pk
+    ]
+
+
+def get_activities(user_ids, since):
+    """Returns the classified activity for many users at once, as a dictionary
+    mapping user ids to activity.
+
+    All of the users' unread notifications since the given time are loaded in
+    one query along with their actions.  Notifications are split between
+    objects owned by the user and objects followed by the user, and request
+    notifications are classified by their verb.
+    """
+    models = {"requests": FOIARequest, "questions": Question}
+    content_types = ContentType.objects.get_for_models(*models.values())
+    content_types = {key: content_types[model] for key, model in models.items()}
+    notifications = list(
+        Notification.objects.filter(user__in=user_ids, read=False, datetime__gte=since)
+        .select_related("action")
+        .prefetch_related("action__actor", "action__target", "action__action_object")
+        .order_by("-datetime")
+    )
+
+    # find the owners of all requests and questions in the notifications
+    object_ids = {key: set() for key in models}
+    for notification in notifications:
+        for key, content_type in content_types.items():
+            object_ids[key].update(_object_ids(notification.action, content_type))
+    owners = {
+        "requests": FOIARequest.objects.filter(
+            pk__in=object_ids["requests"]
+        ).values_list("pk", "composer__user_id"),
+        "questions": Question.objects.filter(
+            pk__in=object_ids["questions"]
+        ).values_list("pk", "user_id"),
+    }
+    owners = {
+        key: {str(pk): user_id for pk, user_id in values}
+        for key, values in owners.items()
+    }
+    # the digest shows the requests' agencies, and links to the requests, which
+    # needs their jurisdictions - jurisdiction is a property of the request, so
+    # it is loaded through the agency
+    prefetch_related_objects(
+        [
+            n.action.target
+            for n in notifications
+            if isinstance(n.action.target, FOIARequest)
+        ],
+        "agency__jurisdiction",
+    )
+
+    activities = {user_id: empty_activity() for user_id in user_ids}
+    for notification in notifications:
+        activity = activities[notification.user_id]
+        action = notification.action
+        for key, content_type in content_types.items():
+            ids = _object_ids(action, content_type)
+            if not ids:
+                continue
+            # only public actions count towards the user's own objects
+            own = action.public and any(
+                owners[key].get(i) == notification.user_id for i in ids
+            )
+            group = "mine" if own else "following"
+            if key == "requests":
+                classified = activity["requests"][group]
+                for verb_key in classify_verb(action.verb, own):
+                    classified[verb_key].append(notification)
+                    classified["count"] += 1
+            else:
+                activity["questions"][group].append(notification)
+                activity["questions"]["count"] += 1
+    for activity in activities.values():
+        activity["requests"]["count"] = (
+            activity["requests"]["mine"]["count"]
+            + activity["requests"]["following"]["count"]
+        )
+        activity["count"] = (
+            activity["requests"]["count"] + activity["questions"]["count"]
+        )
+    return activities
+
+
 class ActivityDigest(Digest):
     """
     An ActivityDigest describes a collection of activity over a duration, which
@@ -110,36 +243,23 @@ class ActivityDigest(Digest):
     text_template = "message/digest/digest.txt"
     html_template = "message/digest/digest.html"
 
-    # Here we scaffold out the activity dictionary.
-    # It is scaffolded to prevent key errors when counting
-    # activity, as well as to provide some guidance for
-    # which activities to filter from the global stream.
-
     # Activity is independent from template context because
     # we use activity counts to influence other parts of the
     # email, like the subject line and whether or not to
     # even send the email at all.
 
-    activity = {
-        "count": 0,
-        "requests": {"count": 0, "mine": None, "following": None},
-        "questions": {"count": 0, "mine": None, "following": None},
-    }
-
     # Most of the work re: composing the email takes place
     # at init. This is by design, since digests should require
     # a minimum of configuration outside of their own configuration,
     # which is their responsibility. In other words, a digest really
-    # only needs to know its user.
-
-    # Question: should interval be made into a required init value?
-    # On the one hand, having interval hardcoded into subclasses is
-    # less flexible. On the other, this flexibility might not be required
-    # beyond specifically-defined subclasses.
+    # only needs to know its user.  When sending many digests at once,
+    # the activity may be computed for all of the users together with
+    # `get_activities` and passed in.
 
-    def __init__(self, **kwargs):
+    def __init__(self, activity=None, **kwargs):
         """Initialize the digest with a dynamic subject."""
-        logger.info("Activity digest - creating - User: %s", self.user)
+        logger.info("Activity digest - creating - User: %s", kwargs.get("user"))
+        self.activity = activity
         super().__init__(**kwargs)
         self.subject = self.get_subject()
 
@@ -150,96 +270,13 @@ class ActivityDigest(Digest):
         context["subject"] = self.get_subject()
         return context
 
-    def notifications_for_model(self, notifications, model):
-        """Filter a list of notifications for a specific model,
-        split between objects owned by the user and objects followed by the user."""
-        user = self.get_user()
-        model_notifications = notifications.for_model(model)
-        own_model_actions = Action.objects.owned_by(user, model)
-        own_model_notifications = model_notifications.filter(
-            action__in=own_model_actions
-        )
-        following_model_notifications = model_notifications.exclude(
-            action__in=own_model_actions
-        )
-        return {
-            "count": model_notifications.count(),
-            "mine": own_model_notifications,
-            "following": following_model_notifications,
-        }
-
     def get_activity(self):
-        """Returns a list of activities to be sent in the email"""
-        duration = self.get_duration()
-        user = self.get_user()
-        # get unread notifications for the user that are new since the last email
-        notifications = (
-            Notification.objects.for_user(user)
-            .get_unread()
-            .filter(datetime__gte=duration)
-        )
-        self.activity["requests"] = self.foia_notifications(notifications)
-        self.activity["questions"] = self.notifications_for_model(
-            notifications, Question
-        )
-        self.activity["count"] = (
-            self.activity["requests"]["count"] + self.activity["questions"]["count"]
-        )
+        """Returns the activity to be sent in the email"""
+        if self.activity is None:
+            user = self.get_user()
+            self.activity = get_activities([user.pk], self.get_duration())[user.pk]
         return self.activity
 
-    def foia_notifications(self, notifications):
-        """Do some heavy filtering and classifying of foia notifications."""
-        filtered_notifications = self.notifications_for_model(
-            notifications, FOIARequest
-        )
-        filtered_notifications["mine"] = self.classify_request_notifications(
-            filtered_notifications["mine"],
-            [
-                ("completed", "completed"),
-                ("rejected", "rejected"),
-                ("no_documents", "no responsive documents"),
-                ("require_payment", "payment"),
-                ("require_fix", "require_fix"),
-                ("interim_response", "processing"),
-                ("acknowledged", "acknowledged"),
-                ("received", "sent a communication"),
-                ("note", "added a note"),
-            ],
-        )
-        filtered_notifications["following"] = self.classify_request_notifications(
-            filtered_notifications["following"],
-            [
-                ("completed", "completed"),
-                ("rejected", "rejected"),
-                ("no_documents", "no responsive documents"),
-                ("require_payment", "payment"),
-                ("require_fix", "require_fix"),
-                ("interim_response", "processing"),
-                ("acknowledged", "acknowledged"),
-                ("received", "sent a communication"),
-            ],
-        )
-        filtered_notifications["count"] = (
-            filtered_notifications["mine"]["count"]
-            + filtered_notifications["following"]["count"]
-        )
-        return filtered_notifications
-
-    def classify_request_notifications(self, notifications, classifiers):
-        """Break a single list of notifications into a classified dictionary."""
-        classified = {}
-        # a classifier should be a tuple of a key and a verb phrase to filter by
-        # e.g. ('no_documents', 'no responsive documents')
-        for classifier in classifiers:
-            classified[classifier[0]] = notifications.filter(
-                action__verb__icontains=classifier[1]
-            )
-        activity_count = 0
-        for _, classified_stream in classified.items():
-            activity_count += len(classified_stream)
-        classified["count"] = activity_count
-        return classified
-
     def get_subject(self):
         """Summarizes the activities in the notification."""
         count = self.activity["count"]
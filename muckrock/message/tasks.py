@@ -6,10 +6,15 @@ Tasks for the messages application.
 from celery.exceptions import SoftTimeLimitExceeded
 from celery.schedules import crontab
 from celery.task import periodic_task, task
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.mail import get_connection
+from django.utils import timezone
 
 # Standard Library
 import logging
+import sys
+import time
 from random import randint
 
 # Third Party
@@ -19,6 +24,7 @@ from requests.exceptions import RequestException
 
 # MuckRock
 from muckrock.accounts.models import RecurringDonation
+from muckrock.core import metrics
 from muckrock.core.utils import stripe_retry_on_error
 from muckrock.crowdfund.models import RecurringCrowdfundPayment
 from muckrock.message import digests, receipts
@@ -28,52 +34,106 @@ from muckrock.message.notifications import SlackNotification
 logger = logging.getLogger(__name__)
 
 
+DIGEST_INTERVALS = {
+    "hourly": relativedelta(hours=1),
+    "daily": relativedelta(days=1),
+    "weekly": relativedelta(weeks=1),
+    "monthly": relativedelta(months=1),
+}
+
+
 @task(
     time_limit=600,
     soft_time_limit=570,
-    name="muckrock.message.tasks.send_activity_digest",
+    name="muckrock.message.tasks.send_activity_digests",
 )
-def send_activity_digest(user_id, subject, preference):
-    """Individual task to create and send an activity digest to a user."""
-    user = User.objects.get(id=user_id)
-    interval = {
-        "hourly": relativedelta(hours=1),
-        "daily": relativedelta(days=1),
-        "weekly": relativedelta(weeks=1),
-        "monthly": relativedelta(months=1),
-    }[preference]
-
+def send_activity_digests(user_ids, subject, preference):
+    """Create and send activity digests to a batch of users"""
+    interval = DIGEST_INTERVALS[preference]
     logger.info(
-        "Starting activity digest - User: %s Subject: %s Interval: %s",
-        user,
+        "Starting activity digests - Users: %d Subject: %s Interval: %s",
+        len(user_ids),
         subject,
         interval,
     )
+    start = time.time()
+    sent = 0
     try:
-        email = digests.ActivityDigest(user=user, subject=subject, interval=interval)
-        email.send()
+        with metrics.count_queries() as queries:
+            activities = digests.get_activities(user_ids, timezone.now() - interval)
+            users = User.objects.filter(pk__in=user_ids).select_related("profile")
+            # send all of the emails over a single connection
+            with get_connection() as connection:
+                for user in users:
+                    try:
+                        email = digests.ActivityDigest(
+                            user=user,
+                            subject=subject,
+                            interval=interval,
+                            activity=activities[user.pk],
+                            connection=connection,
+                        )
+                        sent += email.send()
+                    except SoftTimeLimitExceeded:
+                        raise
+                    except Exception as exc:  # pylint: disable=broad-except
+                        # do not let one user's digest stop the rest of the batch
+                        logger.error(
+                            "Error sending activity digest - User: %s Subject: %s: %s",
+                            user.username,
+                            subject,
+                            exc,
+                            exc_info=sys.exc_info(),
+                        )
+        metrics.gauge(f"digests.{preference}.queries_per_batch", queries.count)
         logger.info(
-            "Activity digest sent - User: %s Subject: %s Interval: %s",
-            user,
+            "Activity digests sent - Users: %d Sent: %d Subject: %s Interval: %s",
+            len(user_ids),
+            sent,
             subject,
             interval,
         )
     except SoftTimeLimitExceeded:
         logger.error(
-            "Send Activity Digest took too long. User: %s, Subject: %s, Interval %s",
-            user,
+            "Send Activity Digests took too long. Users: %d, Sent: %d, "
+            "Subject: %s, Interval %s",
+            len(user_ids),
+            sent,
             subject,
             interval,
         )
+        raise
+    finally:
+        elapsed = time.time() - start
+        metrics.incr(f"digests.{preference}.users", len(user_ids))
+        metrics.incr(f"digests.{preference}.sent", sent)
+        metrics.timing(f"digests.{preference}.batch", elapsed)
+        if elapsed:
+            metrics.gauge(
+                f"digests.{preference}.users_per_second", int(len(user_ids) / elapsed)
+            )
+
+
+@task(name="muckrock.message.tasks.send_activity_digest")
+def send_activity_digest(user_id, subject, preference):
+    """Send an activity digest to a single user, kept for tasks queued before
+    digests were sent in batches"""
+    send_activity_digests([user_id], subject, preference)
 
 
 def send_digests(preference, subject):
-    """Helper to send out timed digests"""
-    users = User.objects.filter(
-        profile__email_pref=preference, notifications__read=False
-    ).distinct()
-    for user in users:
-        send_activity_digest.delay(user.pk, subject, preference)
+    """Helper to send out timed digests, in batches of users"""
+    user_ids = list(
+        User.objects.filter(profile__email_pref=preference, notifications__read=False)
+        .order_by("pk")
+        .values_list("pk", flat=True)
+        .distinct()
+    )
+    metrics.gauge(f"digests.{preference}.last_run_users", len(user_ids))
+    for i in range(0, len(user_ids), settings.DIGEST_BATCH_SIZE):
+        send_activity_digests.delay(
+            user_ids[i : i + settings.DIGEST_BATCH_SIZE], subject, preference
+        )
 
 
 # every hour
@@ -6,6 +6,7 @@ correctly grabbing site activity.
 
 # Django
 from django.test import TestCase
+from django.utils import timezone
 
 # Standard Library
 from datetime import date
@@ -94,8 +95,8 @@ class TestDailyDigest(TestCase):
             1,
             "There should be activity that is not user initiated.",
         )
-        eq_(email.activity["questions"]["mine"].first().action.actor, other_user)
-        eq_(email.activity["questions"]["mine"].first().action.verb, "answered")
+        eq_(email.activity["questions"]["mine"][0].action.actor, other_user)
+        eq_(email.activity["questions"]["mine"][0].action.verb, "answered")
         eq_(email.send(), 1, "The email should send.")
 
     def test_digest_follow_questions(self):
@@ -107,14 +108,40 @@ class TestDailyDigest(TestCase):
         answer = AnswerFactory(user=other_user, question=question)
         email = self.digest(user=self.user, interval=self.interval)
         eq_(email.activity["count"], 1, "There should be activity.")
-        eq_(email.activity["questions"]["following"].first().action.actor, other_user)
+        eq_(email.activity["questions"]["following"][0].action.actor, other_user)
         eq_(
-            email.activity["questions"]["following"].first().action.action_object,
+            email.activity["questions"]["following"][0].action.action_object,
             answer,
         )
-        eq_(email.activity["questions"]["following"].first().action.target, question)
+        eq_(email.activity["questions"]["following"][0].action.target, question)
         eq_(email.send(), 1, "The email should send.")
 
+    def test_get_activities(self):
+        """Activity for many users should be classified together"""
+        other_user = UserFactory()
+        foia = FOIARequestFactory(composer__user=self.user)
+        completed = new_action(foia.agency, "completed", target=foia)
+        note = new_action(self.user, "added a note", target=foia)
+        notify(self.user, completed)
+        notify(self.user, note)
+        notify(other_user, completed)
+        notify(other_user, note)
+        activities = digests.get_activities(
+            [self.user.pk, other_user.pk], timezone.now() - self.interval
+        )
+        mine = activities[self.user.pk]["requests"]["mine"]
+        eq_([n.action for n in mine["completed"]], [completed])
+        eq_([n.action for n in mine["note"]], [note])
+        eq_(activities[self.user.pk]["count"], 2)
+        following = activities[other_user.pk]["requests"]["following"]
+        eq_([n.action for n in following["completed"]], [completed])
+        # notes are not included for followed requests
+        eq_(activities[other_user.pk]["count"], 1)
+        # the agency and jurisdiction shown in the digest are preloaded
+        jurisdiction = foia.jurisdiction
+        with self.assertNumQueries(0):
+            eq_(mine["completed"][0].action.target.jurisdiction, jurisdiction)
+
 
 class TestStaffDigest(TestCase):
     """The Staff Digest updates us about the state of the website."""
@@ -5,6 +5,7 @@ object cannot be instantiated.
 """
 
 # Django
+from django.core import mail
 from django.test import TestCase
 
 # Third Party
@@ -13,6 +14,8 @@ import nose.tools
 
 # MuckRock
 from muckrock.core.factories import NotificationFactory, ProjectFactory, UserFactory
+from muckrock.core.utils import new_action, notify
+from muckrock.foia.factories import FOIARequestFactory
 from muckrock.message import tasks
 from muckrock.task.factories import FlaggedTaskFactory
 
@@ -27,20 +30,57 @@ class TestDailyTask(TestCase):
     def setUp(self):
         self.user = UserFactory()
 
-    @mock.patch("muckrock.message.tasks.send_activity_digest.delay")
+    @mock.patch("muckrock.message.tasks.send_activity_digests.delay")
     def test_when_unread(self, mock_send):
         """The send method should be called when a user has unread notifications."""
         NotificationFactory(user=self.user)
         tasks.daily_digest()
-        mock_send.assert_called_with(self.user.pk, "Daily Digest", "daily")
+        mock_send.assert_called_with([self.user.pk], "Daily Digest", "daily")
 
-    @mock.patch("muckrock.message.tasks.send_activity_digest.delay")
+    @mock.patch("muckrock.message.tasks.send_activity_digests.delay")
     def test_when_no_unread(self, mock_send):
         """The send method should not be called when a user does not have
         unread notifications."""
         tasks.daily_digest()
         mock_send.assert_not_called()
 
+    def test_send_batch(self):
+        """Digests should be sent to each user in a batch with activity"""
+        other_user = UserFactory()
+        idle_user = UserFactory()
+        for user in (self.user, other_user):
+            foia = FOIARequestFactory(composer__user=user)
+            notify(user, new_action(foia.agency, "completed", target=foia))
+        tasks.send_activity_digests(
+            [self.user.pk, other_user.pk, idle_user.pk], "Daily Digest", "daily"
+        )
+        eq_(len(mail.outbox), 2)
+        eq_(
+            {tuple(m.to) for m in mail.outbox},
+            {(self.user.email,), (other_user.email,)},
+        )
+
+    def test_send_batch_error(self):
+        """An error sending one digest should not stop the rest of the batch"""
+        other_user = UserFactory()
+        for user in (self.user, other_user):
+            foia = FOIARequestFactory(composer__user=user)
+            notify(user, new_action(foia.agency, "completed", target=foia))
+        send = tasks.digests.ActivityDigest.send
+
+        def fail_once(email, *args, **kwargs):
+            if email.user == self.user:
+                raise ValueError
+            return send(email, *args, **kwargs)
+
+        with mock.patch.object(
+            tasks.digests.ActivityDigest, "send", autospec=True, side_effect=fail_once
+        ):
+            tasks.send_activity_digests(
+                [self.user.pk, other_user.pk], "Daily Digest", "daily"
+            )
+        eq_([m.to for m in mail.outbox], [[other_user.email]])
+
 
 class TestStaffTask(TestCase):
     """Tests the daily staff digest task."""
@@ -10,7 +10,6 @@ import re
 
 # MuckRock
 from muckrock.communication.models import PortalCommunication
-from muckrock.foia.tasks import classify_status
 from muckrock.task.models import ResponseTask
 
 
@@ -47,8 +46,8 @@ class PortalAutoReceiveMixin:
         comm.hidden = False
         comm.create_agency_notifications()
         comm.save()
-        task = ResponseTask.objects.create(communication=comm)
-        classify_status.apply_async(args=(task.pk,), countdown=30 * 60)
+        # the status is predicted by classify_pending_statuses
+        ResponseTask.objects.create(communication=comm)
         PortalCommunication.objects.create(
             communication=comm,
             sent_datetime=timezone.now(),
@@ -141,8 +141,7 @@ class TestFBIPortal(TestCase):
 
     @requests_mock.Mocker()
     @patch("muckrock.foia.tasks.upload_document_cloud.apply_async")
-    @patch("muckrock.foia.tasks.classify_status.apply_async")
-    def test_document_reply(self, mock_requests, mock_upload, mock_classify):
+    def test_document_reply(self, mock_upload, mock_requests):
         """Test receiving a confirmation message"""
         # pylint: disable=unused-argument
         mock_requests.get("https://www.example.com/file1.pdf", text="File 1 Content")
@@ -342,7 +342,10 @@ CELERY_WORKER_MAX_TASKS_PER_CHILD = os.environ.get(
     "CELERY_WORKER_MAX_TASKS_PER_CHILD", 100
 )
 CELERY_TASK_TIME_LIMIT = os.environ.get("CELERY_TASK_TIME_LIMIT", 5 * 60)
-CELERY_TASK_ROUTES = {"muckrock.foia.tasks.send_fax": {"queue": "phaxio"}}
+CELERY_TASK_ROUTES = {
+    "muckrock.foia.tasks.send_fax": {"queue": "phaxio"},
+    "muckrock.mailgun.tasks.process_inbound": {"queue": "mailgun"},
+}
 CELERY_WORKER_CONCURRENCY = os.environ.get("CELERY_WORKER_CONCURRENCY")
 CELERY_REDIS_MAX_CONNECTIONS = os.environ.get("CELERY_REDIS_MAX_CONNECTIONS")
 if CELERY_REDIS_MAX_CONNECTIONS is not None:
@@ -456,6 +459,21 @@ MAILGUN_SERVER_NAME = os.environ.get("MAILGUN_SERVER_NAME", "requests.muckrock.c
 MAILGUN_API_URL = os.environ.get(
     "MAILGUN_API_URL", f"https://api.mailgun.net/v3/{MAILGUN_SERVER_NAME}"
 )
+# store incoming mail and process it in a worker instead of in the webhook,
+# processing at most this many messages at once
+MAILGUN_ASYNC_INGEST = boolcheck(os.environ.get("MAILGUN_ASYNC_INGEST", False))
+MAILGUN_INGEST_CONCURRENCY = int(os.environ.get("MAILGUN_INGEST_CONCURRENCY", 4))
+# limits for downloading files from links in incoming mail - the maximum size
+# in bytes, the connect and read timeouts in seconds, and how many links to
+# download at once
+DOWNLOAD_LINK_MAX_SIZE = int(
+    os.environ.get("DOWNLOAD_LINK_MAX_SIZE", 5 * 1024 * 1024 * 1024)
+)
+DOWNLOAD_LINK_TIMEOUT = (
+    int(os.environ.get("DOWNLOAD_LINK_CONNECT_TIMEOUT", 10)),
+    int(os.environ.get("DOWNLOAD_LINK_READ_TIMEOUT", 60)),
+)
+DOWNLOAD_LINK_THREADS = int(os.environ.get("DOWNLOAD_LINK_THREADS", 4))
 
 
 EMAIL_SUBJECT_PREFIX = "[Muckrock]"
@@ -524,6 +542,10 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.DjangoModelPermissionsOrAnonReadOnly",
     ),
+    "DEFAULT_THROTTLE_RATES": {
+        # each user may stream this many bulk request exports
+        "foia_bulk": os.environ.get("API_BULK_THROTTLE_RATE", "20/hour")
+    },
 }
 MAX_PAGE_SIZE = int(os.environ.get("MAX_PAGE_SIZE", 100))
 
@@ -806,3 +828,111 @@ FOIA_TASKS_STAFF_ONLY = boolcheck(os.environ.get("FOIA_TASKS_STAFF_ONLY", True))
 SIMPLE_HISTORY_HISTORY_CHANGE_REASON_USE_TEXT_FIELD = True
 
 USE_PLAUSIBLE = boolcheck(os.environ.get("USE_PLAUSIBLE", False))
+
+# number of statistic groups to compute in parallel for the nightly statistics
+STATISTICS_WORKERS = int(os.environ.get("STATISTICS_WORKERS", 4))
+
+# how long to keep operational metrics around, in seconds
+METRICS_TIMEOUT = int(os.environ.get("METRICS_TIMEOUT", 7 * 24 * 60 * 60))
+
+# maximum number of response tasks to classify in one batch
+CLASSIFY_BATCH_SIZE = int(os.environ.get("CLASSIFY_BATCH_SIZE", 500))
+# response tasks which have not been classified after this many seconds, as
+# their files never finished processing, are no longer retried
+CLASSIFY_MAX_AGE = int(os.environ.get("CLASSIFY_MAX_AGE", 24 * 60 * 60))
+
+# the allowed email domains and agency emails are reloaded at least this often
+ALLOW_LIST_TIMEOUT = int(os.environ.get("ALLOW_LIST_TIMEOUT", 10 * 60))
+
+# follow ups are sent in chunks of this many requests, with the chunk tasks
+# rate limited per worker.  Claims on requests are kept for this many seconds
+FOLLOWUP_CHUNK_SIZE = int(os.environ.get("FOLLOWUP_CHUNK_SIZE", 100))
+FOLLOWUP_RATE_LIMIT = os.environ.get("FOLLOWUP_RATE_LIMIT", "6/m")
+FOLLOWUP_CLAIM_TIMEOUT = int(os.environ.get("FOLLOWUP_CLAIM_TIMEOUT", 24 * 60 * 60))
+
+# number of threads to copy scans with, and how many times to re-queue the
+# autoimport if it runs out of time
+AUTOIMPORT_THREADS = int(os.environ.get("AUTOIMPORT_THREADS", 8))
+AUTOIMPORT_MAX_RESUMES = int(os.environ.get("AUTOIMPORT_MAX_RESUMES", 10))
+
+# how long to cache prepared PDF attachments for, in seconds
+PDF_CACHE_TIMEOUT = int(os.environ.get("PDF_CACHE_TIMEOUT", 30 * 24 * 60 * 60))
+
+# scorecards are refreshed this many seconds after a request changes, so
+# that many changes to an agency's requests are only counted once
+SCORECARD_REFRESH_DELAY = int(os.environ.get("SCORECARD_REFRESH_DELAY", 5 * 60))
+
+# the in memory agency name indexes and jurisdiction names used by the agency
+# autocomplete are rebuilt at least this often, in seconds
+AGENCY_INDEX_TIMEOUT = int(os.environ.get("AGENCY_INDEX_TIMEOUT", 60 * 60))
+JURISDICTION_RESOLVER_TIMEOUT = int(
+    os.environ.get("JURISDICTION_RESOLVER_TIMEOUT", 60 * 60)
+)
+
+# agency mass imports fetch and create contact information for this many rows
+# at a time
+AGENCY_IMPORT_BATCH_SIZE = int(os.environ.get("AGENCY_IMPORT_BATCH_SIZE", 500))
+
+# crowdsource exports read this many responses at a time
+CROWDSOURCE_EXPORT_CHUNK_SIZE = int(
+    os.environ.get("CROWDSOURCE_EXPORT_CHUNK_SIZE", 5000)
+)
+
+# the number of eligible crowdsource data read when picking an assignment, and
+# how long a datum handed to one volunteer is passed over for others
+CROWDSOURCE_SAMPLE_SIZE = int(os.environ.get("CROWDSOURCE_SAMPLE_SIZE", 10))
+CROWDSOURCE_CLAIM_TIMEOUT = int(os.environ.get("CROWDSOURCE_CLAIM_TIMEOUT", 120))
+
+# DocumentCloud imports for crowdsources create data this many rows at a time,
+# and are restarted if they have not made progress within the time limit
+CROWDSOURCE_IMPORT_CHUNK_SIZE = int(
+    os.environ.get("CROWDSOURCE_IMPORT_CHUNK_SIZE", 1000)
+)
+CROWDSOURCE_IMPORT_TIME_LIMIT = int(
+    os.environ.get("CROWDSOURCE_IMPORT_TIME_LIMIT", 1800)
+)
+
+# crowdsource data embed codes are cached for a week, and failures to fetch
+# them for an hour
+CROWDSOURCE_EMBED_TTL = int(os.environ.get("CROWDSOURCE_EMBED_TTL", 7 * 24 * 3600))
+CROWDSOURCE_EMBED_FAILURE_TTL = int(
+    os.environ.get("CROWDSOURCE_EMBED_FAILURE_TTL", 3600)
+)
+# how long before a URL may be scheduled to be fetched again, and how many
+# URLs each task fetches
+CROWDSOURCE_EMBED_PENDING = int(os.environ.get("CROWDSOURCE_EMBED_PENDING", 600))
+CROWDSOURCE_EMBED_CHUNK_SIZE = int(os.environ.get("CROWDSOURCE_EMBED_CHUNK_SIZE", 100))
+
+# squarelet webhook notifications are collected for this many seconds and then
+# pulled in batches, with this many concurrent requests to squarelet.  Pulls
+# which keep failing are dropped after the maximum number of attempts
+SQUARELET_PULL_WINDOW = int(os.environ.get("SQUARELET_PULL_WINDOW", 10))
+SQUARELET_PULL_BATCH_SIZE = int(os.environ.get("SQUARELET_PULL_BATCH_SIZE", 100))
+SQUARELET_PULL_CONCURRENCY = int(os.environ.get("SQUARELET_PULL_CONCURRENCY", 8))
+SQUARELET_PULL_MAX_ATTEMPTS = int(os.environ.get("SQUARELET_PULL_MAX_ATTEMPTS", 5))
+
+# the request detail page shows this many of the latest communications, with
+# older communications loaded on demand
+FOIA_THREAD_PAGE_SIZE = int(os.environ.get("FOIA_THREAD_PAGE_SIZE", 25))
+
+# notifications are created this many rows at a time, and followers of a
+# request are notified in the background when there are more than the
+# threshold
+NOTIFICATION_BATCH_SIZE = int(os.environ.get("NOTIFICATION_BATCH_SIZE", 1000))
+NOTIFICATION_ASYNC_THRESHOLD = int(os.environ.get("NOTIFICATION_ASYNC_THRESHOLD", 100))
+
+# activity digests are built and sent for this many users at a time
+DIGEST_BATCH_SIZE = int(os.environ.get("DIGEST_BATCH_SIZE", 200))
+
+# soft cached fragments are kept this long after they are due to be refreshed,
+# so stale fragments can be served while one process refreshes them.  Other
+# processes wait this many seconds for a missing fragment to be computed
+SOFT_CACHE_STALE_TIMEOUT = int(os.environ.get("SOFT_CACHE_STALE_TIMEOUT", 60 * 60))
+SOFT_CACHE_LOCK_TIMEOUT = int(os.environ.get("SOFT_CACHE_LOCK_TIMEOUT", 60))
+SOFT_CACHE_LOCK_WAIT = float(os.environ.get("SOFT_CACHE_LOCK_WAIT", 5))
+# site wide stats are precomputed every ten minutes, and recomputed on demand
+# if they have not been for this long
+SITE_STATS_TIMEOUT = int(os.environ.get("SITE_STATS_TIMEOUT", 60 * 60))
+
+# the bulk request API streams this many requests per query
+API_BULK_CHUNK_SIZE = int(os.environ.get("API_BULK_CHUNK_SIZE", 500))
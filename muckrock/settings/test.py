@@ -51,3 +51,6 @@ warnings.filterwarnings(
 )
 
 CLEAN_S3_ON_FOIA_DELETE = False
+
+# test data is only visible to the test's own database connection
+STATISTICS_WORKERS = 1
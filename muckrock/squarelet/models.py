@@ -1,2 +1,31 @@
 """Models for the squarelet app"""
 # -*- coding: utf-8 -*-
+
+# Django
+from django.db import models
+from django.utils import timezone
+
+
+class PendingPull(models.Model):
+    """A user or organization waiting to have its data pulled from squarelet
+
+    Repeated notifications for the same user or organization are coalesced
+    into a single pending pull
+    """
+
+    type = models.CharField(
+        max_length=12, choices=(("user", "User"), ("organization", "Organization"))
+    )
+    uuid = models.UUIDField()
+    # when the first notification was received, to measure the sync lag
+    datetime_created = models.DateTimeField(default=timezone.now)
+    # when the latest notification was received, so that a notification which
+    # arrives while pulling is not lost
+    datetime_updated = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(default=0)
+
+    def __str__(self):
+        return "{}: {}".format(self.get_type_display(), self.uuid)
+
+    class Meta:
+        unique_together = (("type", "uuid"),)
@@ -1,43 +1,235 @@
 """Celery tasks for squarelet app"""
 # Django
 from celery.task import task
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Count, F, Min
+from django.utils import timezone
 
 # Standard Library
 import logging
 import sys
+import uuid as uuid_
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 
 # Third Party
 import requests
+from requests.adapters import HTTPAdapter
 
 # MuckRock
 from muckrock.accounts.models import Profile
+from muckrock.core import metrics
 from muckrock.core.utils import squarelet_get
 from muckrock.organization.models import Organization
+from muckrock.squarelet.models import PendingPull
 
 logger = logging.getLogger(__name__)
 
+TYPES_URL = {"user": "users", "organization": "organizations"}
+PULL_SCHEDULED = "squarelet:pull:scheduled:{}"
 
-@task(name="muckrock.squarelet.tasks.pull_data")
-def pull_data(type_, uuid, **kwargs):
-    """Task to pull data from squarelet"""
-    types_url = {"user": "users", "organization": "organizations"}
-    types_model = {"user": Profile, "organization": Organization}
-    if type_ not in types_url:
+
+@lru_cache(maxsize=None)
+def get_session():
+    """Get a session, shared for the life of the process, to reuse
+    connections to squarelet"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_maxsize=settings.SQUARELET_PULL_CONCURRENCY)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def queue_pull(type_, uuids):
+    """Queue users or organizations to have their data pulled from squarelet,
+    coalescing repeated notifications for the same uuid"""
+    if type_ not in TYPES_URL:
         logger.warning("Pull data received invalid type: %s", type_)
         return
-    try:
-        resp = squarelet_get("/api/{}/{}/".format(types_url[type_], uuid))
-        resp.raise_for_status()
-    except requests.exceptions.RequestException as exc:
-        logger.warning("Exception during pull data: %s", exc, exc_info=sys.exc_info())
-        pull_data.retry(
-            args=(type_, uuid),
-            kwargs=kwargs,
-            exc=exc,
-            countdown=2**pull_data.request.retries,
+    valid_uuids = set()
+    for uuid in uuids:
+        try:
+            valid_uuids.add(uuid_.UUID(uuid))
+        except ValueError:
+            logger.warning("Pull data received invalid uuid: %s", uuid)
+    now = timezone.now()
+    PendingPull.objects.bulk_create(
+        [
+            PendingPull(
+                type=type_, uuid=uuid, datetime_created=now, datetime_updated=now
+            )
+            for uuid in valid_uuids
+        ],
+        update_conflicts=True,
+        unique_fields=["type", "uuid"],
+        update_fields=["datetime_updated"],
+    )
+    metrics.incr(f"squarelet.pull.{type_}.received", len(uuids))
+    schedule_pull(type_)
+
+
+def schedule_pull(type_, countdown=None):
+    """Pull the pending data soon, unless a pull is already scheduled, so
+    notifications arriving close together are pulled together"""
+    if countdown is None:
+        countdown = settings.SQUARELET_PULL_WINDOW
+    if caches["lock"].add(PULL_SCHEDULED.format(type_), True, countdown + 3600):
+        transaction.on_commit(
+            lambda: pull_pending.apply_async(args=[type_], countdown=countdown)
         )
+
+
+def _fetch(type_, uuids):
+    """Fetch the data for many uuids concurrently, returning a dictionary
+    mapping each uuid to its data, or None if it could not be fetched"""
+    session = get_session()
+
+    def fetch(uuid):
+        try:
+            resp = squarelet_get(
+                "/api/{}/{}/".format(TYPES_URL[type_], uuid), session=session
+            )
+            resp.raise_for_status()
+            return uuid, resp.json()
+        except (requests.exceptions.RequestException, ValueError) as exc:
+            # a malformed body is retried like any other failed fetch
+            logger.warning(
+                "Exception during pull data: %s", exc, exc_info=sys.exc_info()
+            )
+            return uuid, None
+
+    with ThreadPoolExecutor(max_workers=settings.SQUARELET_PULL_CONCURRENCY) as pool:
+        return dict(pool.map(fetch, uuids))
+
+
+def _record_queue_metrics(type_):
+    """Record the number of pending pulls and how long the oldest has waited"""
+    pending = PendingPull.objects.filter(type=type_).aggregate(
+        depth=Count("pk"), oldest=Min("datetime_created")
+    )
+    metrics.gauge(f"squarelet.pull.{type_}.depth", pending["depth"])
+    if pending["oldest"] is None:
+        lag = 0
     else:
-        model = types_model[type_]
-        data = resp.json()
-        logger.info("Pull data for: %s %s %s", type_, uuid, data)
-        model.objects.squarelet_update_or_create(uuid, data)
+        lag = (timezone.now() - pending["oldest"]).total_seconds()
+    metrics.gauge(f"squarelet.pull.{type_}.lag_seconds", int(lag))
+
+
+@task(ignore_result=True, name="muckrock.squarelet.tasks.pull_pending")
+def pull_pending(type_):
+    """Pull the data for all pending users or organizations of the given type
+    from squarelet, a batch at a time"""
+    # clear the scheduled flag first, so notifications received while we are
+    # pulling schedule another pull
+    caches["lock"].delete(PULL_SCHEDULED.format(type_))
+    _record_queue_metrics(type_)
+    pending = PendingPull.objects.filter(type=type_).order_by("datetime_created")
+    # failed entries stay pending until their retry, so skip past them
+    skipped = []
+    while True:
+        batch = list(
+            pending.exclude(pk__in=skipped)[: settings.SQUARELET_PULL_BATCH_SIZE]
+        )
+        if not batch:
+            break
+        start = timezone.now()
+        with metrics.timer(f"squarelet.pull.{type_}.fetch"):
+            results = _fetch(type_, [p.uuid for p in batch])
+        failed = [p for p in batch if results[p.uuid] is None]
+        with metrics.timer(f"squarelet.pull.{type_}.apply"):
+            failed.extend(_apply(type_, batch, results, start))
+        for pull in batch:
+            if results[pull.uuid] is not None and pull not in failed:
+                metrics.timing(
+                    f"squarelet.pull.{type_}.lag",
+                    (timezone.now() - pull.datetime_created).total_seconds(),
+                )
+        if failed:
+            _retry(type_, failed)
+            skipped.extend(p.pk for p in failed)
+    _record_queue_metrics(type_)
+
+
+def _apply(type_, batch, results, start):
+    """Apply the updates for a batch in one transaction, and refresh the
+    cached organizations of all affected users together
+
+    Returns the pulls which failed to apply and should be tried again
+    """
+    users = []
+    organizations = []
+    pulled = []
+    failed = []
+    with transaction.atomic():
+        for pull in batch:
+            data = results[pull.uuid]
+            if data is None:
+                continue
+            logger.info("Pull data for: %s %s %s", type_, pull.uuid, data)
+            try:
+                with transaction.atomic():
+                    if type_ == "user":
+                        user, _ = Profile.objects.squarelet_update_or_create(
+                            pull.uuid, data, refresh_cache=False
+                        )
+                        users.append(user)
+                    else:
+                        (
+                            organization,
+                            _,
+                        ) = Organization.objects.squarelet_update_or_create(
+                            pull.uuid, data
+                        )
+                        organizations.append(organization)
+            except ValueError as exc:
+                # the data will not be any better if we pull it again
+                logger.error("Invalid pull data for %s %s: %s", type_, pull.uuid, exc)
+            except Exception as exc:  # pylint: disable=broad-except
+                # do not let one bad record roll back the rest of the batch
+                logger.error(
+                    "Error applying pull data for %s %s: %s",
+                    type_,
+                    pull.uuid,
+                    exc,
+                    exc_info=sys.exc_info(),
+                )
+                failed.append(pull)
+                continue
+            pulled.append(pull.uuid)
+        # remove the pulled entries, unless they were notified again since we
+        # started fetching them
+        PendingPull.objects.filter(
+            type=type_, uuid__in=pulled, datetime_updated__lt=start
+        ).delete()
+    if organizations:
+        users.extend(
+            User.objects.filter(memberships__organization__in=organizations).distinct()
+        )
+    Profile.objects.refresh_organization_cache(users)
+    return failed
+
+
+def _retry(type_, failed):
+    """Pull failed entries again later, with an exponential backoff, giving up
+    after too many attempts"""
+    retry = []
+    for pull in failed:
+        if pull.attempts + 1 < settings.SQUARELET_PULL_MAX_ATTEMPTS:
+            retry.append(pull.pk)
+        else:
+            logger.error("Giving up pulling data for: %s %s", type_, pull.uuid)
+            pull.delete()
+    if retry:
+        PendingPull.objects.filter(pk__in=retry).update(attempts=F("attempts") + 1)
+        attempts = max(p.attempts for p in failed if p.pk in retry) + 1
+        schedule_pull(type_, countdown=2**attempts * settings.SQUARELET_PULL_WINDOW)
+
+
+@task(name="muckrock.squarelet.tasks.pull_data")
+def pull_data(type_, uuid, **kwargs):
+    """Task to pull data from squarelet, kept for tasks queued before pulls
+    were coalesced"""
+    queue_pull(type_, [uuid])
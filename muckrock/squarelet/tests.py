@@ -3,7 +3,7 @@
 
 # Django
 from django.conf import settings
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.test.client import RequestFactory
 from django.urls import reverse
 
@@ -14,10 +14,13 @@ import time
 import uuid
 
 # Third Party
-from mock import patch
+import requests
+from mock import Mock, patch
 from nose.tools import eq_
 
 # MuckRock
+from muckrock.squarelet.models import PendingPull
+from muckrock.squarelet.tasks import pull_pending, queue_pull
 from muckrock.squarelet.views import webhook
 
 
@@ -45,7 +48,7 @@ class ViewsTest(TestCase):
             digestmod=hashlib.sha256,
         ).hexdigest()
 
-    @patch("muckrock.squarelet.tasks.pull_data.delay")
+    @patch("muckrock.squarelet.views.queue_pull")
     def test_webhook_success(self, mock):
         """Test a succesful webhook"""
         request = self.request_factory.post(self.url, self.data)
@@ -53,10 +56,9 @@ class ViewsTest(TestCase):
 
         eq_(response.status_code, 200)
         eq_(response.content, b"OK")
-        for uuid_ in self.data["uuids"]:
-            mock.assert_any_call(self.data["type"], uuid_)
+        mock.assert_called_once_with(self.data["type"], self.data["uuids"])
 
-    @patch("muckrock.squarelet.tasks.pull_data.delay")
+    @patch("muckrock.squarelet.views.queue_pull")
     def test_webhook_signature_error(self, mock):
         """Test a webhook with an incorrect signature"""
         self.data["signature"] = "foobar"
@@ -66,7 +68,7 @@ class ViewsTest(TestCase):
         eq_(response.status_code, 403)
         mock.assert_not_called()
 
-    @patch("muckrock.squarelet.tasks.pull_data.delay")
+    @patch("muckrock.squarelet.views.queue_pull")
     def test_webhook_expired_error(self, mock):
         """Test a webhook with an expired timestamp"""
         self.data["timestamp"] = int(time.time()) - 3600
@@ -79,7 +81,7 @@ class ViewsTest(TestCase):
         eq_(response.status_code, 403)
         mock.assert_not_called()
 
-    @patch("muckrock.squarelet.tasks.pull_data.delay")
+    @patch("muckrock.squarelet.views.queue_pull")
     def test_webhook_bad_timestamp(self, mock):
         """Test a webhook with a non-numeric timestamp"""
         self.data["timestamp"] = "foobar"
@@ -91,3 +93,62 @@ class ViewsTest(TestCase):
 
         eq_(response.status_code, 403)
         mock.assert_not_called()
+
+
+class PullTest(TestCase):
+    """Test pulling data from squarelet in batches"""
+
+    def test_queue_pull_coalesce(self):
+        """Repeated notifications for the same uuid should be pulled once"""
+        uuid_ = str(uuid.uuid4())
+        queue_pull("user", [uuid_, uuid_, "foobar"])
+        queue_pull("user", [uuid_])
+        queue_pull("organization", [uuid_])
+        eq_(PendingPull.objects.filter(type="user").count(), 1)
+        eq_(PendingPull.objects.filter(type="organization").count(), 1)
+
+    @override_settings(SQUARELET_PULL_MAX_ATTEMPTS=2)
+    @patch("muckrock.squarelet.tasks.schedule_pull")
+    @patch("muckrock.squarelet.tasks.squarelet_get")
+    def test_pull_pending_error(self, mock_get, mock_schedule):
+        """Failed pulls should be retried, up to the maximum attempts"""
+        mock_get.side_effect = requests.exceptions.ConnectionError
+        pull = PendingPull.objects.create(type="user", uuid=uuid.uuid4())
+        pull_pending("user")
+        pull.refresh_from_db()
+        eq_(pull.attempts, 1)
+        mock_schedule.assert_called_once()
+        pull_pending("user")
+        assert not PendingPull.objects.filter(pk=pull.pk).exists()
+
+    @override_settings(SQUARELET_PULL_BATCH_SIZE=1)
+    @patch("muckrock.squarelet.tasks.Profile")
+    @patch("muckrock.squarelet.tasks.schedule_pull")
+    @patch("muckrock.squarelet.tasks.squarelet_get")
+    def test_pull_pending_continue(self, mock_get, mock_schedule, mock_profile):
+        """A failed pull should not hold up the rest of the queue"""
+        fetch_error, decode_error, apply_error, success = [
+            PendingPull.objects.create(type="user", uuid=uuid.uuid4()) for _ in range(4)
+        ]
+
+        def get(url, session):
+            if str(fetch_error.uuid) in url:
+                raise requests.exceptions.ConnectionError
+            if str(decode_error.uuid) in url:
+                return Mock(json=Mock(side_effect=ValueError))
+            return Mock(json=Mock(return_value={"url": url}))
+
+        def update_or_create(uuid_, data, refresh_cache):
+            if uuid_ == apply_error.uuid:
+                raise RuntimeError
+            return Mock(), False
+
+        mock_get.side_effect = get
+        mock_profile.objects.squarelet_update_or_create.side_effect = update_or_create
+        pull_pending("user")
+        eq_(mock_profile.objects.squarelet_update_or_create.call_count, 2)
+        eq_(
+            set(PendingPull.objects.values_list("uuid", "attempts")),
+            {(fetch_error.uuid, 1), (decode_error.uuid, 1), (apply_error.uuid, 1)},
+        )
+        eq_(mock_schedule.call_count, 3)
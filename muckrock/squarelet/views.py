@@ -14,7 +14,7 @@ import logging
 import time
 
 # MuckRock
-from muckrock.squarelet.tasks import pull_data
+from muckrock.squarelet.tasks import queue_pull
 
 logger = logging.getLogger(__name__)
 
@@ -42,7 +42,6 @@ def webhook(request):
     if not match or not timestamp_current:
         return HttpResponseForbidden()
 
-    # pull the new data asynchrnously
-    for uuid in uuids:
-        pull_data.delay(type_, uuid)
+    # pull the new data asynchrnously, in batches
+    queue_pull(type_, uuids)
     return HttpResponse("OK")
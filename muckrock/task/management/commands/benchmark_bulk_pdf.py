@@ -0,0 +1,90 @@
+"""
+Benchmark merging bulk snail mail PDFs in memory against spooling them to disk
+"""
+# Django
+from django.core.management.base import BaseCommand
+
+# Standard Library
+import os.path
+import time
+import tracemalloc
+from io import BytesIO
+from tempfile import TemporaryDirectory, TemporaryFile
+
+# Third Party
+from fpdf import FPDF
+from pypdf import PdfMerger, PdfReader
+
+# MuckRock
+from muckrock.task.pdf import blank_page_pdf, merge_bulk_pdf
+
+
+class Command(BaseCommand):
+    """Benchmark bulk snail mail PDF merging"""
+
+    help = "Compare peak memory and time of in memory and spooled PDF merging"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--letters", type=int, default=20, help="Number of letters to merge"
+        )
+        parser.add_argument(
+            "--pages", type=int, default=300, help="Pages per synthetic attachment"
+        )
+
+    def handle(self, *args, **kwargs):
+        with TemporaryDirectory() as tmp_dir:
+            paths = self.generate(tmp_dir, kwargs["letters"], kwargs["pages"])
+            for name, method in [
+                ("In memory", self.merge_in_memory),
+                ("Spooled", self.merge_spooled),
+            ]:
+                tracemalloc.start()
+                start = time.time()
+                size = method(paths, kwargs["pages"])
+                elapsed = time.time() - start
+                _current, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                self.stdout.write(
+                    f"{name}: {elapsed:.2f}s, peak memory {peak / 1024 / 1024:.1f}MB, "
+                    f"output {size / 1024 / 1024:.1f}MB"
+                )
+
+    def generate(self, tmp_dir, letters, pages):
+        """Generate synthetic multi page PDFs on disk"""
+        paths = []
+        for i in range(letters):
+            pdf = FPDF()
+            pdf.set_font("Times", "", 12)
+            for page in range(pages):
+                pdf.add_page()
+                pdf.multi_cell(0, 5, f"Letter {i} page {page}\n" * 40)
+            path = os.path.join(tmp_dir, f"{i}.pdf")
+            pdf.output(path)
+            paths.append(path)
+        self.stdout.write(f"Generated {letters} PDFs with {pages} pages each")
+        return paths
+
+    def merge_in_memory(self, paths, _pages):
+        """Merge the way the bulk PDF task used to - every prepared PDF is held
+        in memory, re-read for its page count, and the output is buffered"""
+        merger = PdfMerger(strict=False)
+        blank = blank_page_pdf()
+        for path in paths:
+            with open(path, "rb") as pdf_file:
+                prepared_pdf = BytesIO(pdf_file.read())
+            merger.append(prepared_pdf)
+            if len(PdfReader(prepared_pdf).pages) % 2 == 1:
+                blank.seek(0)
+                merger.append(blank)
+        bulk_pdf = BytesIO()
+        merger.write(bulk_pdf)
+        return bulk_pdf.tell()
+
+    def merge_spooled(self, paths, pages):
+        """Merge from disk to disk, using the known page counts"""
+        cover_pdf = FPDF()
+        cover_pdf.add_page()
+        with TemporaryFile() as bulk_pdf:
+            merge_bulk_pdf(cover_pdf, [(path, pages) for path in paths], bulk_pdf)
+            return bulk_pdf.tell()
@@ -5,13 +5,17 @@ PDF Class for Snail Mail PDF letter generation
 
 # Django
 from django.conf import settings
-from django.core.files.base import ContentFile
+from django.core.cache import cache
+from django.core.files.base import ContentFile, File
+from django.core.files.storage import default_storage
 from django.utils import timezone
 
 # Standard Library
+import hashlib
 import logging
 import os.path
 import subprocess
+import time
 from datetime import date
 from io import BytesIO
 from itertools import groupby
@@ -21,11 +25,12 @@ from tempfile import TemporaryDirectory
 import emoji
 import pypdf
 from fpdf import FPDF
-from pypdf import PdfMerger, PdfReader
+from pypdf import PdfMerger, PdfReader, PdfWriter
 from pypdf.errors import PdfReadError
 
 # MuckRock
 from muckrock.communication.models import MailCommunication
+from muckrock.core import metrics
 
 # These are the dimensions of a standard sized PDF page
 # in whatever units pypdf are using
@@ -137,13 +142,27 @@ ALLOWED_FONTS = [
 def needs_embedding(pdf):
     """We need to embed fonts if it contains a non-embedded font not in the list"""
     fonts, _embedded, _unembedded = get_fonts(pdf)
+    return _needs_embedding(fonts)
+
+
+def _needs_embedding(fonts):
     return any(font.strip("/") not in ALLOWED_FONTS for font in fonts)
 
 
 def handle_embedding(file):
-    """Check if the file needs fonts embedded, and then embed them if it does"""
+    """Check if the file needs fonts embedded, and then embed them if it does
+
+    Returns a report of the fonts used in the file
+    """
     pdf = PdfReader(file.ffile)
-    if needs_embedding(pdf):
+    fonts, _embedded, unembedded = get_fonts(pdf)
+    report = {
+        "fonts": sorted(str(f) for f in fonts),
+        "unembedded": sorted(str(f) for f in unembedded),
+        "ghostscript": False,
+    }
+    if _needs_embedding(fonts):
+        start = time.time()
         with TemporaryDirectory() as tmp:
             input_path = os.path.join(tmp, "input.pdf")
             with open(input_path, "wb") as input_file:
@@ -157,6 +176,80 @@ def handle_embedding(file):
             )
             with open(output_path, "rb") as output_file:
                 file.ffile.save(file.name(), ContentFile(output_file.read()))
+        report["ghostscript"] = True
+        metrics.timing("pdf_cache.ghostscript", time.time() - start)
+    return report
+
+
+def get_file_hash(ffile):
+    """Get the SHA-256 hash of a file's contents"""
+    sha = hashlib.sha256()
+    for chunk in ffile.chunks():
+        sha.update(chunk)
+    ffile.seek(0)
+    return sha.hexdigest()
+
+
+def normalize_page(page):
+    """Rotate pages to portrait and scale them to letter size if necessary"""
+    rotated = False
+    width = page.mediabox.width
+    height = page.mediabox.height
+    # account for rotations
+    rotation = page.rotation
+    if rotation is not None and rotation % 180 == 90:
+        width, height = height, width
+        rotated = not rotated
+    if width > height:
+        page.rotate(-90)
+        # page.transfer_rotation_to_content()
+        width, height = height, width
+        rotated = not rotated
+    if (width, height) != (PDF_WIDTH, PDF_HEIGHT):
+        if rotated:
+            page.scale_to(PDF_HEIGHT, PDF_WIDTH)
+        else:
+            page.scale_to(PDF_WIDTH, PDF_HEIGHT)
+
+
+def prepare_attachment(file_):
+    """Embed fonts in and normalize the pages of a PDF attachment
+
+    Results are cached by the hash of the file's contents, so the same
+    attachment is only parsed and run through ghostscript once, no matter how
+    many times it is mailed.  Returns a file object for the prepared PDF and
+    its page count.
+    """
+    file_hash = get_file_hash(file_.ffile)
+    cache_key = f"pdf_cache:{file_hash}"
+    info = cache.get(cache_key)
+    if info is not None and default_storage.exists(info["path"]):
+        metrics.incr("pdf_cache.hit")
+        return default_storage.open(info["path"]), info["pages"]
+    metrics.incr("pdf_cache.miss")
+
+    report = handle_embedding(file_)
+    writer = PdfWriter()
+    for page in PdfReader(file_.ffile).pages:
+        normalize_page(page)
+        writer.add_page(page)
+    prepared = BytesIO()
+    writer.write(prepared)
+
+    path = f"pdf_cache/{file_hash}.pdf"
+    if not default_storage.exists(path):
+        prepared.seek(0)
+        path = default_storage.save(path, File(prepared))
+    info = {"path": path, "pages": len(writer.pages), "fonts": report}
+    cache.set(cache_key, info, settings.PDF_CACHE_TIMEOUT)
+    if report["ghostscript"]:
+        # the file was replaced with its embedded version, cache that too
+        cache.set(
+            f"pdf_cache:{get_file_hash(file_.ffile)}", info, settings.PDF_CACHE_TIMEOUT
+        )
+
+    prepared.seek(0)
+    return prepared, info["pages"]
 
 
 class PDF(FPDF):
@@ -244,27 +337,8 @@ class MailPDF(PDF):
 
     def _resize_pages(self, pages):
         """Resize the page if necessary and able"""
-        i = 0
         for page in pages:
-            i += 1
-            rotated = False
-            width = page.pagedata.mediabox.width
-            height = page.pagedata.mediabox.height
-            # account for rotations
-            rotation = page.pagedata.rotation
-            if rotation is not None and rotation % 180 == 90:
-                width, height = height, width
-                rotated = not rotated
-            if width > height:
-                page.pagedata.rotate(-90)
-                # page.transfer_rotation_to_content()
-                width, height = height, width
-                rotated = not rotated
-            if (width, height) != (PDF_WIDTH, PDF_HEIGHT):
-                if rotated:
-                    page.pagedata.scale_to(PDF_HEIGHT, PDF_WIDTH)
-                else:
-                    page.pagedata.scale_to(PDF_WIDTH, PDF_HEIGHT)
+            normalize_page(page.pagedata)
 
     def prepare(self, address_override=None, num_msgs=5):
         """Prepare the PDF to be sent by appending attachments"""
@@ -301,14 +375,13 @@ class MailPDF(PDF):
         for file_ in self.comm.files.all():
             if file_.get_extension() == "pdf":
                 try:
-                    # detect un-embedded fonts
-                    handle_embedding(file_)
-                    pages = len(PdfReader(file_.ffile).pages)
+                    # embed fonts and normalize pages
+                    prepared_file, pages = prepare_attachment(file_)
                     if pages + total_pages > self.page_limit:
                         # too long, skip
                         files.append((file_, "skipped", pages))
                     else:
-                        merger.append(file_.ffile)
+                        merger.append(prepared_file)
                         files.append((file_, "attached", pages))
                         total_pages += pages
                 except (PdfReadError, ValueError, subprocess.CalledProcessError):
@@ -330,7 +403,7 @@ class MailPDF(PDF):
             defaults={"to_address": address, "sent_datetime": timezone.now()},
         )
         single_pdf.seek(0)
-        mail.pdf.save("{}.pdf".format(self.comm.pk), ContentFile(single_pdf.read()))
+        mail.pdf.save("{}.pdf".format(self.comm.pk), File(single_pdf))
 
         # return to begining of merged pdf before returning
         single_pdf.seek(0)
@@ -456,3 +529,37 @@ class CoverPDF(PDF):
                         )
         text = "\n".join(lines)
         self.multi_cell(0, 13, text, 0, "L")
+
+
+def blank_page_pdf():
+    """A single blank page, for aligning double sided printing"""
+    blank_pdf = FPDF()
+    blank_pdf.add_page()
+    return BytesIO(blank_pdf.output(dest="S").encode("latin-1"))
+
+
+def merge_bulk_pdf(cover_pdf, prepared, out_file):
+    """Merge the cover sheet and prepared PDFs into a single PDF for printing
+
+    `prepared` is an iterable of (path, page count) for each prepared PDF, which
+    have been spooled to disk.  The PDFs are read lazily from disk and the merged
+    PDF is written to `out_file`, so nothing is buffered in memory beyond what
+    pypdf needs to write the output.
+    """
+    merger = PdfMerger(strict=False)
+    blank = blank_page_pdf()
+
+    # the cover sheet goes first
+    if cover_pdf.page % 2 == 1:
+        cover_pdf.add_page()
+    merger.append(BytesIO(cover_pdf.output(dest="S").encode("latin-1")))
+
+    for path, page_count in prepared:
+        merger.append(path)
+        # ensure we align for double sided printing
+        if page_count % 2 == 1:
+            blank.seek(0)
+            merger.append(blank)
+
+    merger.write(out_file)
+    merger.close()
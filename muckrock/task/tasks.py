@@ -11,14 +11,14 @@ from django.utils import timezone
 
 # Standard Library
 import logging
+import shutil
 import sys
-from io import BytesIO
 from random import randint
+from tempfile import NamedTemporaryFile, TemporaryDirectory, TemporaryFile
 
 # Third Party
 import boto3
-from fpdf import FPDF
-from pypdf import PdfMerger, PdfReader
+from boto3.s3.transfer import TransferConfig
 from requests.exceptions import RequestException
 from zenpy.lib.exception import APIException, ZenpyException
 
@@ -26,7 +26,7 @@ from zenpy.lib.exception import APIException, ZenpyException
 from muckrock.foia.models import FOIACommunication, FOIARequest
 from muckrock.task.filters import SnailMailTaskFilterSet
 from muckrock.task.models import FlaggedTask, SnailMailTask
-from muckrock.task.pdf import CoverPDF, SnailMailPDF
+from muckrock.task.pdf import CoverPDF, SnailMailPDF, merge_bulk_pdf
 
 logger = logging.getLogger(__name__)
 
@@ -48,62 +48,68 @@ def submit_review_update(foia_pks, reply_text, **kwargs):
         foia.submit(switch=True)
 
 
+def _prepare_snail_mail_pdf(snail, tmp_dir):
+    """Prepare the PDF for a single snail mail task, spooling it to disk
+
+    Returns the path to the prepared PDF, or None if it could not be
+    prepared, along with its page count and the attached files
+    """
+    pdf = SnailMailPDF(snail.communication, snail.category, snail.switch, snail.amount)
+    prepared_pdf, page_count, files, _mail = pdf.prepare()
+    if prepared_pdf is None:
+        return None, page_count, files
+    with NamedTemporaryFile(suffix=".pdf", dir=tmp_dir, delete=False) as prepared_file:
+        shutil.copyfileobj(prepared_pdf, prepared_file)
+    return prepared_file.name, page_count, files
+
+
 @task(
     ignore_result=True,
     time_limit=900,
     name="muckrock.task.tasks.snail_mail_bulk_pdf_task",
 )
 def snail_mail_bulk_pdf_task(pdf_name, get, **kwargs):
-    """Save a PDF file for all open snail mail tasks"""
-    # pylint: disable=too-many-locals
-    cover_info = []
-    bulk_merger = PdfMerger(strict=False)
-
-    snails = SnailMailTaskFilterSet(
-        get,
-        queryset=SnailMailTask.objects.filter(resolved=False)
-        .order_by("-amount", "communication__foia__agency")
-        .preload_pdf(),
-    ).qs[:100]
-
-    blank_pdf = FPDF()
-    blank_pdf.add_page()
-    blank = BytesIO(blank_pdf.output(dest="S").encode("latin-1"))
-    for snail in snails.iterator():
-        # generate the pdf and merge all pdf attachments
-        pdf = SnailMailPDF(
-            snail.communication, snail.category, snail.switch, snail.amount
-        )
-        prepared_pdf, page_count, files, _mail = pdf.prepare()
-        cover_info.append((snail, page_count, files))
-
-        if prepared_pdf is not None:
-            # append to the bulk pdf
-            bulk_merger.append(prepared_pdf)
-            # ensure we align for double sided printing
-            if PdfReader(prepared_pdf).getNumPages() % 2 == 1:
-                blank.seek(0)
-                bulk_merger.append(blank)
-
-    # preprend the cover sheet
-    cover_pdf = CoverPDF(cover_info)
-    cover_pdf.generate()
-    if cover_pdf.page % 2 == 1:
-        cover_pdf.add_page()
-    bulk_merger.merge(0, BytesIO(cover_pdf.output(dest="S").encode("latin-1")))
-
-    bulk_pdf = BytesIO()
-    bulk_merger.write(bulk_pdf)
-    bulk_pdf.seek(0)
-
-    s3 = boto3.client("s3")
-    s3.upload_fileobj(
-        bulk_pdf,
-        settings.AWS_MEDIA_BUCKET_NAME,
-        pdf_name,
-        ExtraArgs={"ACL": settings.AWS_DEFAULT_ACL},
+    """Save a PDF file for all open snail mail tasks
+
+    Each prepared PDF is spooled to disk and the merged PDF is streamed
+    from disk to S3.
+    """
+    snails = list(
+        SnailMailTaskFilterSet(
+            get,
+            queryset=SnailMailTask.objects.filter(resolved=False)
+            .order_by("-amount", "communication__foia__agency")
+            .preload_pdf(),
+        ).qs[:100]
     )
 
+    with TemporaryDirectory() as tmp_dir:
+        results = [_prepare_snail_mail_pdf(snail, tmp_dir) for snail in snails]
+
+        cover_info = [
+            (snail, page_count, files)
+            for snail, (_path, page_count, files) in zip(snails, results)
+        ]
+        prepared = [
+            (path, page_count)
+            for path, page_count, _files in results
+            if path is not None
+        ]
+        cover_pdf = CoverPDF(cover_info)
+        cover_pdf.generate()
+
+        with TemporaryFile() as bulk_pdf:
+            merge_bulk_pdf(cover_pdf, prepared, bulk_pdf)
+            bulk_pdf.seek(0)
+            s3 = boto3.client("s3")
+            s3.upload_fileobj(
+                bulk_pdf,
+                settings.AWS_MEDIA_BUCKET_NAME,
+                pdf_name,
+                ExtraArgs={"ACL": settings.AWS_DEFAULT_ACL},
+                Config=TransferConfig(multipart_chunksize=8 * 1024 * 1024),
+            )
+
 
 @task(ignore_result=True, max_retries=5, name="muckrock.task.tasks.create_ticket")
 def create_ticket(flag_pk, **kwargs):
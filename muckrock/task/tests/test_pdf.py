@@ -3,16 +3,25 @@ Tests for PDF generation
 """
 
 # Django
-from django.test import TestCase
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+
+# Standard Library
+from io import BytesIO
 
 # Third Party
+from fpdf import FPDF
+from mock import patch
 from nose.tools import eq_, ok_
+from pypdf import PdfReader
 
 # MuckRock
 from muckrock.communication.models import MailCommunication
-from muckrock.foia.factories import FOIACommunicationFactory
+from muckrock.foia.factories import FOIACommunicationFactory, FOIAFileFactory
 from muckrock.task.factories import SnailMailTaskFactory
-from muckrock.task.pdf import LobPDF, SnailMailPDF
+from muckrock.task.pdf import LobPDF, SnailMailPDF, prepare_attachment
+from muckrock.task.tasks import snail_mail_bulk_pdf_task
 
 
 class PDFTests(TestCase):
@@ -39,3 +48,76 @@ class PDFTests(TestCase):
         eq_(page_count, 1)
         eq_(files, [])
         ok_(isinstance(mail, MailCommunication))
+
+    @override_settings(
+        CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+            "lock": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        }
+    )
+    def test_prepare_attachment_cache(self):
+        """Identical attachments should only be prepared once"""
+        pdf = FPDF("L", "pt", "Letter")
+        pdf.add_page()
+        pdf.add_page()
+        content = pdf.output(dest="S").encode("latin-1")
+        file_a = FOIAFileFactory(ffile=ContentFile(content, name="a.pdf"))
+        file_b = FOIAFileFactory(ffile=ContentFile(content, name="b.pdf"))
+
+        prepared_a, pages_a = prepare_attachment(file_a)
+        eq_(pages_a, 2)
+        # landscape pages are rotated to portrait
+        eq_(PdfReader(prepared_a).pages[0].rotation % 180, 90)
+
+        with self.assertNumQueries(0):
+            prepared_b, pages_b = prepare_attachment(file_b)
+        eq_(pages_b, 2)
+        eq_(prepared_b.read(), prepared_a.getvalue())
+
+
+class BulkPDFTests(TestCase):
+    """Test generating the bulk snail mail PDF"""
+
+    def setUp(self):
+        self.uploads = []
+        patcher = patch("muckrock.task.tasks.boto3.client")
+        mock_client = patcher.start()
+        self.addCleanup(patcher.stop)
+        mock_client.return_value.upload_fileobj.side_effect = self.upload
+
+    def upload(self, fileobj, bucket, key, **kwargs):
+        """Record what would have been uploaded to S3"""
+        self.uploads.append(
+            {
+                "bucket": bucket,
+                "key": key,
+                "on_disk": hasattr(fileobj, "fileno"),
+                "content": fileobj.read(),
+                "kwargs": kwargs,
+            }
+        )
+
+    def test_bulk_pdf(self):
+        """The PDFs for all open snail mail tasks are merged and uploaded"""
+        SnailMailTaskFactory.create_batch(2)
+        SnailMailTaskFactory(resolved=True)
+        snail_mail_bulk_pdf_task.apply(args=("bulk.pdf", {}), throw=True)
+        eq_(len(self.uploads), 1)
+        upload = self.uploads[0]
+        eq_(upload["bucket"], settings.AWS_MEDIA_BUCKET_NAME)
+        eq_(upload["key"], "bulk.pdf")
+        eq_(upload["kwargs"]["ExtraArgs"], {"ACL": settings.AWS_DEFAULT_ACL})
+        # the merged PDF is streamed from a file on disk, from the beginning
+        ok_(upload["on_disk"])
+        reader = PdfReader(BytesIO(upload["content"]))
+        # each one page letter is padded with a blank page for double sided
+        # printing, after a cover sheet with an even number of pages
+        eq_(len(reader.pages) % 2, 0)
+        ok_(len(reader.pages) >= 6)
+
+    def test_bulk_pdf_empty(self):
+        """With no open snail mail tasks only the cover sheet is uploaded"""
+        snail_mail_bulk_pdf_task.apply(args=("bulk.pdf", {}), throw=True)
+        eq_(len(self.uploads), 1)
+        reader = PdfReader(BytesIO(self.uploads[0]["content"]))
+        ok_(len(reader.pages) >= 1)